@@ -0,0 +1,139 @@
+"""
+模擬工作的協作式取消
+
+每個模擬請求在 job_scope 中執行並持有一個 CancelToken：
+- 背景任務定期以 probe (例如 Request.is_disconnected) 檢查客戶端是否已中斷連線；
+- 同一客戶端對同一圖表送出新請求時，先前仍在排隊或執行中的請求被取代 (superseded)；
+- 生成函數在場景設置、求解、CFR 計算與繪圖之間呼叫 await checkpoint()，
+  取消後於下一個檢查點拋出 SimulationCancelled。
+
+Sionna/Mitsuba 的求解呼叫本身無法中斷，取消會在該呼叫結束後的檢查點生效。
+"""
+
+import asyncio
+import contextvars
+import logging
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, Hashable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 背景檢查客戶端連線的間隔 (秒)
+DISCONNECT_POLL_INTERVAL = 0.5
+
+
+class SimulationCancelled(Exception):
+    """模擬在檢查點被取消；reason 為 disconnected 或 superseded"""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Simulation cancelled ({reason})")
+        self.reason = reason
+
+
+class CancelToken:
+    """單一模擬請求的取消狀態"""
+
+    def __init__(self, probe: Optional[Callable[[], Awaitable[bool]]] = None):
+        self.probe = probe
+        self.reason: Optional[str] = None
+        self._callbacks: List[Callable[[str], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+
+    def cancel(self, reason: str) -> None:
+        if self.reason is not None:
+            return
+        self.reason = reason
+        for callback in list(self._callbacks):
+            callback(reason)
+
+    def add_callback(self, callback: Callable[[str], None]) -> None:
+        """取消時呼叫 (例如把排隊中的工作移出佇列)"""
+        self._callbacks.append(callback)
+
+    def remove_callback(self, callback: Callable[[str], None]) -> None:
+        if callback in self._callbacks:
+            self._callbacks.remove(callback)
+
+    def raise_if_cancelled(self) -> None:
+        if self.reason is not None:
+            raise SimulationCancelled(self.reason)
+
+    async def poll(self) -> bool:
+        """以 probe 檢查連線，已中斷時取消並回傳 True"""
+        if not self.cancelled and self.probe is not None and await self.probe():
+            self.cancel("disconnected")
+        return self.cancelled
+
+
+_current_token: contextvars.ContextVar[Optional[CancelToken]] = contextvars.ContextVar(
+    "simulation_cancel_token", default=None
+)
+
+
+def current_token() -> Optional[CancelToken]:
+    return _current_token.get()
+
+
+@contextmanager
+def cancellation_scope(token: CancelToken) -> Iterator[CancelToken]:
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset)
+
+
+def raise_if_cancelled() -> None:
+    """同步檢查點：不讓出事件迴圈，只檢查已記錄的取消"""
+    token = _current_token.get()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+async def checkpoint() -> None:
+    """非同步檢查點：讓出事件迴圈處理連線事件後檢查客戶端是否仍在等待"""
+    token = _current_token.get()
+    if token is None:
+        return
+    await asyncio.sleep(0)
+    await token.poll()
+    token.raise_if_cancelled()
+
+
+# 同一客戶端與圖表最新的請求，新請求會取代舊請求
+_active_jobs: Dict[Hashable, CancelToken] = {}
+
+
+async def _watch(token: CancelToken) -> None:
+    while not await token.poll():
+        await asyncio.sleep(DISCONNECT_POLL_INTERVAL)
+    logger.info(f"Cancelling simulation request: {token.reason}")
+
+
+@asynccontextmanager
+async def job_scope(
+    key: Optional[Hashable] = None,
+    probe: Optional[Callable[[], Awaitable[bool]]] = None,
+) -> AsyncIterator[CancelToken]:
+    """在可取消的範圍內執行模擬請求
+
+    key 相同的新請求會取消先前的請求；probe 回傳 True 時 (客戶端已中斷) 取消此請求。
+    """
+    token = CancelToken(probe)
+    if key is not None:
+        previous = _active_jobs.get(key)
+        if previous is not None:
+            previous.cancel("superseded")
+        _active_jobs[key] = token
+    watcher = asyncio.create_task(_watch(token)) if probe is not None else None
+    try:
+        with cancellation_scope(token):
+            yield token
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+        if key is not None and _active_jobs.get(key) is token:
+            del _active_jobs[key]
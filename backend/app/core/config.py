@@ -82,6 +82,10 @@ SINR_MAP_IMAGE_PATH = OUTPUT_DIR / "sinr_map.png"  # SINR 地圖路徑
 DOPPLER_IMAGE_PATH = OUTPUT_DIR / "delay_doppler.png"  # 延遲多普勒圖路徑
 # 通道響應圖路徑
 CHANNEL_RESPONSE_IMAGE_PATH = OUTPUT_DIR / "channel_response_plots.png"
+# 漸進式 SINR 地圖各級圖像的目錄
+SINR_LEVEL_IMAGE_DIR = OUTPUT_DIR / "sinr_levels"
+# 各模擬工作輸出圖像的目錄 (依 job_id 命名，並行的工作不共用檔案)
+JOB_IMAGE_DIR = OUTPUT_DIR / "jobs"
 logger.info(f"Time-Frequency Image Path (in container): {CHANNEL_RESPONSE_IMAGE_PATH}")
 
 # logger.info(f"Project Root (estimated): {PROJECT_ROOT}") # 不再需要
@@ -147,6 +151,83 @@ logger.info(
 )
 
 
+
+def get_bool_env(var_name, default=False):
+    value = os.getenv(var_name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# --- Device Event Stream Configuration ---
+# 啟用後設備事件經由 PostgreSQL LISTEN/NOTIFY 廣播，讓多個 worker 的客戶端都能收到
+DEVICE_EVENTS_PG_NOTIFY = get_bool_env("DEVICE_EVENTS_PG_NOTIFY")
+DEVICE_EVENTS_CHANNEL = os.getenv("DEVICE_EVENTS_CHANNEL", "device_events")
+
+# --- Simulation Profiling Configuration ---
+# 只有設定 SIMULATION_PROFILE_TOKEN 時才允許以 profile=true 分析請求，且請求需帶相同的 X-Profile-Token
+SIMULATION_PROFILE_TOKEN = os.getenv("SIMULATION_PROFILE_TOKEN") or None
+SIMULATION_PROFILE_DIR = Path(
+    os.getenv("SIMULATION_PROFILE_DIR", str(APP_DIR.parent / "profiles"))
+)
+SIMULATION_PROFILE_KEEP = int(os.getenv("SIMULATION_PROFILE_KEEP", "50"))  # 保留最近的分析結果數
+
+# --- Simulation Memory Configuration ---
+# 啟用後以 tracemalloc 追蹤 Python/NumPy 配置 (有額外開銷，建議只在診斷時開啟)
+SIMULATION_TRACEMALLOC = get_bool_env("SIMULATION_TRACEMALLOC")
+# 估計記憶體用量超過此上限 (MiB) 的模擬在開始前即被拒絕；未設定時不限制
+SIMULATION_MEMORY_LIMIT_MB = get_float_env("SIMULATION_MEMORY_LIMIT_MB")
+
+# --- Simulation Admission Configuration ---
+SIMULATION_MAX_CONCURRENT = int(os.getenv("SIMULATION_MAX_CONCURRENT", "1"))  # 一般 worker 數
+# 只給 interactive 等級使用的保留 worker 數
+SIMULATION_INTERACTIVE_WORKERS = int(os.getenv("SIMULATION_INTERACTIVE_WORKERS", "1"))
+# 各優先等級排隊中的模擬上限，超過回傳 429
+SIMULATION_QUEUE_LIMITS = {
+    "interactive": int(os.getenv("SIMULATION_INTERACTIVE_QUEUE_LIMIT", "4")),
+    "standard": int(os.getenv("SIMULATION_QUEUE_LIMIT", "8")),
+    "batch": int(os.getenv("SIMULATION_BATCH_QUEUE_LIMIT", "32")),
+}
+# 估計執行時間超過此值 (秒) 的工作即使要求 interactive 也以 standard 排程
+SIMULATION_INTERACTIVE_MAX_RUNTIME_S = float(
+    os.getenv("SIMULATION_INTERACTIVE_MAX_RUNTIME_S", "15")
+)
+# 估計排隊時間 (秒) 超過此值時回傳 429；未設定時不限制
+SIMULATION_MAX_QUEUE_WAIT_S = get_float_env("SIMULATION_MAX_QUEUE_WAIT_S")
+# 估計執行時間 (秒) 超過此值的模擬會調降參數 (SINR 地圖) 或回傳 429；未設定時不限制
+SIMULATION_MAX_RUNTIME_S = get_float_env("SIMULATION_MAX_RUNTIME_S")
+# 保存執行時間模型校正觀測值的 JSON 檔；未設定時只保存在記憶體中
+SIMULATION_COST_MODEL_PATH = (
+    Path(os.environ["SIMULATION_COST_MODEL_PATH"])
+    if os.getenv("SIMULATION_COST_MODEL_PATH")
+    else None
+)
+
+# --- Radio Map Tiling Configuration ---
+# 分塊 SINR 地圖的求解行程數；0 時在目前行程中逐塊求解
+RADIO_MAP_TILE_WORKERS = int(os.getenv("RADIO_MAP_TILE_WORKERS", "2"))
+# 分塊 rss 快取的容量上限 (MiB)
+RADIO_MAP_TILE_CACHE_MB = float(os.getenv("RADIO_MAP_TILE_CACHE_MB", "512"))
+# 單次求解 (未分塊) 的各發射器 rss 快取容量上限 (MiB)
+RADIO_MAP_RSS_CACHE_MB = float(os.getenv("RADIO_MAP_RSS_CACHE_MB", "256"))
+# 指定 SINR 地圖範圍時，只載入範圍向外擴展此距離 (m) 內的設備；邊界內範圍外的干擾器仍計入
+SINR_DEVICE_MARGIN_M = float(os.getenv("SINR_DEVICE_MARGIN_M", "500"))
+
+# --- Progressive SINR Map Configuration ---
+# 漸進模式的解析度級數 (含最終的請求解析度)
+SINR_PROGRESSIVE_LEVELS = int(os.getenv("SINR_PROGRESSIVE_LEVELS", "3"))
+# 最粗一級的目標執行時間 (秒)
+SINR_PROGRESSIVE_FIRST_LEVEL_S = float(os.getenv("SINR_PROGRESSIVE_FIRST_LEVEL_S", "2"))
+
+# --- Adaptive Sampling Configuration ---
+# 自適應取樣 (adaptive_samples=true) 每批次每個發射器的射線數
+SINR_ADAPTIVE_BATCH_SAMPLES = int(os.getenv("SINR_ADAPTIVE_BATCH_SAMPLES", str(10**6)))
+# 收斂目標：有覆蓋網格的 rss 相對標準誤差上限，及需達標的網格比例
+SINR_ADAPTIVE_TARGET_REL_ERROR = float(os.getenv("SINR_ADAPTIVE_TARGET_REL_ERROR", "0.05"))
+SINR_ADAPTIVE_CONFIDENCE = float(os.getenv("SINR_ADAPTIVE_CONFIDENCE", "0.9"))
+# 預設的取樣時間預算 (秒)
+SINR_ADAPTIVE_TIME_BUDGET_S = float(os.getenv("SINR_ADAPTIVE_TIME_BUDGET_S", "30"))
+
 # --- GPU/CPU Configuration ---
 # (這部分邏輯也可以放在這裡，或在需要時執行)
 def configure_gpu_cpu():
@@ -0,0 +1,623 @@
+"""
+程序內指標收集與 Prometheus 文字格式輸出
+
+不依賴外部收集器或套件：直方圖、計數器與量測值 (gauge) 皆保存在記憶體中，
+由 /metrics 端點以 Prometheus text exposition format (0.0.4) 輸出。
+"""
+
+import asyncio
+import contextvars
+import functools
+import inspect
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.core.cancellation import SimulationCancelled, raise_if_cancelled
+from app.core.config import SIMULATION_TRACEMALLOC
+from app.core.progress import STAGE_PHASES, emit
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 模擬階段耗時 (秒) 的直方圖分界
+DEFAULT_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0,
+)
+
+# 記憶體直方圖分界：1 MiB 到 64 GiB
+MEMORY_BUCKETS = tuple(float(2**power) for power in range(20, 37))
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """單調遞增計數器"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> Iterator[Tuple[str, LabelValues, float]]:
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield self.name, labels, value
+
+
+class Histogram:
+    """固定分界的累積直方圖"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # 每組標籤：[各分界計數..., 總和, 總數]
+        self._series: Dict[LabelValues, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return int(series[-1]) if series else 0
+
+    def samples(self) -> Iterator[Tuple[str, LabelValues, float]]:
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._series.items()]
+        for labels, series in items:
+            for bound, count in zip(self.buckets, series):
+                yield f"{self.name}_bucket", labels + (_format_value(bound),), count
+            yield f"{self.name}_sum", labels, series[-2]
+            yield f"{self.name}_count", labels, series[-1]
+
+
+class Gauge:
+    """於輸出時才讀取的量測值，callback 回傳 {標籤值: 數值}"""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Dict[LabelValues, float]],
+        labelnames: Sequence[str] = (),
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def samples(self) -> Iterator[Tuple[str, LabelValues, float]]:
+        for labels, value in self.callback().items():
+            yield self.name, labels, value
+
+
+class MetricsRegistry:
+    """指標註冊表；同名指標只註冊一次，重複呼叫回傳既有物件"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Dict[LabelValues, float]],
+        labelnames: Sequence[str] = (),
+    ) -> Gauge:
+        return self._register(Gauge(name, documentation, callback, labelnames))
+
+    def render(self) -> str:
+        """以 Prometheus 文字格式輸出所有指標"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for sample_name, labels, value in metric.samples():
+                names = metric.labelnames
+                if sample_name.endswith("_bucket"):
+                    names = names + ("le",)
+                lines.append(
+                    f"{sample_name}{_format_labels(names, labels)} {_format_value(float(value))}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+def process_rss_bytes() -> float:
+    """目前程序的常駐記憶體 (bytes)；無 /proc 時退回歷史峰值"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return float(int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE"))
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss 在 Linux 為 KB，在 macOS 為 bytes
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return float(max_rss if os.uname().sysname == "Darwin" else max_rss * 1024)
+
+
+# 全域指標註冊表
+metrics_registry = MetricsRegistry()
+
+SIMULATION_DURATION = metrics_registry.histogram(
+    "simulation_duration_seconds",
+    "End-to-end simulation latency per artifact and scene.",
+    ("artifact", "scene", "outcome"),
+)
+SIMULATION_STAGE_DURATION = metrics_registry.histogram(
+    "simulation_stage_duration_seconds",
+    "Latency of each simulation stage per artifact and scene.",
+    ("artifact", "scene", "stage"),
+)
+CACHE_REQUESTS = metrics_registry.counter(
+    "cache_requests_total", "Cache lookups by cache name and result.", ("cache", "result")
+)
+SIMULATION_PEAK_RSS_DELTA = metrics_registry.histogram(
+    "simulation_peak_rss_delta_bytes",
+    "Peak resident memory growth during a simulation per artifact and scene.",
+    ("artifact", "scene"),
+    buckets=MEMORY_BUCKETS,
+)
+SIMULATION_STAGE_TRACED_PEAK = metrics_registry.histogram(
+    "simulation_stage_traced_peak_bytes",
+    "Peak tracemalloc-traced memory (Python and NumPy) of each simulation stage.",
+    ("artifact", "scene", "stage"),
+    buckets=MEMORY_BUCKETS,
+)
+SIMULATION_REJECTED = metrics_registry.counter(
+    "simulation_rejected_total",
+    "Simulations rejected before starting, by artifact and reason.",
+    ("artifact", "reason"),
+)
+
+SIMULATION_CANCELLED = metrics_registry.counter(
+    "simulation_cancelled_total",
+    "Simulations cancelled while queued or at a checkpoint, by artifact and reason.",
+    ("artifact", "reason"),
+)
+SIMULATION_DOWNGRADED = metrics_registry.counter(
+    "simulation_downgraded_total",
+    "Simulations whose parameters were reduced to fit the server limits.",
+    ("artifact",),
+)
+SIMULATION_RUNTIME_PREDICTION_RATIO = metrics_registry.histogram(
+    "simulation_runtime_prediction_ratio",
+    "Actual over predicted simulation runtime, for monitoring the cost model calibration.",
+    ("artifact",),
+    buckets=(0.25, 0.5, 0.67, 0.8, 0.9, 1.0, 1.1, 1.25, 1.5, 2.0, 4.0),
+)
+
+# SIMULATION_TRACEMALLOC 啟用時追蹤 Python/NumPy 配置，供各階段的峰值與快照比較
+if SIMULATION_TRACEMALLOC and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+_active_simulations: Dict[LabelValues, int] = {}
+
+metrics_registry.gauge(
+    "simulation_in_progress",
+    "Simulations currently running per artifact.",
+    lambda: {labels: float(count) for labels, count in _active_simulations.items()},
+    ("artifact",),
+)
+metrics_registry.gauge(
+    "process_resident_memory_bytes",
+    "Resident memory size of this process in bytes.",
+    lambda: {(): process_rss_bytes()},
+)
+
+
+def _cache_hit_ratio() -> Dict[LabelValues, float]:
+    ratios: Dict[LabelValues, float] = {}
+    for cache in {labels[0] for _, labels, _ in CACHE_REQUESTS.samples()}:
+        hits = CACHE_REQUESTS.value(cache, "hit")
+        total = hits + CACHE_REQUESTS.value(cache, "miss")
+        ratios[(cache,)] = hits / total if total else 0.0
+    return ratios
+
+
+metrics_registry.gauge(
+    "cache_hit_ratio", "Hit ratio of each cache since process start.", _cache_hit_ratio, ("cache",)
+)
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    """記錄一次快取查詢結果"""
+    CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
+
+
+def allocator_stats() -> Dict[str, Dict[str, float]]:
+    """已載入的 TensorFlow 在各 GPU 上的配置器用量；未載入或無 GPU 時為空"""
+    stats: Dict[str, Dict[str, float]] = {}
+    tf = sys.modules.get("tensorflow")
+    if tf is None:
+        return stats
+    try:
+        for device in tf.config.list_logical_devices("GPU"):
+            info = tf.config.experimental.get_memory_info(device.name)
+            stats[f"tensorflow:{device.name}"] = {
+                "current_bytes": float(info["current"]),
+                "peak_bytes": float(info["peak"]),
+            }
+    except Exception:
+        # 配置器統計僅供參考，不影響模擬
+        pass
+    return stats
+
+
+def _top_allocations(before, after, limit: int = 5) -> List[Dict[str, Any]]:
+    """兩個 tracemalloc 快照之間增加最多的配置位置"""
+    top = []
+    for diff in after.compare_to(before, "lineno"):
+        if diff.size_diff <= 0:
+            continue
+        frame = diff.traceback[0]
+        top.append(
+            {
+                "location": f"{frame.filename}:{frame.lineno}",
+                "size_diff_bytes": diff.size_diff,
+                "count_diff": diff.count_diff,
+            }
+        )
+        if len(top) >= limit:
+            break
+    return top
+
+
+class _RssSampler:
+    """有模擬執行時於背景定期取樣 RSS，更新所有進行中模擬的峰值"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self._spans: set = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, span: "SimulationSpan") -> None:
+        """開始追蹤 span；已有其他模擬在執行時，雙方都標記為重疊"""
+        with self._lock:
+            if self._spans:
+                span.overlaps += 1
+                for other in self._spans:
+                    other.overlaps += 1
+            self._spans.add(span)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+                self._thread.start()
+            self._wake.set()
+
+    def unregister(self, span: "SimulationSpan") -> None:
+        with self._lock:
+            self._spans.discard(span)
+
+    @property
+    def active(self) -> int:
+        """進行中的模擬數量"""
+        with self._lock:
+            return len(self._spans)
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait()
+            with self._lock:
+                spans = list(self._spans)
+                if not spans:
+                    self._wake.clear()
+                    continue
+            rss = process_rss_bytes()
+            for span in spans:
+                span.observe_rss(rss)
+            time.sleep(self.interval)
+
+
+_rss_sampler = _RssSampler()
+
+
+class SimulationSpan:
+    """單次模擬的計時範圍，各階段耗時記錄於 simulation_stage_duration_seconds
+
+    同時記錄常駐記憶體 (RSS) 峰值增量；啟用 tracemalloc 時另記錄各階段的
+    追蹤配置峰值，標記 snapshot 的階段 (NumPy 大型陣列運算) 另比較前後快照。
+
+    RSS 與 tracemalloc 都是整個行程的量測：與其他模擬同時執行過的範圍標記為
+    overlapped，其記憶體數值屬於行程層級而非單一工作，不記入記憶體直方圖，
+    也不用於校正記憶體估計；重疊期間的階段不重設 tracemalloc 峰值、不比較快照。
+    """
+
+    def __init__(self, artifact: str, scene: str):
+        self.artifact = artifact
+        self.scene = scene
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.duration: Optional[float] = None
+        self.outcome: Optional[str] = None
+        # 場景檔、設備數量等描述此次模擬的屬性 (不作為指標標籤)
+        self.attributes: Dict[str, object] = {}
+        self.rss_start = process_rss_bytes()
+        self.rss_peak = self.rss_start
+        self.stage_memory: Dict[str, Dict[str, Any]] = {}
+        self.allocators: Dict[str, Dict[str, float]] = {}
+        # 執行期間與其他模擬重疊的次數 (由 _rss_sampler.register 累加)
+        self.overlaps = 0
+        _rss_sampler.register(self)
+
+    @property
+    def overlapped(self) -> bool:
+        return self.overlaps > 0
+
+    def observe_rss(self, rss: float) -> None:
+        if rss > self.rss_peak:
+            self.rss_peak = rss
+
+    @property
+    def peak_rss_delta(self) -> float:
+        return max(0.0, self.rss_peak - self.rss_start)
+
+    @contextmanager
+    def stage(self, name: str, snapshot: bool = False):
+        # 其他模擬同時執行時不重設共用的 tracemalloc 峰值
+        alone = _rss_sampler.active == 1
+        overlaps_before = self.overlaps
+        tracing = tracemalloc.is_tracing() and alone
+        rss_before = process_rss_bytes()
+        self.observe_rss(rss_before)
+        if tracing:
+            traced_before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            snapshot_before = tracemalloc.take_snapshot() if snapshot else None
+        phase = STAGE_PHASES.get(name, name)
+        emit("stage", stage=name, phase=phase, state="started")
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed
+            SIMULATION_STAGE_DURATION.observe(elapsed, self.artifact, self.scene, name)
+
+            rss_after = process_rss_bytes()
+            self.observe_rss(rss_after)
+            memory: Dict[str, Any] = {"rss_delta_bytes": rss_after - rss_before}
+            overlapped = not alone or self.overlaps != overlaps_before
+            if overlapped:
+                memory["overlapped"] = True
+            if tracing and not overlapped:
+                current, peak = tracemalloc.get_traced_memory()
+                memory["traced_delta_bytes"] = current - traced_before
+                memory["traced_peak_bytes"] = peak - traced_before
+                SIMULATION_STAGE_TRACED_PEAK.observe(
+                    memory["traced_peak_bytes"], self.artifact, self.scene, name
+                )
+                if snapshot_before is not None:
+                    memory["top_allocations"] = _top_allocations(
+                        snapshot_before, tracemalloc.take_snapshot()
+                    )
+            self.stage_memory[name] = memory
+            emit(
+                "stage",
+                stage=name,
+                phase=phase,
+                state="finished",
+                duration_s=elapsed,
+                rss_delta_bytes=memory["rss_delta_bytes"],
+            )
+
+    def memory_summary(self) -> Dict[str, Any]:
+        """附加到模擬結果的記憶體摘要"""
+        return {
+            # overlapped 時為行程層級的數值，包含同時執行的其他模擬
+            "scope": "process" if self.overlapped else "job",
+            "overlapped": self.overlapped,
+            "rss_start_bytes": self.rss_start,
+            "rss_peak_bytes": self.rss_peak,
+            "peak_rss_delta_bytes": self.peak_rss_delta,
+            "stages": self.stage_memory,
+            "allocators": self.allocators,
+        }
+
+    def finish(self, outcome: str) -> float:
+        elapsed = time.perf_counter() - self.started
+        self.duration = elapsed
+        self.outcome = outcome
+        _rss_sampler.unregister(self)
+        self.observe_rss(process_rss_bytes())
+        self.allocators = allocator_stats()
+        SIMULATION_DURATION.observe(elapsed, self.artifact, self.scene, outcome)
+        if not self.overlapped:
+            SIMULATION_PEAK_RSS_DELTA.observe(self.peak_rss_delta, self.artifact, self.scene)
+        for listener in list(_span_listeners):
+            listener(self)
+        return elapsed
+
+
+# 模擬結束時通知的回呼 (例如基準測試收集各階段耗時)
+_span_listeners: List[Callable[[SimulationSpan], None]] = []
+
+
+def add_span_listener(listener: Callable[[SimulationSpan], None]) -> None:
+    _span_listeners.append(listener)
+
+
+def remove_span_listener(listener: Callable[[SimulationSpan], None]) -> None:
+    if listener in _span_listeners:
+        _span_listeners.remove(listener)
+
+
+def _running_task() -> Optional[asyncio.Task]:
+    try:
+        return asyncio.current_task()
+    except RuntimeError:
+        return None
+
+
+@contextmanager
+def capture_spans() -> Iterator[List[SimulationSpan]]:
+    """收集區塊內於目前 asyncio 任務中結束的模擬計時範圍"""
+    spans: List[SimulationSpan] = []
+    task = _running_task()
+
+    def collect(span: SimulationSpan) -> None:
+        if _running_task() is task:
+            spans.append(span)
+
+    add_span_listener(collect)
+    try:
+        yield spans
+    finally:
+        remove_span_listener(collect)
+
+
+_current_span: contextvars.ContextVar[Optional[SimulationSpan]] = contextvars.ContextVar(
+    "simulation_span", default=None
+)
+
+
+def current_span() -> Optional[SimulationSpan]:
+    return _current_span.get()
+
+
+def annotate(**attributes) -> None:
+    """為目前模擬的計時範圍附加屬性並以 stats 進度事件發布；不在模擬中時不做任何事"""
+    span = _current_span.get()
+    if span is not None:
+        span.attributes.update(attributes)
+        emit("stats", **attributes)
+
+
+@contextmanager
+def stage(name: str, snapshot: bool = False):
+    """在目前模擬的計時範圍內記錄一個階段；不在模擬中時不做任何事
+
+    snapshot=True 時 (且啟用 tracemalloc) 比較階段前後的配置快照。
+    階段開始前檢查請求是否已被取消。
+    """
+    raise_if_cancelled()
+    span = _current_span.get()
+    if span is None:
+        yield
+        return
+    with span.stage(name, snapshot=snapshot):
+        yield
+
+
+def timed_simulation(artifact: str, scene: Optional[str] = None):
+    """為 async 模擬生成函數建立計時範圍
+
+    場景標籤取自 scene_name 參數 (或固定的 scene)；回傳 False、被取消或拋出例外時
+    outcome 分別為 failure、cancelled 與 error。
+    """
+
+    def decorator(func):
+        signature = inspect.signature(func)
+        scene_parameter = signature.parameters.get("scene_name")
+        default_scene = (
+            scene_parameter.default
+            if scene_parameter is not None
+            and scene_parameter.default is not inspect.Parameter.empty
+            else scene or "default"
+        )
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            bound = signature.bind_partial(*args, **kwargs)
+            scene_label = str(bound.arguments.get("scene_name", default_scene)).lower()
+            span = SimulationSpan(artifact, scene_label)
+            token = _current_span.set(span)
+            key = (artifact,)
+            _active_simulations[key] = _active_simulations.get(key, 0) + 1
+            outcome = "error"
+            emit("simulation", artifact=artifact, scene=scene_label, state="started")
+            try:
+                result = await func(*args, **kwargs)
+                outcome = "success" if result is not False else "failure"
+                return result
+            except SimulationCancelled as e:
+                outcome = "cancelled"
+                SIMULATION_CANCELLED.inc(artifact, e.reason)
+                raise
+            finally:
+                _active_simulations[key] -= 1
+                _current_span.reset(token)
+                duration = span.finish(outcome)
+                emit(
+                    "simulation",
+                    artifact=artifact,
+                    scene=scene_label,
+                    state="finished",
+                    outcome=outcome,
+                    duration_s=duration,
+                    peak_rss_delta_bytes=span.peak_rss_delta,
+                )
+
+        return wrapper
+
+    return decorator
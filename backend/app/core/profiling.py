@@ -0,0 +1,351 @@
+"""
+模擬請求的按需效能分析
+
+帶有 profile=true 與正確 X-Profile-Token 的請求會在分析器下執行：
+speedscope 格式由背景執行緒對呼叫堆疊取樣，pstats 格式使用 cProfile (決定性)。
+結果連同場景、設備數量與各階段耗時摘要寫入 SIMULATION_PROFILE_DIR，
+回應標頭以 X-Profile-Id 與 Link 指向分析結果。
+
+分析器作用於事件迴圈執行緒，以及以 profile_thread 納入的工作執行緒 (請求的阻塞工作
+在其他執行緒執行時)；同時執行的其他請求也會出現在事件迴圈執行緒的結果中，
+因此同一時間只允許一個分析中的請求。
+"""
+
+import asyncio
+import cProfile
+import json
+import logging
+import pstats
+import re
+import secrets
+import sys
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import (
+    SIMULATION_PROFILE_DIR,
+    SIMULATION_PROFILE_KEEP,
+    SIMULATION_PROFILE_TOKEN,
+)
+from app.core.metrics import SimulationSpan, capture_spans
+
+logger = logging.getLogger(__name__)
+
+PROFILE_FORMATS = ("speedscope", "pstats")
+PROFILE_ID_HEADER = "X-Profile-Id"
+PROFILE_TOKEN_HEADER = "X-Profile-Token"
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+_PROFILE_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+_ARTIFACT_SUFFIXES = {"speedscope": ".speedscope.json", "pstats": ".pstats"}
+
+# 同一時間只允許一個分析中的請求 (cProfile 無法巢狀啟用)
+_profile_lock = asyncio.Lock()
+
+
+def check_profile_access(token: Optional[str]) -> None:
+    """未啟用分析或 token 不符時拋出 PermissionError"""
+    if not SIMULATION_PROFILE_TOKEN:
+        raise PermissionError("Request profiling is disabled on this server")
+    if token is None or not secrets.compare_digest(token, SIMULATION_PROFILE_TOKEN):
+        raise PermissionError(f"Missing or invalid {PROFILE_TOKEN_HEADER} header")
+
+
+def _package_of(filename: str) -> str:
+    """依原始碼路徑歸類為套件名稱，用於彙總 load_scene、求解器與 matplotlib 的耗時"""
+    if not filename or filename.startswith("<") or filename == "~":
+        return "builtins"
+    parts = Path(filename).parts
+    for marker in ("site-packages", "dist-packages"):
+        if marker in parts:
+            index = parts.index(marker)
+            if index + 1 < len(parts):
+                return parts[index + 1].split(".")[0]
+    if "app" in parts:
+        return "app"
+    return "stdlib"
+
+
+class StackSampler:
+    """以背景執行緒定期取樣指定執行緒 (及 attach 的執行緒) 的呼叫堆疊，輸出 speedscope sampled 格式
+
+    每個執行緒輸出為一個 profile。
+    """
+
+    def __init__(self, thread_id: Optional[int] = None, interval: float = 0.002):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.frames: List[Dict[str, Any]] = []
+        # 執行緒名稱 -> (樣本, 權重)
+        self.threads: Dict[str, Tuple[List[List[int]], List[float]]] = {}
+        self._thread_names: Dict[int, str] = {self.thread_id: "event-loop"}
+        self._frame_index: Dict[Tuple[str, str, int], int] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.duration = 0.0
+
+    def _frame_id(self, code) -> int:
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        index = self._frame_index.get(key)
+        if index is None:
+            index = self._frame_index[key] = len(self.frames)
+            self.frames.append({"name": key[0], "file": key[1], "line": key[2]})
+        return index
+
+    def attach(self) -> None:
+        """同時取樣目前執行緒，直到 detach"""
+        self._thread_names[threading.get_ident()] = threading.current_thread().name
+
+    def detach(self) -> None:
+        self._thread_names.pop(threading.get_ident(), None)
+
+    def _run(self) -> None:
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            current = sys._current_frames()
+            now = time.perf_counter()
+            for thread_id, name in list(self._thread_names.items()):
+                frame = current.get(thread_id)
+                stack: List[int] = []
+                while frame is not None:
+                    stack.append(self._frame_id(frame.f_code))
+                    frame = frame.f_back
+                if stack:
+                    stack.reverse()  # speedscope 由根到葉
+                    samples, weights = self.threads.setdefault(name, ([], []))
+                    samples.append(stack)
+                    weights.append(now - last)
+            last = now
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self._started
+
+    def self_time_by_package(self) -> Dict[str, float]:
+        """以每個樣本的葉節點估計各套件的自身耗時"""
+        totals: Dict[str, float] = {}
+        for samples, weights in self.threads.values():
+            for stack, weight in zip(samples, weights):
+                package = _package_of(self.frames[stack[-1]]["file"])
+                totals[package] = totals.get(package, 0.0) + weight
+        return totals
+
+    def speedscope(self, name: str) -> Dict[str, Any]:
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": name,
+            "exporter": "web-sionna",
+            "activeProfileIndex": 0,
+            "shared": {"frames": self.frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": f"{name} [{thread}]",
+                    "unit": "seconds",
+                    "startValue": 0.0,
+                    "endValue": float(sum(weights)),
+                    "samples": samples,
+                    "weights": weights,
+                }
+                for thread, (samples, weights) in self.threads.items()
+            ],
+        }
+
+
+def summarize_pstats(stats: pstats.Stats, limit: int = 20) -> Dict[str, Any]:
+    """彙總各套件的自身耗時與自身耗時最高的函數"""
+    by_package: Dict[str, float] = {}
+    functions = []
+    for (filename, line, name), (_, calls, self_time, cumulative, _) in stats.stats.items():
+        package = _package_of(filename)
+        by_package[package] = by_package.get(package, 0.0) + self_time
+        functions.append((self_time, cumulative, calls, f"{name} ({filename}:{line})"))
+    functions.sort(reverse=True)
+    return {
+        "self_time_by_package_s": by_package,
+        "top_functions": [
+            {"function": label, "calls": calls, "self_s": self_time, "cumulative_s": cumulative}
+            for self_time, cumulative, calls, label in functions[:limit]
+        ],
+    }
+
+
+class ProfileRun:
+    """一次分析中的請求"""
+
+    def __init__(self, fmt: str, artifact: str, attributes: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.format = fmt
+        self.artifact = artifact
+        self.attributes = attributes
+        self.created_at = datetime.now(timezone.utc)
+        self.spans: List[SimulationSpan] = []
+        self.summary: Dict[str, Any] = {}
+        self.duration = 0.0
+        # 分析器與啟用它的 (事件迴圈) 執行緒
+        self.profiler: Any = None
+        self.thread_id = threading.get_ident()
+        # 工作執行緒各自的 cProfile，儲存時併入事件迴圈執行緒的結果
+        self.thread_profiles: List[cProfile.Profile] = []
+
+    @property
+    def artifact_path(self) -> Path:
+        return profile_artifact_path(self.id, self.format)
+
+    def metadata(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "format": self.format,
+            "artifact": self.artifact,
+            "created_at": self.created_at.isoformat(),
+            "duration_s": self.duration,
+            "request": self.attributes,
+            "simulations": [
+                {
+                    "artifact": span.artifact,
+                    "scene": span.scene,
+                    "outcome": span.outcome,
+                    "duration_s": span.duration,
+                    "stages_s": span.stages,
+                    "memory": span.memory_summary(),
+                    **span.attributes,
+                }
+                for span in self.spans
+            ],
+            **self.summary,
+        }
+
+    def headers(self) -> Dict[str, str]:
+        """回應標頭；Link 為相對於 /simulations/ 的路徑"""
+        return {
+            PROFILE_ID_HEADER: self.id,
+            "Link": f'<profiles/{self.id}/{self.format}>; rel="profile"',
+        }
+
+
+def profile_artifact_path(profile_id: str, fmt: str) -> Path:
+    if not _PROFILE_ID_PATTERN.match(profile_id):
+        raise ValueError(f"Invalid profile id '{profile_id}'")
+    if fmt not in _ARTIFACT_SUFFIXES:
+        raise ValueError(f"Unknown profile format '{fmt}', expected one of {PROFILE_FORMATS}")
+    return SIMULATION_PROFILE_DIR / f"{profile_id}{_ARTIFACT_SUFFIXES[fmt]}"
+
+
+def load_profile_metadata(profile_id: str) -> Optional[Dict[str, Any]]:
+    if not _PROFILE_ID_PATTERN.match(profile_id):
+        raise ValueError(f"Invalid profile id '{profile_id}'")
+    path = SIMULATION_PROFILE_DIR / f"{profile_id}.json"
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def _prune_profiles() -> None:
+    """只保留最近 SIMULATION_PROFILE_KEEP 筆分析結果"""
+    metadata_files = sorted(
+        SIMULATION_PROFILE_DIR.glob("*.json"), key=lambda path: path.stat().st_mtime
+    )
+    metadata_files = [path for path in metadata_files if _PROFILE_ID_PATTERN.match(path.stem)]
+    for path in metadata_files[: max(0, len(metadata_files) - SIMULATION_PROFILE_KEEP)]:
+        for suffix in _ARTIFACT_SUFFIXES.values():
+            path.with_name(f"{path.stem}{suffix}").unlink(missing_ok=True)
+        path.unlink(missing_ok=True)
+
+
+def _save(run: ProfileRun, profiler) -> None:
+    SIMULATION_PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    name = f"{run.artifact} {run.attributes.get('scene', '')}".strip()
+    if isinstance(profiler, StackSampler):
+        run.artifact_path.write_text(json.dumps(profiler.speedscope(name)))
+        run.summary = {"self_time_by_package_s": profiler.self_time_by_package()}
+    else:
+        stats = pstats.Stats(profiler)
+        if run.thread_profiles:
+            stats.add(*run.thread_profiles)
+        stats.dump_stats(str(run.artifact_path))
+        run.summary = summarize_pstats(stats)
+    (SIMULATION_PROFILE_DIR / f"{run.id}.json").write_text(
+        json.dumps(run.metadata(), default=str)
+    )
+    _prune_profiles()
+
+
+# 目前 context 中分析中的請求；複製 contextvars 到工作執行緒後由 profile_thread 讀取
+_active_run: ContextVar[Optional[ProfileRun]] = ContextVar("active_profile_run", default=None)
+
+
+@contextmanager
+def profile_thread() -> Iterator[None]:
+    """將目前執行緒中屬於分析中請求的工作納入分析 (沒有分析中的請求時不做任何事)
+
+    分析器只作用於事件迴圈執行緒，在其他執行緒執行請求阻塞工作的呼叫端 (需複製
+    contextvars) 以此包住工作：speedscope 同時取樣此執行緒，pstats 在此執行緒啟用
+    個別的 cProfile，儲存時併入請求的結果。
+    """
+    run = _active_run.get()
+    if run is None or threading.get_ident() == run.thread_id:
+        yield
+        return
+    if isinstance(run.profiler, StackSampler):
+        run.profiler.attach()
+        try:
+            yield
+        finally:
+            run.profiler.detach()
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        run.thread_profiles.append(profiler)
+
+
+@asynccontextmanager
+async def profile_request(
+    fmt: Optional[str], artifact: str, **attributes
+) -> AsyncIterator[Optional[ProfileRun]]:
+    """fmt 為 None 時不做任何事；否則在分析器下執行區塊並於結束時儲存結果"""
+    if fmt is None:
+        yield None
+        return
+
+    async with _profile_lock:
+        run = ProfileRun(fmt, artifact, attributes)
+        profiler = run.profiler = StackSampler() if fmt == "speedscope" else cProfile.Profile()
+        started = time.perf_counter()
+        if isinstance(profiler, StackSampler):
+            profiler.start()
+        else:
+            profiler.enable()
+        token = _active_run.set(run)
+        try:
+            with capture_spans() as spans:
+                yield run
+        finally:
+            _active_run.reset(token)
+            if isinstance(profiler, StackSampler):
+                profiler.stop()
+            else:
+                profiler.disable()
+            run.duration = time.perf_counter() - started
+            run.spans = spans
+            try:
+                _save(run, profiler)
+                logger.info(f"Saved {fmt} profile {run.id} for {artifact} ({run.duration:.2f}s)")
+            except OSError as e:
+                logger.error(f"Failed to save profile {run.id}: {e}", exc_info=True)
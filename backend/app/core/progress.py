@@ -0,0 +1,239 @@
+"""
+模擬工作的進度事件
+
+每個模擬請求以 job_id 對應一個 JobProgress：接受、排隊、取得 worker、各階段
+開始/結束 (由 metrics.stage 發布)、生成函數以 annotate 附加的部分統計，以及最後的
+end 事件 (completed、failed、cancelled、error 或 rejected)。
+事件保留在歷史中，先訂閱 (工作尚未開始) 或晚訂閱的客戶端都能收到完整過程，
+API 以 Server-Sent Events 推送給前端。
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import re
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Set
+
+from app.core.cancellation import SimulationCancelled
+
+logger = logging.getLogger(__name__)
+
+JOB_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+# 各階段對應的前端進度名稱
+STAGE_PHASES = {
+    "db_fetch": "devices",
+    "scene_path": "scene",
+    "load_scene": "scene",
+    "path_solver": "solving",
+    "radio_map_solver": "solving",
+    "cfr": "cfr",
+    "combine": "cfr",
+    "fft": "cfr",
+    "sinr": "sinr",
+    "plot": "rendering",
+    "savefig": "rendering",
+    "render": "rendering",
+}
+
+# 結束後保留事件歷史的時間 (秒)，供晚連線的客戶端讀取
+FINISHED_RETENTION_S = 120.0
+# 已訂閱但工作遲遲未開始時保留的時間 (秒)
+PENDING_TIMEOUT_S = 120.0
+MAX_HISTORY = 500
+# 沒有事件時送出註解行的間隔 (秒)，避免代理伺服器關閉閒置連線
+HEARTBEAT_INTERVAL_S = 15.0
+
+
+class JobProgress:
+    """單一模擬工作的進度事件與訂閱者"""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.created = time.monotonic()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.history: List[Dict[str, Any]] = []
+        # 生成函數回報的模擬結果 (success / failure / error / cancelled)
+        self.outcome: Optional[str] = None
+        self._subscribers: Set[asyncio.Queue] = set()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event: str, **data: Any) -> Dict[str, Any]:
+        if self.finished is not None:
+            return {}
+        now = time.monotonic()
+        if self.started is None:
+            self.started = now
+        message = {
+            "id": len(self.history),
+            "event": event,
+            "job_id": self.job_id,
+            "elapsed_s": now - self.started,
+            **data,
+        }
+        if event == "simulation" and "outcome" in data:
+            self.outcome = data["outcome"]
+        if len(self.history) < MAX_HISTORY or event == "end":
+            self.history.append(message)
+        if event == "end":
+            self.finished = now
+        for queue in list(self._subscribers):
+            queue.put_nowait(message)
+        return message
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> asyncio.Queue:
+        """註冊訂閱者，佇列中先放入已發生的事件 (重新連線時略過 last_event_id 之前的事件)"""
+        queue: asyncio.Queue = asyncio.Queue()
+        for message in self.history:
+            if last_event_id is None or message["id"] > last_event_id:
+                queue.put_nowait(message)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    def expired(self, now: float) -> bool:
+        if self._subscribers:
+            return False
+        if self.finished is not None:
+            return now - self.finished > FINISHED_RETENTION_S
+        return self.started is None and now - self.created > PENDING_TIMEOUT_S
+
+
+class ProgressRegistry:
+    """job_id → JobProgress；過期的工作在下次存取時清除"""
+
+    def __init__(self):
+        self._jobs: Dict[str, JobProgress] = {}
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.expired(now)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[JobProgress]:
+        return self._jobs.get(job_id)
+
+    def get_or_create(self, job_id: str) -> JobProgress:
+        self._prune()
+        job = self._jobs.get(job_id)
+        if job is None:
+            job = self._jobs[job_id] = JobProgress(job_id)
+        return job
+
+    def start(self, job_id: str) -> JobProgress:
+        """工作開始：沿用先訂閱的紀錄；同一 job_id 的前一個工作已結束時重新建立"""
+        job = self.get_or_create(job_id)
+        if job.finished is not None:
+            job = self._jobs[job_id] = JobProgress(job_id)
+        return job
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+
+progress_registry = ProgressRegistry()
+
+_current_job: contextvars.ContextVar[Optional[JobProgress]] = contextvars.ContextVar(
+    "simulation_job_progress", default=None
+)
+
+
+def current_job() -> Optional[JobProgress]:
+    return _current_job.get()
+
+
+@contextmanager
+def progress_scope(job: JobProgress) -> Iterator[JobProgress]:
+    """區塊內的 emit 發布到 job"""
+    reset = _current_job.set(job)
+    try:
+        yield job
+    finally:
+        _current_job.reset(reset)
+
+
+def emit(event: str, **data: Any) -> None:
+    """發布進度事件到目前的工作；不在工作中時不做任何事"""
+    job = _current_job.get()
+    if job is not None:
+        job.publish(event, **data)
+
+
+# 生成函數回報的結果對應到 end 事件的狀態
+_END_STATUS = {"success": "completed", "failure": "failed", "cancelled": "cancelled"}
+
+
+@asynccontextmanager
+async def track_job(job_id: str, **attributes: Any) -> AsyncIterator[JobProgress]:
+    """在 job_id 的進度範圍內執行模擬，結束時發布 end 事件"""
+    job = progress_registry.start(job_id)
+    status = "error"
+    detail: Dict[str, Any] = {}
+    with progress_scope(job):
+        job.publish("accepted", **attributes)
+        try:
+            yield job
+            status = _END_STATUS.get(job.outcome or "success", "error")
+        except SimulationCancelled as e:
+            status = "cancelled"
+            detail["reason"] = e.reason
+            raise
+        except asyncio.CancelledError:
+            # 串流回應在客戶端中斷連線時取消任務
+            status = "cancelled"
+            detail["reason"] = "disconnected"
+            raise
+        except Exception as e:
+            detail["error"] = str(e)
+            raise
+        finally:
+            job.publish("end", status=status, **detail)
+
+
+def publish_end(job_id: str, status: str, **data: Any) -> None:
+    """工作未進入執行 (例如准入控制拒絕) 時通知已訂閱的客戶端"""
+    progress_registry.start(job_id).publish("end", status=status, **data)
+
+
+async def event_stream(
+    job: JobProgress,
+    is_disconnected: Callable[[], Awaitable[bool]],
+    last_event_id: Optional[int] = None,
+) -> AsyncIterator[str]:
+    """以 SSE 格式推送 job 的事件，直到 end 事件或客戶端中斷連線"""
+    queue = job.subscribe(last_event_id)
+    try:
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), HEARTBEAT_INTERVAL_S)
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    return
+                if job.started is None and time.monotonic() - job.created > PENDING_TIMEOUT_S:
+                    # 訂閱後遲遲沒有對應的模擬請求
+                    yield format_sse({"event": "end", "job_id": job.job_id, "status": "expired"})
+                    return
+                yield ": keep-alive\n\n"
+                continue
+            yield format_sse(message)
+            if message["event"] == "end":
+                return
+    finally:
+        job.unsubscribe(queue)
+
+
+def format_sse(message: Dict[str, Any]) -> str:
+    """Server-Sent Events 格式；id 供客戶端重新連線時以 Last-Event-ID 接續"""
+    lines = [f"id: {message['id']}"] if "id" in message else []
+    lines.append(f"event: {message['event']}")
+    lines.append(f"data: {json.dumps(message, default=str)}")
+    return "\n".join(lines) + "\n\n"
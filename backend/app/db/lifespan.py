@@ -3,20 +3,36 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 
 # Ensure SQLModel specific imports are correctly managed if you mix ORMs
-from sqlmodel import (
-    SQLModel,
-    select as sqlmodel_select,
-)  # SQLModel used for Device model
-from sqlalchemy.sql.functions import count
+from sqlmodel import SQLModel  # SQLModel used for Device model
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select as sqlalchemy_select  # For SQLAlchemy models
 
 from app.db.base import engine, async_session_maker
 
 # 更新為領域驅動設計後的模型導入
-from app.domains.device.models.device_model import Device, DeviceRole  # 從領域模型導入
+from app.domains.device.models.device_model import (  # 從領域模型導入
+    DEVICE_GEOMETRY_DDL,
+    Device,
+    DeviceRole,
+)
+from app.domains.device.models.trajectory_model import DeviceTrajectoryPoint  # noqa: F401 註冊軌跡表
+from app.domains.device.adapters.sqlmodel_device_repository import (
+    SQLModelDeviceRepository,
+)
+from app.domains.device.services.device_event_broker import device_event_broker
+from app.domains.simulation.services.radio_map_tiles import shutdown_tile_workers
+from app.domains.simulation.services.simulation_scheduler import shutdown_simulation_workers
+from app.domains.coordinates.models.coordinate_model import (
+    COORDINATE_TRANSFORMATION_DDL,
+)
+from app.domains.coordinates.adapters.sqlmodel_transformation_repository import (
+    SQLModelTransformationRepository,
+)
+from app.domains.coordinates.services.scene_frame_registry import scene_frame_registry
+from app.domains.coordinates.services.transform_registry import transform_registry
 
 from app.core.config import (
+    DATABASE_URL,
     OUTPUT_DIR,
     configure_gpu_cpu,
     configure_matplotlib,
@@ -39,30 +55,56 @@ async def create_db_and_tables():
         await conn.run_sync(
             SQLModel.metadata.create_all
         )  # Creates Device table (and any other SQLModels)
+        # create_all 不會為已存在的資料表補建索引，這裡逐一補上
+        await conn.run_sync(_ensure_device_indexes)
         logger.info("Database tables created (if they didn't exist).")
 
 
+def _ensure_device_indexes(sync_conn) -> None:
+    """為既有的 Device 資料表補建缺少的索引 (例如 (active, role) 複合索引)"""
+    for index in Device.__table__.indexes:
+        index.create(sync_conn, checkfirst=True)
+
+
+async def ensure_device_geometry():
+    """在 PostGIS 上建立設備幾何欄位與 GiST 索引，成功後啟用空間查詢"""
+    if engine.dialect.name != "postgresql":
+        logger.info("Database is not PostgreSQL. Spatial device queries use plain filters.")
+        return
+    try:
+        async with engine.begin() as conn:
+            for ddl in DEVICE_GEOMETRY_DDL:
+                await conn.execute(text(ddl))
+        SQLModelDeviceRepository.use_postgis = True
+        logger.info("Device geometry column and GiST index are ready.")
+    except Exception as e:
+        logger.warning(
+            f"PostGIS device geometry unavailable, spatial queries use plain filters: {e}"
+        )
+
+
+async def ensure_coordinate_transformation_columns():
+    """為既有的 coordinatetransformation 資料表補上 name 欄位 (PostgreSQL)"""
+    if engine.dialect.name != "postgresql":
+        return
+    try:
+        async with engine.begin() as conn:
+            for ddl in COORDINATE_TRANSFORMATION_DDL:
+                await conn.execute(text(ddl))
+    except Exception as e:
+        logger.warning(f"Failed to migrate coordinatetransformation table: {e}")
+
+
 async def seed_initial_device_data(session: AsyncSession):
     """Inserts initial device data if minimum roles (TX, RX, JAM) are not met."""
     logger.info("Checking if initial data seeding is needed for Devices...")
 
-    query_desired = sqlmodel_select(count(Device.id)).where(
-        Device.active == True, Device.role == DeviceRole.DESIRED
-    )
-    query_receiver = sqlmodel_select(count(Device.id)).where(
-        Device.active == True, Device.role == DeviceRole.RECEIVER
-    )
-    query_jammer = sqlmodel_select(count(Device.id)).where(
-        Device.active == True, Device.role == DeviceRole.JAMMER
-    )
-
-    result_desired = await session.execute(query_desired)
-    result_receiver = await session.execute(query_receiver)
-    result_jammer = await session.execute(query_jammer)
+    # 單一 GROUP BY 查詢取得各角色數量
+    role_counts = await SQLModelDeviceRepository(session).count_active_by_role()
 
-    desired_count = result_desired.scalar_one_or_none() or 0
-    receiver_count = result_receiver.scalar_one_or_none() or 0
-    jammer_count = result_jammer.scalar_one_or_none() or 0
+    desired_count = role_counts[DeviceRole.DESIRED.value]
+    receiver_count = role_counts[DeviceRole.RECEIVER.value]
+    jammer_count = role_counts[DeviceRole.JAMMER.value]
 
     if desired_count > 0 and receiver_count > 0 and jammer_count > 0:
         logger.info(
@@ -192,17 +234,30 @@ async def lifespan(app: FastAPI):
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     logger.info("Environment configured.")
 
+    # 載入場景座標框架並預先計算轉換矩陣
+    scene_frame_registry.load()
+
     logger.info("Database initialization sequence...")
     await create_db_and_tables()
+    await ensure_device_geometry()
+    await ensure_coordinate_transformation_columns()
 
     # 異步初始化資料庫
     async with async_session_maker() as db_session:
         # 初始化設備資料
         await seed_initial_device_data(db_session)
+        # 載入具名座標轉換 (需在場景框架之後，資料庫中的框架會覆蓋預設值)
+        await transform_registry.load(SQLModelTransformationRepository(db_session))
+
+    # 啟動設備事件廣播 (啟用時監聽 PostgreSQL NOTIFY)
+    await device_event_broker.start(DATABASE_URL)
 
     logger.info("Application startup complete.")
 
     yield
 
     # 應用程式關閉時執行清理
+    await device_event_broker.stop()
+    shutdown_tile_workers()
+    shutdown_simulation_workers()
     logger.info("Application shutdown complete.")
@@ -0,0 +1,93 @@
+"""
+陣列端點的 JSON / 二進位輸入輸出
+
+二進位格式為 little-endian、列優先 (row-major) 的原始陣列，形狀以
+X-Array-Shape 標頭 (例如 "1000,3") 表示，資料型別以 X-Array-Dtype 表示。
+"""
+
+from typing import Any, Dict, Mapping, Optional
+
+import numpy as np
+from fastapi import HTTPException, Request, Response, status
+from fastapi.responses import JSONResponse
+
+BINARY_MEDIA_TYPE = "application/octet-stream"
+ARRAY_SHAPE_HEADER = "X-Array-Shape"
+ARRAY_DTYPE_HEADER = "X-Array-Dtype"
+# 回應包含多個陣列時，二進位內容沿第 0 軸依此標頭的順序堆疊
+ARRAY_NAMES_HEADER = "X-Array-Names"
+
+
+def wants_binary(request: Request) -> bool:
+    """請求為二進位或 Accept 指定二進位時以二進位回應"""
+    return request.headers.get("content-type", "").startswith(
+        BINARY_MEDIA_TYPE
+    ) or BINARY_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+async def read_array(request: Request, key: str = "points", columns: int = 3) -> np.ndarray:
+    """讀取 JSON ({key: [[...], ...]}) 或二進位 float64 陣列
+
+    二進位請求可用 X-Array-Shape 標頭指定欄位數，預設為 columns。
+    """
+    try:
+        if request.headers.get("content-type", "").startswith(BINARY_MEDIA_TYPE):
+            body = await request.body()
+            shape = request.headers.get(ARRAY_SHAPE_HEADER)
+            if shape:
+                columns = int(shape.split(",")[-1])
+            if columns <= 0 or len(body) % (8 * columns):
+                raise ValueError(
+                    f"Binary body of {len(body)} bytes is not a float64 array with {columns} columns"
+                )
+            return np.frombuffer(body, dtype="<f8").reshape(-1, columns)
+
+        payload = await request.json()
+        values = payload.get(key) if isinstance(payload, dict) else payload
+        if values is None:
+            raise ValueError(f"Request body must contain '{key}'")
+        return np.asarray(values, dtype=np.float64)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+def _json_values(array: np.ndarray) -> list:
+    """轉為 JSON 列表，非有限值 (NaN、inf) 以 null 表示"""
+    values = array.astype(object)
+    values[~np.isfinite(array)] = None
+    return values.tolist()
+
+
+def array_response(
+    arrays: Mapping[str, np.ndarray],
+    binary: bool,
+    *,
+    dtype: str = "<f8",
+    extra: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """以二進位或 JSON 回傳一個或多個同形狀的陣列
+
+    JSON 為 {name: [...], **extra}；二進位只包含陣列本身，多個陣列沿第 0 軸堆疊。
+    """
+    names = list(arrays)
+    stacked = (
+        np.asarray(arrays[names[0]])
+        if len(names) == 1
+        else np.stack([arrays[name] for name in names])
+    )
+    headers = {
+        **(headers or {}),
+        ARRAY_SHAPE_HEADER: ",".join(str(dim) for dim in stacked.shape),
+        ARRAY_NAMES_HEADER: ",".join(names),
+    }
+    if binary:
+        headers[ARRAY_DTYPE_HEADER] = np.dtype(dtype).str
+        return Response(
+            content=np.ascontiguousarray(stacked, dtype=dtype).tobytes(),
+            media_type=BINARY_MEDIA_TYPE,
+            headers=headers,
+        )
+    content = {name: _json_values(np.asarray(arrays[name])) for name in names}
+    content.update(extra or {})
+    return JSONResponse(content, headers=headers)
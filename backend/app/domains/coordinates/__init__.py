@@ -14,3 +14,13 @@ from app.domains.coordinates.interfaces.coordinate_service_interface import (
     CoordinateServiceInterface,
 )
 from app.domains.coordinates.services.coordinate_service import CoordinateService
+from app.domains.coordinates.models.scene_frame import SceneFrame, SceneFrameTransforms
+from app.domains.coordinates.services.scene_frame_registry import (
+    SceneFrameRegistry,
+    scene_frame_registry,
+)
+from app.domains.coordinates.services.transform_registry import (
+    CompiledTransform,
+    TransformRegistry,
+    transform_registry,
+)
@@ -0,0 +1,76 @@
+import logging
+from typing import Optional, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.domains.coordinates.interfaces.transformation_repository import (
+    TransformationRepository,
+)
+from app.domains.coordinates.models.coordinate_model import CoordinateTransformation
+
+logger = logging.getLogger(__name__)
+
+
+class SQLModelTransformationRepository(TransformationRepository):
+    """SQLModel 具名座標轉換存儲庫實現"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_all(self) -> Sequence[CoordinateTransformation]:
+        stmt = (
+            select(CoordinateTransformation)
+            .where(CoordinateTransformation.name.is_not(None))
+            .order_by(CoordinateTransformation.id)
+        )
+        result = await self.session.execute(stmt)
+        return result.scalars().all()
+
+    async def get_by_name(self, name: str) -> Optional[CoordinateTransformation]:
+        stmt = select(CoordinateTransformation).where(
+            CoordinateTransformation.name == name
+        )
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def upsert(
+        self, transformation: CoordinateTransformation
+    ) -> CoordinateTransformation:
+        try:
+            existing = await self.get_by_name(transformation.name)
+            if existing is not None:
+                for field in (
+                    "source_system",
+                    "target_system",
+                    "transformation_parameters",
+                    "description",
+                ):
+                    setattr(existing, field, getattr(transformation, field))
+                transformation = existing
+            self.session.add(transformation)
+            await self.session.commit()
+            await self.session.refresh(transformation)
+            return transformation
+        except Exception as e:
+            await self.session.rollback()
+            logger.error(
+                f"Error saving coordinate transformation {transformation.name}: {e}",
+                exc_info=True,
+            )
+            raise
+
+    async def remove(self, name: str) -> Optional[CoordinateTransformation]:
+        transformation = await self.get_by_name(name)
+        if transformation is None:
+            return None
+        try:
+            await self.session.delete(transformation)
+            await self.session.commit()
+            return transformation
+        except Exception as e:
+            await self.session.rollback()
+            logger.error(
+                f"Error deleting coordinate transformation {name}: {e}", exc_info=True
+            )
+            raise
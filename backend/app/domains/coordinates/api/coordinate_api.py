@@ -1,12 +1,32 @@
 import logging
-from typing import Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Dict, Any, List, Optional
 
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_session
+from app.domains.common.utils.array_io import array_response, read_array, wants_binary
 from app.domains.coordinates.models.coordinate_model import (
     GeoCoordinate,
     CartesianCoordinate,
+    CoordinateTransformationCreate,
+    CoordinateTransformationResponse,
+    DistanceMatrixRequest,
+)
+from app.domains.coordinates.adapters.sqlmodel_transformation_repository import (
+    SQLModelTransformationRepository,
+)
+from app.domains.coordinates.models.scene_frame import (
+    SceneFrame,
+    SceneFrameParameters,
+    SceneFrameResponse,
 )
 from app.domains.coordinates.services.coordinate_service import CoordinateService
+from app.domains.coordinates.services.transform_registry import (
+    transform_registry,
+    transformation_to_response,
+)
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -14,7 +34,6 @@ router = APIRouter()
 # 創建座標服務的單例
 coordinate_service = CoordinateService()
 
-
 @router.post("/geo-to-cartesian", response_model=CartesianCoordinate)
 async def convert_geo_to_cartesian(geo: GeoCoordinate) -> CartesianCoordinate:
     """將地理座標轉換為笛卡爾座標"""
@@ -111,3 +130,290 @@ async def calculate_destination_point(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Calculation error: {str(e)}",
         )
+
+
+@router.post("/batch/geo-to-utm", response_description="UTM 座標陣列")
+async def convert_batch_geo_to_utm(
+    request: Request,
+    zone: Optional[int] = Query(
+        None, ge=1, le=60, description="目標 UTM 區帶；省略時依點位平均位置決定"
+    ),
+    south: Optional[bool] = Query(None, description="是否使用南半球北向偏移"),
+) -> Response:
+    """
+    批次將 (緯度, 經度[, 高度]) 投影為 (easting, northing, 高度)，所有點位使用同一區帶。
+
+    實際使用的區帶以 X-UTM-Zone 標頭回傳 (例如 "51N")。
+    """
+    points = await read_array(request)
+    try:
+        result, zone, south = await coordinate_service.geo_to_utm_batch(
+            points, zone=zone, south=south
+        )
+        logger.info(f"Batch projected {len(result)} points to UTM zone {zone}")
+        return array_response(
+            {"points": result},
+            wants_binary(request),
+            headers={"X-UTM-Zone": f"{zone}{'S' if south else 'N'}"},
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in batch UTM projection: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Coordinate conversion error: {str(e)}",
+        )
+
+
+@router.post("/batch/utm-to-geo", response_description="大地座標陣列")
+async def convert_batch_utm_to_geo(
+    request: Request,
+    zone: int = Query(..., ge=1, le=60, description="輸入座標的 UTM 區帶"),
+    south: bool = Query(False, description="輸入座標是否為南半球"),
+) -> Response:
+    """批次將 (easting, northing[, 高度]) 轉為 (緯度, 經度, 高度)"""
+    points = await read_array(request)
+    try:
+        result = await coordinate_service.utm_to_geo_batch(points, zone, south=south)
+        logger.info(f"Batch converted {len(result)} points from UTM zone {zone}")
+        return array_response({"points": result}, wants_binary(request))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in batch UTM conversion: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Coordinate conversion error: {str(e)}",
+        )
+
+
+@router.post("/batch/{conversion}", response_description="批次轉換後的座標陣列")
+async def convert_batch(conversion: str, request: Request) -> Response:
+    """
+    以向量化方式批次轉換座標 (geo-to-cartesian, cartesian-to-geo, geo-to-ecef, ecef-to-geo)。
+
+    請求可為 JSON {"points": [[a, b, c], ...]} 或二進位 float64 (N×3)；
+    大地座標順序為 (緯度, 經度, 高度)，高度欄可省略。
+    """
+    points = await read_array(request)
+    try:
+        result = await coordinate_service.convert_batch(conversion, points)
+        logger.info(f"Batch converted {len(result)} points ({conversion})")
+        return array_response({"points": result}, wants_binary(request))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in batch conversion {conversion}: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Coordinate conversion error: {str(e)}",
+        )
+
+
+def _get_scene_transforms(scene: str):
+    transforms = coordinate_service.frame_registry.get(scene)
+    if transforms is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Scene frame '{scene}' not found",
+        )
+    return transforms
+
+
+@router.get("/scenes", response_model=List[SceneFrameResponse])
+async def list_scene_frames() -> List[SceneFrameResponse]:
+    """列出已註冊的場景框架及其轉換矩陣"""
+    return [
+        SceneFrameResponse.from_transforms(transforms)
+        for transforms in coordinate_service.frame_registry.frames()
+    ]
+
+
+@router.get("/scenes/{scene}", response_model=SceneFrameResponse)
+async def get_scene_frame(scene: str) -> SceneFrameResponse:
+    """取得場景框架及其 4x4 轉換矩陣 (場景座標、ENU、ECEF)"""
+    return SceneFrameResponse.from_transforms(_get_scene_transforms(scene))
+
+
+@router.put("/scenes/{scene}", response_model=SceneFrameResponse)
+async def register_scene_frame(
+    scene: str, parameters: SceneFrameParameters
+) -> SceneFrameResponse:
+    """註冊或更新場景框架 (原點與旋轉)，並重新計算快取的轉換矩陣"""
+    try:
+        frame = SceneFrame(name=scene, **parameters.model_dump())
+        transforms = coordinate_service.frame_registry.register(frame)
+        return SceneFrameResponse.from_transforms(transforms)
+    except Exception as e:
+        logger.error(f"Error registering scene frame {scene}: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Scene frame registration error: {str(e)}",
+        )
+
+
+@router.post(
+    "/scenes/{scene}/batch/{conversion}", response_description="批次轉換後的座標陣列"
+)
+async def convert_scene_batch(scene: str, conversion: str, request: Request) -> Response:
+    """
+    以場景框架批次轉換座標 (local-to-geo, geo-to-local, local-to-ecef, ecef-to-local, local-to-enu)。
+
+    輸入與輸出格式同 /batch/{conversion}；場景座標為場景模型 (GLB) 的 x, y, z。
+    """
+    _get_scene_transforms(scene)
+    points = await read_array(request)
+    try:
+        result = await coordinate_service.convert_scene_batch(scene, conversion, points)
+        logger.info(f"Batch converted {len(result)} points ({scene}: {conversion})")
+        return array_response({"points": result}, wants_binary(request))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(
+            f"Error in scene batch conversion {scene}/{conversion}: {e}", exc_info=True
+        )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Coordinate conversion error: {str(e)}",
+        )
+
+
+@router.post("/distance-matrix", response_description="N×M 距離與方位角矩陣")
+async def calculate_distance_matrix(
+    payload: DistanceMatrixRequest,
+    request: Request,
+    scene: Optional[str] = Query(
+        None, description="以場景座標輸入時的場景名稱；省略時輸入為大地座標"
+    ),
+    max_distance: Optional[float] = Query(
+        None, gt=0, description="超出此距離 (米) 的配對以 null/NaN 表示"
+    ),
+) -> Response:
+    """
+    以廣播運算一次計算所有 sources × targets 配對的距離 (米) 與方位角 (度)。
+
+    Accept: application/octet-stream 時回傳 float32 陣列，形狀 (2, N, M)，
+    依序為 distance 與 bearing。
+    """
+    if scene is not None:
+        _get_scene_transforms(scene)
+    try:
+        bearing, distance = await coordinate_service.distance_matrix(
+            payload.sources, payload.targets, scene=scene, max_distance=max_distance
+        )
+        logger.info(f"Calculated {distance.shape[0]}x{distance.shape[1]} distance matrix")
+        return array_response(
+            {"distance": distance, "bearing": bearing},
+            wants_binary(request),
+            dtype="<f4",
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error calculating distance matrix: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Distance matrix calculation error: {str(e)}",
+        )
+
+
+async def get_transformation_repository(
+    session: AsyncSession = Depends(get_session),
+) -> SQLModelTransformationRepository:
+    """獲取具名座標轉換存儲庫，用於依賴注入"""
+    return SQLModelTransformationRepository(session=session)
+
+
+@router.get("/transforms", response_model=List[CoordinateTransformationResponse])
+async def list_transformations() -> List[CoordinateTransformationResponse]:
+    """列出已載入的具名座標轉換"""
+    return [
+        transformation_to_response(compiled.record)
+        for compiled in transform_registry.transforms()
+    ]
+
+
+@router.post("/transforms", response_model=CoordinateTransformationResponse)
+async def save_transformation(
+    data: CoordinateTransformationCreate,
+    repository: SQLModelTransformationRepository = Depends(
+        get_transformation_repository
+    ),
+) -> CoordinateTransformationResponse:
+    """新增或更新具名座標轉換 (依名稱)，並立即更新快取"""
+    try:
+        compiled = await transform_registry.save(repository, data)
+        logger.info(f"Saved coordinate transformation '{data.name}'")
+        return transformation_to_response(compiled.record)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error saving coordinate transformation: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Coordinate transformation error: {str(e)}",
+        )
+
+
+@router.delete("/transforms/{name}", response_model=CoordinateTransformationResponse)
+async def delete_transformation(
+    name: str,
+    repository: SQLModelTransformationRepository = Depends(
+        get_transformation_repository
+    ),
+) -> CoordinateTransformationResponse:
+    """刪除具名座標轉換"""
+    try:
+        record = await transform_registry.remove(repository, name)
+    except Exception as e:
+        logger.error(f"Error deleting coordinate transformation: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Coordinate transformation error: {str(e)}",
+        )
+    if record is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Coordinate transformation '{name}' not found",
+        )
+    return transformation_to_response(record)
+
+
+@router.post("/transforms/{name}/apply", response_description="轉換後的座標陣列")
+async def apply_transformation(
+    name: str,
+    request: Request,
+    inverse: bool = Query(False, description="由目標系統轉回來源系統"),
+    repository: SQLModelTransformationRepository = Depends(
+        get_transformation_repository
+    ),
+) -> Response:
+    """
+    以具名轉換批次轉換座標，輸入與輸出格式同 /batch/{conversion}。
+
+    轉換參數在載入時已預先計算，每次請求只需執行向量化運算。
+    """
+    try:
+        compiled = await transform_registry.resolve(repository, name)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if compiled is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Coordinate transformation '{name}' not found",
+        )
+    points = await read_array(request)
+    try:
+        result = compiled.apply(points, inverse=inverse)
+        logger.info(f"Applied transformation '{name}' to {len(result)} points")
+        return array_response({"points": result}, wants_binary(request))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error applying transformation {name}: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Coordinate conversion error: {str(e)}",
+        )
@@ -1,6 +1,8 @@
 from abc import ABC, abstractmethod
 from typing import Tuple, Dict, Any, Optional
 
+import numpy as np
+
 from app.domains.coordinates.models.coordinate_model import (
     GeoCoordinate,
     CartesianCoordinate,
@@ -55,3 +57,40 @@ class CoordinateServiceInterface(ABC):
     async def geo_to_utm(self, geo: GeoCoordinate) -> Dict[str, Any]:
         """將地理座標轉換為 UTM 座標"""
         pass
+
+    @abstractmethod
+    async def convert_batch(self, conversion: str, points: Any) -> np.ndarray:
+        """以向量化方式批次轉換 (N, 3) 座標陣列"""
+        pass
+
+    @abstractmethod
+    async def convert_scene_batch(
+        self, scene: str, conversion: str, points: Any
+    ) -> np.ndarray:
+        """以場景 ENU 框架批次轉換 (N, 3) 座標陣列"""
+        pass
+
+    @abstractmethod
+    async def distance_matrix(
+        self,
+        sources: Any,
+        targets: Any,
+        scene: Optional[str] = None,
+        max_distance: Optional[float] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """計算 N×M 的方位角與距離矩陣"""
+        pass
+
+    @abstractmethod
+    async def geo_to_utm_batch(
+        self, points: Any, zone: Optional[int] = None, south: Optional[bool] = None
+    ) -> Tuple[np.ndarray, int, bool]:
+        """批次將大地座標投影到單一 UTM 區帶"""
+        pass
+
+    @abstractmethod
+    async def utm_to_geo_batch(
+        self, points: Any, zone: int, south: bool = False
+    ) -> np.ndarray:
+        """批次將 UTM 座標轉為大地座標"""
+        pass
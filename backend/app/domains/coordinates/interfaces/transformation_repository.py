@@ -0,0 +1,30 @@
+from abc import ABC, abstractmethod
+from typing import Optional, Sequence
+
+from app.domains.coordinates.models.coordinate_model import CoordinateTransformation
+
+
+class TransformationRepository(ABC):
+    """具名座標轉換存儲庫接口"""
+
+    @abstractmethod
+    async def get_all(self) -> Sequence[CoordinateTransformation]:
+        """取得所有具名轉換"""
+        pass
+
+    @abstractmethod
+    async def get_by_name(self, name: str) -> Optional[CoordinateTransformation]:
+        """依名稱取得轉換"""
+        pass
+
+    @abstractmethod
+    async def upsert(
+        self, transformation: CoordinateTransformation
+    ) -> CoordinateTransformation:
+        """依名稱新增或更新轉換"""
+        pass
+
+    @abstractmethod
+    async def remove(self, name: str) -> Optional[CoordinateTransformation]:
+        """刪除轉換，回傳被刪除的記錄"""
+        pass
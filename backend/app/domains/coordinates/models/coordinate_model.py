@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
 from sqlmodel import SQLModel, Column, Field
 from sqlalchemy import Integer, String, Column as SAColumn
@@ -20,13 +20,47 @@ class CartesianCoordinate(BaseModel):
     z: float = Field(..., description="Z 座標")
 
 
+class DistanceMatrixRequest(BaseModel):
+    """距離矩陣請求，每列為大地座標 (緯度, 經度[, 高度]) 或場景座標 (x, y[, z])"""
+
+    sources: List[List[float]] = Field(..., description="起點座標，N 列")
+    targets: List[List[float]] = Field(..., description="終點座標，M 列")
+
+
 class CoordinateTransformation(SQLModel, table=True):
-    """座標轉換記錄，用於追蹤常用的座標轉換"""
+    """具名座標轉換，transformation_parameters 為 JSON 序列化的參數 (含 type 欄位)"""
 
     __tablename__ = "coordinatetransformation"
 
     id: int = Field(primary_key=True, default=None)
+    name: Optional[str] = Field(default=None, index=True, unique=True)
     source_system: str = Field(index=True)
     target_system: str = Field(index=True)
     transformation_parameters: str
     description: Optional[str] = None
+
+
+# 既有資料表在 name 欄位加入前即已建立，啟動時補上欄位與唯一索引 (PostgreSQL)
+COORDINATE_TRANSFORMATION_DDL = (
+    "ALTER TABLE coordinatetransformation ADD COLUMN IF NOT EXISTS name VARCHAR",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_coordinatetransformation_name "
+    "ON coordinatetransformation (name)",
+)
+
+
+class CoordinateTransformationCreate(BaseModel):
+    """建立或更新具名座標轉換的請求"""
+
+    name: str = Field(..., min_length=1, description="轉換名稱")
+    source_system: str = Field(..., description="來源座標系統，例如 scene:NYCU、UTM51N")
+    target_system: str = Field("WGS84", description="目標座標系統")
+    parameters: Dict[str, Any] = Field(
+        ..., description="轉換參數，type 為 scene-frame、utm、helmert 或 affine"
+    )
+    description: Optional[str] = None
+
+
+class CoordinateTransformationResponse(CoordinateTransformationCreate):
+    """具名座標轉換"""
+
+    id: int
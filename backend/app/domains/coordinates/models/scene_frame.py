@@ -0,0 +1,92 @@
+from typing import List
+
+import numpy as np
+from pydantic import ConfigDict, Field
+
+from app.domains.common.models.base_model import ValueObject
+from app.domains.coordinates.utils import geodesy
+
+
+class SceneFrameParameters(ValueObject):
+    """場景局部座標框架參數
+
+    場景座標 (x, y, z) 先依各軸比例換算為米，再繞天頂軸逆時針旋轉 rotation_deg，
+    即得到以原點為中心的 ENU (東、北、天頂) 座標。
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    origin_latitude: float = Field(..., ge=-90, le=90, description="場景原點緯度")
+    origin_longitude: float = Field(..., ge=-180, le=180, description="場景原點經度")
+    origin_altitude: float = Field(0.0, description="場景原點橢球高 (米)")
+    rotation_deg: float = Field(0.0, description="場景 x 軸相對正東的逆時針旋轉角 (度)")
+    scale_x: float = Field(1.0, description="每個場景 x 單位對應的米數 (負值表示反向)")
+    scale_y: float = Field(1.0, description="每個場景 y 單位對應的米數 (負值表示反向)")
+    scale_z: float = Field(1.0, description="每個場景 z 單位對應的米數")
+
+
+class SceneFrame(SceneFrameParameters):
+    """具名的場景局部座標框架"""
+
+    name: str = Field(..., description="場景名稱")
+
+    def local_to_enu_matrix(self) -> np.ndarray:
+        """場景座標轉 ENU 的 4x4 齊次矩陣"""
+        theta = np.radians(self.rotation_deg)
+        rotation = np.array(
+            [
+                [np.cos(theta), -np.sin(theta), 0.0],
+                [np.sin(theta), np.cos(theta), 0.0],
+                [0.0, 0.0, 1.0],
+            ]
+        )
+        matrix = np.eye(4)
+        matrix[:3, :3] = rotation @ np.diag((self.scale_x, self.scale_y, self.scale_z))
+        return matrix
+
+    def enu_to_ecef_matrix(self) -> np.ndarray:
+        """ENU 轉 ECEF 的 4x4 齊次矩陣"""
+        return geodesy.enu_to_ecef_matrix(
+            self.origin_latitude, self.origin_longitude, self.origin_altitude
+        )
+
+
+class SceneFrameTransforms(ValueObject):
+    """場景框架預先計算的轉換矩陣 (4x4，唯讀)"""
+
+    model_config = ConfigDict(frozen=True, arbitrary_types_allowed=True)
+
+    frame: SceneFrame
+    local_to_enu: np.ndarray
+    local_to_ecef: np.ndarray
+    ecef_to_local: np.ndarray
+
+    @classmethod
+    def from_frame(cls, frame: SceneFrame) -> "SceneFrameTransforms":
+        local_to_enu = frame.local_to_enu_matrix()
+        local_to_ecef = frame.enu_to_ecef_matrix() @ local_to_enu
+        matrices = {
+            "local_to_enu": local_to_enu,
+            "local_to_ecef": local_to_ecef,
+            "ecef_to_local": np.linalg.inv(local_to_ecef),
+        }
+        for matrix in matrices.values():
+            matrix.setflags(write=False)
+        return cls(frame=frame, **matrices)
+
+
+class SceneFrameResponse(SceneFrame):
+    """場景框架與其轉換矩陣，前端可直接套用矩陣而不需逐點呼叫 API"""
+
+    local_to_enu: List[List[float]]
+    local_to_ecef: List[List[float]]
+    ecef_to_local: List[List[float]]
+
+    @classmethod
+    def from_transforms(cls, transforms: SceneFrameTransforms) -> "SceneFrameResponse":
+        return cls(
+            **transforms.frame.model_dump(),
+            local_to_enu=transforms.local_to_enu.tolist(),
+            local_to_ecef=transforms.local_to_ecef.tolist(),
+            ecef_to_local=transforms.ecef_to_local.tolist(),
+        )
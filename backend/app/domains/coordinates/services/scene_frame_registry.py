@@ -0,0 +1,138 @@
+import json
+import logging
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set
+
+import numpy as np
+
+from app.core.config import SCENE_DIR
+from app.domains.coordinates.models.scene_frame import SceneFrame, SceneFrameTransforms
+from app.domains.coordinates.utils import geodesy
+
+logger = logging.getLogger(__name__)
+
+# --- GLB Coordinate Conversion Constants ---
+ORIGIN_LATITUDE_GLB = 24.786667  # 真實世界原點緯度 (GLB (0,0) 對應點)
+ORIGIN_LONGITUDE_GLB = 120.996944  # 真實世界原點經度 (GLB (0,0) 對應點)
+# GLB (100, 100) -> (真實): (24.785833 N, 120.997778 E)
+LATITUDE_SCALE_PER_GLB_Y = -0.000834 / 100  # 度 / GLB Y 單位
+LONGITUDE_SCALE_PER_GLB_X = 0.000834 / 100  # 度 / GLB X 單位
+
+# 場景目錄下的框架設定檔，欄位同 SceneFrame (name 可省略，預設為目錄名稱)
+SCENE_FRAME_FILENAME = "frame.json"
+
+
+def _nycu_frame() -> SceneFrame:
+    """由 GLB 換算常數建立 NYCU 場景框架 (x 向東、y 向南)"""
+    meters_per_lat, meters_per_lon = geodesy.meters_per_degree(ORIGIN_LATITUDE_GLB)
+    return SceneFrame(
+        name="NYCU",
+        origin_latitude=ORIGIN_LATITUDE_GLB,
+        origin_longitude=ORIGIN_LONGITUDE_GLB,
+        scale_x=LONGITUDE_SCALE_PER_GLB_X * meters_per_lon,
+        scale_y=LATITUDE_SCALE_PER_GLB_Y * meters_per_lat,
+    )
+
+
+class SceneFrameRegistry:
+    """場景局部 ENU 框架註冊表
+
+    每個場景的轉換矩陣在註冊時計算一次並快取，批次轉換只需一次矩陣乘法
+    (轉大地座標時再加上向量化的 ECEF 閉合解)。場景名稱不分大小寫。
+    """
+
+    def __init__(self):
+        self._transforms: Dict[str, SceneFrameTransforms] = {}
+        # load() 註冊的內建框架 (NYCU 與各場景目錄的 frame.json)
+        self._builtin: Set[str] = set()
+        self._conversions: Dict[str, Callable[[SceneFrameTransforms, np.ndarray], np.ndarray]] = {
+            "local-to-geo": self._local_to_geo,
+            "geo-to-local": self._geo_to_local,
+            "local-to-ecef": self._local_to_ecef,
+            "ecef-to-local": self._ecef_to_local,
+            "local-to-enu": self._local_to_enu,
+        }
+
+    @property
+    def conversions(self) -> List[str]:
+        return sorted(self._conversions)
+
+    def register(self, frame: SceneFrame) -> SceneFrameTransforms:
+        """註冊 (或取代) 場景框架並預先計算轉換矩陣"""
+        transforms = SceneFrameTransforms.from_frame(frame)
+        self._transforms[frame.name.lower()] = transforms
+        logger.info(
+            f"Registered scene frame '{frame.name}' at ({frame.origin_latitude}, {frame.origin_longitude})"
+        )
+        return transforms
+
+    def unregister(self, scene: str) -> None:
+        """移除場景框架；內建框架不會被移除"""
+        key = scene.lower()
+        if key in self._builtin:
+            return
+        if self._transforms.pop(key, None) is not None:
+            logger.info(f"Unregistered scene frame '{scene}'")
+
+    def is_builtin(self, scene: str) -> bool:
+        return scene.lower() in self._builtin
+
+    def get(self, scene: str) -> Optional[SceneFrameTransforms]:
+        return self._transforms.get(scene.lower())
+
+    def frames(self) -> List[SceneFrameTransforms]:
+        return list(self._transforms.values())
+
+    def load(self, scene_dir: Path = SCENE_DIR) -> None:
+        """註冊預設 NYCU 框架，再載入各場景目錄下的 frame.json (皆為內建框架)"""
+        self.register(_nycu_frame())
+        self._builtin.add(_nycu_frame().name.lower())
+        if not scene_dir.is_dir():
+            return
+        for path in sorted(scene_dir.glob(f"*/{SCENE_FRAME_FILENAME}")):
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+                data.setdefault("name", path.parent.name)
+                frame = SceneFrame(**data)
+                self.register(frame)
+                self._builtin.add(frame.name.lower())
+            except Exception as e:
+                logger.warning(f"Ignoring invalid scene frame file {path}: {e}")
+
+    def convert(self, scene: str, conversion: str, points) -> np.ndarray:
+        """以場景框架批次轉換 (N, 3) 座標陣列"""
+        transforms = self.get(scene)
+        if transforms is None:
+            raise KeyError(f"Scene frame '{scene}' is not registered.")
+        convert = self._conversions.get(conversion)
+        if convert is None:
+            raise ValueError(
+                f"Unknown scene conversion '{conversion}'. Available: {self.conversions}"
+            )
+        return convert(transforms, geodesy.as_points(points))
+
+    @staticmethod
+    def _local_to_enu(transforms: SceneFrameTransforms, points: np.ndarray) -> np.ndarray:
+        return geodesy.apply_transform(transforms.local_to_enu, points)
+
+    @staticmethod
+    def _local_to_ecef(transforms: SceneFrameTransforms, points: np.ndarray) -> np.ndarray:
+        return geodesy.apply_transform(transforms.local_to_ecef, points)
+
+    @staticmethod
+    def _ecef_to_local(transforms: SceneFrameTransforms, points: np.ndarray) -> np.ndarray:
+        return geodesy.apply_transform(transforms.ecef_to_local, points)
+
+    @staticmethod
+    def _local_to_geo(transforms: SceneFrameTransforms, points: np.ndarray) -> np.ndarray:
+        ecef = geodesy.apply_transform(transforms.local_to_ecef, points)
+        return np.column_stack(geodesy.ecef_to_geo(ecef[:, 0], ecef[:, 1], ecef[:, 2]))
+
+    @staticmethod
+    def _geo_to_local(transforms: SceneFrameTransforms, points: np.ndarray) -> np.ndarray:
+        ecef = np.column_stack(geodesy.geo_to_ecef(points[:, 0], points[:, 1], points[:, 2]))
+        return geodesy.apply_transform(transforms.ecef_to_local, ecef)
+
+
+# 全域場景框架註冊表，於應用程式啟動時載入
+scene_frame_registry = SceneFrameRegistry()
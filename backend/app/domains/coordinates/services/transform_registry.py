@@ -0,0 +1,257 @@
+import json
+import logging
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+import numpy as np
+
+from app.core.metrics import record_cache_lookup
+from app.domains.coordinates.interfaces.transformation_repository import (
+    TransformationRepository,
+)
+from app.domains.coordinates.models.coordinate_model import (
+    CoordinateTransformation,
+    CoordinateTransformationCreate,
+    CoordinateTransformationResponse,
+)
+from app.domains.coordinates.models.scene_frame import (
+    SceneFrame,
+    SceneFrameParameters,
+    SceneFrameTransforms,
+)
+from app.domains.coordinates.services.scene_frame_registry import (
+    SceneFrameRegistry,
+    scene_frame_registry,
+)
+from app.domains.coordinates.utils import geodesy, utm
+
+logger = logging.getLogger(__name__)
+
+ARCSECONDS_TO_RADIANS = np.pi / (180.0 * 3600.0)
+
+PointsFunction = Callable[[np.ndarray], np.ndarray]
+
+
+class CompiledTransform:
+    """已預先計算參數的具名轉換，forward 為 來源→目標，inverse 為 目標→來源"""
+
+    def __init__(
+        self,
+        record: CoordinateTransformation,
+        forward: PointsFunction,
+        inverse: PointsFunction,
+        frame: Optional[SceneFrame] = None,
+    ):
+        self.record = record
+        self.forward = forward
+        self.inverse = inverse
+        # 場景框架類型的轉換在啟用時註冊到場景框架註冊表
+        self.frame = frame
+
+    @property
+    def name(self) -> str:
+        return self.record.name
+
+    def apply(self, points: Any, inverse: bool = False) -> np.ndarray:
+        array = geodesy.as_points(points)
+        return (self.inverse if inverse else self.forward)(array)
+
+
+def _matrix_functions(matrix: np.ndarray):
+    inverse_matrix = np.linalg.inv(matrix)
+    return (
+        lambda points: geodesy.apply_transform(matrix, points),
+        lambda points: geodesy.apply_transform(inverse_matrix, points),
+    )
+
+
+def _helmert_matrix(parameters: Mapping[str, Any]) -> np.ndarray:
+    """七參數 Helmert 轉換 (ECEF)，旋轉以角秒、尺度以 ppm 表示
+
+    convention 為 position-vector (預設) 或 coordinate-frame (旋轉方向相反)。
+    """
+    rx, ry, rz = (
+        float(parameters.get(key, 0.0)) * ARCSECONDS_TO_RADIANS for key in ("rx", "ry", "rz")
+    )
+    if parameters.get("convention", "position-vector") == "coordinate-frame":
+        rx, ry, rz = -rx, -ry, -rz
+    scale = 1.0 + float(parameters.get("scale_ppm", 0.0)) * 1e-6
+    matrix = np.eye(4)
+    matrix[:3, :3] = scale * np.array(
+        [[1.0, -rz, ry], [rz, 1.0, -rx], [-ry, rx, 1.0]]
+    )
+    matrix[:3, 3] = [float(parameters.get(key, 0.0)) for key in ("tx", "ty", "tz")]
+    return matrix
+
+
+def _scene_frame_functions(transforms: SceneFrameTransforms):
+    def forward(points: np.ndarray) -> np.ndarray:
+        ecef = geodesy.apply_transform(transforms.local_to_ecef, points)
+        return np.column_stack(geodesy.ecef_to_geo(ecef[:, 0], ecef[:, 1], ecef[:, 2]))
+
+    def inverse(points: np.ndarray) -> np.ndarray:
+        ecef = np.column_stack(geodesy.geo_to_ecef(points[:, 0], points[:, 1], points[:, 2]))
+        return geodesy.apply_transform(transforms.ecef_to_local, ecef)
+
+    return forward, inverse
+
+
+def _utm_functions(parameters: Mapping[str, Any]):
+    zone = int(parameters["zone"])
+    south = bool(parameters.get("south", False))
+    utm.zone_parameters(zone, south)  # 驗證區帶並預先快取
+
+    def forward(points: np.ndarray) -> np.ndarray:
+        lat, lon = utm.utm_to_geo(points[:, 0], points[:, 1], zone, south=south)
+        return np.column_stack((lat, lon, points[:, 2]))
+
+    def inverse(points: np.ndarray) -> np.ndarray:
+        easting, northing = utm.geo_to_utm(points[:, 0], points[:, 1], zone=zone, south=south)
+        return np.column_stack((easting, northing, points[:, 2]))
+
+    return forward, inverse
+
+
+class TransformRegistry:
+    """具名座標轉換註冊表
+
+    轉換記錄保存在 CoordinateTransformation 資料表，啟動時載入並編譯為
+    CompiledTransform (預先計算矩陣與區帶參數)，之後的批次轉換直接使用快取。
+    場景框架類型的轉換在寫入資料庫後才註冊到場景框架註冊表，刪除時一併移除；
+    不可取代內建的場景框架 (NYCU 與 frame.json)，也不可與其他轉換使用相同的場景。
+    """
+
+    def __init__(self, frame_registry: SceneFrameRegistry = scene_frame_registry):
+        self.frame_registry = frame_registry
+        self._compiled: Dict[str, CompiledTransform] = {}
+
+    def get(self, name: str) -> Optional[CompiledTransform]:
+        return self._compiled.get(name)
+
+    def transforms(self) -> List[CompiledTransform]:
+        return list(self._compiled.values())
+
+    def compile(self, record: CoordinateTransformation) -> CompiledTransform:
+        """由資料表記錄編譯轉換 (不註冊場景框架)；參數無效時拋出 ValueError"""
+        frame = None
+        try:
+            parameters = json.loads(record.transformation_parameters)
+            kind = parameters.get("type")
+            if kind == "scene-frame":
+                frame = SceneFrame(
+                    name=parameters.get("scene", record.name),
+                    **SceneFrameParameters(**parameters).model_dump(),
+                )
+                self._check_frame_name(record.name, frame.name)
+                forward, inverse = _scene_frame_functions(SceneFrameTransforms.from_frame(frame))
+            elif kind == "utm":
+                forward, inverse = _utm_functions(parameters)
+            elif kind == "helmert":
+                forward, inverse = _matrix_functions(_helmert_matrix(parameters))
+            elif kind == "affine":
+                matrix = np.asarray(parameters["matrix"], dtype=np.float64)
+                if matrix.shape != (4, 4):
+                    raise ValueError("Affine transform matrix must be 4x4")
+                forward, inverse = _matrix_functions(matrix)
+            else:
+                raise ValueError(
+                    f"Unknown transform type '{kind}'. Expected scene-frame, utm, helmert or affine"
+                )
+        except ValueError:
+            raise
+        except (KeyError, TypeError, np.linalg.LinAlgError) as e:
+            raise ValueError(f"Invalid parameters for transform '{record.name}': {e}")
+        return CompiledTransform(record, forward, inverse, frame)
+
+    def _check_frame_name(self, name: str, scene: str) -> None:
+        if self.frame_registry.is_builtin(scene):
+            raise ValueError(
+                f"Transform '{name}' cannot replace the built-in scene frame '{scene}'"
+            )
+        for other in self._compiled.values():
+            if (
+                other.name != name
+                and other.frame is not None
+                and other.frame.name.lower() == scene.lower()
+            ):
+                raise ValueError(
+                    f"Scene frame '{scene}' is already defined by transform '{other.name}'"
+                )
+
+    def _activate(self, compiled: CompiledTransform) -> CompiledTransform:
+        """快取轉換並註冊其場景框架；同名的舊轉換若定義其他場景則移除該框架"""
+        previous = self._compiled.get(compiled.name)
+        if previous is not None and previous.frame is not None and (
+            compiled.frame is None or compiled.frame.name.lower() != previous.frame.name.lower()
+        ):
+            self.frame_registry.unregister(previous.frame.name)
+        if compiled.frame is not None:
+            self.frame_registry.register(compiled.frame)
+        self._compiled[compiled.name] = compiled
+        return compiled
+
+    async def load(self, repository: TransformationRepository) -> None:
+        """從資料庫載入並編譯所有具名轉換，無效的記錄會被略過"""
+        for compiled in self._compiled.values():
+            if compiled.frame is not None:
+                self.frame_registry.unregister(compiled.frame.name)
+        self._compiled = {}
+        for record in await repository.get_all():
+            try:
+                self._activate(self.compile(record))
+            except ValueError as e:
+                logger.warning(f"Skipping coordinate transformation '{record.name}': {e}")
+        logger.info(f"Loaded {len(self._compiled)} coordinate transformations.")
+
+    async def resolve(
+        self, repository: TransformationRepository, name: str
+    ) -> Optional[CompiledTransform]:
+        """取得快取的轉換；未快取時 (例如由其他 worker 建立) 從資料庫載入"""
+        compiled = self.get(name)
+        record_cache_lookup("coordinate_transforms", compiled is not None)
+        if compiled is None:
+            record = await repository.get_by_name(name)
+            if record is not None:
+                compiled = self._activate(self.compile(record))
+        return compiled
+
+    async def save(
+        self, repository: TransformationRepository, data: CoordinateTransformationCreate
+    ) -> CompiledTransform:
+        """驗證並儲存轉換，寫入成功後才更新快取與場景框架"""
+        record = CoordinateTransformation(
+            name=data.name,
+            source_system=data.source_system,
+            target_system=data.target_system,
+            transformation_parameters=json.dumps(data.parameters),
+            description=data.description,
+        )
+        compiled = self.compile(record)  # 先驗證參數，避免寫入無法使用的記錄
+        compiled.record = await repository.upsert(record)
+        return self._activate(compiled)
+
+    async def remove(
+        self, repository: TransformationRepository, name: str
+    ) -> Optional[CoordinateTransformation]:
+        """刪除轉換，並移除其註冊的場景框架"""
+        record = await repository.remove(name)
+        compiled = self._compiled.pop(name, None)
+        if compiled is not None and compiled.frame is not None:
+            self.frame_registry.unregister(compiled.frame.name)
+        return record
+
+
+def transformation_to_response(
+    record: CoordinateTransformation,
+) -> CoordinateTransformationResponse:
+    return CoordinateTransformationResponse(
+        id=record.id,
+        name=record.name,
+        source_system=record.source_system,
+        target_system=record.target_system,
+        parameters=json.loads(record.transformation_parameters),
+        description=record.description,
+    )
+
+
+# 全域具名轉換註冊表，於應用程式啟動時從資料庫載入
+transform_registry = TransformRegistry()
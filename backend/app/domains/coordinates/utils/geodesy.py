@@ -0,0 +1,169 @@
+"""
+向量化大地測量計算
+
+所有函數皆接受可廣播的 NumPy 陣列 (或純量)，一次處理任意數量的點，
+角度以度為單位、距離與高度以米為單位。
+"""
+
+import numpy as np
+
+# 地球參數
+EARTH_RADIUS_KM = 6371.0  # 地球平均半徑 (公里)
+EARTH_RADIUS_M = EARTH_RADIUS_KM * 1000.0
+WGS84_A = 6378137.0  # WGS-84 橢球體長半軸 (米)
+WGS84_F = 1 / 298.257223563  # WGS-84 扁率
+WGS84_B = WGS84_A * (1 - WGS84_F)  # WGS-84 橢球體短半軸 (米)
+WGS84_E2 = WGS84_F * (2 - WGS84_F)  # 第一偏心率的平方
+
+
+def as_points(points, columns: int = 3) -> np.ndarray:
+    """將輸入整理為 (N, columns) 的 float64 陣列；列數不足時以 0 補齊 (例如省略高度)"""
+    array = np.asarray(points, dtype=np.float64)
+    if array.ndim == 1:
+        array = array.reshape(1, -1)
+    if array.ndim != 2 or not 1 <= array.shape[1] <= columns:
+        raise ValueError(f"Expected an array of shape (N, {columns}), got {array.shape}")
+    if array.shape[1] < columns:
+        array = np.pad(array, ((0, 0), (0, columns - array.shape[1])))
+    return array
+
+
+def geo_to_ecef(lat, lon, alt=0.0):
+    """大地座標 (WGS-84) 轉 ECEF"""
+    lat = np.radians(lat)
+    lon = np.radians(lon)
+    sin_lat = np.sin(lat)
+    cos_lat = np.cos(lat)
+    # 卯酉圈曲率半徑
+    n = WGS84_A / np.sqrt(1 - WGS84_E2 * sin_lat**2)
+    x = (n + alt) * cos_lat * np.cos(lon)
+    y = (n + alt) * cos_lat * np.sin(lon)
+    z = (n * (1 - WGS84_E2) + alt) * sin_lat
+    return x, y, z
+
+
+def ecef_to_geo(x, y, z):
+    """ECEF 轉大地座標 (WGS-84)，使用 Vermeille (2004) 閉合解
+
+    不需迭代，地表附近到衛星高度的精度皆優於 1 mm。
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    z = np.asarray(z, dtype=np.float64)
+    e4 = WGS84_E2**2
+
+    horizontal = np.hypot(x, y)
+    p = (horizontal / WGS84_A) ** 2
+    q = (1 - WGS84_E2) * (z / WGS84_A) ** 2
+    r = (p + q - e4) / 6
+    s = e4 * p * q / (4 * r**3)
+    t = np.cbrt(1 + s + np.sqrt(s * (2 + s)))
+    u = r * (1 + t + 1 / t)
+    v = np.sqrt(u**2 + e4 * q)
+    w = WGS84_E2 * (u + v - q) / (2 * v)
+    k = np.sqrt(u + v + w**2) - w
+    d = k * horizontal / (k + WGS84_E2)
+    dz = np.hypot(d, z)
+
+    lat = 2 * np.arctan2(z, d + dz)
+    lon = np.arctan2(y, x)
+    alt = (k + WGS84_E2 - 1) / k * dz
+    return np.degrees(lat), np.degrees(lon), alt
+
+
+def geo_to_sphere(lat, lon, alt=0.0):
+    """大地座標轉球面笛卡爾座標 (公里)，與 CoordinateService.geo_to_cartesian 相同的簡單投影"""
+    lat = np.radians(lat)
+    lon = np.radians(lon)
+    radius = EARTH_RADIUS_KM + np.asarray(alt, dtype=np.float64) / 1000.0
+    return (
+        radius * np.cos(lat) * np.cos(lon),
+        radius * np.cos(lat) * np.sin(lon),
+        radius * np.sin(lat),
+    )
+
+
+def sphere_to_geo(x, y, z):
+    """球面笛卡爾座標 (公里) 轉大地座標，高度單位為米"""
+    r = np.sqrt(np.asarray(x) ** 2 + np.asarray(y) ** 2 + np.asarray(z) ** 2)
+    lat = np.degrees(np.arcsin(z / r))
+    lon = np.degrees(np.arctan2(y, x))
+    return lat, lon, (r - EARTH_RADIUS_KM) * 1000.0
+
+
+def bearing_distance(lat1, lon1, lat2, lon2):
+    """方位角 (度，0-360) 與 Haversine 大圓距離 (米)，輸入可互相廣播"""
+    lat1 = np.radians(lat1)
+    lat2 = np.radians(lat2)
+    dlon = np.radians(lon2) - np.radians(lon1)
+    cos_lat2 = np.cos(lat2)
+
+    bearing = np.degrees(
+        np.arctan2(
+            np.sin(dlon) * cos_lat2,
+            np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * cos_lat2 * np.cos(dlon),
+        )
+    )
+    bearing = np.mod(bearing + 360.0, 360.0)
+
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * cos_lat2 * np.sin(dlon / 2) ** 2
+    distance = 2 * EARTH_RADIUS_M * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return bearing, distance
+
+
+def destination_point(lat, lon, bearing, distance):
+    """由起點、方位角 (度) 與距離 (米) 計算球面上的終點"""
+    lat1 = np.radians(lat)
+    lon1 = np.radians(lon)
+    bearing = np.radians(bearing)
+    angular = np.asarray(distance, dtype=np.float64) / EARTH_RADIUS_M
+
+    lat2 = np.arcsin(
+        np.sin(lat1) * np.cos(angular)
+        + np.cos(lat1) * np.sin(angular) * np.cos(bearing)
+    )
+    lon2 = lon1 + np.arctan2(
+        np.sin(bearing) * np.sin(angular) * np.cos(lat1),
+        np.cos(angular) - np.sin(lat1) * np.sin(lat2),
+    )
+    # 經度規範化到 -180 ~ 180
+    return np.degrees(lat2), np.mod(np.degrees(lon2) + 180.0, 360.0) - 180.0
+
+
+def enu_to_ecef_matrix(lat: float, lon: float, alt: float = 0.0) -> np.ndarray:
+    """以 (lat, lon, alt) 為原點的 ENU 局部座標轉 ECEF 的 4x4 齊次矩陣"""
+    phi = np.radians(lat)
+    lam = np.radians(lon)
+    sin_phi, cos_phi = np.sin(phi), np.cos(phi)
+    sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+    matrix = np.eye(4)
+    # 三個欄位依序為東、北、天頂方向在 ECEF 中的單位向量
+    matrix[:3, 0] = (-sin_lam, cos_lam, 0.0)
+    matrix[:3, 1] = (-sin_phi * cos_lam, -sin_phi * sin_lam, cos_phi)
+    matrix[:3, 2] = (cos_phi * cos_lam, cos_phi * sin_lam, sin_phi)
+    matrix[:3, 3] = geo_to_ecef(lat, lon, alt)
+    return matrix
+
+
+def meters_per_degree(lat: float) -> tuple:
+    """WGS-84 上緯度 lat 處每度緯度與每度經度的長度 (米)"""
+    sin_lat = np.sin(np.radians(lat))
+    w = np.sqrt(1 - WGS84_E2 * sin_lat**2)
+    meridional = WGS84_A * (1 - WGS84_E2) / w**3
+    prime_vertical = WGS84_A / w
+    return (
+        float(np.radians(1.0) * meridional),
+        float(np.radians(1.0) * prime_vertical * np.cos(np.radians(lat))),
+    )
+
+
+def apply_transform(matrix: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """對 (N, 3) 點陣列套用 4x4 齊次轉換矩陣"""
+    return points @ matrix[:3, :3].T + matrix[:3, 3]
+
+
+def enu_bearing_distance(sources: np.ndarray, targets: np.ndarray):
+    """ENU 局部座標 (米) 的 N×M 方位角 (度，0-360，正北順時針) 與 3D 距離矩陣"""
+    delta = targets[np.newaxis, :, :] - sources[:, np.newaxis, :]
+    bearing = np.mod(np.degrees(np.arctan2(delta[..., 0], delta[..., 1])), 360.0)
+    return bearing, np.linalg.norm(delta, axis=-1)
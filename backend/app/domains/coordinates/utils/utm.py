@@ -0,0 +1,161 @@
+"""
+向量化 UTM (通用橫麥卡托) 投影
+
+使用 Krüger 級數 (Karney 2011，展開至 n^6)，在距中央子午線 ±3° 內精度
+優於 1 mm，兩個方向皆可一次處理任意數量的點。級數係數只與橢球體有關，
+於模組載入時計算一次；各區帶的投影參數則依 (區帶, 半球) 快取。
+"""
+
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import numpy as np
+
+from app.domains.coordinates.utils.geodesy import WGS84_A, WGS84_E2, WGS84_F
+
+UTM_SCALE_FACTOR = 0.9996  # 中央子午線比例因子 k0
+UTM_FALSE_EASTING = 500000.0
+UTM_FALSE_NORTHING_SOUTH = 10000000.0
+# 緯度帶字母，每帶 8°，X 帶延伸至 84°N
+UTM_LATITUDE_BANDS = "CDEFGHJKLMNPQRSTUVWXX"
+
+_N = WGS84_F / (2 - WGS84_F)
+_E = np.sqrt(WGS84_E2)
+# 子午線弧長的修正半徑 A
+_RECTIFYING_RADIUS = (
+    WGS84_A / (1 + _N) * (1 + _N**2 / 4 + _N**4 / 64 + _N**6 / 256)
+)
+# 正算 (α) 與反算 (β) 的 Krüger 級數係數
+_ALPHA = np.array(
+    [
+        _N / 2 - 2 * _N**2 / 3 + 5 * _N**3 / 16 + 41 * _N**4 / 180
+        - 127 * _N**5 / 288 + 7891 * _N**6 / 37800,
+        13 * _N**2 / 48 - 3 * _N**3 / 5 + 557 * _N**4 / 1440
+        + 281 * _N**5 / 630 - 1983433 * _N**6 / 1935360,
+        61 * _N**3 / 240 - 103 * _N**4 / 140 + 15061 * _N**5 / 26880
+        + 167603 * _N**6 / 181440,
+        49561 * _N**4 / 161280 - 179 * _N**5 / 168 + 6601661 * _N**6 / 7257600,
+        34729 * _N**5 / 80640 - 3418889 * _N**6 / 1995840,
+        212378941 * _N**6 / 319334400,
+    ]
+)
+_BETA = np.array(
+    [
+        _N / 2 - 2 * _N**2 / 3 + 37 * _N**3 / 96 - _N**4 / 360
+        - 81 * _N**5 / 512 + 96199 * _N**6 / 604800,
+        _N**2 / 48 + _N**3 / 15 - 437 * _N**4 / 1440
+        + 46 * _N**5 / 105 - 1118711 * _N**6 / 3870720,
+        17 * _N**3 / 480 - 37 * _N**4 / 840 - 209 * _N**5 / 4480
+        + 5569 * _N**6 / 90720,
+        4397 * _N**4 / 161280 - 11 * _N**5 / 504 - 830251 * _N**6 / 7257600,
+        4583 * _N**5 / 161280 - 108847 * _N**6 / 3991680,
+        20648693 * _N**6 / 638668800,
+    ]
+)
+_HARMONICS = 2 * np.arange(1, 7)
+
+
+@lru_cache(maxsize=None)
+def zone_parameters(zone_number: int, south: bool = False) -> Tuple[float, float]:
+    """區帶的中央子午線 (弧度) 與北向偏移 (米)"""
+    if not 1 <= zone_number <= 60:
+        raise ValueError(f"UTM zone number must be between 1 and 60, got {zone_number}")
+    central_meridian = np.radians(6.0 * zone_number - 183.0)
+    return float(central_meridian), UTM_FALSE_NORTHING_SOUTH if south else 0.0
+
+
+def zone_number(lat, lon) -> np.ndarray:
+    """標準 UTM 區帶編號，包含挪威 (32V) 與斯瓦巴 (31X-37X) 的例外"""
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.mod(np.asarray(lon, dtype=np.float64) + 180.0, 360.0) - 180.0
+    zone = np.floor((lon + 180.0) / 6.0).astype(np.int64) + 1
+    zone = np.minimum(zone, 60)
+
+    norway = (lat >= 56.0) & (lat < 64.0) & (lon >= 3.0) & (lon < 12.0)
+    zone = np.where(norway, 32, zone)
+
+    svalbard = lat >= 72.0
+    for low, high, number in ((0, 9, 31), (9, 21, 33), (21, 33, 35), (33, 42, 37)):
+        zone = np.where(svalbard & (lon >= low) & (lon < high), number, zone)
+    return zone
+
+
+def latitude_band(lat) -> np.ndarray:
+    """緯度帶字母 (C-X)；超出 UTM 範圍 (80°S-84°N) 時為 'Z'"""
+    lat = np.asarray(lat, dtype=np.float64)
+    index = np.clip(np.floor((lat + 80.0) / 8.0).astype(np.int64), 0, 20)
+    letters = np.array(list(UTM_LATITUDE_BANDS))[index]
+    return np.where((lat < -80.0) | (lat > 84.0), "Z", letters)
+
+
+def geo_to_utm(lat, lon, zone: Optional[int] = None, south: Optional[bool] = None):
+    """大地座標轉 UTM，回傳 (easting, northing)
+
+    zone 省略時以輸入的平均位置決定單一區帶；south 省略時依平均緯度決定半球。
+    同一批點位投影到同一區帶，跨區的點位仍可精確轉換。
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    if zone is None:
+        zone = int(zone_number(np.mean(lat), np.mean(lon)))
+    if south is None:
+        south = bool(np.mean(lat) < 0)
+    central_meridian, false_northing = zone_parameters(zone, south)
+
+    phi = np.radians(lat)
+    lam = np.radians(lon) - central_meridian
+    # 將經度差規範化到 -π ~ π
+    lam = np.mod(lam + np.pi, 2 * np.pi) - np.pi
+    cos_lam = np.cos(lam)
+
+    # 保角緯度
+    tau = np.tan(phi)
+    sigma = np.sinh(_E * np.arctanh(_E * tau / np.sqrt(1 + tau**2)))
+    tau_prime = tau * np.sqrt(1 + sigma**2) - sigma * np.sqrt(1 + tau**2)
+
+    xi_prime = np.arctan2(tau_prime, cos_lam)
+    eta_prime = np.arcsinh(np.sin(lam) / np.sqrt(tau_prime**2 + cos_lam**2))
+
+    angles = _HARMONICS * xi_prime[..., np.newaxis]
+    hyperbolic = _HARMONICS * eta_prime[..., np.newaxis]
+    xi = xi_prime + np.sum(_ALPHA * np.sin(angles) * np.cosh(hyperbolic), axis=-1)
+    eta = eta_prime + np.sum(_ALPHA * np.cos(angles) * np.sinh(hyperbolic), axis=-1)
+
+    k0a = UTM_SCALE_FACTOR * _RECTIFYING_RADIUS
+    return UTM_FALSE_EASTING + k0a * eta, false_northing + k0a * xi
+
+
+def utm_to_geo(easting, northing, zone: int, south: bool = False, iterations: int = 5):
+    """UTM 轉大地座標，回傳 (緯度, 經度) (度)"""
+    central_meridian, false_northing = zone_parameters(zone, south)
+    k0a = UTM_SCALE_FACTOR * _RECTIFYING_RADIUS
+    eta = (np.asarray(easting, dtype=np.float64) - UTM_FALSE_EASTING) / k0a
+    xi = (np.asarray(northing, dtype=np.float64) - false_northing) / k0a
+
+    angles = _HARMONICS * xi[..., np.newaxis]
+    hyperbolic = _HARMONICS * eta[..., np.newaxis]
+    xi_prime = xi - np.sum(_BETA * np.sin(angles) * np.cosh(hyperbolic), axis=-1)
+    eta_prime = eta - np.sum(_BETA * np.cos(angles) * np.sinh(hyperbolic), axis=-1)
+
+    sinh_eta = np.sinh(eta_prime)
+    cos_xi = np.cos(xi_prime)
+    tau_prime = np.sin(xi_prime) / np.sqrt(sinh_eta**2 + cos_xi**2)
+
+    # 由保角緯度反求緯度 (牛頓法，通常 2-3 次即收斂到 1e-12)
+    tau = tau_prime
+    for _ in range(iterations):
+        sigma = np.sinh(_E * np.arctanh(_E * tau / np.sqrt(1 + tau**2)))
+        tau_i = tau * np.sqrt(1 + sigma**2) - sigma * np.sqrt(1 + tau**2)
+        delta = (
+            (tau_prime - tau_i)
+            / np.sqrt(1 + tau_i**2)
+            * (1 + (1 - WGS84_E2) * tau**2)
+            / ((1 - WGS84_E2) * np.sqrt(1 + tau**2))
+        )
+        tau = tau + delta
+        if np.all(np.abs(delta) < 1e-12):
+            break
+
+    lat = np.degrees(np.arctan(tau))
+    lon = np.degrees(np.arctan2(sinh_eta, cos_xi) + central_meridian)
+    return lat, np.mod(lon + 180.0, 360.0) - 180.0
@@ -6,6 +6,11 @@
 """
 
 from app.domains.device.models.device_model import Device, DeviceRole, DeviceBase
+from app.domains.device.models.device_snapshot import DeviceColumns
 from app.domains.device.services.device_service import DeviceService
 from app.domains.device.interfaces.device_repository import DeviceRepository
-from app.domains.device.adapters.sqlmodel_device_repository import SQLModelDeviceRepository 
\ No newline at end of file
+from app.domains.device.adapters.sqlmodel_device_repository import SQLModelDeviceRepository
+from app.domains.device.services.device_event_broker import (
+    DeviceEventBroker,
+    device_event_broker,
+)
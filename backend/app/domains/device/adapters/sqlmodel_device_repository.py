@@ -1,10 +1,26 @@
 import logging
-from typing import List, Optional, Dict, Any, Union, Sequence
+from typing import List, Optional, Dict, Any, Union, Sequence, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, delete, func, insert, literal_column, text, update
 from sqlmodel import select
 
-from app.domains.device.models.device_model import Device, DeviceRole
+from app.domains.device.models.device_model import (
+    DEVICE_GEOMETRY_COLUMN,
+    Device,
+    DeviceRole,
+)
+from app.domains.device.models.device_snapshot import (
+    DeviceColumns,
+    DEVICE_COLUMNS,
+)
 from app.domains.device.interfaces.device_repository import DeviceRepository
+from app.domains.device.services.device_event_broker import (
+    DeviceEventBroker,
+    build_device_event,
+    device_diff,
+    device_event_broker,
+    device_to_event_dict,
+)
 from app.domains.device.models.dto import (
     DeviceCreate,
     DeviceUpdate,
@@ -13,12 +29,35 @@ from app.domains.device.models.dto import (
 
 logger = logging.getLogger(__name__)
 
+# 保護「至少一個 tx/rx/jammer」不變量的 PostgreSQL advisory lock 鍵值
+DEVICE_ROLE_LOCK_KEY = 0x5D3_0001
+
 
 class SQLModelDeviceRepository(DeviceRepository):
     """SQLModel 設備存儲庫實現"""
 
-    def __init__(self, session: AsyncSession):
+    # 由 lifespan 在 PostGIS 幾何欄位與 GiST 索引建立成功後設為 True；
+    # 否則空間查詢退回以 position_x/y 欄位過濾
+    use_postgis: bool = False
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        event_broker: Optional[DeviceEventBroker] = device_event_broker,
+    ):
         self.session = session
+        # 每次提交後將設備變更發布到事件廣播器；傳入 None 可停用
+        self.event_broker = event_broker
+
+    async def _publish(self, **changes) -> None:
+        """提交後發布精簡的設備事件"""
+        if self.event_broker is None:
+            return
+        try:
+            await self.event_broker.publish(build_device_event(**changes))
+        except Exception as e:
+            # 事件發布失敗不影響已提交的寫入
+            logger.error(f"Error publishing device event: {e}", exc_info=True)
 
     async def create(self, obj_in: DeviceCreate) -> Device:
         """創建一個新的設備記錄"""
@@ -43,6 +82,7 @@ class SQLModelDeviceRepository(DeviceRepository):
             logger.info(
                 f"Successfully created device '{db_device.name}' with ID {db_device.id}"
             )
+            await self._publish(created=[device_to_event_dict(db_device)])
             return db_device
         except Exception as e:
             await self.session.rollback()
@@ -63,6 +103,22 @@ class SQLModelDeviceRepository(DeviceRepository):
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
 
+    async def get_by_ids(self, device_ids: Sequence[int]) -> Sequence[Device]:
+        """以單一查詢根據多個 ID 獲取設備"""
+        if not device_ids:
+            return []
+        stmt = select(Device).where(Device.id.in_(device_ids))
+        result = await self.session.execute(stmt)
+        return result.scalars().all()
+
+    async def get_by_names(self, names: Sequence[str]) -> Sequence[Device]:
+        """以單一查詢根據多個名稱獲取設備"""
+        if not names:
+            return []
+        stmt = select(Device).where(Device.name.in_(names))
+        result = await self.session.execute(stmt)
+        return result.scalars().all()
+
     async def get_multi(
         self,
         *,
@@ -96,6 +152,154 @@ class SQLModelDeviceRepository(DeviceRepository):
         """獲取活躍的設備列表，可選按角色過濾"""
         return await self.get_multi(role=role, active_only=True)
 
+    async def get_active_columns(
+        self, bbox: Optional[Tuple[float, float, float, float]] = None
+    ) -> DeviceColumns:
+        """以單一查詢獲取活躍設備的欄位式 (NumPy) 快照，不設數量上限
+
+        bbox 為 (min_x, min_y, max_x, max_y) 時只取範圍內的設備。
+        """
+        logger.debug(f"Fetching active device columns (bbox={bbox})")
+        # 只選取需要的欄位，跳過 ORM 物件建立，直接由結果列組成陣列
+        stmt = select(*DEVICE_COLUMNS).where(Device.active == True)
+        if bbox is not None:
+            stmt = stmt.where(self._bbox_condition(*bbox))
+        stmt = stmt.order_by(Device.id)
+        result = await self.session.execute(stmt)
+        return DeviceColumns.from_rows(result.all())
+
+    def _spatial_query(self, *conditions, role: Optional[str], active_only: bool):
+        """組合空間查詢的共同過濾條件"""
+        query = select(Device).where(*conditions)
+        if role:
+            query = query.where(Device.role == role)
+        if active_only:
+            query = query.where(Device.active == True)
+        return query
+
+    @staticmethod
+    def _geometry():
+        return literal_column(f"{Device.__tablename__}.{DEVICE_GEOMETRY_COLUMN}")
+
+    def _bbox_condition(self, min_x: float, min_y: float, max_x: float, max_y: float):
+        if self.use_postgis:
+            # && 以 GiST 索引比對範圍框
+            return self._geometry().op("&&")(
+                func.ST_MakeEnvelope(min_x, min_y, max_x, max_y)
+            )
+        return and_(
+            Device.position_x.between(min_x, max_x),
+            Device.position_y.between(min_y, max_y),
+        )
+
+    @staticmethod
+    def _squared_distance(x: float, y: float):
+        dx = Device.position_x - x
+        dy = Device.position_y - y
+        return dx * dx + dy * dy
+
+    async def get_in_bbox(
+        self,
+        min_x: float,
+        min_y: float,
+        max_x: float,
+        max_y: float,
+        *,
+        role: Optional[str] = None,
+        active_only: bool = True,
+    ) -> Sequence[Device]:
+        """獲取水平範圍框 (x/y) 內的設備"""
+        logger.debug(f"Fetching devices in bbox ({min_x}, {min_y}, {max_x}, {max_y})")
+        query = self._spatial_query(
+            self._bbox_condition(min_x, min_y, max_x, max_y),
+            role=role,
+            active_only=active_only,
+        ).order_by(Device.id)
+        result = await self.session.execute(query)
+        return result.scalars().all()
+
+    async def get_within_radius(
+        self,
+        x: float,
+        y: float,
+        radius: float,
+        *,
+        role: Optional[str] = None,
+        active_only: bool = True,
+    ) -> Sequence[Device]:
+        """獲取與 (x, y) 水平距離不超過 radius 的設備"""
+        logger.debug(f"Fetching devices within {radius} of ({x}, {y})")
+        if self.use_postgis:
+            condition = func.ST_DWithin(
+                self._geometry(), func.ST_MakePoint(x, y), radius
+            )
+        else:
+            # 先以外接範圍框縮小範圍，再比較平方距離
+            condition = and_(
+                self._bbox_condition(x - radius, y - radius, x + radius, y + radius),
+                self._squared_distance(x, y) <= radius * radius,
+            )
+        query = self._spatial_query(
+            condition, role=role, active_only=active_only
+        ).order_by(Device.id)
+        result = await self.session.execute(query)
+        return result.scalars().all()
+
+    async def get_nearest(
+        self,
+        x: float,
+        y: float,
+        k: int,
+        *,
+        role: Optional[str] = None,
+        active_only: bool = True,
+    ) -> Sequence[Device]:
+        """獲取距離 (x, y) 最近的 k 個設備，依距離排序"""
+        logger.debug(f"Fetching {k} devices nearest to ({x}, {y})")
+        if self.use_postgis:
+            # <-> 為索引輔助的 kNN 排序
+            distance = self._geometry().op("<->")(func.ST_MakePoint(x, y))
+        else:
+            distance = self._squared_distance(x, y)
+        query = (
+            self._spatial_query(role=role, active_only=active_only)
+            .order_by(distance, Device.id)
+            .limit(k)
+        )
+        result = await self.session.execute(query)
+        return result.scalars().all()
+
+    async def count_active_by_role(self) -> Dict[str, int]:
+        """以單一聚合查詢統計各角色的活躍設備數量"""
+        logger.debug("Counting active devices by role")
+        stmt = (
+            select(Device.role, func.count(Device.id))
+            .where(Device.active == True)
+            .group_by(Device.role)
+        )
+        result = await self.session.execute(stmt)
+        counts = {role.value: 0 for role in DeviceRole}
+        for role, role_count in result.all():
+            counts[getattr(role, "value", role)] = role_count
+        return counts
+
+    async def lock_role_counts(self) -> None:
+        """在目前交易中取得角色統計的排他鎖，直到提交或回滾為止
+
+        PostgreSQL 使用交易層級 advisory lock，只鎖一個鍵值而非整張表；
+        其他資料庫（如 SQLite）寫入本身即已序列化，不需額外加鎖。
+        """
+        if self.session.bind.dialect.name != "postgresql":
+            return
+        logger.debug("Acquiring device role advisory lock")
+        await self.session.execute(
+            text("SELECT pg_advisory_xact_lock(:key)"), {"key": DEVICE_ROLE_LOCK_KEY}
+        )
+
+    async def rollback(self) -> None:
+        """回滾目前交易並釋放交易內取得的鎖"""
+        await self.session.rollback()
+
     async def update(
         self, *, db_obj: Device, obj_in: Union[DeviceUpdate, Dict[str, Any]]
     ) -> Device:
@@ -108,6 +312,8 @@ class SQLModelDeviceRepository(DeviceRepository):
             else:
                 update_data = obj_in.dict(exclude_unset=True)
 
+            before = device_to_event_dict(db_obj)
+
             # 更新設備欄位
             for field in update_data:
                 if field in update_data and hasattr(db_obj, field):
@@ -117,6 +323,9 @@ class SQLModelDeviceRepository(DeviceRepository):
             await self.session.commit()
             await self.session.refresh(db_obj)
             logger.info(f"Successfully updated device: {db_obj.name} (ID: {db_obj.id})")
+            await self._publish(
+                updated=[device_diff(before, device_to_event_dict(db_obj))]
+            )
             return db_obj
         except Exception as e:
             await self.session.rollback()
@@ -141,6 +350,74 @@ class SQLModelDeviceRepository(DeviceRepository):
             )
             raise
 
+    async def bulk_apply(
+        self,
+        *,
+        creates: Sequence[DeviceCreate],
+        updates: Sequence[Dict[str, Any]],
+        delete_ids: Sequence[int],
+    ) -> Tuple[List[Device], List[Device], List[int]]:
+        """在同一交易中批次刪除、更新與建立設備
+
+        每種操作只發出一條多列語句：刪除用 IN 條件、更新用以主鍵比對的
+        executemany、建立用多列 INSERT ... RETURNING，最後只提交一次。
+        updates 中每筆字典需包含 id 及完整欄位值。
+        """
+        logger.info(
+            f"Bulk applying devices (create={len(creates)}, update={len(updates)}, delete={len(delete_ids)})"
+        )
+        try:
+            # 先刪除再更新、建立，讓被刪除設備釋出的名稱可在同批次重用
+            if delete_ids:
+                await self.session.execute(
+                    delete(Device).where(Device.id.in_(delete_ids))
+                )
+
+            updated: List[Device] = []
+            before: Dict[int, Dict[str, Any]] = {}
+            if updates:
+                # 被更新的設備通常已由服務層載入，session.get 直接取自 identity map
+                for row in updates:
+                    db_device = await self.session.get(Device, row["id"])
+                    if db_device is not None:
+                        before[row["id"]] = device_to_event_dict(db_device)
+                await self.session.execute(update(Device), list(updates))
+                # 以單一查詢取回更新後的設備並覆寫 session 中的舊狀態
+                stmt = (
+                    select(Device)
+                    .where(Device.id.in_([row["id"] for row in updates]))
+                    .order_by(Device.id)
+                    .execution_options(populate_existing=True)
+                )
+                result = await self.session.execute(stmt)
+                updated = list(result.scalars().all())
+
+            created: List[Device] = []
+            if creates:
+                result = await self.session.scalars(
+                    insert(Device).returning(Device),
+                    [device.dict() for device in creates],
+                )
+                created = list(result.all())
+
+            await self.session.commit()
+            logger.info(
+                f"Successfully bulk applied devices (created={len(created)}, updated={len(updated)}, deleted={len(delete_ids)})"
+            )
+            await self._publish(
+                created=[device_to_event_dict(device) for device in created],
+                updated=[
+                    device_diff(before.get(device.id, {}), device_to_event_dict(device))
+                    for device in updated
+                ],
+                deleted=list(delete_ids),
+            )
+            return created, updated, list(delete_ids)
+        except Exception as e:
+            await self.session.rollback()
+            logger.error(f"Error bulk applying devices: {e}", exc_info=True)
+            raise
+
     async def remove(self, *, device_id: int) -> Optional[Device]:
         """刪除設備"""
         logger.debug(f"Removing device with ID: {device_id}")
@@ -155,6 +432,7 @@ class SQLModelDeviceRepository(DeviceRepository):
             await self.session.delete(db_device)
             await self.session.commit()
             logger.info(f"Successfully removed device with ID: {device_id}")
+            await self._publish(deleted=[device_id])
 
             return db_device
         except Exception as e:
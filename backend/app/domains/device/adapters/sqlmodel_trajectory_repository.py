@@ -0,0 +1,198 @@
+import logging
+import math
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, func, insert, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.domains.device.interfaces.trajectory_repository import TrajectoryRepository
+from app.domains.device.models.trajectory_model import (
+    TRAJECTORY_COLUMNS,
+    DeviceTrajectory,
+    DeviceTrajectoryPoint,
+)
+
+logger = logging.getLogger(__name__)
+
+# 寫入欄位順序，與 DeviceTrajectory.records() 對應
+RECORD_COLUMNS = (
+    "device_id",
+    "t",
+    "x",
+    "y",
+    "z",
+    "orientation_x",
+    "orientation_y",
+    "orientation_z",
+)
+
+
+class SQLModelTrajectoryRepository(TrajectoryRepository):
+    """SQLModel 設備軌跡存儲庫實現
+
+    PostgreSQL (asyncpg) 以 COPY 寫入，其他資料庫以分批多列 INSERT 寫入。
+    """
+
+    # 非 COPY 路徑下每條多列 INSERT 的列數
+    insert_chunk_size: int = 1000
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    def _range_conditions(
+        self, device_id: int, t_start: Optional[float], t_end: Optional[float]
+    ) -> list:
+        conditions = [DeviceTrajectoryPoint.device_id == device_id]
+        if t_start is not None:
+            conditions.append(DeviceTrajectoryPoint.t >= t_start)
+        if t_end is not None:
+            conditions.append(DeviceTrajectoryPoint.t <= t_end)
+        return conditions
+
+    async def _copy_records(self, records: List[Tuple[Any, ...]]) -> None:
+        """在目前交易中以 asyncpg COPY 寫入"""
+        connection = await self.session.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            DeviceTrajectoryPoint.__tablename__,
+            records=records,
+            columns=list(RECORD_COLUMNS),
+        )
+
+    async def bulk_ingest(self, trajectory: DeviceTrajectory) -> int:
+        """批次寫入軌跡，取代同一時間範圍內的既有點，回傳寫入點數"""
+        if len(trajectory) == 0:
+            return 0
+        t_start, t_end = float(trajectory.t[0]), float(trajectory.t[-1])
+        logger.info(
+            f"Ingesting {len(trajectory)} trajectory points for device {trajectory.device_id} ({t_start}..{t_end})"
+        )
+        try:
+            # 重新上傳同一段航跡時以新資料取代，也避免與既有主鍵衝突
+            await self.session.execute(
+                delete(DeviceTrajectoryPoint).where(
+                    *self._range_conditions(trajectory.device_id, t_start, t_end)
+                )
+            )
+
+            records = trajectory.records()
+            if self.session.bind.dialect.driver == "asyncpg":
+                await self._copy_records(records)
+            else:
+                for start in range(0, len(records), self.insert_chunk_size):
+                    chunk = records[start : start + self.insert_chunk_size]
+                    await self.session.execute(
+                        insert(DeviceTrajectoryPoint),
+                        [dict(zip(RECORD_COLUMNS, record)) for record in chunk],
+                    )
+
+            await self.session.commit()
+            return len(records)
+        except Exception as e:
+            await self.session.rollback()
+            logger.error(
+                f"Error ingesting trajectory for device {trajectory.device_id}: {e}",
+                exc_info=True,
+            )
+            raise
+
+    async def get_range(
+        self,
+        device_id: int,
+        *,
+        t_start: Optional[float] = None,
+        t_end: Optional[float] = None,
+        max_points: Optional[int] = None,
+    ) -> Tuple[DeviceTrajectory, int]:
+        """查詢時間範圍內的軌跡，可降採樣至最多 max_points 點；同時回傳範圍內總點數"""
+        conditions = self._range_conditions(device_id, t_start, t_end)
+        total = (
+            await self.session.execute(
+                select(func.count()).select_from(DeviceTrajectoryPoint).where(*conditions)
+            )
+        ).scalar_one()
+
+        step = 1
+        if max_points and total > max_points:
+            # 取第 0, step, 2*step... 點再補上最後一點，總數不超過 max_points
+            step = math.ceil((total - 1) / max(max_points - 1, 1))
+        logger.debug(
+            f"Fetching trajectory for device {device_id} (total={total}, step={step})"
+        )
+
+        if step == 1:
+            stmt = (
+                select(*TRAJECTORY_COLUMNS)
+                .where(*conditions)
+                .order_by(DeviceTrajectoryPoint.t)
+            )
+        else:
+            # 在資料庫端以 row_number 每 step 點取一點，並保留最後一點
+            row_number = func.row_number().over(order_by=DeviceTrajectoryPoint.t)
+            ranked = (
+                select(*TRAJECTORY_COLUMNS, row_number.label("rn"))
+                .where(*conditions)
+                .subquery()
+            )
+            stmt = (
+                select(*[ranked.c[column.key] for column in TRAJECTORY_COLUMNS])
+                .where(or_((ranked.c.rn - 1) % step == 0, ranked.c.rn == total))
+                .order_by(ranked.c.t)
+            )
+
+        result = await self.session.execute(stmt)
+        return DeviceTrajectory.from_rows(device_id, result.all()), total
+
+    async def get_bracketing_points(
+        self, device_ids: Sequence[int], t: float
+    ) -> Sequence[Tuple[Any, ...]]:
+        """取得每個設備在時間 t 前後最近的軌跡點 (device_id 加上 TRAJECTORY_COLUMNS)"""
+        if not device_ids:
+            return []
+        rows: List[Tuple[Any, ...]] = []
+        for condition, ordering in (
+            (DeviceTrajectoryPoint.t <= t, DeviceTrajectoryPoint.t.desc()),
+            (DeviceTrajectoryPoint.t >= t, DeviceTrajectoryPoint.t.asc()),
+        ):
+            rank = func.row_number().over(
+                partition_by=DeviceTrajectoryPoint.device_id, order_by=ordering
+            )
+            ranked = (
+                select(
+                    DeviceTrajectoryPoint.device_id,
+                    *TRAJECTORY_COLUMNS,
+                    rank.label("rn"),
+                )
+                .where(DeviceTrajectoryPoint.device_id.in_(device_ids), condition)
+                .subquery()
+            )
+            stmt = select(
+                ranked.c.device_id,
+                *[ranked.c[column.key] for column in TRAJECTORY_COLUMNS],
+            ).where(ranked.c.rn == 1)
+            rows.extend((await self.session.execute(stmt)).all())
+        return rows
+
+    async def delete_range(
+        self,
+        device_id: int,
+        *,
+        t_start: Optional[float] = None,
+        t_end: Optional[float] = None,
+    ) -> int:
+        """刪除時間範圍內的軌跡點，回傳刪除點數"""
+        try:
+            result = await self.session.execute(
+                delete(DeviceTrajectoryPoint).where(
+                    *self._range_conditions(device_id, t_start, t_end)
+                )
+            )
+            await self.session.commit()
+            return result.rowcount
+        except Exception as e:
+            await self.session.rollback()
+            logger.error(
+                f"Error deleting trajectory for device {device_id}: {e}", exc_info=True
+            )
+            raise
@@ -1,18 +1,42 @@
+import asyncio
 import logging
-from typing import List, Any, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from typing import Any, Dict, List, Optional
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_session
-from app.domains.device.models.device_model import Device
+from app.domains.common.utils.array_io import array_response, wants_binary
+from app.domains.coordinates.services.coordinate_service import CoordinateService
+from app.domains.device.models.device_model import Device, DeviceRole
+from app.domains.device.models.device_snapshot import ROLE_CODES
 from app.domains.device.services.device_service import DeviceService
+from app.domains.device.services.device_event_broker import device_event_broker
 from app.domains.device.adapters.sqlmodel_device_repository import (
     SQLModelDeviceRepository,
 )
+from app.domains.device.adapters.sqlmodel_trajectory_repository import (
+    SQLModelTrajectoryRepository,
+)
+from app.domains.device.services.trajectory_service import TrajectoryService
 from app.domains.device.models.dto import (
+    DeviceBulkRequest,
+    DeviceBulkResponse,
     DeviceCreate,
     DeviceUpdate,
     DeviceResponse as DeviceSchema,
+    TrajectoryIngest,
+    TrajectoryIngestResult,
+    TrajectoryResponse,
 )  # 使用領域內的 DTO 模型
 
 logger = logging.getLogger(__name__)
@@ -28,6 +52,16 @@ async def get_device_service(
     return DeviceService(device_repository=repository)
 
 
+async def get_trajectory_service(
+    session: AsyncSession = Depends(get_session),
+) -> TrajectoryService:
+    """獲取設備軌跡服務實例，用於依賴注入"""
+    return TrajectoryService(
+        trajectory_repository=SQLModelTrajectoryRepository(session=session),
+        device_repository=SQLModelDeviceRepository(session=session),
+    )
+
+
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=DeviceSchema)
 async def create_new_device(
     *,
@@ -53,6 +87,77 @@ async def create_new_device(
         )
 
 
+@router.post("/bulk", response_model=DeviceBulkResponse)
+async def bulk_apply_devices(
+    *,
+    device_service: DeviceService = Depends(get_device_service),
+    bulk_in: DeviceBulkRequest,
+) -> Any:
+    """
+    在單一交易中批次建立、更新與刪除設備；任何一筆驗證失敗則整批不寫入。
+    """
+    logger.info(
+        f"API: Received bulk device request (create={len(bulk_in.create)}, update={len(bulk_in.update)}, delete={len(bulk_in.delete)})"
+    )
+    try:
+        created, updated, deleted_ids = await device_service.bulk_apply_devices(
+            request=bulk_in
+        )
+        return DeviceBulkResponse(
+            created=[DeviceSchema.from_orm(device) for device in created],
+            updated=[DeviceSchema.from_orm(device) for device in updated],
+            deleted_ids=deleted_ids,
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"API Error applying bulk device changes: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while applying bulk device changes: {str(e)}",
+        )
+
+
+@router.websocket("/events")
+async def device_events_stream(websocket: WebSocket):
+    """
+    設備事件串流：每次提交後推送 {created, updated, deleted} 精簡差異，
+    收到 {"resync": true} 時客戶端應重新獲取設備列表。
+    """
+    await websocket.accept()
+    queue = device_event_broker.subscribe()
+    logger.info(
+        f"API: Device event subscriber connected (total={device_event_broker.subscriber_count})"
+    )
+
+    async def wait_for_disconnect() -> None:
+        # 客戶端不需傳送訊息，這裡只用來偵測連線中斷
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+
+    disconnect_task = asyncio.create_task(wait_for_disconnect())
+    try:
+        while True:
+            next_event = asyncio.create_task(queue.get())
+            done, _ = await asyncio.wait(
+                {next_event, disconnect_task}, return_when=asyncio.FIRST_COMPLETED
+            )
+            if disconnect_task in done:
+                next_event.cancel()
+                break
+            await websocket.send_json(next_event.result())
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        disconnect_task.cancel()
+        device_event_broker.unsubscribe(queue)
+        logger.info(
+            f"API: Device event subscriber disconnected (total={device_event_broker.subscriber_count})"
+        )
+
+
 @router.get("/", response_model=List[DeviceSchema])
 async def read_devices(
     device_service: DeviceService = Depends(get_device_service),
@@ -75,6 +180,131 @@ async def read_devices(
     return [DeviceSchema.from_orm(device) for device in devices]
 
 
+@router.get("/region", response_model=List[DeviceSchema])
+async def read_devices_in_region(
+    device_service: DeviceService = Depends(get_device_service),
+    min_x: Optional[float] = Query(None, description="Bounding box min x"),
+    min_y: Optional[float] = Query(None, description="Bounding box min y"),
+    max_x: Optional[float] = Query(None, description="Bounding box max x"),
+    max_y: Optional[float] = Query(None, description="Bounding box max y"),
+    x: Optional[float] = Query(None, description="Center x for radius/nearest queries"),
+    y: Optional[float] = Query(None, description="Center y for radius/nearest queries"),
+    radius: Optional[float] = Query(None, gt=0, description="Horizontal search radius"),
+    k: Optional[int] = Query(None, gt=0, le=10000, description="Number of nearest devices"),
+    role: Optional[str] = Query(None, description="Filter by device role"),
+    active_only: bool = Query(True, description="Get only active devices"),
+) -> Any:
+    """
+    以空間條件查詢設備：範圍框 (min_x, min_y, max_x, max_y)、
+    半徑 (x, y, radius) 或最近 k 個 (x, y, k)。
+    """
+    bbox_values = (min_x, min_y, max_x, max_y)
+    bbox = None
+    if any(v is not None for v in bbox_values):
+        if any(v is None for v in bbox_values):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Bounding box queries require min_x, min_y, max_x and max_y.",
+            )
+        bbox = bbox_values
+    center = (x, y) if x is not None and y is not None else None
+    logger.info(
+        f"API: Received region query (bbox={bbox}, center={center}, radius={radius}, k={k})"
+    )
+    try:
+        devices = await device_service.get_devices_in_region(
+            bbox=bbox,
+            center=center,
+            radius=radius,
+            nearest=k,
+            role=role,
+            active_only=active_only,
+        )
+        return [DeviceSchema.from_orm(device) for device in devices]
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"API Error querying devices in region: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while querying devices in region: {str(e)}",
+        )
+
+
+@router.get("/distance-matrix", response_description="N×M 距離與方位角矩陣")
+async def read_device_distance_matrix(
+    request: Request,
+    device_service: DeviceService = Depends(get_device_service),
+    trajectory_service: TrajectoryService = Depends(get_trajectory_service),
+    source_role: str = Query(
+        DeviceRole.DESIRED.value, description="Role of the source (row) devices"
+    ),
+    target_role: str = Query(
+        DeviceRole.RECEIVER.value, description="Role of the target (column) devices"
+    ),
+    scene: str = Query("nycu", description="Scene frame of the device coordinates"),
+    max_distance: Optional[float] = Query(
+        None, gt=0, description="Mask pairs farther than this distance (m)"
+    ),
+    time_s: Optional[float] = Query(
+        None, description="Use trajectory positions at this time (s)"
+    ),
+) -> Response:
+    """
+    計算活躍設備快照中 source_role × target_role 所有配對的距離 (米) 與方位角 (度)，
+    可在光線追蹤前先以距離篩選收發配對。
+
+    JSON 回應包含 source_ids 與 target_ids；二進位回應 (Accept: application/octet-stream)
+    為 float32 陣列，形狀 (2, N, M)，ID 由 X-Source-Ids 與 X-Target-Ids 標頭提供。
+    """
+    for role in (source_role, target_role):
+        if role not in ROLE_CODES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid role '{role}'. Expected one of: {sorted(ROLE_CODES)}",
+            )
+    coordinate_service = CoordinateService()
+    if coordinate_service.frame_registry.get(scene) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Scene frame '{scene}' not found",
+        )
+    logger.info(
+        f"API: Received distance matrix request ({source_role} x {target_role}, scene={scene}, max_distance={max_distance})"
+    )
+    try:
+        columns = await device_service.get_active_columns()
+        if time_s is not None:
+            columns = await trajectory_service.apply_to_columns(columns, time_s)
+        sources = columns.select(columns.role_mask(source_role))
+        targets = columns.select(columns.role_mask(target_role))
+        bearing, distance = await coordinate_service.distance_matrix(
+            sources.positions, targets.positions, scene=scene, max_distance=max_distance
+        )
+        source_ids = sources.ids.tolist()
+        target_ids = targets.ids.tolist()
+        return array_response(
+            {"distance": distance, "bearing": bearing},
+            wants_binary(request),
+            dtype="<f4",
+            extra={"source_ids": source_ids, "target_ids": target_ids},
+            headers={
+                "X-Source-Ids": ",".join(map(str, source_ids)),
+                "X-Target-Ids": ",".join(map(str, target_ids)),
+            },
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"API Error calculating device distance matrix: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while calculating the distance matrix: {str(e)}",
+        )
+
+
 @router.get("/{device_id}", response_model=DeviceSchema)
 async def read_device_by_id(
     device_id: int,
@@ -144,3 +374,105 @@ async def delete_device_by_id(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"An error occurred while deleting the device: {str(e)}",
         )
+
+
+@router.post(
+    "/{device_id}/trajectory",
+    status_code=status.HTTP_201_CREATED,
+    response_model=TrajectoryIngestResult,
+)
+async def ingest_device_trajectory(
+    *,
+    trajectory_service: TrajectoryService = Depends(get_trajectory_service),
+    device_id: int,
+    trajectory_in: TrajectoryIngest,
+) -> Any:
+    """
+    批次寫入設備軌跡 (欄位式陣列)，取代同一時間範圍內的既有點。
+    """
+    logger.info(
+        f"API: Received trajectory ingest for device {device_id} ({len(trajectory_in.t)} points)"
+    )
+    try:
+        trajectory = await trajectory_service.ingest(device_id, trajectory_in)
+        return TrajectoryIngestResult(
+            device_id=device_id,
+            ingested=len(trajectory),
+            t_start=float(trajectory.t[0]),
+            t_end=float(trajectory.t[-1]),
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"API Error ingesting trajectory: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while ingesting the trajectory: {str(e)}",
+        )
+
+
+@router.get("/{device_id}/trajectory", response_model=TrajectoryResponse)
+async def read_device_trajectory(
+    device_id: int,
+    trajectory_service: TrajectoryService = Depends(get_trajectory_service),
+    t_start: Optional[float] = Query(None, description="Start time (s)"),
+    t_end: Optional[float] = Query(None, description="End time (s)"),
+    max_points: Optional[int] = Query(
+        None, gt=1, description="Downsample to at most this many points"
+    ),
+) -> Any:
+    """
+    查詢設備軌跡，可限定時間範圍並在資料庫端降採樣。
+    """
+    logger.info(
+        f"API: Received trajectory query for device {device_id} (t_start={t_start}, t_end={t_end}, max_points={max_points})"
+    )
+    try:
+        trajectory, total = await trajectory_service.get_trajectory(
+            device_id, t_start=t_start, t_end=t_end, max_points=max_points
+        )
+        return TrajectoryResponse(
+            device_id=device_id,
+            total_points=total,
+            t=trajectory.t.tolist(),
+            x=trajectory.positions[:, 0].tolist(),
+            y=trajectory.positions[:, 1].tolist(),
+            z=trajectory.positions[:, 2].tolist(),
+            orientation_x=trajectory.orientations[:, 0].tolist(),
+            orientation_y=trajectory.orientations[:, 1].tolist(),
+            orientation_z=trajectory.orientations[:, 2].tolist(),
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"API Error reading trajectory: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while reading the trajectory: {str(e)}",
+        )
+
+
+@router.delete("/{device_id}/trajectory", response_model=Dict[str, int])
+async def delete_device_trajectory(
+    device_id: int,
+    trajectory_service: TrajectoryService = Depends(get_trajectory_service),
+    t_start: Optional[float] = Query(None, description="Start time (s)"),
+    t_end: Optional[float] = Query(None, description="End time (s)"),
+) -> Any:
+    """
+    刪除設備在時間範圍內的軌跡點。
+    """
+    logger.info(f"API: Received trajectory delete for device {device_id}")
+    try:
+        deleted = await trajectory_service.delete_trajectory(
+            device_id, t_start=t_start, t_end=t_end
+        )
+        return {"device_id": device_id, "deleted": deleted}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"API Error deleting trajectory: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while deleting the trajectory: {str(e)}",
+        )
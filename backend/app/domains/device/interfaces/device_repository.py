@@ -1,7 +1,8 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional, Dict, Any, Union, Sequence
+from typing import List, Optional, Dict, Any, Union, Sequence, Tuple
 
 from app.domains.device.models.device_model import Device
+from app.domains.device.models.device_snapshot import DeviceColumns
 from app.domains.device.models.dto import (
     DeviceCreate,
     DeviceUpdate,
@@ -26,6 +27,16 @@ class DeviceRepository(ABC):
         """根據名稱獲取設備"""
         pass
 
+    @abstractmethod
+    async def get_by_ids(self, device_ids: Sequence[int]) -> Sequence[Device]:
+        """以單一查詢根據多個 ID 獲取設備"""
+        pass
+
+    @abstractmethod
+    async def get_by_names(self, names: Sequence[str]) -> Sequence[Device]:
+        """以單一查詢根據多個名稱獲取設備"""
+        pass
+
     @abstractmethod
     async def get_multi(
         self,
@@ -43,6 +54,68 @@ class DeviceRepository(ABC):
         """獲取活躍的設備列表，可選按角色過濾"""
         pass
 
+    @abstractmethod
+    async def get_active_columns(
+        self, bbox: Optional[Tuple[float, float, float, float]] = None
+    ) -> DeviceColumns:
+        """以單一查詢獲取活躍設備的欄位式 (NumPy) 快照，可選以 (min_x, min_y, max_x, max_y) 限定範圍"""
+        pass
+
+    @abstractmethod
+    async def get_in_bbox(
+        self,
+        min_x: float,
+        min_y: float,
+        max_x: float,
+        max_y: float,
+        *,
+        role: Optional[str] = None,
+        active_only: bool = True,
+    ) -> Sequence[Device]:
+        """獲取水平範圍框 (x/y) 內的設備"""
+        pass
+
+    @abstractmethod
+    async def get_within_radius(
+        self,
+        x: float,
+        y: float,
+        radius: float,
+        *,
+        role: Optional[str] = None,
+        active_only: bool = True,
+    ) -> Sequence[Device]:
+        """獲取與 (x, y) 水平距離不超過 radius 的設備"""
+        pass
+
+    @abstractmethod
+    async def get_nearest(
+        self,
+        x: float,
+        y: float,
+        k: int,
+        *,
+        role: Optional[str] = None,
+        active_only: bool = True,
+    ) -> Sequence[Device]:
+        """獲取距離 (x, y) 最近的 k 個設備，依距離排序"""
+        pass
+
+    @abstractmethod
+    async def count_active_by_role(self) -> Dict[str, int]:
+        """以單一聚合查詢統計各角色的活躍設備數量"""
+        pass
+
+    @abstractmethod
+    async def lock_role_counts(self) -> None:
+        """在目前交易中取得角色統計的排他鎖，直到提交或回滾為止"""
+        pass
+
+    @abstractmethod
+    async def rollback(self) -> None:
+        """回滾目前交易並釋放交易內取得的鎖"""
+        pass
+
     @abstractmethod
     async def update(
         self, *, db_obj: Device, obj_in: Union[DeviceUpdate, Dict[str, Any]]
@@ -57,6 +130,17 @@ class DeviceRepository(ABC):
         """根據 ID 更新設備資訊"""
         pass
 
+    @abstractmethod
+    async def bulk_apply(
+        self,
+        *,
+        creates: Sequence[DeviceCreate],
+        updates: Sequence[Dict[str, Any]],
+        delete_ids: Sequence[int],
+    ) -> Tuple[List[Device], List[Device], List[int]]:
+        """在同一交易中批次刪除、更新與建立設備"""
+        pass
+
     @abstractmethod
     async def remove(self, *, device_id: int) -> Optional[Device]:
         """刪除設備"""
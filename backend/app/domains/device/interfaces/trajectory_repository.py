@@ -0,0 +1,43 @@
+from abc import ABC, abstractmethod
+from typing import Any, Optional, Sequence, Tuple
+
+from app.domains.device.models.trajectory_model import DeviceTrajectory
+
+
+class TrajectoryRepository(ABC):
+    """設備軌跡存儲庫接口，定義軌跡時間序列的寫入與查詢"""
+
+    @abstractmethod
+    async def bulk_ingest(self, trajectory: DeviceTrajectory) -> int:
+        """批次寫入軌跡，取代同一時間範圍內的既有點，回傳寫入點數"""
+        pass
+
+    @abstractmethod
+    async def get_range(
+        self,
+        device_id: int,
+        *,
+        t_start: Optional[float] = None,
+        t_end: Optional[float] = None,
+        max_points: Optional[int] = None,
+    ) -> Tuple[DeviceTrajectory, int]:
+        """查詢時間範圍內的軌跡，可降採樣至最多 max_points 點；同時回傳範圍內總點數"""
+        pass
+
+    @abstractmethod
+    async def get_bracketing_points(
+        self, device_ids: Sequence[int], t: float
+    ) -> Sequence[Tuple[Any, ...]]:
+        """取得每個設備在時間 t 前後最近的軌跡點 (device_id 加上 TRAJECTORY_COLUMNS)"""
+        pass
+
+    @abstractmethod
+    async def delete_range(
+        self,
+        device_id: int,
+        *,
+        t_start: Optional[float] = None,
+        t_end: Optional[float] = None,
+    ) -> int:
+        """刪除時間範圍內的軌跡點，回傳刪除點數"""
+        pass
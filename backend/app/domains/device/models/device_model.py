@@ -1,7 +1,7 @@
 from typing import Optional, Any
 from sqlmodel import Field, SQLModel
 from enum import Enum as PyEnum
-from sqlalchemy import String
+from sqlalchemy import Index, String
 
 
 # --- Enum Definitions ---
@@ -27,8 +27,26 @@ class DeviceBase(SQLModel):
     active: bool = Field(default=True, index=True)
 
 
+# 可由 DTO 寫入、並在設備事件中廣播的欄位
+DEVICE_FIELDS = tuple(DeviceBase.model_fields)
+
+
 # Represents the table structure, inherits validation from DeviceBase
 class Device(DeviceBase, table=True):
     """設備實體模型，對應資料庫中的設備表"""
 
+    # 複合索引：模擬時以 (active, role) 一次取出所有活躍設備並依角色分組
+    __table_args__ = (Index("ix_device_active_role", "active", "role"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
+
+
+# PostGIS 幾何欄位：由 position_x/y/z 自動產生，GiST 索引支援範圍、半徑與 kNN 查詢。
+# 只在 PostgreSQL/PostGIS 上建立，ORM 模型不映射此欄位，其他資料庫仍可使用 Device 表。
+DEVICE_GEOMETRY_COLUMN = "geom"
+DEVICE_GEOMETRY_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS postgis",
+    "ALTER TABLE device ADD COLUMN IF NOT EXISTS geom geometry(PointZ) "
+    "GENERATED ALWAYS AS (ST_MakePoint(position_x, position_y, position_z)) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_device_geom ON device USING GIST (geom)",
+)
@@ -0,0 +1,137 @@
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+from pydantic import ConfigDict, Field
+
+from app.domains.common.models.base_model import ValueObject
+from .device_model import Device, DeviceRole
+
+
+# 角色代碼：欄位式快照以小整數表示角色，便於向量化篩選
+ROLE_CODES: Dict[str, int] = {
+    DeviceRole.DESIRED.value: 0,
+    DeviceRole.JAMMER.value: 1,
+    DeviceRole.RECEIVER.value: 2,
+}
+ROLE_NAMES: Tuple[str, ...] = tuple(ROLE_CODES)
+
+# 欄位式快照的查詢欄位順序，需與 DeviceColumns.from_rows 一致
+DEVICE_COLUMNS = (
+    Device.id,
+    Device.name,
+    Device.position_x,
+    Device.position_y,
+    Device.position_z,
+    Device.orientation_x,
+    Device.orientation_y,
+    Device.orientation_z,
+    Device.power_dbm,
+    Device.role,
+)
+
+
+def _readonly(array: np.ndarray) -> np.ndarray:
+    array.setflags(write=False)
+    return array
+
+
+class DeviceColumns(ValueObject):
+    """欄位式設備快照，以 NumPy 陣列保存位置、方向、功率與角色代碼
+
+    直接由查詢結果的列建立，不經過 ORM 物件；所有陣列皆為唯讀，
+    第 i 列在每個陣列中都對應同一個設備。
+    """
+
+    model_config = ConfigDict(frozen=True, arbitrary_types_allowed=True)
+
+    ids: np.ndarray = Field(..., description="設備 ID，形狀 (N,)")
+    names: Tuple[str, ...] = Field(default=(), description="設備名稱")
+    positions: np.ndarray = Field(..., description="位置 (x, y, z)，形狀 (N, 3)")
+    orientations: np.ndarray = Field(..., description="方向 (x, y, z)，形狀 (N, 3)")
+    power_dbm: np.ndarray = Field(..., description="發射功率 (dBm)，形狀 (N,)")
+    role_codes: np.ndarray = Field(..., description="角色代碼，形狀 (N,)")
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Tuple[Any, ...]]) -> "DeviceColumns":
+        """由依 DEVICE_COLUMNS 順序排列的查詢結果列建立快照；遇到未知角色時拋出 ValueError"""
+        if not rows:
+            return cls.empty()
+
+        ids, names, px, py, pz, ox, oy, oz, power, roles = zip(*rows)
+        try:
+            role_codes = np.fromiter(
+                (ROLE_CODES[getattr(r, "value", r)] for r in roles),
+                dtype=np.int8,
+                count=len(roles),
+            )
+        except KeyError as e:
+            raise ValueError(f"未知的設備角色: {e.args[0]}") from e
+        return cls(
+            ids=_readonly(np.asarray(ids, dtype=np.int64)),
+            names=tuple(names),
+            positions=_readonly(np.column_stack((px, py, pz)).astype(np.float64)),
+            orientations=_readonly(np.column_stack((ox, oy, oz)).astype(np.float64)),
+            power_dbm=_readonly(np.asarray(power, dtype=np.float64)),
+            role_codes=_readonly(role_codes),
+        )
+
+    @classmethod
+    def empty(cls) -> "DeviceColumns":
+        """建立不含任何設備的快照"""
+        return cls(
+            ids=_readonly(np.empty(0, dtype=np.int64)),
+            names=(),
+            positions=_readonly(np.empty((0, 3), dtype=np.float64)),
+            orientations=_readonly(np.empty((0, 3), dtype=np.float64)),
+            power_dbm=_readonly(np.empty(0, dtype=np.float64)),
+            role_codes=_readonly(np.empty(0, dtype=np.int8)),
+        )
+
+    def __len__(self) -> int:
+        return int(self.ids.shape[0])
+
+    def role_mask(self, *roles: str) -> np.ndarray:
+        """回傳屬於任一指定角色的布林遮罩"""
+        codes = [ROLE_CODES[getattr(role, "value", role)] for role in roles]
+        return np.isin(self.role_codes, codes)
+
+    def role_indices(self, *roles: str) -> np.ndarray:
+        """回傳屬於任一指定角色的列索引"""
+        return np.flatnonzero(self.role_mask(*roles))
+
+    def select(self, mask: np.ndarray) -> "DeviceColumns":
+        """以布林遮罩或索引陣列取出子集合，保持原始順序"""
+        index = np.flatnonzero(mask) if mask.dtype == bool else mask
+        return DeviceColumns(
+            ids=_readonly(self.ids[index]),
+            names=tuple(self.names[i] for i in index),
+            positions=_readonly(self.positions[index]),
+            orientations=_readonly(self.orientations[index]),
+            power_dbm=_readonly(self.power_dbm[index]),
+            role_codes=_readonly(self.role_codes[index]),
+        )
+
+    def with_positions(
+        self, positions: np.ndarray, orientations: Optional[np.ndarray] = None
+    ) -> "DeviceColumns":
+        """回傳以新位置（及方向）取代後的快照，例如套用軌跡上某時刻的位置"""
+        positions = np.array(positions, dtype=np.float64).reshape(len(self), 3)
+        if orientations is None:
+            orientations = self.orientations
+        orientations = np.array(orientations, dtype=np.float64).reshape(len(self), 3)
+        return self.model_copy(
+            update={
+                "positions": _readonly(positions),
+                "orientations": _readonly(orientations),
+            }
+        )
+
+    @property
+    def roles(self) -> Tuple[str, ...]:
+        """每列的角色名稱"""
+        return tuple(ROLE_NAMES[code] for code in self.role_codes)
+
+    @property
+    def power_watts(self) -> np.ndarray:
+        """發射功率 (W)"""
+        return 10 ** (self.power_dbm / 10) / 1000
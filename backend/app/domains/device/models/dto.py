@@ -1,4 +1,4 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from pydantic import BaseModel, Field
 from .device_model import DeviceBase, DeviceRole
 
@@ -35,3 +35,64 @@ class DeviceResponse(DeviceBase):
 
     class Config:
         orm_mode = True
+
+
+
+class DeviceBulkUpdate(DeviceUpdate):
+    """批次更新中的單筆設備更新，需指定設備 ID"""
+
+    id: int
+
+
+class DeviceBulkRequest(BaseModel):
+    """批次建立/更新/刪除設備的請求，所有操作在同一交易中完成"""
+
+    create: List[DeviceCreate] = Field(default_factory=list)
+    update: List[DeviceBulkUpdate] = Field(default_factory=list)
+    delete: List[int] = Field(default_factory=list)
+
+
+class DeviceBulkResponse(BaseModel):
+    """批次操作結果"""
+
+    created: List[DeviceResponse] = Field(default_factory=list)
+    updated: List[DeviceResponse] = Field(default_factory=list)
+    deleted_ids: List[int] = Field(default_factory=list)
+
+
+class TrajectoryIngest(BaseModel):
+    """軌跡批次寫入 (欄位式陣列)，所有欄位長度必須相同
+
+    寫入時會取代該設備在 [min(t), max(t)] 範圍內的既有軌跡點。
+    """
+
+    t: List[float] = Field(..., description="時間 (s)")
+    x: List[float]
+    y: List[float]
+    z: List[float]
+    orientation_x: Optional[List[float]] = None
+    orientation_y: Optional[List[float]] = None
+    orientation_z: Optional[List[float]] = None
+
+
+class TrajectoryIngestResult(BaseModel):
+    """軌跡寫入結果"""
+
+    device_id: int
+    ingested: int
+    t_start: float
+    t_end: float
+
+
+class TrajectoryResponse(BaseModel):
+    """軌跡查詢結果 (欄位式陣列)"""
+
+    device_id: int
+    total_points: int = Field(..., description="時間範圍內的點數 (降採樣前)")
+    t: List[float] = Field(default_factory=list)
+    x: List[float] = Field(default_factory=list)
+    y: List[float] = Field(default_factory=list)
+    z: List[float] = Field(default_factory=list)
+    orientation_x: List[float] = Field(default_factory=list)
+    orientation_y: List[float] = Field(default_factory=list)
+    orientation_z: List[float] = Field(default_factory=list)
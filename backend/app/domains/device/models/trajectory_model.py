@@ -0,0 +1,120 @@
+from typing import Any, Optional, Sequence, Tuple
+
+import numpy as np
+from pydantic import ConfigDict, Field as PydanticField
+from sqlmodel import Field, SQLModel
+
+from app.domains.common.models.base_model import ValueObject
+from .device_snapshot import _readonly
+
+
+class DeviceTrajectoryPoint(SQLModel, table=True):
+    """設備軌跡點，記錄設備在時間 t (秒) 的位置與方向
+
+    複合主鍵 (device_id, t) 即為時間範圍查詢所用的索引。
+    """
+
+    __tablename__ = "device_trajectory"
+
+    device_id: int = Field(
+        foreign_key="device.id", primary_key=True, ondelete="CASCADE"
+    )
+    t: float = Field(primary_key=True)
+    x: float = Field(...)
+    y: float = Field(...)
+    z: float = Field(...)
+    orientation_x: float = Field(default=0.0)
+    orientation_y: float = Field(default=0.0)
+    orientation_z: float = Field(default=0.0)
+
+
+# 軌跡查詢的欄位順序，與 DeviceTrajectory.from_rows 對應
+TRAJECTORY_COLUMNS = (
+    DeviceTrajectoryPoint.t,
+    DeviceTrajectoryPoint.x,
+    DeviceTrajectoryPoint.y,
+    DeviceTrajectoryPoint.z,
+    DeviceTrajectoryPoint.orientation_x,
+    DeviceTrajectoryPoint.orientation_y,
+    DeviceTrajectoryPoint.orientation_z,
+)
+
+
+class DeviceTrajectory(ValueObject):
+    """單一設備的欄位式軌跡，依時間排序，所有陣列皆為唯讀"""
+
+    model_config = ConfigDict(frozen=True, arbitrary_types_allowed=True)
+
+    device_id: int = PydanticField(..., description="設備 ID")
+    t: np.ndarray = PydanticField(..., description="時間 (s)，形狀 (N,)")
+    positions: np.ndarray = PydanticField(..., description="位置 (x, y, z)，形狀 (N, 3)")
+    orientations: np.ndarray = PydanticField(
+        ..., description="方向 (x, y, z)，形狀 (N, 3)"
+    )
+
+    @classmethod
+    def from_rows(
+        cls, device_id: int, rows: Sequence[Tuple[Any, ...]]
+    ) -> "DeviceTrajectory":
+        """由依 TRAJECTORY_COLUMNS 順序排列的查詢結果列建立軌跡"""
+        if not rows:
+            return cls.empty(device_id)
+        data = np.asarray(rows, dtype=np.float64).reshape(len(rows), 7)
+        return cls(
+            device_id=device_id,
+            t=_readonly(np.ascontiguousarray(data[:, 0])),
+            positions=_readonly(np.ascontiguousarray(data[:, 1:4])),
+            orientations=_readonly(np.ascontiguousarray(data[:, 4:7])),
+        )
+
+    @classmethod
+    def from_arrays(
+        cls,
+        device_id: int,
+        t: Sequence[float],
+        positions: np.ndarray,
+        orientations: Optional[np.ndarray] = None,
+    ) -> "DeviceTrajectory":
+        """由陣列建立軌跡，並依時間排序"""
+        t = np.asarray(t, dtype=np.float64)
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        if orientations is None:
+            orientations = np.zeros_like(positions)
+        orientations = np.asarray(orientations, dtype=np.float64).reshape(-1, 3)
+        order = np.argsort(t, kind="stable")
+        return cls(
+            device_id=device_id,
+            t=_readonly(t[order]),
+            positions=_readonly(positions[order]),
+            orientations=_readonly(orientations[order]),
+        )
+
+    @classmethod
+    def empty(cls, device_id: int) -> "DeviceTrajectory":
+        return cls(
+            device_id=device_id,
+            t=_readonly(np.empty(0, dtype=np.float64)),
+            positions=_readonly(np.empty((0, 3), dtype=np.float64)),
+            orientations=_readonly(np.empty((0, 3), dtype=np.float64)),
+        )
+
+    def __len__(self) -> int:
+        return int(self.t.shape[0])
+
+    def records(self) -> list:
+        """轉為 (device_id, t, x, y, z, ox, oy, oz) 元組列表，供批次寫入使用"""
+        data = np.column_stack((self.t, self.positions, self.orientations)).tolist()
+        return [(self.device_id, *row) for row in data]
+
+    def interpolate(self, times: Any) -> Tuple[np.ndarray, np.ndarray]:
+        """線性內插指定時間的位置與方向，超出範圍時取端點值"""
+        times = np.atleast_1d(np.asarray(times, dtype=np.float64))
+        if len(self) == 0:
+            raise ValueError(f"Device {self.device_id} has no trajectory points.")
+        positions = np.column_stack(
+            [np.interp(times, self.t, self.positions[:, i]) for i in range(3)]
+        )
+        orientations = np.column_stack(
+            [np.interp(times, self.t, self.orientations[:, i]) for i in range(3)]
+        )
+        return positions, orientations
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import logging
+from typing import Any, Dict, Optional, Sequence, Set
+
+from app.core.config import DEVICE_EVENTS_CHANNEL, DEVICE_EVENTS_PG_NOTIFY
+from app.core.metrics import metrics_registry
+from app.domains.device.models.device_model import DEVICE_FIELDS, Device
+
+logger = logging.getLogger(__name__)
+
+# PostgreSQL NOTIFY 載荷上限為 8000 bytes，超過時改送 resync 事件
+PG_NOTIFY_MAX_PAYLOAD = 7900
+
+# 客戶端收到後應重新獲取完整設備列表（事件遺失或載荷過大時送出）
+RESYNC_EVENT: Dict[str, Any] = {"resync": True}
+
+
+def device_to_event_dict(device: Device) -> Dict[str, Any]:
+    """將設備轉為可 JSON 序列化的事件字典"""
+    data = {"id": device.id}
+    for field in DEVICE_FIELDS:
+        value = getattr(device, field)
+        data[field] = getattr(value, "value", value)
+    return data
+
+
+def device_diff(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    """只保留有變動的欄位，產生精簡的更新差異"""
+    diff = {key: value for key, value in after.items() if before.get(key) != value}
+    if diff:
+        diff["id"] = after["id"]
+    return diff
+
+
+def build_device_event(
+    *,
+    created: Sequence[Dict[str, Any]] = (),
+    updated: Sequence[Dict[str, Any]] = (),
+    deleted: Sequence[int] = (),
+) -> Dict[str, Any]:
+    """組合單次提交的設備事件，省略空白的部分"""
+    event: Dict[str, Any] = {}
+    if created:
+        event["created"] = list(created)
+    updated = [diff for diff in updated if diff]
+    if updated:
+        event["updated"] = updated
+    if deleted:
+        event["deleted"] = list(deleted)
+    return event
+
+
+class DeviceEventBroker:
+    """設備事件廣播器
+
+    存儲庫在每次提交後發布事件，WebSocket 連線與模擬快取等訂閱者
+    各自持有一個有界佇列。啟用 LISTEN/NOTIFY 時事件經由 PostgreSQL
+    廣播，所有 worker（包含發布者自身）都從通知中取得事件。
+    """
+
+    def __init__(self, queue_size: int = 256):
+        self._queue_size = queue_size
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._channel = DEVICE_EVENTS_CHANNEL
+        self._connection = None  # asyncpg 連線，僅在啟用 LISTEN/NOTIFY 時建立
+        self._notify_lock = asyncio.Lock()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    @property
+    def queue_depth(self) -> int:
+        """所有訂閱者佇列中尚未消費的事件總數"""
+        return sum(queue.qsize() for queue in list(self._subscribers))
+
+    def subscribe(self) -> asyncio.Queue:
+        """註冊新的訂閱者，回傳其事件佇列"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self._queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        """移除訂閱者"""
+        self._subscribers.discard(queue)
+
+    async def start(self, database_url: str) -> None:
+        """依設定啟動 PostgreSQL LISTEN 連線；未啟用或失敗時只在本程序內廣播"""
+        if not DEVICE_EVENTS_PG_NOTIFY or self._connection is not None:
+            return
+        if not database_url.startswith("postgresql"):
+            logger.warning(
+                "DEVICE_EVENTS_PG_NOTIFY is enabled but DATABASE_URL is not PostgreSQL. Using in-process device events."
+            )
+            return
+        try:
+            import asyncpg
+
+            dsn = database_url.replace("postgresql+asyncpg://", "postgresql://", 1)
+            self._connection = await asyncpg.connect(dsn)
+            await self._connection.add_listener(self._channel, self._on_notify)
+            logger.info(f"Listening for device events on channel '{self._channel}'.")
+        except Exception as e:
+            logger.error(
+                f"Failed to start device event listener, using in-process events: {e}",
+                exc_info=True,
+            )
+            self._connection = None
+
+    async def stop(self) -> None:
+        """關閉 LISTEN 連線"""
+        if self._connection is None:
+            return
+        connection, self._connection = self._connection, None
+        try:
+            await connection.remove_listener(self._channel, self._on_notify)
+            await connection.close()
+        except Exception as e:
+            logger.warning(f"Error closing device event listener: {e}")
+
+    async def publish(self, event: Optional[Dict[str, Any]]) -> None:
+        """發布設備事件；應在交易提交之後呼叫"""
+        if not event:
+            return
+        if self._connection is not None:
+            payload = json.dumps(event, separators=(",", ":"))
+            if len(payload.encode("utf-8")) > PG_NOTIFY_MAX_PAYLOAD:
+                payload = json.dumps(RESYNC_EVENT)
+            try:
+                # 單一 asyncpg 連線不可並行執行指令
+                async with self._notify_lock:
+                    await self._connection.execute(
+                        "SELECT pg_notify($1, $2)", self._channel, payload
+                    )
+                return
+            except Exception as e:
+                logger.error(
+                    f"Failed to NOTIFY device event, delivering locally: {e}"
+                )
+        self._dispatch(event)
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning(f"Ignoring malformed device event payload: {payload!r}")
+            return
+        self._dispatch(event)
+
+    def _dispatch(self, event: Dict[str, Any]) -> None:
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # 訂閱者消費太慢：丟棄積壓的事件，改送 resync 讓其重新同步
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC_EVENT)
+
+
+# 全域設備事件廣播器
+device_event_broker = DeviceEventBroker()
+
+metrics_registry.gauge(
+    "device_event_queue_depth",
+    "Undelivered device events across all subscriber queues.",
+    lambda: {(): float(device_event_broker.queue_depth)},
+)
+metrics_registry.gauge(
+    "device_event_subscribers",
+    "Connected device event subscribers.",
+    lambda: {(): float(device_event_broker.subscriber_count)},
+)
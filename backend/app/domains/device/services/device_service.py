@@ -1,16 +1,32 @@
 import logging
-from typing import List, Optional, Dict, Any, Union, Sequence
+from typing import List, Optional, Dict, Any, Union, Sequence, Tuple
 from fastapi import HTTPException, status
+from sqlalchemy.exc import IntegrityError
 
-from app.domains.device.models.device_model import Device, DeviceRole
+from app.domains.device.models.device_model import (
+    DEVICE_FIELDS,
+    Device,
+    DeviceRole,
+)
+from app.domains.device.models.device_snapshot import DeviceColumns
 from app.domains.device.interfaces.device_repository import DeviceRepository
 from app.domains.device.models.dto import (
+    DeviceBulkRequest,
     DeviceCreate,
     DeviceUpdate,
 )  # 使用領域內的 DTO 模型
 
 logger = logging.getLogger(__name__)
 
+MINIMUM_ROLES_DETAIL = (
+    "系統必須至少有一個發射器 (tx)、接收器 (rx)、干擾源 (jammer)。"
+)
+
+
+def _role_value(role: Any) -> str:
+    """將 DeviceRole 或字串統一為角色字串"""
+    return getattr(role, "value", role)
+
 
 class DeviceService:
     """設備服務層，實現設備相關的業務邏輯"""
@@ -55,6 +71,40 @@ class DeviceService:
             skip=skip, limit=limit, role=role, active_only=active_only
         )
 
+    async def get_active_columns(
+        self, bbox: Optional[Tuple[float, float, float, float]] = None
+    ) -> DeviceColumns:
+        """獲取欄位式活躍設備快照，供大量設備的向量化模擬使用；可選只取範圍內的設備"""
+        return await self.device_repository.get_active_columns(bbox=bbox)
+
+    async def get_devices_in_region(
+        self,
+        *,
+        bbox: Optional[Tuple[float, float, float, float]] = None,
+        center: Optional[Tuple[float, float]] = None,
+        radius: Optional[float] = None,
+        nearest: Optional[int] = None,
+        role: Optional[str] = None,
+        active_only: bool = True,
+    ) -> Sequence[Device]:
+        """依範圍框、半徑或最近 k 個條件查詢設備"""
+        if bbox is not None:
+            return await self.device_repository.get_in_bbox(
+                *bbox, role=role, active_only=active_only
+            )
+        if center is not None and radius is not None:
+            return await self.device_repository.get_within_radius(
+                *center, radius, role=role, active_only=active_only
+            )
+        if center is not None and nearest is not None:
+            return await self.device_repository.get_nearest(
+                *center, nearest, role=role, active_only=active_only
+            )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Specify a bbox, a center with radius, or a center with nearest.",
+        )
+
     async def update_device(self, device_id: int, device_data: DeviceUpdate) -> Device:
         """更新設備資訊"""
         # 先檢查設備是否存在
@@ -67,32 +117,170 @@ class DeviceService:
 
     async def delete_device(self, device_id: int) -> Device:
         """刪除設備，並檢查系統中是否仍有足夠的必要設備"""
-        # 先查出要刪除的設備
-        device = await self.get_device_by_id(device_id=device_id)
+        # 先鎖定角色統計，檢查與刪除在同一交易中完成，避免並發刪除同時通過檢查
+        await self.device_repository.lock_role_counts()
+        try:
+            device = await self.get_device_by_id(device_id=device_id)
 
-        # 查詢活躍設備列表
-        all_active_devices = await self.device_repository.get_active()
+            # 以 GROUP BY 聚合取得各角色活躍數量，再扣除即將刪除的設備
+            counts = await self.device_repository.count_active_by_role()
+            if device.active:
+                role = _role_value(device.role)
+                counts[role] = counts.get(role, 0) - 1
 
-        # 排除即將刪除的這個設備
-        remaining_devices = [d for d in all_active_devices if d.id != device_id]
+            if any(counts[role.value] < 1 for role in DeviceRole):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"{MINIMUM_ROLES_DETAIL}刪除失敗。",
+                )
+        except HTTPException:
+            await self.device_repository.rollback()
+            raise
 
-        # 檢查剩餘設備數量
-        tx_count = sum(
-            1 for d in remaining_devices if d.role == DeviceRole.DESIRED.value
-        )
-        rx_count = sum(
-            1 for d in remaining_devices if d.role == DeviceRole.RECEIVER.value
-        )
-        jammer_count = sum(
-            1 for d in remaining_devices if d.role == DeviceRole.JAMMER.value
-        )
+        # 通過檢查才實際刪除，提交時一併釋放鎖
+        deleted_device = await self.device_repository.remove(device_id=device_id)
+        return deleted_device
+
+    async def bulk_apply_devices(
+        self, request: DeviceBulkRequest
+    ) -> Tuple[List[Device], List[Device], List[int]]:
+        """批次建立、更新與刪除設備
 
-        if tx_count < 1 or rx_count < 1 or jammer_count < 1:
+        整批請求先一併驗證（ID 存在、名稱唯一、最少角色數），
+        通過後才交由存儲庫在單一交易中寫入。
+        """
+        update_ids = [item.id for item in request.update]
+        delete_ids = list(dict.fromkeys(request.delete))
+        if not (request.create or update_ids or delete_ids):
+            return [], [], []
+
+        if len(set(update_ids)) != len(update_ids):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="系統必須至少有一個發射器 (tx)、接收器 (rx)、干擾源 (jammer)。刪除失敗。",
+                detail="Each device may only be updated once per batch.",
+            )
+        overlap = set(update_ids) & set(delete_ids)
+        if overlap:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Devices cannot be both updated and deleted: {sorted(overlap)}",
             )
 
-        # 通過檢查才實際刪除
-        deleted_device = await self.device_repository.remove(device_id=device_id)
-        return deleted_device
+        # 驗證與寫入在同一交易中進行，先鎖定角色統計避免並發批次同時通過檢查
+        await self.device_repository.lock_role_counts()
+        try:
+            # 一次查出所有被更新或刪除的設備
+            existing = {
+                device.id: device
+                for device in await self.device_repository.get_by_ids(
+                    update_ids + delete_ids
+                )
+            }
+            missing = [i for i in update_ids + delete_ids if i not in existing]
+            if missing:
+                logger.warning(f"Bulk request references unknown devices: {missing}")
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Devices not found: {missing}",
+                )
+
+            # 計算每筆更新後的完整欄位值
+            update_rows: List[Dict[str, Any]] = []
+            for item in request.update:
+                db_device = existing[item.id]
+                row = {field: getattr(db_device, field) for field in DEVICE_FIELDS}
+                row.update(item.dict(exclude_unset=True, exclude={"id"}))
+                row["role"] = _role_value(row["role"])
+                row["id"] = item.id
+                update_rows.append(row)
+
+            await self._validate_bulk_names(request, update_rows, delete_ids)
+            await self._validate_bulk_roles(request, update_rows, existing, delete_ids)
+        except HTTPException:
+            await self.device_repository.rollback()
+            raise
+
+        try:
+            return await self.device_repository.bulk_apply(
+                creates=request.create, updates=update_rows, delete_ids=delete_ids
+            )
+        except IntegrityError as e:
+            logger.warning(f"Bulk device request violated a constraint: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Bulk device request conflicts with existing data.",
+            )
+
+    async def _validate_bulk_names(
+        self,
+        request: DeviceBulkRequest,
+        update_rows: List[Dict[str, Any]],
+        delete_ids: List[int],
+    ) -> None:
+        """檢查批次結果中的設備名稱是否唯一"""
+        # 名稱 -> 批次中宣告該名稱的設備 ID（新建設備為 None）
+        claims: Dict[str, Optional[int]] = {}
+        final_names: Dict[int, str] = {}
+        for name, device_id in [(d.name, None) for d in request.create] + [
+            (row["name"], row["id"]) for row in update_rows
+        ]:
+            if name in claims:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Duplicate device name in batch: {name}",
+                )
+            claims[name] = device_id
+            if device_id is not None:
+                final_names[device_id] = name
+
+        released = set(delete_ids)
+        for holder in await self.device_repository.get_by_names(list(claims)):
+            if claims[holder.name] == holder.id or holder.id in released:
+                continue
+            # 同批次中已改名的設備不再佔用原名稱
+            if final_names.get(holder.id, holder.name) != holder.name:
+                continue
+            logger.warning(f"Device name '{holder.name}' already exists.")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"A device with this name already exists: {holder.name}",
+            )
+
+    async def _validate_bulk_roles(
+        self,
+        request: DeviceBulkRequest,
+        update_rows: List[Dict[str, Any]],
+        existing: Dict[int, Device],
+        delete_ids: List[int],
+    ) -> None:
+        """以批次的整體結果檢查最少角色數，只查詢一次角色統計"""
+        before = await self.device_repository.count_active_by_role()
+        counts = dict(before)
+
+        def adjust(role: Any, delta: int) -> None:
+            role = _role_value(role)
+            counts[role] = counts.get(role, 0) + delta
+
+        for device_id in delete_ids:
+            device = existing[device_id]
+            if device.active:
+                adjust(device.role, -1)
+        for row in update_rows:
+            device = existing[row["id"]]
+            if device.active:
+                adjust(device.role, -1)
+            if row["active"]:
+                adjust(row["role"], 1)
+        for device in request.create:
+            if device.active:
+                adjust(device.role, 1)
+
+        # 只拒絕使某角色減少且降到零的批次，不影響原本就缺角色時的其他修改
+        if any(
+            counts[role.value] < 1 and counts[role.value] < before[role.value]
+            for role in DeviceRole
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{MINIMUM_ROLES_DETAIL}批次操作失敗。",
+            )
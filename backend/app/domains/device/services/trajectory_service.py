@@ -0,0 +1,125 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException, status
+
+from app.domains.device.interfaces.device_repository import DeviceRepository
+from app.domains.device.interfaces.trajectory_repository import TrajectoryRepository
+from app.domains.device.models.device_snapshot import DeviceColumns
+from app.domains.device.models.dto import TrajectoryIngest
+from app.domains.device.models.trajectory_model import DeviceTrajectory
+
+logger = logging.getLogger(__name__)
+
+
+class TrajectoryService:
+    """設備軌跡服務層，處理軌跡寫入驗證、查詢與供模擬使用的時間內插"""
+
+    def __init__(
+        self,
+        trajectory_repository: TrajectoryRepository,
+        device_repository: DeviceRepository,
+    ):
+        self.trajectory_repository = trajectory_repository
+        self.device_repository = device_repository
+
+    async def _ensure_device(self, device_id: int) -> None:
+        if await self.device_repository.get_by_id(device_id=device_id) is None:
+            logger.warning(f"Device with ID {device_id} not found.")
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Device not found"
+            )
+
+    async def ingest(self, device_id: int, data: TrajectoryIngest) -> DeviceTrajectory:
+        """驗證並批次寫入軌跡，回傳已排序的軌跡"""
+        await self._ensure_device(device_id)
+
+        n_points = len(data.t)
+        columns = [data.x, data.y, data.z]
+        orientation_columns = [
+            column if column is not None else [0.0] * n_points
+            for column in (data.orientation_x, data.orientation_y, data.orientation_z)
+        ]
+        if n_points == 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Trajectory must contain at least one point.",
+            )
+        if any(len(column) != n_points for column in columns + orientation_columns):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="All trajectory columns must have the same length as t.",
+            )
+
+        trajectory = DeviceTrajectory.from_arrays(
+            device_id,
+            data.t,
+            np.column_stack(columns),
+            np.column_stack(orientation_columns),
+        )
+        if not np.all(np.isfinite(trajectory.t)) or np.any(np.diff(trajectory.t) == 0):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Trajectory timestamps must be finite and unique.",
+            )
+
+        await self.trajectory_repository.bulk_ingest(trajectory)
+        return trajectory
+
+    async def get_trajectory(
+        self,
+        device_id: int,
+        *,
+        t_start: Optional[float] = None,
+        t_end: Optional[float] = None,
+        max_points: Optional[int] = None,
+    ) -> Tuple[DeviceTrajectory, int]:
+        """查詢設備軌跡，可限定時間範圍並降採樣"""
+        await self._ensure_device(device_id)
+        return await self.trajectory_repository.get_range(
+            device_id, t_start=t_start, t_end=t_end, max_points=max_points
+        )
+
+    async def delete_trajectory(
+        self,
+        device_id: int,
+        *,
+        t_start: Optional[float] = None,
+        t_end: Optional[float] = None,
+    ) -> int:
+        """刪除設備在時間範圍內的軌跡點"""
+        await self._ensure_device(device_id)
+        return await self.trajectory_repository.delete_range(
+            device_id, t_start=t_start, t_end=t_end
+        )
+
+    async def apply_to_columns(self, devices: DeviceColumns, t: float) -> DeviceColumns:
+        """將設備快照的位置與方向替換為軌跡在時間 t 的內插值
+
+        沒有軌跡的設備保留資料庫中的靜態位置；t 超出軌跡範圍時取端點。
+        """
+        if len(devices) == 0:
+            return devices
+        rows = await self.trajectory_repository.get_bracketing_points(
+            devices.ids.tolist(), t
+        )
+        if not rows:
+            return devices
+
+        points: Dict[int, List[tuple]] = {}
+        for device_id, *point in rows:
+            points.setdefault(device_id, []).append(tuple(point))
+
+        positions = np.array(devices.positions)
+        orientations = np.array(devices.orientations)
+        for index, device_id in enumerate(devices.ids.tolist()):
+            if device_id not in points:
+                continue
+            # 前後兩點 (可能相同) 組成的短軌跡，內插即可取得 t 時刻的狀態
+            bracket = DeviceTrajectory.from_rows(device_id, sorted(set(points[device_id])))
+            positions[index], orientations[index] = (
+                value[0] for value in bracket.interpolate(t)
+            )
+        logger.debug(f"Applied trajectories at t={t} to {len(points)} devices")
+        return devices.with_positions(positions, orientations)
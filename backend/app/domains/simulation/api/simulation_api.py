@@ -1,29 +1,76 @@
+import json
 import logging
-from typing import Optional, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from fastapi.responses import StreamingResponse
+import math
+import uuid
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, List
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Path,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_session
-from app.core.config import (
-    CFR_PLOT_IMAGE_PATH,
-    SINR_MAP_IMAGE_PATH,
-    DOPPLER_IMAGE_PATH,
-    CHANNEL_RESPONSE_IMAGE_PATH,
-    get_scene_xml_path,
+from app.db.base import async_session_maker
+from app.core.cancellation import SimulationCancelled, job_scope
+from app.core.metrics import capture_spans
+from app.core.config import get_scene_xml_path
+from app.core.progress import (
+    JOB_ID_PATTERN,
+    emit,
+    event_stream,
+    progress_registry,
+    publish_end,
+    track_job,
+)
+from app.core.profiling import (
+    PROFILE_FORMATS,
+    check_profile_access,
+    load_profile_metadata,
+    profile_artifact_path,
+    profile_request,
 )
 from app.domains.simulation.models.simulation_model import (
     SimulationParameters,
     SimulationImageRequest,
+    SimulationPriority,
+)
+from app.domains.simulation.services.admission_controller import (
+    AdmissionRejected,
+    admission_controller,
+)
+from app.domains.simulation.services.job_images import cleanup_job_images, job_image_path
+from app.domains.simulation.services.progressive_map import (
+    cleanup_level_images,
+    level_image_path,
+    plan_levels,
+)
+from app.domains.simulation.services.resource_estimator import (
+    ResourceEstimate,
+    estimate_job,
+)
+from app.domains.simulation.services.simulation_scheduler import simulation_scheduler
+from app.domains.simulation.services.sionna_service import (
+    get_scene_xml_file_path,
+    sionna_service,
 )
-from app.domains.simulation.services.sionna_service import sionna_service
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
 # 通用的圖像回應函數
-def create_image_response(image_path: str, filename: str):
+def create_image_response(
+    image_path: str, filename: str, headers: Optional[Dict[str, str]] = None
+):
     """建立統一的圖像檔案串流回應"""
     logger.info(f"返回圖像，文件路徑: {image_path}")
 
@@ -37,23 +84,256 @@ def create_image_response(image_path: str, filename: str):
     return StreamingResponse(
         iterfile(),
         media_type="image/png",
-        headers={"Content-Disposition": f"attachment; filename={filename}"},
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            **(headers or {}),
+        },
     )
 
 
+def _profile_access(x_profile_token: Optional[str] = Header(None)) -> None:
+    """分析結果與 profile=true 請求的存取控制"""
+    try:
+        check_profile_access(x_profile_token)
+    except PermissionError as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+
+
+def get_profile_format(
+    profile: bool = Query(False, description="在分析器下執行請求 (需 X-Profile-Token)"),
+    profile_format: str = Query(
+        "speedscope", description="speedscope (取樣分析) 或 pstats (cProfile)"
+    ),
+    x_profile_token: Optional[str] = Header(None),
+) -> Optional[str]:
+    """回傳要使用的分析格式；未要求分析時為 None"""
+    if not profile:
+        return None
+    if profile_format not in PROFILE_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"profile_format 必須是 {', '.join(PROFILE_FORMATS)} 之一",
+        )
+    _profile_access(x_profile_token)
+    return profile_format
+
+
+def _profile_headers(profile_run) -> Optional[Dict[str, str]]:
+    return profile_run.headers() if profile_run is not None else None
+
+
+# 各拒絕原因回傳給客戶端的訊息
+_REJECTION_MESSAGES = {
+    "memory": "模擬估計的記憶體用量超過伺服器上限",
+    "runtime": "模擬估計的執行時間超過伺服器上限，請降低 samples_per_tx 或放大 cell_size",
+    "queue_full": "模擬佇列已滿，請稍後再試",
+    "queue_wait": "模擬佇列的估計等待時間過長，請稍後再試",
+}
+
+
+def _rejection_exception(rejection: AdmissionRejected) -> HTTPException:
+    """記憶體超過上限回傳 413，其餘 (執行時間、佇列) 回傳 429 與估計值"""
+    detail = {
+        "message": _REJECTION_MESSAGES[rejection.reason],
+        "reason": rejection.reason,
+        **rejection.estimate.model_dump(),
+    }
+    if rejection.reason == "memory":
+        return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=detail)
+    headers = (
+        {"Retry-After": str(max(1, math.ceil(rejection.retry_after)))}
+        if rejection.retry_after is not None
+        else None
+    )
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=detail, headers=headers
+    )
+
+
+# 取消原因回傳給客戶端的訊息
+_CANCELLATION_MESSAGES = {
+    "disconnected": "客戶端已中斷連線，模擬已取消",
+    "superseded": "模擬已被同一客戶端的新請求取代",
+}
+
+
+@asynccontextmanager
+async def _job_scope(
+    request: Request,
+    client_id: str,
+    artifact: str,
+    scene: str,
+    job_id: str,
+    estimate: ResourceEstimate,
+):
+    """可取消並發布進度事件的模擬範圍
+
+    客戶端中斷連線或同一客戶端對同一圖表送出新請求時取消；進度可由
+    /jobs/{job_id}/events 訂閱。只有以 X-Client-Id 明確識別的客戶端會取代先前的請求：
+    來源位址可能由多個使用者共用 (例如經過 Vite 代理)，不作為取消的依據。
+    """
+    supersede_key = (
+        (client_id, artifact, scene.lower()) if request.headers.get("X-Client-Id") else None
+    )
+    async with track_job(
+        job_id,
+        artifact=artifact,
+        scene=scene,
+        priority=estimate.priority,
+        runtime_s=estimate.runtime_s,
+        eta_s=estimate.eta_s,
+        downgraded_from=estimate.downgraded_from,
+    ), job_scope(supersede_key, request.is_disconnected):
+        yield
+
+
+def _cancelled_exception(cancelled: SimulationCancelled) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail={
+            "message": _CANCELLATION_MESSAGES.get(cancelled.reason, "模擬已取消"),
+            "reason": cancelled.reason,
+        },
+    )
+
+
+def get_job_id(
+    job_id: Optional[str] = Query(
+        None,
+        pattern=JOB_ID_PATTERN.pattern,
+        description="進度事件的工作 ID (8–64 個英數字、- 或 _)；未提供時由伺服器產生",
+    ),
+) -> str:
+    """模擬請求的工作 ID；客戶端可先以此 ID 訂閱進度事件再送出請求"""
+    return job_id or uuid.uuid4().hex
+
+
+def get_client_id(request: Request, x_client_id: Optional[str] = Header(None)) -> str:
+    """排程公平性使用的客戶端識別：X-Client-Id 標頭，未提供時使用來源位址
+
+    來源位址只用於排程；取代先前的請求需要明確的 X-Client-Id (見 _job_scope)。
+    """
+    if x_client_id:
+        return x_client_id
+    return request.client.host if request.client else "anonymous"
+
+
+async def _admit_job(
+    session: AsyncSession,
+    artifact: str,
+    scene: str,
+    job_id: str,
+    allow_downgrade: bool = True,
+    priority: Optional[SimulationPriority] = None,
+    **params,
+) -> ResourceEstimate:
+    """估計工作資源並決定是否接受；不接受時在開始前以 413 / 429 拒絕"""
+    estimate = await estimate_job(
+        session, artifact, get_scene_xml_file_path(scene), **params
+    )
+    try:
+        return admission_controller.admit(estimate, allow_downgrade, priority=priority)
+    except AdmissionRejected as e:
+        publish_end(job_id, "rejected", reason=e.reason)
+        raise _rejection_exception(e)
+
+
+def get_map_extent(
+    map_center_x: Optional[float] = Query(None, description="地圖範圍中心 x (m)，預設為場景中心"),
+    map_center_y: Optional[float] = Query(None, description="地圖範圍中心 y (m)，預設為場景中心"),
+    map_width: Optional[float] = Query(None, gt=0, description="地圖範圍寬度 (m)，預設為場景範圍"),
+    map_height: Optional[float] = Query(None, gt=0, description="地圖範圍高度 (m)，預設為場景範圍"),
+    tile_size: Optional[float] = Query(
+        None, gt=0, description="分塊邊長 (m)；指定時分塊平行求解，重疊範圍重用快取的分塊"
+    ),
+) -> Dict[str, Any]:
+    """SINR 地圖的範圍與分塊參數 (map_center、map_size、tile_size)"""
+    if (map_center_x is None) != (map_center_y is None) or (map_width is None) != (
+        map_height is None
+    ):
+        raise HTTPException(
+            status_code=400,
+            detail="map_center_x/map_center_y 與 map_width/map_height 必須成對指定",
+        )
+    return {
+        "map_center": (map_center_x, map_center_y) if map_center_x is not None else None,
+        "map_size": (map_width, map_height) if map_width is not None else None,
+        "tile_size": tile_size,
+    }
+
+
+def get_sampling(
+    adaptive_samples: bool = Query(
+        False, description="自適應取樣：分批求解直到收斂或用完時間預算，samples_per_tx 為上限"
+    ),
+    target_rel_error: Optional[float] = Query(
+        None, gt=0, lt=1, description="自適應取樣的 rss 相對標準誤差目標，預設依伺服器設定"
+    ),
+    time_budget_s: Optional[float] = Query(
+        None, gt=0, description="自適應取樣的時間預算 (s)，預設依伺服器設定"
+    ),
+) -> Dict[str, Any]:
+    """SINR 地圖的取樣參數 (adaptive_samples、target_rel_error、time_budget_s)"""
+    if not adaptive_samples and (target_rel_error is not None or time_budget_s is not None):
+        raise HTTPException(
+            status_code=400,
+            detail="target_rel_error 與 time_budget_s 僅適用於 adaptive_samples=true",
+        )
+    return {
+        "adaptive_samples": adaptive_samples,
+        "target_rel_error": target_rel_error,
+        "time_budget_s": time_budget_s,
+    }
+
+
+def _solver_headers(spans) -> Dict[str, str]:
+    """SINR 地圖使用的求解設定與收斂統計 (generate_sinr_map 附加的 solver 屬性)"""
+    if not spans or "solver" not in spans[-1].attributes:
+        return {}
+    return {"X-Radio-Map-Solver": json.dumps(spans[-1].attributes["solver"])}
+
+
+def _estimate_headers(estimate: ResourceEstimate) -> Dict[str, str]:
+    """回應標頭中的估計執行時間；參數被調降時附上原始參數"""
+    headers = {
+        "X-Estimated-Runtime": f"{estimate.runtime_s:.2f}",
+        "X-Queue-Wait": f"{estimate.queue_wait_s:.2f}",
+        "X-Simulation-Priority": estimate.priority or "",
+    }
+    if estimate.downgraded_from is not None:
+        headers["X-Simulation-Downgraded"] = json.dumps(
+            {
+                "from": estimate.downgraded_from,
+                "to": {"cell_size": estimate.cell_size, "samples_per_tx": estimate.samples_per_tx},
+            }
+        )
+    return headers
+
+
+def _response_headers(estimate: ResourceEstimate, job_id: str, profile_run) -> Dict[str, str]:
+    return {
+        **_estimate_headers(estimate),
+        "X-Simulation-Job-Id": job_id,
+        **(_profile_headers(profile_run) or {}),
+    }
+
+
 @router.get("/scene-image", response_description="空場景圖像")
-async def get_scene_image():
+async def get_scene_image(profile_format: Optional[str] = Depends(get_profile_format)):
     """產生並回傳只包含基本場景的圖像 (無設備)"""
     logger.info("--- API Request: /scene-image (empty map) ---")
 
     try:
         output_path = "app/static/images/scene_empty.png"
-        success = await sionna_service.generate_empty_scene_image(output_path)
+        async with profile_request(profile_format, "scene_image") as profile_run:
+            success = await sionna_service.generate_empty_scene_image(output_path)
 
         if not success:
             raise HTTPException(status_code=500, detail="無法產生空場景圖像")
 
-        return create_image_response(output_path, "scene_empty.png")
+        return create_image_response(
+            output_path, "scene_empty.png", _profile_headers(profile_run)
+        )
     except Exception as e:
         logger.error(f"生成空場景圖像時出錯: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"生成場景圖像時出錯: {str(e)}")
@@ -61,55 +341,246 @@ async def get_scene_image():
 
 @router.get("/cfr-plot", response_description="通道頻率響應圖")
 async def get_cfr_plot(
+    request: Request,
     session: AsyncSession = Depends(get_session),
     scene: str = Query("nycu", description="場景名稱 (nycu, lotus)"),
+    time_s: Optional[float] = Query(
+        None, description="軌跡時間 (s)，指定時使用設備軌跡在該時刻的位置"
+    ),
+    priority: Optional[SimulationPriority] = Query(
+        None, description="排程優先等級 (interactive, standard, batch)；預設依圖表類型"
+    ),
+    client_id: str = Depends(get_client_id),
+    job_id: str = Depends(get_job_id),
+    profile_format: Optional[str] = Depends(get_profile_format),
 ):
     """產生並回傳通道頻率響應 (CFR) 圖"""
     logger.info(f"--- API Request: /cfr-plot?scene={scene} ---")
+    estimate = await _admit_job(session, "cfr", scene, job_id, priority=priority)
+    output_path = str(job_image_path(job_id, "cfr_plot"))
+    cleanup_job_images()
 
     try:
-        success = await sionna_service.generate_cfr_plot(
-            session=session, output_path=str(CFR_PLOT_IMAGE_PATH), scene_name=scene
-        )
+        async with _job_scope(
+            request, client_id, "cfr", scene, job_id, estimate
+        ), admission_controller.slot(estimate, client_id), profile_request(
+            profile_format, "cfr", scene=scene, time_s=time_s
+        ) as profile_run:
+            success = await sionna_service.generate_cfr_plot(
+                session=session,
+                output_path=output_path,
+                scene_name=scene,
+                time_s=time_s,
+            )
 
         if not success:
             raise HTTPException(status_code=500, detail="產生 CFR 圖失敗")
 
-        return create_image_response(str(CFR_PLOT_IMAGE_PATH), "cfr_plot.png")
+        return create_image_response(
+            output_path, "cfr_plot.png", _response_headers(estimate, job_id, profile_run)
+        )
+    except SimulationCancelled as e:
+        raise _cancelled_exception(e)
     except Exception as e:
         logger.error(f"生成 CFR 圖時出錯: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"生成 CFR 圖時出錯: {str(e)}")
 
 
+# 漸進式 SINR 地圖的 multipart 分隔字串
+_LEVEL_BOUNDARY = "sinr-level"
+
+
+def _level_headers(level: int, levels: List[ResourceEstimate]) -> Dict[str, str]:
+    return {
+        "X-Simulation-Level": str(level),
+        "X-Simulation-Levels": str(len(levels)),
+        "X-Cell-Size": str(levels[level].cell_size),
+        "X-Samples-Per-Tx": str(levels[level].samples_per_tx),
+    }
+
+
+async def _progressive_sinr_stream(
+    request: Request,
+    client_id: str,
+    job_id: str,
+    scene: str,
+    estimate: ResourceEstimate,
+    levels: List[ResourceEstimate],
+    sampling: Dict[str, Any],
+    **render,
+):
+    """依序產生各級 SINR 地圖，每完成一級即以 multipart 送出圖像並發布 level 事件
+
+    回應開始後已無法改變狀態碼；取消或失敗時結束串流，結果由進度事件的 end 通知。
+    串流在端點返回後才執行，因此自行建立資料庫 session。
+    自適應取樣只用於最後一級，較粗的各級維持固定射線數以快速回應。
+    """
+    cleanup_level_images()
+    try:
+        async with async_session_maker() as session, _job_scope(
+            request, client_id, "sinr_map", scene, job_id, estimate
+        ), admission_controller.slot(estimate, client_id):
+            for level, level_estimate in enumerate(levels):
+                final = level == len(levels) - 1
+                output_path = level_image_path(job_id, level)
+                with capture_spans() as spans:
+                    success = await sionna_service.generate_sinr_map(
+                        session=session,
+                        output_path=str(output_path),
+                        scene_name=scene,
+                        cell_size=level_estimate.cell_size,
+                        samples_per_tx=level_estimate.samples_per_tx,
+                        **(sampling if final else {}),
+                        **render,
+                    )
+                if not success:
+                    logger.error(f"漸進式 SINR 地圖第 {level} 級產生失敗，停止細化")
+                    break
+                headers = {**_level_headers(level, levels), **_solver_headers(spans)}
+                emit(
+                    "level",
+                    level=level,
+                    levels=len(levels),
+                    final=final,
+                    cell_size=level_estimate.cell_size,
+                    samples_per_tx=level_estimate.samples_per_tx,
+                    solver=spans[-1].attributes.get("solver") if spans else None,
+                    url=str(
+                        request.url_for("get_job_sinr_map", job_id=job_id).include_query_params(
+                            level=level
+                        )
+                    ),
+                )
+                image = output_path.read_bytes()
+                part_headers = "".join(
+                    f"{name}: {value}\r\n"
+                    for name, value in {
+                        "Content-Type": "image/png",
+                        "Content-Length": len(image),
+                        **headers,
+                    }.items()
+                )
+                yield f"--{_LEVEL_BOUNDARY}\r\n{part_headers}\r\n".encode() + image + b"\r\n"
+        yield f"--{_LEVEL_BOUNDARY}--\r\n".encode()
+    except SimulationCancelled as e:
+        logger.info(f"漸進式 SINR 地圖已取消 ({e.reason})")
+    except Exception as e:
+        logger.error(f"產生漸進式 SINR 地圖時出錯: {e}", exc_info=True)
+
+
 @router.get("/sinr-map", response_description="SINR 地圖")
 async def get_sinr_map(
+    request: Request,
     session: AsyncSession = Depends(get_session),
     scene: str = Query("nycu", description="場景名稱 (nycu, lotus)"),
     sinr_vmin: float = Query(-40.0, description="SINR 最小值 (dB)"),
     sinr_vmax: float = Query(0.0, description="SINR 最大值 (dB)"),
     cell_size: float = Query(1.0, description="Radio map 網格大小 (m)"),
     samples_per_tx: int = Query(10**7, description="每個發射器的採樣數量"),
+    time_s: Optional[float] = Query(
+        None, description="軌跡時間 (s)，指定時使用設備軌跡在該時刻的位置"
+    ),
+    allow_downgrade: bool = Query(
+        True, description="超過伺服器限制時允許調降 samples_per_tx 與 cell_size"
+    ),
+    priority: Optional[SimulationPriority] = Query(
+        None, description="排程優先等級 (interactive, standard, batch)；預設依圖表類型"
+    ),
+    progressive: bool = Query(
+        False,
+        description="漸進模式：先送出粗略地圖再逐級細化，以 multipart/x-mixed-replace 串流各級圖像",
+    ),
+    extent: Dict[str, Any] = Depends(get_map_extent),
+    sampling: Dict[str, Any] = Depends(get_sampling),
+    client_id: str = Depends(get_client_id),
+    job_id: str = Depends(get_job_id),
+    profile_format: Optional[str] = Depends(get_profile_format),
 ):
-    """產生並回傳 SINR 地圖"""
+    """產生並回傳 SINR 地圖
+
+    progressive=true 時回應為各級圖像的串流 (可直接作為 <img> 來源)；各級完成時
+    也以 level 事件發布到 /jobs/{job_id}/events，並可由 /jobs/{job_id}/sinr-map 輪詢。
+    使用的求解設定與 (自適應取樣的) 收斂統計以 X-Radio-Map-Solver 標頭回傳。
+    """
     logger.info(
         f"--- API Request: /sinr-map?scene={scene}&sinr_vmin={sinr_vmin}&sinr_vmax={sinr_vmax}&cell_size={cell_size}&samples_per_tx={samples_per_tx} ---"
     )
+    estimate = await _admit_job(
+        session,
+        "sinr_map",
+        scene,
+        job_id,
+        allow_downgrade,
+        priority,
+        cell_size=cell_size,
+        samples_per_tx=samples_per_tx,
+        **extent,
+    )
+    if progressive:
+        if profile_format is not None:
+            raise HTTPException(status_code=400, detail="漸進模式不支援 profile")
+        levels = plan_levels(estimate)
+        return StreamingResponse(
+            _progressive_sinr_stream(
+                request,
+                client_id,
+                job_id,
+                scene,
+                estimate,
+                levels,
+                sampling,
+                sinr_vmin=sinr_vmin,
+                sinr_vmax=sinr_vmax,
+                time_s=time_s,
+                **extent,
+            ),
+            media_type=f"multipart/x-mixed-replace; boundary={_LEVEL_BOUNDARY}",
+            headers={
+                **_response_headers(estimate, job_id, None),
+                "X-Simulation-Levels": str(len(levels)),
+                "Cache-Control": "no-cache",
+            },
+        )
 
+    output_path = str(job_image_path(job_id, "sinr_map"))
+    cleanup_job_images()
     try:
-        success = await sionna_service.generate_sinr_map(
-            session=session,
-            output_path=str(SINR_MAP_IMAGE_PATH),
-            scene_name=scene,
-            sinr_vmin=sinr_vmin,
-            sinr_vmax=sinr_vmax,
-            cell_size=cell_size,
-            samples_per_tx=samples_per_tx,
-        )
+        async with _job_scope(
+            request, client_id, "sinr_map", scene, job_id, estimate
+        ), admission_controller.slot(estimate, client_id), profile_request(
+            profile_format,
+            "sinr_map",
+            scene=scene,
+            cell_size=estimate.cell_size,
+            samples_per_tx=estimate.samples_per_tx,
+            time_s=time_s,
+            **extent,
+            **sampling,
+        ) as profile_run:
+            with capture_spans() as spans:
+                success = await sionna_service.generate_sinr_map(
+                    session=session,
+                    output_path=output_path,
+                    scene_name=scene,
+                    sinr_vmin=sinr_vmin,
+                    sinr_vmax=sinr_vmax,
+                    cell_size=estimate.cell_size,
+                    samples_per_tx=estimate.samples_per_tx,
+                    time_s=time_s,
+                    **extent,
+                    **sampling,
+                )
 
         if not success:
             raise HTTPException(status_code=500, detail="產生 SINR 地圖失敗")
 
-        return create_image_response(str(SINR_MAP_IMAGE_PATH), "sinr_map.png")
+        return create_image_response(
+            output_path,
+            "sinr_map.png",
+            {**_response_headers(estimate, job_id, profile_run), **_solver_headers(spans)},
+        )
+    except SimulationCancelled as e:
+        raise _cancelled_exception(e)
     except Exception as e:
         logger.error(f"生成 SINR 地圖時出錯: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"生成 SINR 地圖時出錯: {str(e)}")
@@ -117,21 +588,45 @@ async def get_sinr_map(
 
 @router.get("/doppler-plots", response_description="延遲多普勒圖")
 async def get_doppler_plots(
+    request: Request,
     session: AsyncSession = Depends(get_session),
     scene: str = Query("nycu", description="場景名稱 (nycu, lotus)"),
+    time_s: Optional[float] = Query(
+        None, description="軌跡時間 (s)，指定時使用設備軌跡在該時刻的位置"
+    ),
+    priority: Optional[SimulationPriority] = Query(
+        None, description="排程優先等級 (interactive, standard, batch)；預設依圖表類型"
+    ),
+    client_id: str = Depends(get_client_id),
+    job_id: str = Depends(get_job_id),
+    profile_format: Optional[str] = Depends(get_profile_format),
 ):
     """產生並回傳延遲多普勒圖"""
     logger.info(f"--- API Request: /doppler-plots?scene={scene} ---")
+    estimate = await _admit_job(session, "doppler", scene, job_id, priority=priority)
+    output_path = str(job_image_path(job_id, "delay_doppler"))
+    cleanup_job_images()
 
     try:
-        success = await sionna_service.generate_doppler_plots(
-            session, str(DOPPLER_IMAGE_PATH), scene_name=scene
-        )
+        async with _job_scope(
+            request, client_id, "doppler", scene, job_id, estimate
+        ), admission_controller.slot(estimate, client_id), profile_request(
+            profile_format, "doppler", scene=scene, time_s=time_s
+        ) as profile_run:
+            success = await sionna_service.generate_doppler_plots(
+                session, output_path, scene_name=scene, time_s=time_s
+            )
 
         if not success:
             raise HTTPException(status_code=500, detail="產生延遲多普勒圖失敗")
 
-        return create_image_response(str(DOPPLER_IMAGE_PATH), "delay_doppler.png")
+        return create_image_response(
+            output_path,
+            "delay_doppler.png",
+            _response_headers(estimate, job_id, profile_run),
+        )
+    except SimulationCancelled as e:
+        raise _cancelled_exception(e)
     except Exception as e:
         logger.error(f"生成延遲多普勒圖時出錯: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"生成延遲多普勒圖時出錯: {str(e)}")
@@ -139,25 +634,48 @@ async def get_doppler_plots(
 
 @router.get("/channel-response", response_description="通道響應圖")
 async def get_channel_response(
+    request: Request,
     session: AsyncSession = Depends(get_session),
     scene: str = Query("nycu", description="場景名稱 (nycu, lotus)"),
+    time_s: Optional[float] = Query(
+        None, description="軌跡時間 (s)，指定時使用設備軌跡在該時刻的位置"
+    ),
+    priority: Optional[SimulationPriority] = Query(
+        None, description="排程優先等級 (interactive, standard, batch)；預設依圖表類型"
+    ),
+    client_id: str = Depends(get_client_id),
+    job_id: str = Depends(get_job_id),
+    profile_format: Optional[str] = Depends(get_profile_format),
 ):
     """產生並回傳通道響應圖，顯示 H_des、H_jam 和 H_all 的三維圖"""
     logger.info(f"--- API Request: /channel-response?scene={scene} ---")
+    estimate = await _admit_job(session, "channel_response", scene, job_id, priority=priority)
+    output_path = str(job_image_path(job_id, "channel_response_plots"))
+    cleanup_job_images()
 
     try:
-        success = await sionna_service.generate_channel_response_plots(
-            session,
-            str(CHANNEL_RESPONSE_IMAGE_PATH),
-            scene_name=scene,
-        )
+        async with _job_scope(
+            request, client_id, "channel_response", scene, job_id, estimate
+        ), admission_controller.slot(estimate, client_id), profile_request(
+            profile_format, "channel_response", scene=scene, time_s=time_s
+        ) as profile_run:
+            success = await sionna_service.generate_channel_response_plots(
+                session,
+                output_path,
+                scene_name=scene,
+                time_s=time_s,
+            )
 
         if not success:
             raise HTTPException(status_code=500, detail="產生通道響應圖失敗")
 
         return create_image_response(
-            str(CHANNEL_RESPONSE_IMAGE_PATH), "channel_response_plots.png"
+            output_path,
+            "channel_response_plots.png",
+            _response_headers(estimate, job_id, profile_run),
         )
+    except SimulationCancelled as e:
+        raise _cancelled_exception(e)
     except Exception as e:
         logger.error(f"生成通道響應圖時出錯: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"生成通道響應圖時出錯: {str(e)}")
@@ -165,13 +683,52 @@ async def get_channel_response(
 
 @router.post("/run", response_model=Dict[str, Any])
 async def run_simulation(
-    params: SimulationParameters, session: AsyncSession = Depends(get_session)
+    params: SimulationParameters,
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_session),
+    allow_downgrade: bool = Query(
+        True, description="超過伺服器限制時允許調降 samples_per_tx 與 cell_size"
+    ),
+    client_id: str = Depends(get_client_id),
+    job_id: str = Depends(get_job_id),
+    profile_format: Optional[str] = Depends(get_profile_format),
 ):
     """執行通用模擬"""
     logger.info(f"--- API Request: /run (type: {params.simulation_type}) ---")
 
     try:
-        result = await sionna_service.run_simulation(session, params)
+        estimate = await _admit_job(
+            session,
+            params.simulation_type,
+            "nycu",
+            job_id,
+            allow_downgrade,
+            params.priority,
+            cell_size=params.cell_size or 1.0,
+            samples_per_tx=params.samples_per_tx or 10**7,
+            map_center=params.map_center,
+            map_size=params.map_size,
+            tile_size=params.tile_size,
+        )
+        cleanup_job_images()
+        if estimate.downgraded_from is not None:
+            params = params.model_copy(
+                update={"cell_size": estimate.cell_size, "samples_per_tx": estimate.samples_per_tx}
+            )
+        async with _job_scope(
+            request, client_id, params.simulation_type, "nycu", job_id, estimate
+        ), admission_controller.slot(estimate, client_id), profile_request(
+            profile_format,
+            params.simulation_type,
+            **params.model_dump(mode="json", exclude_none=True),
+        ) as profile_run:
+            result = await sionna_service.run_simulation(
+                session, params, str(job_image_path(job_id, params.simulation_type))
+            )
+        response.headers.update(_response_headers(estimate, job_id, profile_run))
+        result["estimate"] = estimate.model_dump()
+        result["job_id"] = job_id
 
         if not result["success"]:
             raise HTTPException(
@@ -182,6 +739,8 @@ async def run_simulation(
         return result
     except HTTPException:
         raise
+    except SimulationCancelled as e:
+        raise _cancelled_exception(e)
     except Exception as e:
         logger.error(f"執行模擬時出錯: {e}", exc_info=True)
         raise HTTPException(
@@ -190,6 +749,95 @@ async def run_simulation(
         )
 
 
+@router.get("/estimate", response_model=Dict[str, Any])
+async def estimate_simulation(
+    simulation_type: str = Query(
+        ..., description="模擬類型，如'cfr', 'sinr_map', 'doppler', 'channel_response'"
+    ),
+    scene: str = Query("nycu", description="場景名稱 (nycu, lotus)"),
+    cell_size: float = Query(1.0, description="Radio map 網格大小 (m)"),
+    samples_per_tx: int = Query(10**7, description="每個發射器的採樣數量"),
+    allow_downgrade: bool = Query(
+        True, description="超過伺服器限制時允許調降 samples_per_tx 與 cell_size"
+    ),
+    priority: Optional[SimulationPriority] = Query(
+        None, description="排程優先等級 (interactive, standard, batch)；預設依圖表類型"
+    ),
+    extent: Dict[str, Any] = Depends(get_map_extent),
+    session: AsyncSession = Depends(get_session),
+):
+    """試算模擬的執行時間、記憶體與排隊時間 (不執行)，供前端顯示 ETA"""
+    estimate = await estimate_job(
+        session,
+        simulation_type,
+        get_scene_xml_file_path(scene),
+        cell_size=cell_size,
+        samples_per_tx=samples_per_tx,
+        **extent,
+    )
+    try:
+        estimate = admission_controller.admit(
+            estimate, allow_downgrade, preview=True, priority=priority
+        )
+        return {"admitted": True, "reason": None, **estimate.model_dump()}
+    except AdmissionRejected as e:
+        return {"admitted": False, "reason": e.reason, **e.estimate.model_dump()}
+
+
+@router.get("/queue", response_model=Dict[str, Any])
+async def get_queue_status():
+    """各優先等級的執行中與排隊中工作數、佇列上限與估計等待時間"""
+    return simulation_scheduler.status()
+
+
+@router.get("/jobs/{job_id}/events", response_description="模擬工作的進度事件 (Server-Sent Events)")
+async def stream_job_events(
+    request: Request,
+    job_id: str = Path(..., pattern=JOB_ID_PATTERN.pattern),
+    last_event_id: Optional[int] = Header(None),
+):
+    """推送模擬工作的進度事件：排隊、各階段開始/結束與耗時、部分統計與結束狀態
+
+    可在送出模擬請求 (帶相同 job_id 參數) 之前訂閱；工作結束後仍保留一段時間供晚連線讀取。
+    """
+    job = progress_registry.get_or_create(job_id)
+    return StreamingResponse(
+        event_stream(job, request.is_disconnected, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/jobs/{job_id}/sinr-map", response_description="漸進式 SINR 地圖已完成的一級")
+async def get_job_sinr_map(
+    job_id: str = Path(..., pattern=JOB_ID_PATTERN.pattern),
+    level: Optional[int] = Query(None, ge=0, description="級數；預設為目前最細的已完成級"),
+):
+    """輪詢漸進式 SINR 地圖：回傳已完成的一級圖像，X-Simulation-Final 表示是否已達請求解析度"""
+    job = progress_registry.get(job_id)
+    completed = [m for m in job.history if m["event"] == "level"] if job is not None else []
+    if level is not None:
+        completed = [m for m in completed if m["level"] == level]
+    if not completed:
+        raise HTTPException(status_code=404, detail="此工作尚無已完成的 SINR 地圖")
+    message = completed[-1]
+    image_path = level_image_path(job_id, message["level"])
+    if not image_path.exists():
+        raise HTTPException(status_code=404, detail="SINR 地圖圖像已過期")
+    return FileResponse(
+        image_path,
+        media_type="image/png",
+        headers={
+            "X-Simulation-Level": str(message["level"]),
+            "X-Simulation-Levels": str(message["levels"]),
+            "X-Simulation-Final": "true" if message["final"] else "false",
+            "X-Cell-Size": str(message["cell_size"]),
+            "X-Samples-Per-Tx": str(message["samples_per_tx"]),
+            "Cache-Control": "no-cache",
+        },
+    )
+
+
 @router.get("/scenes", response_description="獲取可用場景列表")
 async def get_available_scenes():
     """獲取系統中所有可用場景的列表"""
@@ -299,3 +947,30 @@ async def get_scene_model(scene_name: str):
     except Exception as e:
         logger.error(f"獲取場景 {scene_name} 模型時出錯: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"獲取場景模型時出錯: {str(e)}")
+
+
+@router.get("/profiles/{profile_id}", response_description="請求分析摘要")
+async def get_profile(profile_id: str, _: None = Depends(_profile_access)):
+    """回傳分析摘要：場景、設備數量、各階段耗時與各套件的自身耗時"""
+    try:
+        metadata = load_profile_metadata(profile_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if metadata is None:
+        raise HTTPException(status_code=404, detail=f"找不到分析結果 {profile_id}")
+    return metadata
+
+
+@router.get("/profiles/{profile_id}/{profile_format}", response_description="分析結果檔案")
+async def get_profile_artifact(
+    profile_id: str, profile_format: str, _: None = Depends(_profile_access)
+):
+    """下載 speedscope JSON 或 pstats 分析結果"""
+    try:
+        path = profile_artifact_path(profile_id, profile_format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not path.exists():
+        raise HTTPException(status_code=404, detail=f"找不到分析結果 {profile_id}")
+    media_type = "application/json" if profile_format == "speedscope" else "application/octet-stream"
+    return FileResponse(path, media_type=media_type, filename=path.name)
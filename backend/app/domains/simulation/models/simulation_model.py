@@ -1,8 +1,17 @@
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime
+from enum import Enum
 from pydantic import BaseModel, Field
 
 
+class SimulationPriority(str, Enum):
+    """模擬排程的優先等級"""
+
+    INTERACTIVE = "interactive"  # 拖曳設備後的即時圖表，有保留的 worker
+    STANDARD = "standard"
+    BATCH = "batch"  # 大量或長時間的背景工作
+
+
 class SimulationParameters(BaseModel):
     """模擬參數模型，用於存儲模擬的輸入參數"""
 
@@ -11,16 +20,40 @@ class SimulationParameters(BaseModel):
         ..., description="模擬類型，如'cfr', 'sinr_map', 'doppler', 'channel_response'"
     )
     description: Optional[str] = Field(None, description="模擬描述")
+    priority: Optional[SimulationPriority] = Field(
+        None, description="排程優先等級；未指定時依模擬類型決定"
+    )
 
     # 時間相關參數
     start_time: Optional[datetime] = Field(None, description="模擬開始時間")
     end_time: Optional[datetime] = Field(None, description="模擬結束時間")
+    time_s: Optional[float] = Field(
+        None, description="軌跡時間 (s)，指定時以設備軌跡在該時刻的位置進行模擬"
+    )
 
     # SINR 地圖相關參數
     sinr_vmin: Optional[float] = Field(None, description="SINR 最小值 (dB)")
     sinr_vmax: Optional[float] = Field(None, description="SINR 最大值 (dB)")
     cell_size: Optional[float] = Field(None, description="Radio map 網格大小 (m)")
     samples_per_tx: Optional[int] = Field(None, description="每個發射器的採樣數量")
+    map_center: Optional[Tuple[float, float]] = Field(
+        None, description="SINR 地圖範圍的中心 (x, y)，預設為場景中心"
+    )
+    map_size: Optional[Tuple[float, float]] = Field(
+        None, description="SINR 地圖範圍的大小 (寬, 高)，預設為場景範圍"
+    )
+    tile_size: Optional[float] = Field(
+        None, gt=0, description="分塊邊長 (m)；指定時分塊平行求解並快取各分塊"
+    )
+    adaptive_samples: bool = Field(
+        False, description="自適應取樣：分批求解直到收斂或用完時間預算，samples_per_tx 為上限"
+    )
+    target_rel_error: Optional[float] = Field(
+        None, gt=0, lt=1, description="自適應取樣的 rss 相對標準誤差目標"
+    )
+    time_budget_s: Optional[float] = Field(
+        None, gt=0, description="自適應取樣的時間預算 (s)"
+    )
 
     # 其他 RF 參數
     carrier_frequency: Optional[float] = Field(None, description="載波頻率 (Hz)")
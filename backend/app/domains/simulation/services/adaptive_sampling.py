@@ -0,0 +1,180 @@
+"""
+Radio map 的自適應 Monte Carlo 取樣
+
+固定的 samples_per_tx 對簡單場景浪費射線，複雜場景仍可能有雜訊。自適應模式以
+不同亂數種子分批求解 radio map (每批射線數相同)，各批 rss 的平均等同於以總射線數
+單次求解；同時追蹤各網格總 rss (所有發射器加總) 的批次間變異，以平均值的相對
+標準誤差判斷收斂。有覆蓋的網格中達標比例到 confidence 時停止，或在時間預算、
+射線總數上限 (samples_per_tx) 用完時停止。
+"""
+
+import logging
+import time
+from typing import Awaitable, Callable, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+from app.core.cancellation import checkpoint
+from app.core.config import (
+    SINR_ADAPTIVE_BATCH_SAMPLES,
+    SINR_ADAPTIVE_CONFIDENCE,
+    SINR_ADAPTIVE_TARGET_REL_ERROR,
+    SINR_ADAPTIVE_TIME_BUDGET_S,
+)
+from app.core.progress import emit
+
+logger = logging.getLogger(__name__)
+
+# 估計變異所需的最少批次數
+MIN_BATCHES = 3
+# 第 k 批使用的亂數種子為 BASE_SEED + k (與 RadioMapSolver 預設種子一致)
+BASE_SEED = 42
+
+# 以 (每批射線數, 種子) 求解一批，回傳形狀 (num_tx, 列 y, 行 x) 的 rss
+BatchSolver = Callable[[int, int], Awaitable[np.ndarray]]
+
+
+class SamplingReport(BaseModel):
+    """此次 radio map 使用的取樣設定與收斂統計"""
+
+    adaptive: bool
+    samples_per_tx: int  # 實際使用的每個發射器射線總數
+    max_samples_per_tx: int
+    batch_samples: int
+    batches: int
+    # fixed (固定射線數)、converged、max_samples 或 time_budget
+    stop_reason: str
+    elapsed_s: float
+    target_rel_error: Optional[float] = None
+    confidence: Optional[float] = None
+    time_budget_s: Optional[float] = None
+    converged: Optional[bool] = None
+    # 有覆蓋網格的相對標準誤差中位數與 confidence 分位數 (批次數不足時為 None)
+    rel_error_median: Optional[float] = None
+    rel_error_quantile: Optional[float] = None
+    converged_fraction: Optional[float] = None
+    covered_cells: Optional[int] = None
+
+
+class ConvergenceTracker:
+    """累積各批 rss 的平均，並以 Welford 法追蹤各網格總 rss 的批次間變異"""
+
+    def __init__(self, target_rel_error: float, confidence: float):
+        self.target_rel_error = target_rel_error
+        self.confidence = confidence
+        self.batches = 0
+        self._rss_sum: Optional[np.ndarray] = None
+        self._mean: Optional[np.ndarray] = None
+        self._m2: Optional[np.ndarray] = None
+
+    def add(self, rss: np.ndarray) -> None:
+        rss = np.asarray(rss, dtype=np.float64)
+        total = rss.sum(axis=0)
+        self.batches += 1
+        if self._rss_sum is None:
+            self._rss_sum = rss.copy()
+            self._mean = total
+            self._m2 = np.zeros_like(total)
+            return
+        if rss.shape != self._rss_sum.shape:
+            raise ValueError(f"批次 rss 形狀 {rss.shape} 與先前的 {self._rss_sum.shape} 不同")
+        self._rss_sum += rss
+        delta = total - self._mean
+        self._mean += delta / self.batches
+        self._m2 += delta * (total - self._mean)
+
+    @property
+    def rss(self) -> np.ndarray:
+        """各發射器 rss 的批次平均"""
+        return self._rss_sum / self.batches
+
+    def rel_error(self) -> Optional[np.ndarray]:
+        """有覆蓋網格的總 rss 平均值相對標準誤差；批次數不足時為 None"""
+        if self.batches < 2:
+            return None
+        covered = self._mean > 0
+        variance = self._m2[covered] / (self.batches - 1)
+        return np.sqrt(variance / self.batches) / self._mean[covered]
+
+    def statistics(self) -> dict:
+        rel = self.rel_error()
+        if rel is None:
+            return {}
+        if rel.size == 0:
+            # 沒有任何網格被射線覆蓋，增加射線也不會改變結果
+            return {"converged": True, "covered_cells": 0, "converged_fraction": 1.0}
+        quantile = float(np.quantile(rel, self.confidence))
+        return {
+            "converged": quantile <= self.target_rel_error,
+            "rel_error_median": float(np.median(rel)),
+            "rel_error_quantile": quantile,
+            "converged_fraction": float(np.mean(rel <= self.target_rel_error)),
+            "covered_cells": int(rel.size),
+        }
+
+
+async def sample_adaptively(
+    solve_batch: BatchSolver,
+    max_samples_per_tx: int,
+    *,
+    batch_samples: int = SINR_ADAPTIVE_BATCH_SAMPLES,
+    target_rel_error: Optional[float] = None,
+    confidence: float = SINR_ADAPTIVE_CONFIDENCE,
+    time_budget_s: Optional[float] = None,
+) -> Tuple[np.ndarray, SamplingReport]:
+    """分批求解直到收斂、時間預算或射線總數上限，回傳平均 rss 與取樣報告
+
+    每批射線數不超過上限的 1/MIN_BATCHES，確保上限內能估計變異；
+    時間預算以已完成批次的平均耗時預測下一批是否會超出。
+    target_rel_error、time_budget_s 未指定時使用設定的預設值。
+    """
+    if target_rel_error is None:
+        target_rel_error = SINR_ADAPTIVE_TARGET_REL_ERROR
+    budget = SINR_ADAPTIVE_TIME_BUDGET_S if time_budget_s is None else time_budget_s
+    batch = max(1, min(batch_samples, max_samples_per_tx // MIN_BATCHES))
+    max_batches = max(1, max_samples_per_tx // batch)
+    tracker = ConvergenceTracker(target_rel_error, confidence)
+    started = time.perf_counter()
+    stats: dict = {}
+    while True:
+        await checkpoint()
+        tracker.add(await solve_batch(batch, BASE_SEED + tracker.batches))
+        elapsed = time.perf_counter() - started
+        stats = tracker.statistics()
+        emit(
+            "sampling",
+            batches=tracker.batches,
+            samples_per_tx=tracker.batches * batch,
+            elapsed_s=elapsed,
+            **stats,
+        )
+        if tracker.batches >= MIN_BATCHES and stats.get("converged"):
+            stop_reason = "converged"
+        elif tracker.batches >= max_batches:
+            stop_reason = "max_samples"
+        elif elapsed + elapsed / tracker.batches > budget:
+            stop_reason = "time_budget"
+        else:
+            continue
+        break
+
+    stats.setdefault("converged", False)
+    report = SamplingReport(
+        adaptive=True,
+        samples_per_tx=tracker.batches * batch,
+        max_samples_per_tx=max_samples_per_tx,
+        batch_samples=batch,
+        batches=tracker.batches,
+        stop_reason=stop_reason,
+        elapsed_s=elapsed,
+        target_rel_error=target_rel_error,
+        confidence=confidence,
+        time_budget_s=budget,
+        **stats,
+    )
+    logger.info(
+        f"自適應取樣：{report.batches} 批共 {report.samples_per_tx} 條射線/發射器，"
+        f"停止原因 {stop_reason}，相對誤差分位數 {report.rel_error_quantile}"
+    )
+    return tracker.rss, report
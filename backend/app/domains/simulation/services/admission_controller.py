@@ -0,0 +1,181 @@
+"""
+模擬工作的准入控制
+
+依資源估計決定每個模擬工作的去向：
+- 估計記憶體超過上限或執行時間超過 SIMULATION_MAX_RUNTIME_S 時，SINR 地圖先嘗試
+  調降 samples_per_tx / 放大 cell_size，仍無法符合時拒絕；
+- 工作所屬優先等級的佇列已滿，或估計排隊時間超過 SIMULATION_MAX_QUEUE_WAIT_S
+  時拒絕 (API 回傳 429 與估計值)；
+- 其餘工作交給 simulation_scheduler 依優先等級與客戶端公平性排隊。
+
+工作完成後以實際耗時與 RSS 峰值增量校正成本模型。
+"""
+
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from app.core.config import SIMULATION_MAX_QUEUE_WAIT_S, SIMULATION_MAX_RUNTIME_S
+from app.core.metrics import (
+    SIMULATION_DOWNGRADED,
+    SIMULATION_REJECTED,
+    SIMULATION_RUNTIME_PREDICTION_RATIO,
+    capture_spans,
+)
+from app.domains.simulation.models.simulation_model import SimulationPriority
+from app.domains.simulation.services.resource_estimator import (
+    ResourceEstimate,
+    check_memory_limit,
+    cost_model,
+    runtime_features,
+    with_radio_map_parameters,
+)
+from app.domains.simulation.services.simulation_scheduler import (
+    SimulationScheduler,
+    simulation_scheduler,
+)
+
+logger = logging.getLogger(__name__)
+
+# SINR 地圖調降的下限與上限
+MIN_SAMPLES_PER_TX = 10**5
+MAX_CELL_SIZE = 10.0
+MAX_DOWNGRADE_STEPS = 16
+
+
+class AdmissionRejected(Exception):
+    """工作未被接受；reason 為 memory、runtime、queue_full 或 queue_wait"""
+
+    def __init__(self, reason: str, estimate: ResourceEstimate, retry_after: Optional[float] = None):
+        super().__init__(reason)
+        self.reason = reason
+        self.estimate = estimate
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """依資源估計決定工作去向，接受的工作交給排程器執行"""
+
+    def __init__(
+        self,
+        scheduler: SimulationScheduler = simulation_scheduler,
+        max_queue_wait_s: Optional[float] = SIMULATION_MAX_QUEUE_WAIT_S,
+        max_runtime_s: Optional[float] = SIMULATION_MAX_RUNTIME_S,
+    ):
+        self.scheduler = scheduler
+        self.max_queue_wait_s = max_queue_wait_s
+        self.max_runtime_s = max_runtime_s
+
+    def _fits(self, estimate: ResourceEstimate) -> bool:
+        if estimate.exceeds_memory_limit:
+            return False
+        return self.max_runtime_s is None or estimate.runtime_s <= self.max_runtime_s
+
+    def _downgrade(self, estimate: ResourceEstimate) -> ResourceEstimate:
+        """逐步降低 SINR 地圖的射線數或網格解析度，直到符合限制或到達下限"""
+        original = {"cell_size": estimate.cell_size, "samples_per_tx": estimate.samples_per_tx}
+        candidate = estimate
+        for _ in range(MAX_DOWNGRADE_STEPS):
+            if self._fits(candidate):
+                break
+            coefficients = cost_model.coefficients(candidate.artifact)
+            features = runtime_features(candidate)
+            samples = candidate.samples_per_tx or MIN_SAMPLES_PER_TX
+            cell_size = candidate.cell_size or 1.0
+            # 優先調降成本較高的一項 (射線追蹤或網格)
+            rays_cost = coefficients.get("rays", 0.0) * features.get("rays", 0.0)
+            cells_cost = coefficients.get("cells", 0.0) * features.get("cells", 0.0)
+            if samples > MIN_SAMPLES_PER_TX and (rays_cost >= cells_cost or cell_size >= MAX_CELL_SIZE):
+                samples = max(MIN_SAMPLES_PER_TX, samples // 2)
+            elif cell_size < MAX_CELL_SIZE:
+                cell_size = min(MAX_CELL_SIZE, cell_size * 2)
+            else:
+                break
+            candidate = with_radio_map_parameters(
+                candidate, cell_size=cell_size, samples_per_tx=samples
+            )
+        if candidate is not estimate:
+            candidate.downgraded_from = original
+        return candidate
+
+    def admit(
+        self,
+        estimate: ResourceEstimate,
+        allow_downgrade: bool = True,
+        preview: bool = False,
+        priority: Optional[SimulationPriority] = None,
+    ) -> ResourceEstimate:
+        """決定工作是否可排隊，回傳 (可能已調降的) 估計；不接受時拋出 AdmissionRejected
+
+        preview=True 時只試算 (供客戶端事先顯示 ETA)，不記錄指標。
+        """
+        if not self._fits(estimate) and allow_downgrade and estimate.artifact == "sinr_map":
+            estimate = self._downgrade(estimate)
+            if not preview and estimate.downgraded_from is not None and self._fits(estimate):
+                SIMULATION_DOWNGRADED.inc(estimate.artifact)
+                logger.info(
+                    f"Downgraded {estimate.artifact} job from {estimate.downgraded_from} to "
+                    f"cell_size={estimate.cell_size}, samples_per_tx={estimate.samples_per_tx}"
+                )
+
+        level = self.scheduler.effective_priority(priority, estimate)
+        estimate.priority = level.value
+        estimate.queue_wait_s = self.scheduler.predicted_wait(level)
+        estimate.eta_s = estimate.queue_wait_s + estimate.runtime_s
+        if preview:
+            if estimate.exceeds_memory_limit:
+                raise AdmissionRejected("memory", estimate)
+        elif not check_memory_limit(estimate):
+            raise AdmissionRejected("memory", estimate)
+        if self.max_runtime_s is not None and estimate.runtime_s > self.max_runtime_s:
+            raise self._reject("runtime", estimate, preview=preview)
+        if self.scheduler.queue_full(level):
+            raise self._reject("queue_full", estimate, estimate.queue_wait_s, preview)
+        if self.max_queue_wait_s is not None and estimate.queue_wait_s > self.max_queue_wait_s:
+            raise self._reject("queue_wait", estimate, estimate.queue_wait_s, preview)
+        return estimate
+
+    def _reject(
+        self,
+        reason: str,
+        estimate: ResourceEstimate,
+        retry_after: Optional[float] = None,
+        preview: bool = False,
+    ) -> AdmissionRejected:
+        if not preview:
+            SIMULATION_REJECTED.inc(estimate.artifact, reason)
+            logger.warning(
+                f"Rejecting {estimate.artifact} job ({reason}): estimated runtime "
+                f"{estimate.runtime_s:.1f}s, queue wait {estimate.queue_wait_s:.1f}s, "
+                f"{self.scheduler.running} running, {self.scheduler.queued()} queued "
+                f"({estimate.priority})"
+            )
+        return AdmissionRejected(reason, estimate, retry_after)
+
+    @asynccontextmanager
+    async def slot(
+        self, estimate: ResourceEstimate, client_id: str = "anonymous"
+    ) -> AsyncIterator[ResourceEstimate]:
+        """依估計的優先等級排隊直到取得 worker；區塊結束後以實際耗時校正成本模型"""
+        priority = SimulationPriority(estimate.priority or SimulationPriority.STANDARD)
+        async with self.scheduler.slot(estimate, priority, client_id):
+            with capture_spans() as spans:
+                yield estimate
+
+        span = spans[-1] if spans else None
+        # 重用快取 rss 的工作只求解部分發射器，耗時不代表成本模型的特徵
+        if (
+            span is not None
+            and span.outcome == "success"
+            and not span.attributes.get("rss_reused")
+        ):
+            if estimate.runtime_s > 0:
+                SIMULATION_RUNTIME_PREDICTION_RATIO.observe(
+                    span.duration / estimate.runtime_s, estimate.artifact
+                )
+            # 與其他模擬重疊時 RSS 包含對方的配置，不用於校正記憶體估計
+            peak_rss_delta = None if span.overlapped else span.peak_rss_delta
+            cost_model.observe(estimate, span.duration, peak_rss_delta)
+
+
+admission_controller = AdmissionController()
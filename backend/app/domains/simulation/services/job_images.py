@@ -0,0 +1,41 @@
+"""
+各模擬工作的輸出圖像
+
+CFR、SINR 地圖、延遲多普勒與通道響應圖依 job_id 寫入 JOB_IMAGE_DIR，並行執行的
+工作不會覆寫彼此的圖檔；回應串流完成後檔案保留一段時間，再由 cleanup_images 刪除。
+"""
+
+import logging
+import time
+from pathlib import Path
+
+from app.core.config import JOB_IMAGE_DIR
+
+logger = logging.getLogger(__name__)
+
+# 工作圖像的保留時間 (秒)
+JOB_IMAGE_RETENTION_S = 600.0
+
+
+def job_image_path(job_id: str, artifact: str) -> Path:
+    return JOB_IMAGE_DIR / f"{job_id}_{artifact}.png"
+
+
+def cleanup_images(directory: Path, max_age_s: float = JOB_IMAGE_RETENTION_S) -> int:
+    """刪除目錄中超過保留時間的圖像，回傳刪除數量"""
+    if not directory.exists():
+        return 0
+    cutoff = time.time() - max_age_s
+    removed = 0
+    for path in directory.glob("*.png"):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except OSError as e:
+            logger.warning(f"無法刪除過期的圖像 {path}: {e}")
+    return removed
+
+
+def cleanup_job_images(max_age_s: float = JOB_IMAGE_RETENTION_S) -> int:
+    return cleanup_images(JOB_IMAGE_DIR, max_age_s)
@@ -0,0 +1,96 @@
+"""
+漸進式多解析度 SINR 地圖
+
+先以大網格、少射線的粗略地圖快速回應，再逐級細化到請求的 cell_size 與
+samples_per_tx。最粗一級從請求參數縮小 (網格每級 ×2、射線每級 ÷10) 後，依成本模型
+繼續減少射線、放大網格，直到估計執行時間不超過 SINR_PROGRESSIVE_FIRST_LEVEL_S
+(或固定成本為主、再縮小已無效果)；
+中間各級在最粗與最終參數之間等比內插。
+"""
+
+import logging
+from pathlib import Path
+from typing import List
+
+from app.core.config import (
+    SINR_LEVEL_IMAGE_DIR,
+    SINR_PROGRESSIVE_FIRST_LEVEL_S,
+    SINR_PROGRESSIVE_LEVELS,
+)
+from app.domains.simulation.services.job_images import cleanup_images
+from app.domains.simulation.services.resource_estimator import (
+    ResourceEstimate,
+    with_radio_map_parameters,
+)
+
+logger = logging.getLogger(__name__)
+
+# 相鄰兩級的網格放大倍率與射線縮減倍率
+CELL_SIZE_STEP = 2.0
+SAMPLES_STEP = 10
+# 粗略級的射線數下限與依成本模型縮小的最多次數
+MIN_PROGRESSIVE_SAMPLES = 10**4
+MAX_COARSEN_STEPS = 8
+# 每次縮小至少要減少的估計執行時間比例
+MIN_COARSEN_GAIN = 0.9
+# 各級圖像的保留時間 (秒)
+LEVEL_IMAGE_RETENTION_S = 600.0
+
+
+def plan_levels(
+    estimate: ResourceEstimate,
+    levels: int = SINR_PROGRESSIVE_LEVELS,
+    first_level_s: float = SINR_PROGRESSIVE_FIRST_LEVEL_S,
+) -> List[ResourceEstimate]:
+    """由粗到細的各級估計，最後一級為 estimate 本身；參數相同的相鄰級只保留一個"""
+    if levels <= 1:
+        return [estimate]
+    cell_size = estimate.cell_size or 1.0
+    samples = estimate.samples_per_tx or MIN_PROGRESSIVE_SAMPLES
+    min_samples = min(samples, MIN_PROGRESSIVE_SAMPLES)
+
+    coarse_cell = cell_size * CELL_SIZE_STEP ** (levels - 1)
+    coarse_samples = max(min_samples, samples // SAMPLES_STEP ** (levels - 1))
+    coarse = with_radio_map_parameters(
+        estimate, cell_size=coarse_cell, samples_per_tx=coarse_samples
+    )
+    for _ in range(MAX_COARSEN_STEPS):
+        if coarse.runtime_s <= first_level_s:
+            break
+        cell, count = coarse_cell, coarse_samples
+        if count > min_samples:
+            count = max(min_samples, count // 2)
+        else:
+            cell *= 2
+        candidate = with_radio_map_parameters(estimate, cell_size=cell, samples_per_tx=count)
+        # 固定成本 (場景載入等) 為主時繼續縮小已無明顯效果
+        if candidate.runtime_s > coarse.runtime_s * MIN_COARSEN_GAIN:
+            break
+        coarse, coarse_cell, coarse_samples = candidate, cell, count
+
+    planned = [coarse]
+    for k in range(1, levels - 1):
+        t = k / (levels - 1)
+        planned.append(
+            with_radio_map_parameters(
+                estimate,
+                cell_size=round(coarse_cell ** (1 - t) * cell_size**t, 3),
+                samples_per_tx=int(round(coarse_samples ** (1 - t) * samples**t)),
+            )
+        )
+    planned.append(estimate)
+    return [
+        level
+        for level, finer in zip(planned, planned[1:] + [None])
+        if finer is None
+        or (level.cell_size, level.samples_per_tx) != (finer.cell_size, finer.samples_per_tx)
+    ]
+
+
+def level_image_path(job_id: str, level: int) -> Path:
+    return SINR_LEVEL_IMAGE_DIR / f"{job_id}_{level}.png"
+
+
+def cleanup_level_images(max_age_s: float = LEVEL_IMAGE_RETENTION_S) -> int:
+    """刪除超過保留時間的各級圖像，回傳刪除數量"""
+    return cleanup_images(SINR_LEVEL_IMAGE_DIR, max_age_s)
@@ -0,0 +1,252 @@
+"""
+分塊 SINR 地圖的平行求解與快取
+
+大範圍或細網格的 radio map 依 utils.tile_grid 的全域格點切成分塊，各分塊在
+RADIO_MAP_TILE_WORKERS 個 worker 行程中以 RadioMapSolver (center/size 指定分塊範圍)
+求解，每個發射器的 rss 再依分塊位置拼接並裁切成請求的範圍。
+
+各分塊的 rss 依發射器 (transmitter_rss.transmitter_keys) 個別快取：範圍重疊的請求
+只需求解尚未快取的分塊，設備變更時各分塊也只重新求解受影響的發射器。
+每個分塊仍向全方向發射 samples_per_tx 條射線，網格的取樣密度與單次求解相同。
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.cancellation import DISCONNECT_POLL_INTERVAL, checkpoint
+from app.core.config import RADIO_MAP_TILE_CACHE_MB, RADIO_MAP_TILE_WORKERS
+from app.core.metrics import annotate, metrics_registry
+from app.core.progress import emit
+from app.domains.device.models.device_snapshot import DeviceColumns
+from app.domains.simulation.services.simulation_scheduler import run_blocking
+from app.domains.simulation.services.transmitter_rss import RssCache, transmitter_keys
+from app.domains.simulation.utils.tile_grid import RadioMapTile, TilePlan
+
+logger = logging.getLogger(__name__)
+
+tile_cache = RssCache("radio_map_tiles", int(RADIO_MAP_TILE_CACHE_MB * 2**20))
+
+metrics_registry.gauge(
+    "radio_map_tile_cache_bytes",
+    "Bytes of per-transmitter rss held by the radio map tile cache.",
+    lambda: {(): float(tile_cache.nbytes)},
+)
+
+
+# --- worker 行程 ---
+
+# 每個 worker 行程保留最近載入的場景，後續分塊只需替換發射器
+_worker_scenes: Dict[Tuple[str, float], Any] = {}
+
+
+def _solve_tile(
+    scene_xml: str,
+    tx_rows: Sequence[Tuple[str, List[float], List[float], float]],
+    center: Tuple[float, float, float],
+    size: Tuple[float, float],
+    cell_size: float,
+    samples_per_tx: int,
+    max_depth: int,
+    array_config: Dict[str, Any],
+    seed: int,
+) -> np.ndarray:
+    """求解單一分塊，回傳形狀 (num_tx, 列 y, 行 x) 的 rss (float32)"""
+    from sionna.rt import PlanarArray, RadioMapSolver, Transmitter, load_scene
+
+    key = (scene_xml, os.path.getmtime(scene_xml))
+    scene = _worker_scenes.get(key)
+    if scene is None:
+        _worker_scenes.clear()
+        scene = _worker_scenes[key] = load_scene(scene_xml)
+    scene.tx_array = PlanarArray(**array_config)
+    scene.rx_array = PlanarArray(**array_config)
+    for name in list(scene.transmitters.keys()) + list(scene.receivers.keys()):
+        scene.remove(name)
+    for name, position, orientation, power_dbm in tx_rows:
+        scene.add(
+            Transmitter(
+                name=name, position=position, orientation=orientation, power_dbm=power_dbm
+            )
+        )
+
+    rm = RadioMapSolver()(
+        scene,
+        center=list(center),
+        orientation=[0.0, 0.0, 0.0],
+        size=list(size),
+        cell_size=(cell_size, cell_size),
+        samples_per_tx=samples_per_tx,
+        max_depth=max_depth,
+        seed=seed,
+    )
+    cc = rm.cell_centers.numpy()
+    rss = np.asarray(rm.rss.numpy(), dtype=np.float32).reshape(
+        len(tx_rows), cc.shape[0], cc.shape[1]
+    )
+    # 拼接時假設 x、y 隨索引遞增
+    if cc.shape[1] > 1 and cc[0, 0, 0] > cc[0, -1, 0]:
+        rss = rss[:, :, ::-1]
+    if cc.shape[0] > 1 and cc[0, 0, 1] > cc[-1, 0, 1]:
+        rss = rss[:, ::-1, :]
+    return np.ascontiguousarray(rss)
+
+
+# --- API 行程 ---
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _tile_executor() -> Optional[ProcessPoolExecutor]:
+    """分塊求解的行程池 (spawn：Mitsuba/TensorFlow 不支援 fork)；未設定 worker 時為 None"""
+    global _executor
+    if RADIO_MAP_TILE_WORKERS <= 0:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=RADIO_MAP_TILE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+    return _executor
+
+
+def shutdown_tile_workers() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+async def solve_tiled_rss(
+    scene_xml: str,
+    transmitters: DeviceColumns,
+    plan: TilePlan,
+    *,
+    samples_per_tx: int,
+    max_depth: int,
+    array_config: Dict[str, Any],
+    seed: int = 42,
+) -> np.ndarray:
+    """求解 (或取自快取) plan 的所有分塊，回傳請求範圍的 rss，形狀 (num_tx, 列 y, 行 x)
+
+    各分塊只求解未快取的發射器。等待 worker 期間定期檢查請求是否已被取消，
+    取消時放棄尚未開始的分塊。
+    """
+    keys = transmitter_keys(
+        scene_xml,
+        transmitters,
+        samples_per_tx=samples_per_tx,
+        max_depth=max_depth,
+        array_config=array_config,
+        seed=seed,
+    )
+    n = plan.tile_cells
+    rows, cols = plan.tiles_shape
+    ix0, iy0 = plan.tile_origin[0] // n, plan.tile_origin[1] // n
+    stitched = np.zeros((len(transmitters), rows * n, cols * n), dtype=np.float32)
+
+    def place(tile: RadioMapTile, tx_indices: List[int], rss: np.ndarray) -> None:
+        if rss.shape[1] < n or rss.shape[2] < n:
+            raise ValueError(f"分塊 ({tile.ix}, {tile.iy}) 的網格數 {rss.shape[1:]} 小於 {n}×{n}")
+        y, x = (tile.iy - iy0) * n, (tile.ix - ix0) * n
+        stitched[tx_indices, y : y + n, x : x + n] = rss[:, :n, :n]
+
+    # 各分塊尚未快取的發射器列索引
+    missing: List[Tuple[RadioMapTile, List[int]]] = []
+    for tile in plan.tiles:
+        absent = []
+        for i, key in enumerate(keys):
+            rss = tile_cache.get((key, tile.key))
+            if rss is None:
+                absent.append(i)
+            else:
+                place(tile, [i], rss[np.newaxis])
+        if absent:
+            missing.append((tile, absent))
+    total = len(plan.tiles)
+    cached = total - len(missing)
+    solved = sum(len(absent) for _, absent in missing)
+    annotate(tiles=total, tiles_cached=cached, tile_transmitters_solved=solved)
+    if solved < total * len(keys):
+        annotate(rss_reused=True)
+    emit("tiles", total=total, cached=cached, completed=cached)
+    logger.info(
+        f"分塊 radio map：{total} 個分塊，{cached} 個取自快取，"
+        f"需求解 {solved}/{total * len(keys)} 個分塊發射器"
+    )
+
+    tx_rows = list(
+        zip(
+            transmitters.names,
+            transmitters.positions.tolist(),
+            transmitters.orientations.tolist(),
+            transmitters.power_dbm.tolist(),
+        )
+    )
+
+    def arguments(tile: RadioMapTile, tx_indices: List[int]) -> tuple:
+        return (
+            scene_xml,
+            [tx_rows[i] for i in tx_indices],
+            tile.center,
+            tile.size,
+            tile.cell_size,
+            samples_per_tx,
+            max_depth,
+            array_config,
+            seed,
+        )
+
+    completed = cached
+
+    def finish(tile: RadioMapTile, tx_indices: List[int], rss: np.ndarray) -> None:
+        nonlocal completed
+        for i, row in zip(tx_indices, rss):
+            tile_cache.put((keys[i], tile.key), row)
+        place(tile, tx_indices, rss)
+        completed += 1
+        emit("tiles", total=total, cached=cached, completed=completed, tile=[tile.ix, tile.iy])
+
+    executor = _tile_executor()
+    if executor is None:
+        for tile, tx_indices in missing:
+            await checkpoint()
+            rss = await run_blocking(_solve_tile, *arguments(tile, tx_indices))
+            finish(tile, tx_indices, rss)
+    elif missing:
+        loop = asyncio.get_running_loop()
+        pending = {
+            loop.run_in_executor(executor, _solve_tile, *arguments(tile, tx_indices)): (
+                tile,
+                tx_indices,
+            )
+            for tile, tx_indices in missing
+        }
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending, timeout=DISCONNECT_POLL_INTERVAL, return_when=asyncio.FIRST_COMPLETED
+                )
+                for future in done:
+                    finish(*pending.pop(future), future.result())
+                await checkpoint()
+        except BrokenProcessPool:
+            # worker 行程異常結束 (例如記憶體不足被終止)，下次請求重新建立行程池
+            shutdown_tile_workers()
+            raise
+        finally:
+            for future in pending:
+                future.cancel()
+
+    y_slice, x_slice = plan.crop()
+    return stitched[:, y_slice, x_slice]
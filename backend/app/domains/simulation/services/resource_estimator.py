@@ -0,0 +1,416 @@
+"""
+模擬工作的資源估算
+
+在載入場景之前，依設備數量、場景幾何與請求參數估計工作的記憶體用量與執行時間，
+超過 SIMULATION_MEMORY_LIMIT_MB 的工作在開始前即被拒絕。
+
+執行時間以各圖表的線性成本模型預測 (特徵為場景三角形數、發射器數、max_depth、
+samples_per_tx 與網格大小)，每次工作完成後以實際耗時重新校正：以預設係數為先驗
+的脊迴歸 (ridge regression)，觀測值少時接近預設值，觀測值多時貼近實測。
+設定 SIMULATION_COST_MODEL_PATH 時觀測值會保存到檔案，也可載入
+benchmarks.simulation_benchmark 的結果檔作為初始校正資料。
+"""
+
+import json
+import logging
+import math
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import (
+    RADIO_MAP_TILE_WORKERS,
+    SIMULATION_COST_MODEL_PATH,
+    SIMULATION_MEMORY_LIMIT_MB,
+)
+from app.core.metrics import SIMULATION_REJECTED
+from app.domains.device.adapters.sqlmodel_device_repository import SQLModelDeviceRepository
+from app.domains.device.models.device_model import DeviceRole
+from app.domains.simulation.utils.scene_stats import SceneStats, scene_stats
+from app.domains.simulation.utils.tile_grid import DEFAULT_MAP_EXTENT, default_extent, plan_tiles
+
+logger = logging.getLogger(__name__)
+
+# 生成函數使用的 OFDM 網格 (時間步 × 子載波)
+OFDM_GRID = 1024 * 1024
+COMPLEX_BYTES = 16  # complex128
+
+# 每個工作在 NumPy 陣列之外的基本用量 (場景、求解器與 matplotlib)
+BASE_BYTES = 512 * 2**20
+# 場景每個三角形的記憶體 (幾何與 BVH)
+BYTES_PER_TRIANGLE = 256
+# RadioMapSolver 每條取樣射線的狀態
+BYTES_PER_RAY = 96
+
+# 每種圖表同時存在的 (num_tx, T, F) complex 陣列份數：
+# cfr 為 paths.cfr 輸出與其副本；doppler 另有功率加權與 FFT 的暫存；
+# channel_response 另有依角色索引取出的副本與三個加總結果
+FULL_GRID_COPIES = {"cfr": 2.0, "doppler": 4.0, "channel_response": 3.0}
+
+# 各生成函數的 max_depth 預設值
+DEFAULT_MAX_DEPTH = {"cfr": 10, "sinr_map": 10, "doppler": 3, "channel_response": 10}
+
+# 執行時間模型的預設係數 (秒 / 特徵單位)，作為校正前的先驗
+RUNTIME_PRIORS: Dict[str, Dict[str, float]] = {
+    "cfr": {"base": 2.0, "triangles": 0.5, "paths": 0.02, "grid": 0.2},
+    "doppler": {"base": 2.0, "triangles": 0.5, "paths": 0.02, "grid": 0.4},
+    "channel_response": {"base": 3.0, "triangles": 0.5, "paths": 0.02, "grid": 0.3},
+    "sinr_map": {"base": 2.0, "triangles": 0.5, "rays": 1.0, "cells": 0.5},
+}
+# 脊迴歸向先驗收斂的強度；約等於先驗相當的觀測筆數
+PRIOR_WEIGHT = 3.0
+# 每種圖表保留的校正觀測筆數
+MAX_OBSERVATIONS = 200
+# 記憶體估計的校正倍率：至少需要的觀測筆數與允許範圍
+MEMORY_CALIBRATION_MIN_SAMPLES = 3
+MEMORY_SCALE_RANGE = (0.25, 4.0)
+
+
+class ResourceEstimate(BaseModel):
+    """模擬工作的資源估計"""
+
+    artifact: str
+    scene_xml: Optional[str] = None
+    transmitters: int = 0
+    receivers: int = 0
+    scene_triangles: int = 0
+    grid_cells: int = 0
+    cell_size: Optional[float] = None
+    samples_per_tx: Optional[int] = None
+    max_depth: Optional[int] = None
+    map_center: Optional[Tuple[float, float]] = Field(None, description="SINR 地圖範圍的中心 (m)")
+    map_size: Optional[Tuple[float, float]] = Field(None, description="SINR 地圖範圍的大小 (m)")
+    tile_size: Optional[float] = Field(None, description="分塊邊長 (m)；None 為單次求解")
+    tiles: int = Field(0, description="分塊數")
+    memory_bytes: float = Field(0.0, description="估計的記憶體峰值 (bytes)")
+    memory_limit_bytes: Optional[float] = None
+    runtime_s: float = Field(0.0, description="估計的執行時間 (秒)")
+    calibration_samples: int = Field(0, description="執行時間模型已校正的觀測筆數")
+    priority: Optional[str] = Field(None, description="排程的優先等級")
+    queue_wait_s: float = Field(0.0, description="估計的排隊等待時間 (秒)")
+    eta_s: float = Field(0.0, description="估計的完成時間 (排隊 + 執行，秒)")
+    downgraded_from: Optional[Dict[str, Any]] = Field(
+        None, description="為符合伺服器限制而調降前的參數"
+    )
+
+    @property
+    def exceeds_memory_limit(self) -> bool:
+        return self.memory_limit_bytes is not None and self.memory_bytes > self.memory_limit_bytes
+
+
+def memory_limit_bytes() -> Optional[float]:
+    return SIMULATION_MEMORY_LIMIT_MB * 2**20 if SIMULATION_MEMORY_LIMIT_MB else None
+
+
+def radio_map_cells(
+    stats: SceneStats, cell_size: float, map_size: Optional[Tuple[float, float]] = None
+) -> int:
+    """指定範圍 (或 RadioMapSolver 預設覆蓋的場景水平範圍) 的網格數"""
+    width, height = map_size or stats.footprint
+    if width <= 0 or height <= 0:
+        width = height = DEFAULT_MAP_EXTENT
+    return math.ceil(width / cell_size) * math.ceil(height / cell_size)
+
+
+def estimate_memory(
+    artifact: str,
+    transmitters: int,
+    stats: SceneStats,
+    *,
+    cell_size: float = 1.0,
+    samples_per_tx: int = 10**7,
+    map_center: Optional[Tuple[float, float]] = None,
+    map_size: Optional[Tuple[float, float]] = None,
+    tile_size: Optional[float] = None,
+) -> ResourceEstimate:
+    """依設備數量與場景估計工作的記憶體峰值
+
+    分塊的 SINR 地圖另計拼接陣列，以及同時求解分塊的 worker 行程各自的場景、
+    射線與分塊 rss。
+    """
+    estimate = ResourceEstimate(
+        artifact=artifact,
+        transmitters=transmitters,
+        scene_triangles=stats.triangles,
+        memory_limit_bytes=memory_limit_bytes(),
+    )
+    memory = BASE_BYTES + stats.triangles * BYTES_PER_TRIANGLE
+    if artifact in FULL_GRID_COPIES:
+        memory += FULL_GRID_COPIES[artifact] * transmitters * OFDM_GRID * COMPLEX_BYTES
+    elif artifact == "sinr_map":
+        estimate.cell_size = cell_size
+        estimate.samples_per_tx = samples_per_tx
+        estimate.map_center = map_center
+        estimate.map_size = map_size
+        if tile_size:
+            default_center, default_size = default_extent(stats)
+            plan = plan_tiles(
+                map_center or default_center, map_size or default_size, cell_size, tile_size
+            )
+            cells = plan.grid_cells
+            estimate.tile_size = tile_size
+            estimate.tiles = len(plan.tiles)
+            # 拼接後的 rss 與裁切後的副本、加總與 SINR
+            memory += transmitters * len(plan.tiles) * plan.tile_grid_cells * 4
+            memory += transmitters * cells * 4 + cells * 8 * 3
+            # 同時求解的分塊：各 worker 行程的場景、射線狀態與分塊 rss
+            parallel = min(max(RADIO_MAP_TILE_WORKERS, 1), len(plan.tiles))
+            memory += parallel * (
+                BASE_BYTES
+                + stats.triangles * BYTES_PER_TRIANGLE
+                + transmitters * plan.tile_grid_cells * 4 * 2
+                + transmitters * samples_per_tx * BYTES_PER_RAY
+            )
+        else:
+            cells = radio_map_cells(stats, cell_size, map_size)
+            # 每個發射器的 rss (float32) 及其副本，加上加總與 SINR (float64)
+            memory += transmitters * cells * 4 * 2 + cells * 8 * 3
+            memory += transmitters * samples_per_tx * BYTES_PER_RAY
+        estimate.grid_cells = cells
+    estimate.memory_bytes = float(memory)
+    return estimate
+
+
+def runtime_features(estimate: ResourceEstimate) -> Dict[str, float]:
+    """執行時間模型的特徵，單位讓各係數落在相近的量級"""
+    depth = estimate.max_depth if estimate.max_depth is not None else DEFAULT_MAX_DEPTH.get(
+        estimate.artifact, 10
+    )
+    transmitters = max(estimate.transmitters, 1)
+    features = {"base": 1.0, "triangles": estimate.scene_triangles / 1e5}
+    if estimate.artifact == "sinr_map":
+        # 射線追蹤量 (每 10^7 條射線 × 深度) 與 rss/SINR 網格 (每 10^6 格)
+        samples = estimate.samples_per_tx or 0
+        features["rays"] = transmitters * samples * max(depth, 1) / 1e7
+        if estimate.tiles:
+            # 每個分塊各自追蹤全部射線，worker 行程分批平行求解
+            features["rays"] *= math.ceil(estimate.tiles / max(RADIO_MAP_TILE_WORKERS, 1))
+        features["cells"] = transmitters * estimate.grid_cells / 1e6
+    else:
+        # 路徑數量 (發射器 × 接收器 × 深度) 與 OFDM 網格運算 (每個發射器 10^6 格)
+        features["paths"] = transmitters * max(estimate.receivers, 1) * max(depth, 1)
+        features["grid"] = transmitters * OFDM_GRID / 1e6
+    return features
+
+
+class CostModel:
+    """各圖表的線性執行時間模型，以實際耗時線上校正"""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path
+        self._observations: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._coefficients: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        if path is not None and path.exists():
+            self.load(path)
+
+    def samples(self, artifact: str) -> int:
+        return len(self._observations.get(artifact, ()))
+
+    def coefficients(self, artifact: str) -> Dict[str, float]:
+        with self._lock:
+            if artifact not in self._coefficients:
+                self._coefficients[artifact] = self._fit(artifact)
+            return self._coefficients[artifact]
+
+    def _fit(self, artifact: str) -> Dict[str, float]:
+        """以先驗為中心的非負脊迴歸
+
+        觀測中沒有變化的特徵 (例如只跑過同一個場景時的三角形數) 無法與常數項區分，
+        維持先驗係數，只校正常數項與有變化的特徵。
+        """
+        prior = RUNTIME_PRIORS.get(artifact, {"base": 5.0})
+        observations = self._observations.get(artifact)
+        if not observations:
+            return dict(prior)
+        names = list(prior)
+        X = np.array([[obs["features"].get(name, 0.0) for name in names] for obs in observations])
+        y = np.array([obs["duration_s"] for obs in observations])
+        theta0 = np.array([prior[name] for name in names])
+        span = X.max(axis=0) - X.min(axis=0)
+        fitted = np.array([name == "base" or span[i] > 1e-9 for i, name in enumerate(names)])
+        y = y - X[:, ~fitted] @ theta0[~fitted]
+        X = X[:, fitted]
+        # 每個特徵以觀測的尺度正規化，讓先驗的強度與特徵單位無關
+        scale = np.maximum(np.abs(X).max(axis=0), 1e-9)
+        Xs = X / scale
+        lhs = Xs.T @ Xs + PRIOR_WEIGHT * np.eye(Xs.shape[1])
+        rhs = Xs.T @ y + PRIOR_WEIGHT * theta0[fitted] * scale
+        theta = theta0.copy()
+        theta[fitted] = np.clip(np.linalg.solve(lhs, rhs), 0.0, None) / scale
+        return {name: float(value) for name, value in zip(names, theta)}
+
+    def predict(self, estimate: ResourceEstimate) -> float:
+        coefficients = self.coefficients(estimate.artifact)
+        features = runtime_features(estimate)
+        return sum(coefficients.get(name, 0.0) * value for name, value in features.items())
+
+    def memory_scale(self, artifact: str) -> float:
+        """實測 RSS 峰值增量相對於估計 (扣除基本用量) 的中位數倍率"""
+        with self._lock:
+            ratios = [
+                obs["peak_rss_delta_bytes"] / obs["memory_variable_bytes"]
+                for obs in self._observations.get(artifact, ())
+                if obs.get("peak_rss_delta_bytes") and obs.get("memory_variable_bytes")
+            ]
+        if len(ratios) < MEMORY_CALIBRATION_MIN_SAMPLES:
+            return 1.0
+        low, high = MEMORY_SCALE_RANGE
+        return float(np.clip(np.median(ratios), low, high))
+
+    def calibrate(self, estimate: ResourceEstimate) -> ResourceEstimate:
+        """填入預測的執行時間並以實測倍率校正記憶體估計"""
+        scale = self.memory_scale(estimate.artifact)
+        if scale != 1.0:
+            variable = max(estimate.memory_bytes - BASE_BYTES, 0.0)
+            estimate.memory_bytes = BASE_BYTES + variable * scale
+        estimate.runtime_s = self.predict(estimate)
+        estimate.calibration_samples = self.samples(estimate.artifact)
+        estimate.eta_s = estimate.queue_wait_s + estimate.runtime_s
+        return estimate
+
+    def observe(
+        self,
+        estimate: ResourceEstimate,
+        duration_s: float,
+        peak_rss_delta: Optional[float] = None,
+        save: bool = True,
+    ) -> None:
+        """記錄一次實際耗時與記憶體並重新校正該圖表的係數"""
+        if estimate.tiles and RADIO_MAP_TILE_WORKERS > 0:
+            # 分塊在 worker 行程中求解，本行程的 RSS 不代表工作的記憶體用量
+            peak_rss_delta = None
+        observation = {
+            "artifact": estimate.artifact,
+            "features": runtime_features(estimate),
+            "duration_s": float(duration_s),
+            "predicted_s": estimate.runtime_s,
+            "memory_variable_bytes": max(estimate.memory_bytes - BASE_BYTES, 0.0),
+            "peak_rss_delta_bytes": peak_rss_delta,
+        }
+        with self._lock:
+            self._observations.setdefault(
+                estimate.artifact, deque(maxlen=MAX_OBSERVATIONS)
+            ).append(observation)
+            self._coefficients.pop(estimate.artifact, None)
+        if save and self.path is not None:
+            self.save(self.path)
+
+    def observations(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [obs for series in self._observations.values() for obs in series]
+
+    def save(self, path: Path) -> None:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps({"observations": self.observations()}))
+        except OSError as e:
+            logger.warning(f"Failed to save cost model observations to {path}: {e}")
+
+    def load(self, path: Path) -> int:
+        """載入保存的觀測值或 simulation_benchmark 的結果檔，回傳載入筆數"""
+        try:
+            data = json.loads(Path(path).read_text())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to load cost model observations from {path}: {e}")
+            return 0
+        if "results" in data:
+            loaded = 0
+            for case in data["results"]:
+                if not case.get("success") or case.get("artifact") not in RUNTIME_PRIORS:
+                    continue
+                stats = scene_stats(case["scene_xml"]) if case.get("scene_xml") else SceneStats()
+                estimate = estimate_memory(
+                    case["artifact"],
+                    case.get("devices", 1),
+                    stats,
+                    cell_size=case.get("cell_size") or 1.0,
+                    samples_per_tx=case.get("samples_per_tx") or 10**7,
+                )
+                estimate.receivers = 1
+                estimate.max_depth = case.get("max_depth")
+                self.observe(estimate, case["median_s"], save=False)
+                loaded += 1
+            return loaded
+        observations = data.get("observations", [])
+        with self._lock:
+            for obs in observations:
+                self._observations.setdefault(
+                    obs["artifact"], deque(maxlen=MAX_OBSERVATIONS)
+                ).append(obs)
+            self._coefficients.clear()
+        return len(observations)
+
+
+cost_model = CostModel(SIMULATION_COST_MODEL_PATH)
+
+
+async def estimate_job(
+    session: AsyncSession,
+    artifact: str,
+    scene_xml: Optional[str] = None,
+    *,
+    max_depth: Optional[int] = None,
+    cell_size: float = 1.0,
+    samples_per_tx: int = 10**7,
+    map_center: Optional[Tuple[float, float]] = None,
+    map_size: Optional[Tuple[float, float]] = None,
+    tile_size: Optional[float] = None,
+) -> ResourceEstimate:
+    """以活躍設備的角色統計與場景幾何估計工作資源 (不載入場景)"""
+    counts = await SQLModelDeviceRepository(session).count_active_by_role()
+    transmitters = counts[DeviceRole.DESIRED.value] + counts[DeviceRole.JAMMER.value]
+    stats = scene_stats(scene_xml) if scene_xml else SceneStats()
+    estimate = estimate_memory(
+        artifact,
+        transmitters,
+        stats,
+        cell_size=cell_size,
+        samples_per_tx=samples_per_tx,
+        map_center=map_center,
+        map_size=map_size,
+        tile_size=tile_size,
+    )
+    estimate.scene_xml = scene_xml
+    estimate.receivers = counts[DeviceRole.RECEIVER.value]
+    estimate.max_depth = max_depth if max_depth is not None else DEFAULT_MAX_DEPTH.get(artifact)
+    return cost_model.calibrate(estimate)
+
+
+def with_radio_map_parameters(
+    estimate: ResourceEstimate, *, cell_size: float, samples_per_tx: int
+) -> ResourceEstimate:
+    """以不同的 cell_size 與 samples_per_tx 重新估計 SINR 地圖工作"""
+    stats = scene_stats(estimate.scene_xml) if estimate.scene_xml else SceneStats()
+    variant = estimate_memory(
+        estimate.artifact,
+        estimate.transmitters,
+        stats,
+        cell_size=cell_size,
+        samples_per_tx=samples_per_tx,
+        map_center=estimate.map_center,
+        map_size=estimate.map_size,
+        tile_size=estimate.tile_size,
+    )
+    variant.scene_xml = estimate.scene_xml
+    variant.receivers = estimate.receivers
+    variant.max_depth = estimate.max_depth
+    return cost_model.calibrate(variant)
+
+
+def check_memory_limit(estimate: ResourceEstimate) -> bool:
+    """估計用量超過上限時記錄拒絕並回傳 False"""
+    if not estimate.exceeds_memory_limit:
+        return True
+    SIMULATION_REJECTED.inc(estimate.artifact, "memory")
+    logger.warning(
+        f"Rejecting {estimate.artifact} job: estimated {estimate.memory_bytes / 2**20:.0f} MiB "
+        f"exceeds the {estimate.memory_limit_bytes / 2**20:.0f} MiB limit "
+        f"({estimate.transmitters} transmitters, {estimate.scene_triangles} triangles)"
+    )
+    return False
@@ -0,0 +1,303 @@
+"""
+模擬工作的優先等級排程
+
+工作分為 interactive、standard 與 batch 三個等級，各等級有獨立的有界佇列：
+- 等級之間嚴格依優先順序分派；
+- 同一等級內以客戶端輪流 (round-robin) 分派，單一客戶端送出大量工作時
+  不會讓其他客戶端一直等待；
+- SIMULATION_INTERACTIVE_WORKERS 個保留 worker 只執行 interactive 工作，
+  其餘 SIMULATION_MAX_CONCURRENT 個一般 worker 三個等級共用。
+
+取得 worker 的工作以 run_blocking 在同樣數量的執行緒中執行場景載入、求解與繪圖，
+事件迴圈不會被長時間的求解阻塞，保留 worker 上的 interactive 工作因此能與一般
+worker 上的 radio map 同時執行。
+"""
+
+import asyncio
+import contextvars
+import functools
+import heapq
+import logging
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, TypeVar
+
+from app.core.cancellation import SimulationCancelled, current_token
+from app.core.config import (
+    SIMULATION_INTERACTIVE_MAX_RUNTIME_S,
+    SIMULATION_INTERACTIVE_WORKERS,
+    SIMULATION_MAX_CONCURRENT,
+    SIMULATION_QUEUE_LIMITS,
+)
+from app.core.metrics import SIMULATION_CANCELLED, metrics_registry
+from app.core.profiling import profile_thread
+from app.core.progress import emit
+from app.domains.simulation.models.simulation_model import SimulationPriority
+from app.domains.simulation.services.resource_estimator import ResourceEstimate
+
+logger = logging.getLogger(__name__)
+
+# 由高到低的優先順序
+PRIORITY_ORDER = (
+    SimulationPriority.INTERACTIVE,
+    SimulationPriority.STANDARD,
+    SimulationPriority.BATCH,
+)
+
+# 未指定等級時依模擬類型決定：單點通道圖表為 interactive，radio map 為 standard
+DEFAULT_PRIORITY = {
+    "cfr": SimulationPriority.INTERACTIVE,
+    "doppler": SimulationPriority.INTERACTIVE,
+    "channel_response": SimulationPriority.INTERACTIVE,
+    "sinr_map": SimulationPriority.STANDARD,
+}
+
+T = TypeVar("T")
+
+SIMULATION_QUEUE_WAIT = metrics_registry.histogram(
+    "simulation_queue_wait_seconds",
+    "Time simulations spent queued before getting a worker, per priority class.",
+    ("priority",),
+)
+
+
+class _Job:
+    def __init__(self, estimate: ResourceEstimate, priority: SimulationPriority, client_id: str):
+        self.estimate = estimate
+        self.priority = priority
+        self.client_id = client_id
+        self.enqueued = time.perf_counter()
+        self.started: Optional[float] = None
+        self.reserved = False
+        self.granted = asyncio.get_running_loop().create_future()
+
+
+class SimulationScheduler:
+    """依優先等級與客戶端公平性分派模擬工作到有限的 worker"""
+
+    def __init__(
+        self,
+        workers: int = SIMULATION_MAX_CONCURRENT,
+        interactive_workers: int = SIMULATION_INTERACTIVE_WORKERS,
+        queue_limits: Optional[Dict[str, int]] = None,
+    ):
+        self.workers = max(1, workers)
+        self.interactive_workers = max(0, interactive_workers)
+        limits = queue_limits or SIMULATION_QUEUE_LIMITS
+        self.queue_limits = {priority: limits[priority.value] for priority in PRIORITY_ORDER}
+        # 各等級：客戶端 → 該客戶端的 FIFO 佇列，依輪流順序排列
+        self._queues: Dict[SimulationPriority, "OrderedDict[str, Deque[_Job]]"] = {
+            priority: OrderedDict() for priority in PRIORITY_ORDER
+        }
+        self._running: List[_Job] = []
+
+    def effective_priority(
+        self, requested: Optional[SimulationPriority], estimate: ResourceEstimate
+    ) -> SimulationPriority:
+        """未指定時依模擬類型決定；估計執行時間過長的工作不能佔用 interactive 保留 worker"""
+        priority = SimulationPriority(
+            requested or DEFAULT_PRIORITY.get(estimate.artifact, SimulationPriority.STANDARD)
+        )
+        if (
+            priority == SimulationPriority.INTERACTIVE
+            and estimate.runtime_s > SIMULATION_INTERACTIVE_MAX_RUNTIME_S
+        ):
+            return SimulationPriority.STANDARD
+        return priority
+
+    def queued(self, priority: Optional[SimulationPriority] = None) -> int:
+        priorities = PRIORITY_ORDER if priority is None else (priority,)
+        return sum(
+            len(jobs) for level in priorities for jobs in self._queues[level].values()
+        )
+
+    @property
+    def running(self) -> int:
+        return len(self._running)
+
+    def queue_full(self, priority: SimulationPriority) -> bool:
+        return self.queued(priority) >= self.queue_limits[priority]
+
+    def predicted_wait(self, priority: SimulationPriority) -> float:
+        """新工作排在同等級與更高等級的所有排隊工作之後時的估計等待時間 (秒)"""
+        now = time.perf_counter()
+        interactive = priority == SimulationPriority.INTERACTIVE
+        slots = [
+            max(job.estimate.runtime_s - (now - job.started), 0.0)
+            for job in self._running
+            if interactive or not job.reserved
+        ]
+        capacity = self.workers + (self.interactive_workers if interactive else 0)
+        slots += [0.0] * max(0, capacity - len(slots))
+        heapq.heapify(slots)
+        for level in PRIORITY_ORDER[: PRIORITY_ORDER.index(priority) + 1]:
+            for jobs in self._queues[level].values():
+                for job in jobs:
+                    heapq.heappush(slots, heapq.heappop(slots) + job.estimate.runtime_s)
+        return slots[0]
+
+    def _free_slot(self, priority: SimulationPriority) -> Optional[bool]:
+        """可用的 worker：True 為保留 worker、False 為一般 worker、None 為沒有"""
+        reserved_busy = sum(1 for job in self._running if job.reserved)
+        general_busy = len(self._running) - reserved_busy
+        # interactive 優先使用保留 worker，讓一般 worker 留給其他等級
+        if priority == SimulationPriority.INTERACTIVE and reserved_busy < self.interactive_workers:
+            return True
+        if general_busy < self.workers:
+            return False
+        return None
+
+    def _next_job(self, priority: SimulationPriority) -> Optional[_Job]:
+        """輪流取出下一個客戶端的最早工作"""
+        clients = self._queues[priority]
+        while clients:
+            client_id, jobs = next(iter(clients.items()))
+            job = jobs.popleft()
+            if jobs:
+                clients.move_to_end(client_id)
+            else:
+                del clients[client_id]
+            if not job.granted.done():
+                return job
+        return None
+
+    def _dispatch(self) -> None:
+        for priority in PRIORITY_ORDER:
+            while self._queues[priority]:
+                reserved = self._free_slot(priority)
+                if reserved is None:
+                    break
+                job = self._next_job(priority)
+                if job is None:
+                    break
+                job.reserved = reserved
+                job.started = time.perf_counter()
+                self._running.append(job)
+                SIMULATION_QUEUE_WAIT.observe(job.started - job.enqueued, priority.value)
+                job.granted.set_result(None)
+
+    def _discard(self, job: _Job) -> None:
+        jobs = self._queues[job.priority].get(job.client_id)
+        if jobs is not None and job in jobs:
+            jobs.remove(job)
+            if not jobs:
+                del self._queues[job.priority][job.client_id]
+
+    @asynccontextmanager
+    async def slot(
+        self, estimate: ResourceEstimate, priority: SimulationPriority, client_id: str
+    ) -> AsyncIterator[None]:
+        """排隊直到取得 worker，區塊結束後釋放；排隊中請求被取消時直接移出佇列"""
+        token = current_token()
+        if token is not None:
+            token.raise_if_cancelled()
+        job = _Job(estimate, priority, client_id)
+
+        def on_cancel(reason: str) -> None:
+            if not job.granted.done():
+                SIMULATION_CANCELLED.inc(estimate.artifact, reason)
+                job.granted.set_exception(SimulationCancelled(reason))
+
+        if token is not None:
+            token.add_callback(on_cancel)
+        emit(
+            "queued",
+            priority=priority.value,
+            jobs_ahead=sum(
+                self.queued(level) for level in PRIORITY_ORDER[: PRIORITY_ORDER.index(priority) + 1]
+            ),
+            queue_wait_s=estimate.queue_wait_s,
+            runtime_s=estimate.runtime_s,
+        )
+        self._queues[priority].setdefault(client_id, deque()).append(job)
+        self._dispatch()
+        try:
+            await job.granted
+        except BaseException:
+            # 排隊中被取消 (客戶端中斷連線、被新請求取代或任務被取消)
+            self._discard(job)
+            if job in self._running:
+                self._running.remove(job)
+                self._dispatch()
+            raise
+        finally:
+            if token is not None:
+                token.remove_callback(on_cancel)
+
+        emit(
+            "started",
+            priority=priority.value,
+            queue_wait_s=job.started - job.enqueued,
+            reserved_worker=job.reserved,
+        )
+        try:
+            yield
+        finally:
+            self._running.remove(job)
+            self._dispatch()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "interactive_workers": self.interactive_workers,
+            "running": {
+                priority.value: sum(1 for job in self._running if job.priority == priority)
+                for priority in PRIORITY_ORDER
+            },
+            "queued": {priority.value: self.queued(priority) for priority in PRIORITY_ORDER},
+            "queue_limits": {priority.value: limit for priority, limit in self.queue_limits.items()},
+            "predicted_wait_s": {
+                priority.value: self.predicted_wait(priority) for priority in PRIORITY_ORDER
+            },
+        }
+
+
+simulation_scheduler = SimulationScheduler()
+
+# 每個 worker 一個執行緒；模擬只在取得 worker 後呼叫 run_blocking，因此不會超出
+_executor = ThreadPoolExecutor(
+    max_workers=simulation_scheduler.workers + simulation_scheduler.interactive_workers,
+    thread_name_prefix="simulation-worker",
+)
+
+
+def _profiled(fn: Callable[..., T], args: tuple, kwargs: Dict[str, Any]) -> T:
+    with profile_thread():
+        return fn(*args, **kwargs)
+
+
+async def run_blocking(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """在模擬 worker 執行緒中執行阻塞的呼叫 (場景載入、求解、繪圖)
+
+    沿用目前的 contextvars；fn 內不應發布進度事件 (進度佇列不是執行緒安全的)。
+    請求正在分析時，執行緒中的呼叫一併納入分析 (profiling.profile_thread)。
+    任務被取消時執行緒無法中斷，等呼叫結束後才傳遞取消，避免 worker 釋放後
+    執行緒仍被佔用。
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(contextvars.copy_context().run, _profiled, fn, args, kwargs)
+    future = loop.run_in_executor(_executor, call)
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        try:
+            await future
+        except BaseException:
+            pass
+        raise
+
+
+def shutdown_simulation_workers() -> None:
+    _executor.shutdown(wait=False, cancel_futures=True)
+
+metrics_registry.gauge(
+    "simulation_queue_depth",
+    "Simulations waiting for a worker, per priority class.",
+    lambda: {
+        (priority.value,): float(simulation_scheduler.queued(priority))
+        for priority in PRIORITY_ORDER
+    },
+    ("priority",),
+)
@@ -1,9 +1,10 @@
 # backend/app/services/sionna_simulation.py
 import logging
 import os
-import matplotlib.pyplot as plt
+import time
+from matplotlib.figure import Figure
 import numpy as np
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from pydantic import BaseModel, Field as PydanticField  # Use Pydantic BaseModel
 from sionna.rt import (
     load_scene,
@@ -19,12 +20,14 @@ from sqlmodel import select
 
 # Import models and config from their new locations
 from app.domains.device.models.device_model import Device, DeviceRole
+from app.domains.device.models.device_snapshot import DeviceColumns
 from app.core.config import (
     NYCU_XML_PATH,
     CFR_PLOT_IMAGE_PATH,
     DOPPLER_IMAGE_PATH,
     CHANNEL_RESPONSE_IMAGE_PATH,
     SINR_MAP_IMAGE_PATH,
+    SINR_DEVICE_MARGIN_M,
     get_scene_xml_path,
 )
 
@@ -33,12 +36,32 @@ from app.domains.device.services.device_service import DeviceService
 from app.domains.device.adapters.sqlmodel_device_repository import (
     SQLModelDeviceRepository,
 )
+from app.domains.device.adapters.sqlmodel_trajectory_repository import (
+    SQLModelTrajectoryRepository,
+)
+from app.domains.device.services.trajectory_service import TrajectoryService
 
 # Import interfaces and models
 from app.domains.simulation.interfaces.simulation_service_interface import (
     SimulationServiceInterface,
 )
 from app.domains.simulation.models.simulation_model import SimulationParameters
+from app.core.cancellation import SimulationCancelled, checkpoint
+from app.core.metrics import annotate, capture_spans, stage, timed_simulation
+from app.domains.simulation.services.adaptive_sampling import (
+    BASE_SEED,
+    SamplingReport,
+    sample_adaptively,
+)
+from app.domains.simulation.services.radio_map_tiles import solve_tiled_rss
+from app.domains.simulation.services.simulation_scheduler import run_blocking
+from app.domains.simulation.services.transmitter_rss import solve_transmitter_rss
+from app.domains.simulation.utils.scene_stats import scene_stats
+from app.domains.simulation.utils.tile_grid import (
+    RADIO_MAP_HEIGHT,
+    default_extent,
+    plan_tiles,
+)
 
 # 新增導入 for GLB rendering
 import trimesh
@@ -209,6 +232,68 @@ def prepare_output_file(output_path, file_desc="圖檔"):
     return True
 
 
+# --- 通用函數：由欄位式設備快照建立發射器 ---
+async def _load_active_devices(
+    session: AsyncSession,
+    time_s: Optional[float] = None,
+    bbox: Optional[Tuple[float, float, float, float]] = None,
+) -> DeviceColumns:
+    """取得欄位式活躍設備快照；指定 time_s 時以設備軌跡在該時刻的位置取代靜態位置
+
+    bbox 為 (min_x, min_y, max_x, max_y) 時只保留範圍內的設備。未指定 time_s 時由資料庫
+    以範圍過濾；指定時設備可能沿軌跡移入或移出範圍，改以該時刻的位置過濾。
+    """
+    device_repository = SQLModelDeviceRepository(session)
+    device_service = DeviceService(device_repository)
+    if time_s is None:
+        return await device_service.get_active_columns(bbox=bbox)
+
+    trajectory_service = TrajectoryService(
+        SQLModelTrajectoryRepository(session), device_repository
+    )
+    devices = await trajectory_service.apply_to_columns(
+        await device_service.get_active_columns(), time_s
+    )
+    if bbox is not None:
+        min_x, min_y, max_x, max_y = bbox
+        x, y = devices.positions[:, 0], devices.positions[:, 1]
+        devices = devices.select((x >= min_x) & (x <= max_x) & (y >= min_y) & (y <= max_y))
+    return devices
+
+
+def _map_bbox(
+    scene_name: str,
+    map_center: Optional[Tuple[float, float]],
+    map_size: Optional[Tuple[float, float]],
+) -> Optional[Tuple[float, float, float, float]]:
+    """地圖範圍向外擴展 SINR_DEVICE_MARGIN_M 的 (min_x, min_y, max_x, max_y)
+
+    未指定 map_size (整個場景) 時為 None，載入所有設備。
+    """
+    if map_size is None:
+        return None
+    center = map_center or default_extent(scene_stats(get_scene_xml_file_path(scene_name)))[0]
+    half_x = map_size[0] / 2 + SINR_DEVICE_MARGIN_M
+    half_y = map_size[1] / 2 + SINR_DEVICE_MARGIN_M
+    return (center[0] - half_x, center[1] - half_y, center[0] + half_x, center[1] + half_y)
+
+
+def _add_transmitters_from_columns(scene, transmitters: DeviceColumns) -> None:
+    """依欄位式快照建立 Sionna 發射器，場景中的發射器順序與快照列順序一致"""
+    for name, pos, ori, p_dbm, role in zip(
+        transmitters.names,
+        transmitters.positions.tolist(),
+        transmitters.orientations.tolist(),
+        transmitters.power_dbm.tolist(),
+        transmitters.roles,
+    ):
+        tx = SionnaTransmitter(
+            name=name, position=pos, orientation=ori, power_dbm=p_dbm
+        )
+        tx.role = role
+        scene.add(tx)
+
+
 # --- 定義新的資料容器 ---
 class DeviceData(BaseModel):
     """用於傳遞設備模型和其處理後的位置列表"""
@@ -424,10 +509,13 @@ def generate_empty_scene_image(output_path: str):
 
 
 # 新增函數: generate_cfr_plot
+@timed_simulation("cfr")
 async def generate_cfr_plot(
     session: AsyncSession,
     output_path: str = str(CFR_PLOT_IMAGE_PATH),
     scene_name: str = "nycu",
+    time_s: Optional[float] = None,
+    max_depth: int = 10,
 ) -> bool:
     """
     生成 Channel Frequency Response (CFR) 圖，基於 Sionna 的模擬。
@@ -441,16 +529,17 @@ async def generate_cfr_plot(
         # 準備輸出檔案
         prepare_output_file(output_path, "CFR 圖檔")
 
-        # 創建設備服務和儲存庫
-        device_repository = SQLModelDeviceRepository(session)
-        device_service = DeviceService(device_repository)
-
-        logger.info("Fetching active receivers from database...")
-        active_receivers = await device_service.get_devices(
-            skip=0, limit=100, role=DeviceRole.RECEIVER.value, active_only=True
+        # 單一查詢取得欄位式活躍設備快照 (不受每角色 100 筆的上限限制)
+        logger.info("Fetching active device columns from database...")
+        with stage("db_fetch"):
+            devices = await _load_active_devices(session, time_s)
+        transmitters = devices.select(
+            devices.role_mask(DeviceRole.DESIRED, DeviceRole.JAMMER)
         )
+        receivers = devices.select(devices.role_mask(DeviceRole.RECEIVER))
+        annotate(transmitters=len(transmitters), receivers=len(receivers))
 
-        if not active_receivers:
+        if len(receivers) == 0:
             logger.warning(
                 "No active receivers found in database. Using default receiver parameters."
             )
@@ -459,95 +548,35 @@ async def generate_cfr_plot(
             rx_position = [0, 0, 20]
         else:
             # 使用第一個活動接收器的參數
-            receiver = active_receivers[0]
-            rx_name = receiver.name
-            rx_position = [
-                receiver.position_x,
-                receiver.position_y,
-                receiver.position_z,
-            ]
+            rx_name = receivers.names[0]
+            rx_position = receivers.positions[0].tolist()
             logger.info(f"Using receiver '{rx_name}' with position {rx_position}")
 
-        # 從資料庫獲取活動的發射器 (desired)
-        logger.info("Fetching active desired transmitters from database...")
-        active_desired = await device_service.get_devices(
-            skip=0, limit=100, role=DeviceRole.DESIRED.value, active_only=True
-        )
-
-        # 從資料庫獲取活動的干擾器 (jammer)
-        logger.info("Fetching active jammers from database...")
-        active_jammers = await device_service.get_devices(
-            skip=0, limit=100, role=DeviceRole.JAMMER.value, active_only=True
-        )
-
-        # 構建 TX_LIST (發射器和干擾器列表)
-        TX_LIST = []
-
-        # 添加發射器
-        if not active_desired:
+        num_desired = int(np.count_nonzero(transmitters.role_mask(DeviceRole.DESIRED)))
+        num_jammers = len(transmitters) - num_desired
+        if num_desired == 0:
             logger.warning(
                 "No active desired transmitters found in database. Simulation might not be meaningful."
             )
-            # 添加默認的發射器參數 # REMOVED
-        else:
-            # 添加從資料庫獲取的發射器
-            for i, tx in enumerate(active_desired):
-                tx_name = tx.name
-                tx_position = [tx.position_x, tx.position_y, tx.position_z]
-                tx_orientation = [tx.orientation_x, tx.orientation_y, tx.orientation_z]
-                tx_power = tx.power_dbm
-
-                TX_LIST.append(
-                    (tx_name, tx_position, tx_orientation, "desired", tx_power)
-                )
-                logger.info(
-                    f"Added desired transmitter: {tx_name}, position: {tx_position}, orientation: {tx_orientation}, power: {tx_power} dBm"
-                )
-
-        # 添加干擾器
-        if not active_jammers:
+        if num_jammers == 0:
             logger.warning(
                 "No active jammers found in database. Interference simulation will not run."
             )
-            # 添加默認的干擾器參數 # REMOVED
-        else:
-            # 添加從資料庫獲取的干擾器
-            for i, jammer in enumerate(active_jammers):
-                jammer_name = jammer.name
-                jammer_position = [
-                    jammer.position_x,
-                    jammer.position_y,
-                    jammer.position_z,
-                ]
-                jammer_orientation = [
-                    jammer.orientation_x,
-                    jammer.orientation_y,
-                    jammer.orientation_z,
-                ]
-                jammer_power = jammer.power_dbm
-
-                TX_LIST.append(
-                    (
-                        jammer_name,
-                        jammer_position,
-                        jammer_orientation,
-                        "jammer",
-                        jammer_power,
-                    )
-                )
-                logger.info(
-                    f"Added jammer: {jammer_name}, position: {jammer_position}, orientation: {jammer_orientation}, power: {jammer_power} dBm"
-                )
+        logger.info(
+            f"Loaded {num_desired} desired transmitters and {num_jammers} jammers"
+        )
 
         # 檢查是否有足夠的發射器和干擾器
-        if not TX_LIST:
+        if len(transmitters) == 0:
             logger.error(
                 "No transmitters or jammers available for simulation. Cannot proceed."
             )
             return False
 
         # 參數設置
-        SCENE_NAME = get_scene_xml_file_path(scene_name)
+        with stage("scene_path"):
+            SCENE_NAME = get_scene_xml_file_path(scene_name)
+        annotate(scene_xml=SCENE_NAME)
         logger.info(f"Loading scene from: {SCENE_NAME}")
 
         TX_ARRAY_CONFIG = {
@@ -564,7 +593,7 @@ async def generate_cfr_plot(
         RX_CONFIG = (rx_name, rx_position)
 
         PATHSOLVER_ARGS = {
-            "max_depth": 10,
+            "max_depth": max_depth,
             "los": True,
             "specular_reflection": True,
             "diffuse_reflection": False,
@@ -580,7 +609,9 @@ async def generate_cfr_plot(
 
         # 場景設置
         logger.info("Setting up scene")
-        scene = load_scene(SCENE_NAME)
+        await checkpoint()
+        with stage("load_scene"):
+            scene = await run_blocking(load_scene, SCENE_NAME)
         scene.tx_array = PlanarArray(**TX_ARRAY_CONFIG)
         scene.rx_array = PlanarArray(**RX_ARRAY_CONFIG)
 
@@ -590,35 +621,24 @@ async def generate_cfr_plot(
 
         # 添加發射器
         logger.info("Adding transmitters")
-
-        def add_tx(scene, name, pos, ori, role, power_dbm):
-            tx = SionnaTransmitter(
-                name=name, position=pos, orientation=ori, power_dbm=power_dbm
-            )
-            tx.role = role
-            scene.add(tx)
-            return tx
-
-        for name, pos, ori, role, p_dbm in TX_LIST:
-            add_tx(scene, name, pos, ori, role, p_dbm)
+        _add_transmitters_from_columns(scene, transmitters)
 
         # 添加接收器
         logger.info(f"Adding receiver '{rx_name}' at position {rx_position}")
         rx_name, rx_pos = RX_CONFIG
         scene.add(SionnaReceiver(name=rx_name, position=rx_pos))
 
-        # 分組發射器
-        tx_names = list(scene.transmitters.keys())
-        all_txs = [scene.get(n) for n in tx_names]
-        idx_des = [i for i, tx in enumerate(all_txs) if tx.role == "desired"]
-        idx_jam = [i for i, tx in enumerate(all_txs) if tx.role == "jammer"]
+        # 分組發射器 (場景中的發射器順序與快照列順序一致)
+        tx_names = list(transmitters.names)
+        idx_des = transmitters.role_indices(DeviceRole.DESIRED)
+        idx_jam = transmitters.role_indices(DeviceRole.JAMMER)
 
         # 檢查是否有發射器和干擾器
-        if not idx_des:
+        if idx_des.size == 0:
             logger.warning(
                 "No desired transmitters available in scene. CFR calculation may not be accurate."
             )
-        if not idx_jam:
+        if idx_jam.size == 0:
             logger.warning(
                 "No jammers available in scene. Interference will not be present in plot."
             )
@@ -628,33 +648,36 @@ async def generate_cfr_plot(
         freqs = subcarrier_frequencies(N_SUBCARRIERS, SUBCARRIER_SPACING)
         for name in tx_names:
             scene.get(name).velocity = [30, 0, 0]
-        paths = PathSolver()(scene, **PATHSOLVER_ARGS)
-
-        def dbm2w(dbm):
-            return 10 ** (dbm / 10) / 1000
+        await checkpoint()
+        with stage("path_solver"):
+            paths = await run_blocking(PathSolver(), scene, **PATHSOLVER_ARGS)
 
-        tx_powers = [dbm2w(scene.get(n).power_dbm) for n in tx_names]
+        # 功率加權直接以快照中的功率陣列向量化計算
+        sqrt_p = np.sqrt(transmitters.power_watts)
         ofdm_symbol_duration = 1 / SUBCARRIER_SPACING
-        H_unit = paths.cfr(
-            frequencies=freqs,
-            sampling_frequency=1 / ofdm_symbol_duration,
-            num_time_steps=N_SUBCARRIERS,
-            normalize_delays=True,
-            normalize=False,
-            out_type="numpy",
-        ).squeeze()  # shape: (num_tx, T, F)
-
-        H_all = np.sqrt(np.array(tx_powers)[:, None, None]) * H_unit
-        H = H_unit[:, 0, :]  # 取第一個時間步
+        await checkpoint()
+        with stage("cfr", snapshot=True):
+            H_unit = (await run_blocking(
+                paths.cfr,
+                frequencies=freqs,
+                sampling_frequency=1 / ofdm_symbol_duration,
+                num_time_steps=N_SUBCARRIERS,
+                normalize_delays=True,
+                normalize=False,
+                out_type="numpy",
+            )).reshape(len(transmitters), N_SUBCARRIERS, N_SUBCARRIERS)  # (num_tx, T, F)
 
-        # 安全處理：確保有所需的發射器
-        h_main = np.zeros(N_SUBCARRIERS, dtype=complex)
-        if idx_des:
-            h_main = sum(np.sqrt(tx_powers[i]) * H[i] for i in idx_des)
+        H = H_unit[:, 0, :]  # 取第一個時間步
 
-        h_intf = np.zeros(N_SUBCARRIERS, dtype=complex)
-        if idx_jam:
-            h_intf = sum(np.sqrt(tx_powers[i]) * H[i] for i in idx_jam)
+        # 空的索引集合會得到全零向量，不需額外的安全分支
+        h_main = sqrt_p[idx_des] @ H[idx_des]
+        h_intf = sqrt_p[idx_jam] @ H[idx_jam]
+        annotate(
+            cfr_signal_power_db=float(10 * np.log10(np.mean(np.abs(h_main) ** 2) + 1e-30)),
+            cfr_interference_power_db=float(
+                10 * np.log10(np.mean(np.abs(h_intf) ** 2) + 1e-30)
+            ),
+        )
 
         # 生成 QPSK+OFDM 符號
         logger.info("Generating QPSK+OFDM symbols")
@@ -689,39 +712,49 @@ async def generate_cfr_plot(
 
         # 繪製星座圖和 CFR，然後保存到文件
         logger.info("Plotting constellation and CFR")
-        fig, ax = plt.subplots(1, 3, figsize=(15, 4))
-        ax[0].scatter(y_eq_no_i.real, y_eq_no_i.imag, s=4, alpha=0.25)
-        ax[0].set(title="No interference", xlabel="Real", ylabel="Imag")
-        ax[0].grid(True)
+        await checkpoint()
 
-        ax[1].scatter(y_eq_with_i.real, y_eq_with_i.imag, s=4, alpha=0.25)
-        ax[1].set(title="With interferer", xlabel="Real", ylabel="Imag")
-        ax[1].grid(True)
+        def plot() -> Figure:
+            fig = Figure(figsize=(15, 4))
+            ax = fig.subplots(1, 3)
+            ax[0].scatter(y_eq_no_i.real, y_eq_no_i.imag, s=4, alpha=0.25)
+            ax[0].set(title="No interference", xlabel="Real", ylabel="Imag")
+            ax[0].grid(True)
 
-        ax[2].plot(np.abs(h_main), label="|H_main|")
-        ax[2].plot(np.abs(h_intf), label="|H_intf|")
-        ax[2].set(title="CFR Magnitude", xlabel="Subcarrier Index")
-        ax[2].legend()
-        ax[2].grid(True)
+            ax[1].scatter(y_eq_with_i.real, y_eq_with_i.imag, s=4, alpha=0.25)
+            ax[1].set(title="With interferer", xlabel="Real", ylabel="Imag")
+            ax[1].grid(True)
 
-        plt.tight_layout()
+            ax[2].plot(np.abs(h_main), label="|H_main|")
+            ax[2].plot(np.abs(h_intf), label="|H_intf|")
+            ax[2].set(title="CFR Magnitude", xlabel="Subcarrier Index")
+            ax[2].legend()
+            ax[2].grid(True)
+
+            fig.tight_layout()
+            return fig
+
+        with stage("plot"):
+            fig = await run_blocking(plot)
 
         # 保存圖片
         logger.info(f"Saving plot to {output_path}")
-        plt.savefig(output_path, dpi=300, bbox_inches="tight")
-        plt.close(fig)
+        with stage("savefig"):
+            await run_blocking(fig.savefig, output_path, dpi=300, bbox_inches="tight")
 
         # 檢查文件是否成功生成
         return verify_output_file(output_path)
 
+    except SimulationCancelled:
+        # 請求已取消，不寫出圖檔
+        raise
     except Exception as e:
         logger.exception(f"Error in generate_cfr_plot: {e}")
-        # 確保關閉所有打開的圖表
-        plt.close("all")
         return False
 
 
 # 新增 SINR Map 生成函數
+@timed_simulation("sinr_map")
 async def generate_sinr_map(
     session: AsyncSession,
     output_path: str = str(SINR_MAP_IMAGE_PATH),
@@ -730,11 +763,25 @@ async def generate_sinr_map(
     sinr_vmax: float = 0,
     cell_size: float = 1.0,
     samples_per_tx: int = 10**7,
+    time_s: Optional[float] = None,
+    max_depth: int = 10,
+    map_center: Optional[Tuple[float, float]] = None,
+    map_size: Optional[Tuple[float, float]] = None,
+    tile_size: Optional[float] = None,
+    adaptive_samples: bool = False,
+    target_rel_error: Optional[float] = None,
+    time_budget_s: Optional[float] = None,
 ) -> bool:
     """
     生成 SINR (Signal-to-Interference-plus-Noise Ratio) 地圖
 
-    從數據庫獲取發射器和接收器設置，計算並生成 SINR 地圖
+    從數據庫獲取發射器和接收器設置，計算並生成 SINR 地圖。
+    map_center / map_size 指定地圖範圍 (預設為場景範圍)；指定 tile_size 時
+    分塊平行求解並拼接 (見 radio_map_tiles)，分塊結果會快取供重疊範圍重用。
+    adaptive_samples 時分批取樣直到收斂或用完時間預算 (見 adaptive_sampling)，
+    samples_per_tx 為射線總數上限。使用的求解設定與收斂統計以 solver 屬性附加。
+    各發射器的 rss 依場景、位置、方向、功率、天線與求解參數快取 (見 transmitter_rss)，
+    設備變更時只重新求解受影響的發射器，再重新加總 SINR。
     """
     logger.info("開始生成 SINR 地圖...")
 
@@ -745,90 +792,39 @@ async def generate_sinr_map(
         # GPU 設置
         gpus = _setup_gpu()
 
-        # 創建設備服務和儲存庫
-        device_repository = SQLModelDeviceRepository(session)
-        device_service = DeviceService(device_repository)
-
-        # 從數據庫獲取活動的發射器 (desired)
-        logger.info("從數據庫獲取活動的發射器...")
-        active_desired = await device_service.get_devices(
-            skip=0, limit=100, role=DeviceRole.DESIRED.value, active_only=True
-        )
-
-        # 從數據庫獲取活動的干擾器 (jammer)
-        logger.info("從數據庫獲取活動的干擾器...")
-        active_jammers = await device_service.get_devices(
-            skip=0, limit=100, role=DeviceRole.JAMMER.value, active_only=True
-        )
-
-        # 從數據庫獲取活動的接收器
-        logger.info("從數據庫獲取活動的接收器...")
-        active_receivers = await device_service.get_devices(
-            skip=0, limit=100, role=DeviceRole.RECEIVER.value, active_only=True
+        # 單一查詢取得欄位式活躍設備快照 (不受每角色 100 筆的上限限制)；
+        # 指定地圖範圍時只取範圍及其邊界內的設備，更遠的設備對範圍內的 SINR 影響可忽略
+        logger.info("從數據庫獲取活動設備欄位快照...")
+        with stage("db_fetch"):
+            bbox = _map_bbox(scene_name, map_center, map_size)
+            devices = await _load_active_devices(session, time_s, bbox)
+        transmitters = devices.select(
+            devices.role_mask(DeviceRole.DESIRED, DeviceRole.JAMMER)
         )
+        receivers = devices.select(devices.role_mask(DeviceRole.RECEIVER))
+        annotate(transmitters=len(transmitters), receivers=len(receivers), device_bbox=bbox)
 
         # 檢查是否有足夠的設備
-        if not active_desired and not active_jammers:
+        if len(transmitters) == 0:
             logger.error("沒有活動的發射器或干擾器，無法生成 SINR 地圖")
             return False
 
-        if not active_receivers:
+        if len(receivers) == 0:
             logger.warning("沒有活動的接收器，將使用預設接收器位置")
             rx_config = ("rx", [-30, 50, 20])
         else:
             # 使用第一個活動接收器
-            receiver = active_receivers[0]
-            rx_config = (
-                receiver.name,
-                [receiver.position_x, receiver.position_y, receiver.position_z],
-            )
+            rx_config = (receivers.names[0], receivers.positions[0].tolist())
 
-        # 構建 TX_LIST
-        tx_list = []
-
-        # 添加發射器
-        for tx in active_desired:
-            tx_name = tx.name
-            tx_position = [tx.position_x, tx.position_y, tx.position_z]
-            tx_orientation = [tx.orientation_x, tx.orientation_y, tx.orientation_z]
-            tx_power = tx.power_dbm
-
-            tx_list.append((tx_name, tx_position, tx_orientation, "desired", tx_power))
-            logger.info(
-                f"添加發射器: {tx_name}, 位置: {tx_position}, 方向: {tx_orientation}, 功率: {tx_power} dBm"
-            )
-
-        # 添加干擾器
-        for jammer in active_jammers:
-            jammer_name = jammer.name
-            jammer_position = [jammer.position_x, jammer.position_y, jammer.position_z]
-            jammer_orientation = [
-                jammer.orientation_x,
-                jammer.orientation_y,
-                jammer.orientation_z,
-            ]
-            jammer_power = jammer.power_dbm
-
-            tx_list.append(
-                (
-                    jammer_name,
-                    jammer_position,
-                    jammer_orientation,
-                    "jammer",
-                    jammer_power,
-                )
-            )
-            logger.info(
-                f"添加干擾器: {jammer_name}, 位置: {jammer_position}, 方向: {jammer_orientation}, 功率: {jammer_power} dBm"
-            )
-
-        # 如果沒有足夠的發射器，返回錯誤
-        if not tx_list:
-            logger.error("沒有可用的發射器或干擾器，無法生成 SINR 地圖")
-            return False
+        num_desired = int(np.count_nonzero(transmitters.role_mask(DeviceRole.DESIRED)))
+        logger.info(
+            f"載入 {num_desired} 個發射器與 {len(transmitters) - num_desired} 個干擾器"
+        )
 
         # 參數設置
-        scene_xml_path = get_scene_xml_file_path(scene_name)
+        with stage("scene_path"):
+            scene_xml_path = get_scene_xml_file_path(scene_name)
+        annotate(scene_xml=scene_xml_path)
         logger.info(f"從 {scene_xml_path} 加載場景")
 
         tx_array_config = {
@@ -842,160 +838,235 @@ async def generate_sinr_map(
         rx_array_config = tx_array_config
 
         rmsolver_args = {
-            "max_depth": 10,
+            "max_depth": max_depth,
             "cell_size": (cell_size, cell_size),
-            "samples_per_tx": samples_per_tx,
         }
+        rx_name, rx_pos = rx_config
 
-        # 場景設置
-        logger.info("設置場景")
-        scene = load_scene(scene_xml_path)
-        scene.tx_array = PlanarArray(**tx_array_config)
-        scene.rx_array = PlanarArray(**rx_array_config)
-
-        # 清除現有的發射器和接收器
-        for name in list(scene.transmitters.keys()) + list(scene.receivers.keys()):
-            scene.remove(name)
-
-        # 添加發射器
-        logger.info("添加發射器")
+        # 按角色分組發射器 (場景中的發射器順序與快照列順序一致)
+        idx_des = transmitters.role_indices(DeviceRole.DESIRED)
+        idx_jam = transmitters.role_indices(DeviceRole.JAMMER)
 
-        def add_tx(scene, name, pos, ori, role, power_dbm):
-            tx = SionnaTransmitter(
-                name=name, position=pos, orientation=ori, power_dbm=power_dbm
+        if tile_size:
+            # 分塊求解：場景在 worker 行程中載入，本行程只拼接各分塊的 rss
+            default_center, default_size = default_extent(scene_stats(scene_xml_path))
+            plan = plan_tiles(
+                map_center or default_center, map_size or default_size, cell_size, tile_size
             )
-            tx.role = role
-            scene.add(tx)
-            return tx
-
-        for name, pos, ori, role, p_dbm in tx_list:
-            add_tx(scene, name, pos, ori, role, p_dbm)
-
-        # 添加接收器
-        rx_name, rx_pos = rx_config
-        logger.info(f"添加接收器 '{rx_name}' 在位置 {rx_pos}")
-        scene.add(SionnaReceiver(name=rx_name, position=rx_pos))
-
-        # 按角色分組發射器
-        all_txs = [scene.get(n) for n in scene.transmitters]
-        idx_des = [
-            i for i, tx in enumerate(all_txs) if getattr(tx, "role", None) == "desired"
-        ]
-        idx_jam = [
-            i for i, tx in enumerate(all_txs) if getattr(tx, "role", None) == "jammer"
-        ]
-
-        if not idx_des and not idx_jam:
-            logger.error("場景中沒有有效的發射器或干擾器")
-            return False
+            logger.info(
+                f"分塊計算無線電地圖：{len(plan.tiles)} 個 {plan.tile_cells}×{plan.tile_cells} 網格的分塊"
+            )
+            x_unique, y_unique = (np.asarray(c) for c in plan.cell_centers())
+
+            async def solve_batch(samples: int, seed: int) -> np.ndarray:
+                return await solve_tiled_rss(
+                    scene_xml_path,
+                    transmitters,
+                    plan,
+                    samples_per_tx=samples,
+                    max_depth=max_depth,
+                    array_config=tx_array_config,
+                    seed=seed,
+                )
+        else:
+            if map_size is not None:
+                center = map_center or default_extent(scene_stats(scene_xml_path))[0]
+                rmsolver_args.update(
+                    center=[center[0], center[1], RADIO_MAP_HEIGHT],
+                    orientation=[0.0, 0.0, 0.0],
+                    size=list(map_size),
+                )
 
-        # 計算無線電地圖
-        logger.info("計算無線電地圖")
-        rm_solver = RadioMapSolver()
-        rm = rm_solver(scene, **rmsolver_args)
+            # 網格由 cell_size 與範圍決定 (未指定範圍時為場景範圍)
+            region = (
+                cell_size,
+                tuple(float(v) for v in rmsolver_args.get("center", ())),
+                tuple(float(v) for v in rmsolver_args.get("size", ())),
+            )
+            rm_solver = RadioMapSolver()
+            scenes: List[Any] = []
+            grid: Dict[str, np.ndarray] = {}
+
+            async def solve_subset(rows: np.ndarray, samples: int, seed: int):
+                # 場景只在有發射器需要重新求解時載入
+                if not scenes:
+                    logger.info("設置場景")
+                    await checkpoint()
+                    with stage("load_scene"):
+                        scene = await run_blocking(load_scene, scene_xml_path)
+                    scene.tx_array = PlanarArray(**tx_array_config)
+                    scene.rx_array = PlanarArray(**rx_array_config)
+                    for name in list(scene.receivers.keys()):
+                        scene.remove(name)
+                    logger.info(f"添加接收器 '{rx_name}' 在位置 {rx_pos}")
+                    scene.add(SionnaReceiver(name=rx_name, position=rx_pos))
+                    scenes.append(scene)
+                scene = scenes[0]
+
+                # 場景中只放需要求解的發射器
+                for name in list(scene.transmitters.keys()):
+                    scene.remove(name)
+                logger.info(f"添加 {len(rows)} 個需要求解的發射器")
+                _add_transmitters_from_columns(scene, transmitters.select(rows))
+
+                logger.info("計算無線電地圖")
+                rm = await run_blocking(
+                    rm_solver, scene, **rmsolver_args, samples_per_tx=samples, seed=seed
+                )
+                cc = rm.cell_centers.numpy()
+                # 一次取出所有求解發射器的 rss，形狀 (len(rows), num_cells_y, num_cells_x)
+                rss = np.asarray(rm.rss.numpy()).reshape(len(rows), cc.shape[0], cc.shape[1])
+                return rss, cc[0, :, 0], cc[:, 0, 1]
+
+            async def solve_batch(samples: int, seed: int) -> np.ndarray:
+                rss, grid["x"], grid["y"] = await solve_transmitter_rss(
+                    scene_xml_path,
+                    transmitters,
+                    region,
+                    lambda rows: solve_subset(rows, samples, seed),
+                    samples_per_tx=samples,
+                    max_depth=max_depth,
+                    array_config=tx_array_config,
+                    seed=seed,
+                )
+                return rss
+
+        await checkpoint()
+        with stage("radio_map_solver"):
+            if adaptive_samples:
+                rss, sampling = await sample_adaptively(
+                    solve_batch,
+                    samples_per_tx,
+                    target_rel_error=target_rel_error,
+                    time_budget_s=time_budget_s,
+                )
+            else:
+                started = time.perf_counter()
+                rss = await solve_batch(samples_per_tx, BASE_SEED)
+                sampling = SamplingReport(
+                    adaptive=False,
+                    samples_per_tx=samples_per_tx,
+                    max_samples_per_tx=samples_per_tx,
+                    batch_samples=samples_per_tx,
+                    batches=1,
+                    stop_reason="fixed",
+                    elapsed_s=time.perf_counter() - started,
+                )
+        if not tile_size:
+            x_unique, y_unique = grid["x"], grid["y"]
+        annotate(
+            solver={
+                "cell_size": cell_size,
+                "max_depth": max_depth,
+                "tile_size": tile_size,
+                **sampling.model_dump(),
+            }
+        )
 
         # 計算並繪製 SINR 地圖
         logger.info("計算 SINR 地圖")
-        cc = rm.cell_centers.numpy()
-        x_unique = cc[0, :, 0]
-        y_unique = cc[:, 0, 1]
-        rss_list = [rm.rss[i].numpy() for i in range(len(all_txs))]
-
-        # 計算 SINR
-        N0_map = 1e-12  # 噪聲功率
-
-        # 檢查是否有目標發射器和干擾器
-        if idx_des:
-            rss_des = sum(rss_list[i] for i in idx_des)
-        else:
-            logger.warning("沒有目標發射器，將假設沒有信號")
-            rss_des = (
-                np.zeros_like(rss_list[0])
-                if rss_list
-                else np.zeros((len(y_unique), len(x_unique)))
-            )
-
-        if idx_jam:
-            rss_jam = sum(rss_list[i] for i in idx_jam)
-        else:
-            logger.warning("沒有干擾器，將假設沒有干擾")
-            rss_jam = (
-                np.zeros_like(rss_list[0])
-                if rss_list
-                else np.zeros((len(y_unique), len(x_unique)))
+        await checkpoint()
+        with stage("sinr", snapshot=True):
+            # 計算 SINR
+            N0_map = 1e-12  # 噪聲功率
+
+            # 以角色索引向量化加總；空的索引集合會得到全零地圖
+            if idx_des.size == 0:
+                logger.warning("沒有目標發射器，將假設沒有信號")
+            if idx_jam.size == 0:
+                logger.warning("沒有干擾器，將假設沒有干擾")
+            rss_des = rss[idx_des].sum(axis=0)
+            rss_jam = rss[idx_jam].sum(axis=0)
+
+            # 計算 SINR (dB)，確保公式與原始 sinr.py 一致
+            sinr_db = 10 * np.log10(
+                np.clip(rss_des / (rss_des + rss_jam + N0_map), 1e-12, None)
             )
-
-        # 計算 SINR (dB)，確保公式與原始 sinr.py 一致
-        sinr_db = 10 * np.log10(
-            np.clip(rss_des / (rss_des + rss_jam + N0_map), 1e-12, None)
+        sinr_p10, sinr_median, sinr_p90 = np.percentile(sinr_db, [10, 50, 90])
+        annotate(
+            grid_cells=int(sinr_db.size),
+            sinr_db_p10=float(sinr_p10),
+            sinr_db_median=float(sinr_median),
+            sinr_db_p90=float(sinr_p90),
+            sinr_coverage_fraction=float(np.mean(sinr_db > sinr_vmin + 10)),
         )
 
         # 繪製地圖
         logger.info("繪製 SINR 地圖")
-        fig, ax = plt.subplots(figsize=(7, 5))
-        X, Y = np.meshgrid(x_unique, y_unique)
-        pcm = ax.pcolormesh(
-            X, Y, sinr_db, shading="nearest", vmin=sinr_vmin + 10, vmax=sinr_vmax
-        )
-        fig.colorbar(pcm, ax=ax, label="SINR (dB)")
-
-        # 繪製發射器和接收器
-        ax.scatter(
-            [t.position[0] for t in all_txs if getattr(t, "role", None) == "desired"],
-            [t.position[1] for t in all_txs if getattr(t, "role", None) == "desired"],
-            c="red",
-            marker="^",
-            s=100,
-            label="Tx",
-        )
-        ax.scatter(
-            [t.position[0] for t in all_txs if getattr(t, "role", None) == "jammer"],
-            [t.position[1] for t in all_txs if getattr(t, "role", None) == "jammer"],
-            c="red",
-            marker="x",
-            s=100,
-            label="Jam",
-        )
+        await checkpoint()
+
+        def plot() -> Figure:
+            fig = Figure(figsize=(7, 5))
+            ax = fig.subplots()
+            X, Y = np.meshgrid(x_unique, y_unique)
+            pcm = ax.pcolormesh(
+                X, Y, sinr_db, shading="nearest", vmin=sinr_vmin + 10, vmax=sinr_vmax
+            )
+            fig.colorbar(pcm, ax=ax, label="SINR (dB)")
 
-        # 獲取接收器
-        rx_object = scene.get(rx_name)
-        if rx_object:
+            # 繪製發射器和接收器
+            ax.scatter(
+                transmitters.positions[idx_des, 0],
+                transmitters.positions[idx_des, 1],
+                c="red",
+                marker="^",
+                s=100,
+                label="Tx",
+            )
             ax.scatter(
-                rx_object.position[0],
-                rx_object.position[1],
+                transmitters.positions[idx_jam, 0],
+                transmitters.positions[idx_jam, 1],
+                c="red",
+                marker="x",
+                s=100,
+                label="Jam",
+            )
+
+            # 繪製接收器
+            ax.scatter(
+                rx_pos[0],
+                rx_pos[1],
                 c="green",
                 marker="o",
                 s=50,
                 label="Rx",
             )
 
-        ax.legend()
-        ax.set_xlabel("x (m)")
-        ax.set_ylabel("y (m)")
-        ax.set_title("SINR Map")
-        ax.invert_yaxis()
-        plt.tight_layout()
+            ax.legend()
+            ax.set_xlabel("x (m)")
+            ax.set_ylabel("y (m)")
+            ax.set_title("SINR Map")
+            ax.invert_yaxis()
+            fig.tight_layout()
+            return fig
+
+        with stage("plot"):
+            fig = await run_blocking(plot)
 
         # 保存圖片
         logger.info(f"保存 SINR 地圖到 {output_path}")
-        plt.savefig(output_path, dpi=300, bbox_inches="tight")
-        plt.close(fig)
+        with stage("savefig"):
+            await run_blocking(fig.savefig, output_path, dpi=300, bbox_inches="tight")
 
         # 檢查文件是否生成成功
         return verify_output_file(output_path)
 
+    except SimulationCancelled:
+        # 請求已取消，不寫出圖檔
+        raise
     except Exception as e:
         logger.exception(f"生成 SINR 地圖時發生錯誤: {e}")
-        # 確保關閉所有打開的圖表
-        plt.close("all")
         return False
 
 
 # 新增 Doppler 圖生成函數
+@timed_simulation("doppler")
 async def generate_doppler_plots(
     session: AsyncSession,
     output_path: str = str(DOPPLER_IMAGE_PATH),
     scene_name: str = "nycu",
+    time_s: Optional[float] = None,
+    max_depth: int = 3,
 ) -> bool:
     """
     生成延遲多普勒圖 (Delay-Doppler)，基於 delay-doppler-v2.py 的功能
@@ -1011,78 +1082,28 @@ async def generate_doppler_plots(
         # 設置 GPU
         _setup_gpu()
 
-        # 創建設備服務和儲存庫
-        device_repository = SQLModelDeviceRepository(session)
-        device_service = DeviceService(device_repository)
-
-        # 從資料庫獲取活動的發射器 (desired)
-        logger.info("從數據庫獲取活動的發射器...")
-        active_desired = await device_service.get_devices(
-            skip=0, limit=100, role=DeviceRole.DESIRED.value, active_only=True
+        # 單一查詢取得欄位式活躍設備快照 (不受每角色 100 筆的上限限制)
+        logger.info("從數據庫獲取活動設備欄位快照...")
+        with stage("db_fetch"):
+            devices = await _load_active_devices(session, time_s)
+        transmitters = devices.select(
+            devices.role_mask(DeviceRole.DESIRED, DeviceRole.JAMMER)
         )
+        receivers = devices.select(devices.role_mask(DeviceRole.RECEIVER))
+        annotate(transmitters=len(transmitters), receivers=len(receivers))
 
-        # 從資料庫獲取活動的干擾器 (jammer)
-        logger.info("從數據庫獲取活動的干擾器...")
-        active_jammers = await device_service.get_devices(
-            skip=0, limit=100, role=DeviceRole.JAMMER.value, active_only=True
-        )
-
-        # 從資料庫獲取活動的接收器
-        logger.info("從數據庫獲取活動的接收器...")
-        active_receivers = await device_service.get_devices(
-            skip=0, limit=100, role=DeviceRole.RECEIVER.value, active_only=True
+        num_desired = int(np.count_nonzero(transmitters.role_mask(DeviceRole.DESIRED)))
+        logger.info(
+            f"載入 {num_desired} 個發射器與 {len(transmitters) - num_desired} 個干擾器"
         )
 
-        # 構建 TX_LIST
-        tx_list = []
-
-        # 添加發射器
-        for tx in active_desired:
-            tx_name = tx.name
-            tx_position = [tx.position_x, tx.position_y, tx.position_z]
-            tx_orientation = [tx.orientation_x, tx.orientation_y, tx.orientation_z]
-            tx_power = tx.power_dbm
-
-            tx_list.append((tx_name, tx_position, tx_orientation, "desired", tx_power))
-            logger.info(
-                f"添加發射器: {tx_name}, 位置: {tx_position}, 方向: {tx_orientation}, 功率: {tx_power} dBm"
-            )
-
-        # 添加干擾器
-        for jammer in active_jammers:
-            jammer_name = jammer.name
-            jammer_position = [jammer.position_x, jammer.position_y, jammer.position_z]
-            jammer_orientation = [
-                jammer.orientation_x,
-                jammer.orientation_y,
-                jammer.orientation_z,
-            ]
-            jammer_power = jammer.power_dbm
-
-            tx_list.append(
-                (
-                    jammer_name,
-                    jammer_position,
-                    jammer_orientation,
-                    "jammer",
-                    jammer_power,
-                )
-            )
-            logger.info(
-                f"添加干擾器: {jammer_name}, 位置: {jammer_position}, 方向: {jammer_orientation}, 功率: {jammer_power} dBm"
-            )
-
         # 設置接收器
-        if not active_receivers:
+        if len(receivers) == 0:
             logger.warning("沒有找到活動的接收器，使用默認位置")
             rx_config = ("rx", [0, 0, 40])
         else:
             # 使用第一個活動接收器
-            receiver = active_receivers[0]
-            rx_config = (
-                receiver.name,
-                [receiver.position_x, receiver.position_y, receiver.position_z],
-            )
+            rx_config = (receivers.names[0], receivers.positions[0].tolist())
             logger.info(f"使用接收器 '{rx_config[0]}' 在位置 {rx_config[1]}")
 
         # -------- 以下為參考 delay-doppler-v2.py 的邏輯 --------
@@ -1099,12 +1120,12 @@ async def generate_doppler_plots(
         RX_ARRAY_CONFIG = TX_ARRAY_CONFIG
 
         # 如果沒有設備，回傳錯誤
-        if not tx_list:
+        if len(transmitters) == 0:
             logger.error("沒有活動的發射器或干擾器，無法生成延遲多普勒圖")
             return False
 
         PATHSOLVER_ARGS = dict(
-            max_depth=3,
+            max_depth=max_depth,
             los=True,
             specular_reflection=True,
             diffuse_reflection=False,
@@ -1119,9 +1140,13 @@ async def generate_doppler_plots(
         num_ofdm_symbols = 1024
 
         # 建立場景與天線配置
-        scene_xml_path = get_scene_xml_file_path(scene_name)
+        with stage("scene_path"):
+            scene_xml_path = get_scene_xml_file_path(scene_name)
+        annotate(scene_xml=scene_xml_path)
         logger.info(f"從 {scene_xml_path} 加載場景")
-        scene = load_scene(scene_xml_path)
+        await checkpoint()
+        with stage("load_scene"):
+            scene = await run_blocking(load_scene, scene_xml_path)
         scene.tx_array = PlanarArray(**TX_ARRAY_CONFIG)
         scene.rx_array = PlanarArray(**RX_ARRAY_CONFIG)
 
@@ -1136,31 +1161,16 @@ async def generate_doppler_plots(
             logger.warning("無法完全清空場景中的發射機和接收機")
 
         # 新增發射機
-        def add_tx(scene, name, pos, ori, role, power_dbm):
-            tx = SionnaTransmitter(
-                name=name, position=pos, orientation=ori, power_dbm=power_dbm
-            )
-            tx.role = role
-            scene.add(tx)
-            return tx
-
-        for name, pos, ori, role, p_dbm in tx_list:
-            add_tx(scene, name, pos, ori, role, p_dbm)
+        _add_transmitters_from_columns(scene, transmitters)
 
         # 新增接收機
         rx_name, rx_pos = rx_config
         logger.info(f"添加接收器 '{rx_name}' 在位置 {rx_pos}")
         scene.add(SionnaReceiver(name=rx_name, position=rx_pos))
 
-        # 分組索引
-        tx_names = list(scene.transmitters.keys())
-        all_txs = [scene.get(n) for n in tx_names]
-        idx_des = [
-            i for i, tx in enumerate(all_txs) if getattr(tx, "role", None) == "desired"
-        ]
-        idx_jam = [
-            i for i, tx in enumerate(all_txs) if getattr(tx, "role", None) == "jammer"
-        ]
+        # 分組索引 (場景中的發射器順序與快照列順序一致)
+        idx_des = transmitters.role_indices(DeviceRole.DESIRED)
+        idx_jam = transmitters.role_indices(DeviceRole.JAMMER)
 
         # 計算 CFR
         logger.info("計算 CFR")
@@ -1171,7 +1181,9 @@ async def generate_doppler_plots(
         # 使用 PathSolver
         solver = PathSolver()
         try:
-            paths = solver(scene, **PATHSOLVER_ARGS)
+            await checkpoint()
+            with stage("path_solver"):
+                paths = await run_blocking(solver, scene, **PATHSOLVER_ARGS)
         except RuntimeError as e:
             logger.error(f"PathSolver 错误: {e}")
             logger.error(
@@ -1184,31 +1196,34 @@ async def generate_doppler_plots(
         doppler_resolution = SUBCARRIER_SPACING / num_ofdm_symbols
 
         # 計算 CFR
-        H_unit = paths.cfr(
-            frequencies=freqs,
-            sampling_frequency=1 / ofdm_symbol_duration,
-            num_time_steps=num_ofdm_symbols,
-            normalize_delays=False,
-            normalize=False,
-            out_type="numpy",
-        ).squeeze()
-
-        # 處理功率加權
-        tx_p_lin = 10 ** (np.array([tx.power_dbm for tx in all_txs]) / 10) / 1e3
-        tx_p_lin = np.squeeze(tx_p_lin)
-        sqrtP = np.sqrt(tx_p_lin)[:, None, None]
-        H_unit = H_unit * sqrtP
-
-        # 計算 Delay-Doppler 圖
+        await checkpoint()
+        with stage("cfr", snapshot=True):
+            H_unit = (await run_blocking(
+                paths.cfr,
+                frequencies=freqs,
+                sampling_frequency=1 / ofdm_symbol_duration,
+                num_time_steps=num_ofdm_symbols,
+                normalize_delays=False,
+                normalize=False,
+                out_type="numpy",
+            )).reshape(len(transmitters), num_ofdm_symbols, N_SUBCARRIERS)  # (num_tx, T, F)
+
+        # 處理功率加權 (以快照中的功率陣列廣播)
+        with stage("combine", snapshot=True):
+            sqrtP = np.sqrt(transmitters.power_watts)[:, None, None]
+            H_unit = H_unit * sqrtP
+
+        # 計算 Delay-Doppler 圖：沿發射器軸一次完成所有發射器的 FFT
         def to_delay_doppler(H_tf):
-            Hf = np.fft.fftshift(H_tf, axes=1)
-            h_delay = np.fft.ifft(Hf, axis=1, norm="ortho")
-            h_dd = np.fft.fft(h_delay, axis=0, norm="ortho")
-            h_dd = np.fft.fftshift(h_dd, axes=0)
+            Hf = np.fft.fftshift(H_tf, axes=-1)
+            h_delay = np.fft.ifft(Hf, axis=-1, norm="ortho")
+            h_dd = np.fft.fft(h_delay, axis=-2, norm="ortho")
+            h_dd = np.fft.fftshift(h_dd, axes=-2)
             return h_dd
 
-        # 計算每個發射機的延遲多普勒圖
-        Hdd_list = [np.abs(to_delay_doppler(H_unit[i])) for i in range(H_unit.shape[0])]
+        # 計算每個發射機的延遲多普勒圖，形狀 (num_tx, T, F)
+        with stage("fft", snapshot=True):
+            Hdd_list = await run_blocking(lambda: np.abs(to_delay_doppler(H_unit)))
 
         # 動態組合網格
         grids = []
@@ -1244,19 +1259,19 @@ async def generate_doppler_plots(
             labels.append(f"Jam Tx{i}")  # 使用 i 而非 k+1
 
         # Desired All
-        if idx_des:
-            Z_des_all = np.sum([Hdd_list[i] for i in idx_des], axis=0)
+        if idx_des.size:
+            Z_des_all = Hdd_list[idx_des].sum(axis=0)
             grids.append(Z_des_all[x_start:x_end, y_start:y_end])
             labels.append("Des ALL")
 
         # Jammer All
-        if idx_jam:
-            Z_jam_all = np.sum([Hdd_list[i] for i in idx_jam], axis=0)
+        if idx_jam.size:
+            Z_jam_all = Hdd_list[idx_jam].sum(axis=0)
             grids.append(Z_jam_all[x_start:x_end, y_start:y_end])
             labels.append("Jam ALL")
 
         # All Tx
-        Z_all = np.sum(Hdd_list, axis=0)
+        Z_all = Hdd_list.sum(axis=0)
         grids.append(Z_all[x_start:x_end, y_start:y_end])
         labels.append("ALL Tx")
 
@@ -1274,39 +1289,50 @@ async def generate_doppler_plots(
 
         # 繪製單一的統一圖
         logger.info(f"繪製統一的延遲多普勒圖")
-        fig = plt.figure(figsize=figsize)
-        fig.suptitle("Delay-Doppler Plots")  # 標題使用原始設置
-
-        for idx, (Z, label) in enumerate(zip(grids, labels), start=1):
-            ax = fig.add_subplot(rows, cols, idx, projection="3d")
-            # 使用與原始相同的色彩映射 viridis
-            ax.plot_surface(x_grid, y_grid, Z, cmap="viridis", edgecolor="none")
-            ax.set_title(f"Delay–Doppler |{label}|", pad=8)
-            ax.set_xlabel("Delay (ns)")
-            ax.set_ylabel("Doppler (Hz)")
-            ax.set_zlabel("|H|")
-            ax.set_zlim(z_min, z_max)
-            # 移除自定義視角設置，使用默認視角
-
-        plt.tight_layout()
-        plt.savefig(output_path, dpi=300, bbox_inches="tight")
-        plt.close(fig)
+        await checkpoint()
+
+        def plot() -> Figure:
+            fig = Figure(figsize=figsize)
+            fig.suptitle("Delay-Doppler Plots")  # 標題使用原始設置
+
+            for idx, (Z, label) in enumerate(zip(grids, labels), start=1):
+                ax = fig.add_subplot(rows, cols, idx, projection="3d")
+                # 使用與原始相同的色彩映射 viridis
+                ax.plot_surface(x_grid, y_grid, Z, cmap="viridis", edgecolor="none")
+                ax.set_title(f"Delay–Doppler |{label}|", pad=8)
+                ax.set_xlabel("Delay (ns)")
+                ax.set_ylabel("Doppler (Hz)")
+                ax.set_zlabel("|H|")
+                ax.set_zlim(z_min, z_max)
+                # 移除自定義視角設置，使用默認視角
+
+            fig.tight_layout()
+            return fig
+
+        with stage("plot"):
+            fig = await run_blocking(plot)
+        with stage("savefig"):
+            await run_blocking(fig.savefig, output_path, dpi=300, bbox_inches="tight")
 
         # 檢查文件是否生成成功
         return verify_output_file(output_path)
 
+    except SimulationCancelled:
+        # 請求已取消，不寫出圖檔
+        raise
     except Exception as e:
         logger.exception(f"生成延遲多普勒圖時發生錯誤: {e}")
-        # 確保關閉所有打開的圖表
-        plt.close("all")
         return False
 
 
 # 新增函數: 整合 tf.py 的通道響應圖功能
+@timed_simulation("channel_response")
 async def generate_channel_response_plots(
     session: AsyncSession,
     output_path: str = str(CHANNEL_RESPONSE_IMAGE_PATH),
     scene_name: str = "nycu",
+    time_s: Optional[float] = None,
+    max_depth: int = 10,
 ) -> bool:
     """
     生成通道響應圖 (H_des, H_jam, H_all)，基於 tf.py 中的功能。
@@ -1318,90 +1344,38 @@ async def generate_channel_response_plots(
         # 準備輸出檔案
         prepare_output_file(output_path, "通道響應圖檔")
 
-        # 創建設備服務和儲存庫
-        device_repository = SQLModelDeviceRepository(session)
-        device_service = DeviceService(device_repository)
-
-        # 從資料庫獲取活動的發射器 (desired)
-        logger.info("從數據庫獲取活動的發射器...")
-        active_desired = await device_service.get_devices(
-            skip=0, limit=100, role=DeviceRole.DESIRED.value, active_only=True
-        )
-
-        # 從資料庫獲取活動的干擾器 (jammer)
-        logger.info("從數據庫獲取活動的干擾器...")
-        active_jammers = await device_service.get_devices(
-            skip=0, limit=100, role=DeviceRole.JAMMER.value, active_only=True
-        )
-
-        # 從資料庫獲取活動的接收器
-        logger.info("從數據庫獲取活動的接收器...")
-        active_receivers = await device_service.get_devices(
-            skip=0, limit=100, role=DeviceRole.RECEIVER.value, active_only=True
+        # 單一查詢取得欄位式活躍設備快照 (不受每角色 100 筆的上限限制)
+        logger.info("從數據庫獲取活動設備欄位快照...")
+        with stage("db_fetch"):
+            devices = await _load_active_devices(session, time_s)
+        transmitters = devices.select(
+            devices.role_mask(DeviceRole.DESIRED, DeviceRole.JAMMER)
         )
+        receivers = devices.select(devices.role_mask(DeviceRole.RECEIVER))
+        annotate(transmitters=len(transmitters), receivers=len(receivers))
 
         # 檢查是否有足夠的設備進行模擬
-        if not active_desired:
+        num_desired = int(np.count_nonzero(transmitters.role_mask(DeviceRole.DESIRED)))
+        if num_desired == 0:
             logger.error("沒有活動的發射器，無法生成通道響應圖")
             return False
 
-        if not active_receivers:
+        if len(receivers) == 0:
             logger.error("沒有活動的接收器，無法生成通道響應圖")
             return False
 
-        # 構建 TX_LIST
-        tx_list = []
-
-        # 添加從資料庫獲取的發射器
-        for tx in active_desired:
-            tx_name = tx.name
-            tx_position = [tx.position_x, tx.position_y, tx.position_z]
-            tx_orientation = [tx.orientation_x, tx.orientation_y, tx.orientation_z]
-            tx_power = tx.power_dbm
-
-            tx_list.append((tx_name, tx_position, tx_orientation, "desired", tx_power))
-            logger.info(
-                f"添加發射器: {tx_name}, 位置: {tx_position}, 方向: {tx_orientation}, 功率: {tx_power} dBm"
-            )
-
-        # 添加從資料庫獲取的干擾器 (如果有)
-        for jammer in active_jammers:
-            jammer_name = jammer.name
-            jammer_position = [
-                jammer.position_x,
-                jammer.position_y,
-                jammer.position_z,
-            ]
-            jammer_orientation = [
-                jammer.orientation_x,
-                jammer.orientation_y,
-                jammer.orientation_z,
-            ]
-            jammer_power = jammer.power_dbm
-
-            tx_list.append(
-                (
-                    jammer_name,
-                    jammer_position,
-                    jammer_orientation,
-                    "jammer",
-                    jammer_power,
-                )
-            )
-            logger.info(
-                f"添加干擾器: {jammer_name}, 位置: {jammer_position}, 方向: {jammer_orientation}, 功率: {jammer_power} dBm"
-            )
+        logger.info(
+            f"載入 {num_desired} 個發射器與 {len(transmitters) - num_desired} 個干擾器"
+        )
 
         # 接收器設置
-        receiver = active_receivers[0]  # 已確認有接收器
-        rx_config = (
-            receiver.name,
-            [receiver.position_x, receiver.position_y, receiver.position_z],
-        )
+        rx_config = (receivers.names[0], receivers.positions[0].tolist())
         logger.info(f"使用接收器 '{rx_config[0]}' 在位置 {rx_config[1]}")
 
         # 從 config.py 取得場景路徑
-        scene_xml_path = get_scene_xml_file_path(scene_name)
+        with stage("scene_path"):
+            scene_xml_path = get_scene_xml_file_path(scene_name)
+        annotate(scene_xml=scene_xml_path)
         logger.info(f"從 {scene_xml_path} 加載場景")
 
         # 參數設置 (從 tf.py 移植)
@@ -1416,7 +1390,7 @@ async def generate_channel_response_plots(
         rx_array_config = tx_array_config
 
         pathsolver_args = {
-            "max_depth": 10,
+            "max_depth": max_depth,
             "los": True,
             "specular_reflection": True,
             "diffuse_reflection": False,
@@ -1431,7 +1405,9 @@ async def generate_channel_response_plots(
 
         # 場景設置
         logger.info("設置場景")
-        scene = load_scene(scene_xml_path)
+        await checkpoint()
+        with stage("load_scene"):
+            scene = await run_blocking(load_scene, scene_xml_path)
         scene.tx_array = PlanarArray(**tx_array_config)
         scene.rx_array = PlanarArray(**rx_array_config)
 
@@ -1441,17 +1417,7 @@ async def generate_channel_response_plots(
 
         # 添加發射器
         logger.info("添加發射器和干擾器")
-
-        def add_tx(scene, name, pos, ori, role, power_dbm):
-            tx = SionnaTransmitter(
-                name=name, position=pos, orientation=ori, power_dbm=power_dbm
-            )
-            tx.role = role
-            scene.add(tx)
-            return tx
-
-        for name, pos, ori, role, p_dbm in tx_list:
-            add_tx(scene, name, pos, ori, role, p_dbm)
+        _add_transmitters_from_columns(scene, transmitters)
 
         # 添加接收器
         rx_name, rx_pos = rx_config
@@ -1462,21 +1428,17 @@ async def generate_channel_response_plots(
         for name, tx in scene.transmitters.items():
             tx.velocity = [30, 0, 0]
 
-        # 按角色分組發射器
-        tx_names = list(scene.transmitters.keys())
-        all_txs = [scene.get(n) for n in tx_names]
-        idx_des = [
-            i for i, tx in enumerate(all_txs) if getattr(tx, "role", None) == "desired"
-        ]
-        idx_jam = [
-            i for i, tx in enumerate(all_txs) if getattr(tx, "role", None) == "jammer"
-        ]
+        # 按角色分組發射器 (場景中的發射器順序與快照列順序一致)
+        idx_des = transmitters.role_indices(DeviceRole.DESIRED)
+        idx_jam = transmitters.role_indices(DeviceRole.JAMMER)
 
         # 計算路徑
         logger.info("計算路徑")
         solver = PathSolver()
         try:
-            paths = solver(scene, **pathsolver_args)
+            await checkpoint()
+            with stage("path_solver"):
+                paths = await run_blocking(solver, scene, **pathsolver_args)
         except RuntimeError as e:
             logger.error(f"PathSolver 錯誤: {e}")
             logger.error(
@@ -1489,26 +1451,27 @@ async def generate_channel_response_plots(
         freqs = subcarrier_frequencies(n_subcarriers, subcarrier_spacing)
         ofdm_symbol_duration = 1 / subcarrier_spacing
 
-        H_unit = paths.cfr(
-            frequencies=freqs,
-            sampling_frequency=1 / ofdm_symbol_duration,
-            num_time_steps=num_ofdm_symbols,
-            normalize_delays=True,
-            normalize=False,
-            out_type="numpy",
-        ).squeeze()  # shape: (num_tx, T, F)
+        await checkpoint()
+        with stage("cfr", snapshot=True):
+            H_unit = (await run_blocking(
+                paths.cfr,
+                frequencies=freqs,
+                sampling_frequency=1 / ofdm_symbol_duration,
+                num_time_steps=num_ofdm_symbols,
+                normalize_delays=True,
+                normalize=False,
+                out_type="numpy",
+            )).reshape(
+            len(transmitters), num_ofdm_symbols, n_subcarriers
+        )  # shape: (num_tx, T, F)
 
         # 計算 H_all, H_des, H_jam
         logger.info("計算 H_all, H_des, H_jam")
-        H_all = H_unit.sum(axis=0)
+        with stage("combine", snapshot=True):
+            H_all = H_unit.sum(axis=0)
 
-        # 安全檢查：確保有所需的發射器和干擾器
-        H_des = np.zeros_like(H_all)
-        if idx_des:
+            # 空的索引集合會得到全零陣列
             H_des = H_unit[idx_des].sum(axis=0)
-
-        H_jam = np.zeros_like(H_all)
-        if idx_jam:
             H_jam = H_unit[idx_jam].sum(axis=0)
 
         # 準備繪圖網格
@@ -1520,49 +1483,57 @@ async def generate_channel_response_plots(
 
         # 創建圖片並保存
         logger.info("繪製通道響應圖")
-        fig = plt.figure(figsize=(18, 5))
+        await checkpoint()
 
-        # 子圖 1: H_des
-        ax1 = fig.add_subplot(131, projection="3d")
-        ax1.plot_surface(
-            F_mesh, T_mesh, np.abs(H_des), cmap="viridis", edgecolor="none"
-        )
-        ax1.set_xlabel("子載波")
-        ax1.set_ylabel("OFDM 符號")
-        ax1.set_title("‖H_des‖")
-
-        # 子圖 2: H_jam
-        ax2 = fig.add_subplot(132, projection="3d")
-        ax2.plot_surface(
-            F_mesh, T_mesh, np.abs(H_jam), cmap="viridis", edgecolor="none"
-        )
-        ax2.set_xlabel("子載波")
-        ax2.set_ylabel("OFDM 符號")
-        ax2.set_title("‖H_jam‖")
-
-        # 子圖 3: H_all
-        ax3 = fig.add_subplot(133, projection="3d")
-        ax3.plot_surface(
-            F_mesh, T_mesh, np.abs(H_all), cmap="viridis", edgecolor="none"
-        )
-        ax3.set_xlabel("子載波")
-        ax3.set_ylabel("OFDM 符號")
-        ax3.set_title("‖H_all‖")
+        def plot() -> Figure:
+            fig = Figure(figsize=(18, 5))
 
-        plt.tight_layout()
+            # 子圖 1: H_des
+            ax1 = fig.add_subplot(131, projection="3d")
+            ax1.plot_surface(
+                F_mesh, T_mesh, np.abs(H_des), cmap="viridis", edgecolor="none"
+            )
+            ax1.set_xlabel("子載波")
+            ax1.set_ylabel("OFDM 符號")
+            ax1.set_title("‖H_des‖")
+
+            # 子圖 2: H_jam
+            ax2 = fig.add_subplot(132, projection="3d")
+            ax2.plot_surface(
+                F_mesh, T_mesh, np.abs(H_jam), cmap="viridis", edgecolor="none"
+            )
+            ax2.set_xlabel("子載波")
+            ax2.set_ylabel("OFDM 符號")
+            ax2.set_title("‖H_jam‖")
+
+            # 子圖 3: H_all
+            ax3 = fig.add_subplot(133, projection="3d")
+            ax3.plot_surface(
+                F_mesh, T_mesh, np.abs(H_all), cmap="viridis", edgecolor="none"
+            )
+            ax3.set_xlabel("子載波")
+            ax3.set_ylabel("OFDM 符號")
+            ax3.set_title("‖H_all‖")
+
+            fig.tight_layout()
+            return fig
+
+        with stage("plot"):
+            fig = await run_blocking(plot)
 
         # 保存圖片
         logger.info(f"保存通道響應圖到 {output_path}")
-        plt.savefig(output_path, dpi=300, bbox_inches="tight")
-        plt.close(fig)
+        with stage("savefig"):
+            await run_blocking(fig.savefig, output_path, dpi=300, bbox_inches="tight")
 
         # 檢查文件是否生成成功
         return verify_output_file(output_path)
 
+    except SimulationCancelled:
+        # 請求已取消，不寫出圖檔
+        raise
     except Exception as e:
         logger.exception(f"生成通道響應圖時發生錯誤: {e}")
-        # 確保關閉所有打開的圖表
-        plt.close("all")
         return False
 
 
@@ -1577,6 +1548,7 @@ class SionnaSimulationService(SimulationServiceInterface):
 
     # --- 實現接口定義的方法 ---
 
+    @timed_simulation("scene_image", scene="nycu")
     async def generate_empty_scene_image(self, output_path: str) -> bool:
         """生成空場景圖像"""
         logger.info(
@@ -1592,33 +1564,42 @@ class SionnaSimulationService(SimulationServiceInterface):
         _setup_gpu()
 
         # 設置 pyrender 場景
-        pr_scene = _setup_pyrender_scene_from_glb()
+        with stage("load_scene"):
+            pr_scene = _setup_pyrender_scene_from_glb()
         if not pr_scene:
             logger.error("無法設置 pyrender 場景")
             return False
 
         # 渲染並保存場景
-        result = _render_crop_and_save(
-            pr_scene,
-            output_path,  # Uses the output_path as received
-            bg_color_float=SCENE_BACKGROUND_COLOR_RGB,
-            render_width=1200,
-            render_height=858,
-            padding_y=20,
-            padding_x=20,
-        )
+        with stage("render"):
+            result = _render_crop_and_save(
+                pr_scene,
+                output_path,  # Uses the output_path as received
+                bg_color_float=SCENE_BACKGROUND_COLOR_RGB,
+                render_width=1200,
+                render_height=858,
+                padding_y=20,
+                padding_x=20,
+            )
 
         return verify_output_file(output_path) if result else False
 
     async def generate_cfr_plot(
-        self, session: AsyncSession, output_path: str, scene_name: str = "nycu"
+        self,
+        session: AsyncSession,
+        output_path: str,
+        scene_name: str = "nycu",
+        time_s: Optional[float] = None,
     ) -> bool:
         """生成通道頻率響應(CFR)圖像"""
         logger.info(
             f"SionnaSimulationService: Calling global generate_cfr_plot, output_path: {output_path}, scene: {scene_name}"
         )
         return await generate_cfr_plot(
-            session=session, output_path=output_path, scene_name=scene_name
+            session=session,
+            output_path=output_path,
+            scene_name=scene_name,
+            time_s=time_s,
         )
 
     async def generate_sinr_map(
@@ -1630,6 +1611,13 @@ class SionnaSimulationService(SimulationServiceInterface):
         sinr_vmax: float = 0.0,
         cell_size: float = 1.0,
         samples_per_tx: int = 10**7,
+        time_s: Optional[float] = None,
+        map_center: Optional[Tuple[float, float]] = None,
+        map_size: Optional[Tuple[float, float]] = None,
+        tile_size: Optional[float] = None,
+        adaptive_samples: bool = False,
+        target_rel_error: Optional[float] = None,
+        time_budget_s: Optional[float] = None,
     ) -> bool:
         """生成SINR地圖"""
         logger.info(
@@ -1643,77 +1631,121 @@ class SionnaSimulationService(SimulationServiceInterface):
             sinr_vmax=sinr_vmax,
             cell_size=cell_size,
             samples_per_tx=samples_per_tx,
+            time_s=time_s,
+            map_center=map_center,
+            map_size=map_size,
+            tile_size=tile_size,
+            adaptive_samples=adaptive_samples,
+            target_rel_error=target_rel_error,
+            time_budget_s=time_budget_s,
         )
 
     async def generate_doppler_plots(
-        self, session: AsyncSession, output_path: str, scene_name: str = "nycu"
+        self,
+        session: AsyncSession,
+        output_path: str,
+        scene_name: str = "nycu",
+        time_s: Optional[float] = None,
     ) -> bool:
         """生成延遲多普勒圖"""
         logger.info(
             f"SionnaSimulationService: Calling global generate_doppler_plots, output_path: {output_path}, scene: {scene_name}"
         )
         return await generate_doppler_plots(
-            session=session, output_path=output_path, scene_name=scene_name
+            session=session,
+            output_path=output_path,
+            scene_name=scene_name,
+            time_s=time_s,
         )
 
     async def generate_channel_response_plots(
-        self, session: AsyncSession, output_path: str, scene_name: str = "nycu"
+        self,
+        session: AsyncSession,
+        output_path: str,
+        scene_name: str = "nycu",
+        time_s: Optional[float] = None,
     ) -> bool:
         """生成通道響應圖"""
         logger.info(
             f"SionnaSimulationService: Calling global generate_channel_response_plots, output_path: {output_path}, scene: {scene_name}"
         )
         return await generate_channel_response_plots(
-            session=session, output_path=output_path, scene_name=scene_name
+            session=session,
+            output_path=output_path,
+            scene_name=scene_name,
+            time_s=time_s,
         )
 
     async def run_simulation(
-        self, session: AsyncSession, params: SimulationParameters
+        self,
+        session: AsyncSession,
+        params: SimulationParameters,
+        output_path: Optional[str] = None,
     ) -> Dict[str, Any]:
-        """執行通用模擬"""
+        """執行通用模擬；output_path 未指定時寫入該模擬類型的預設圖檔路徑"""
         logger.info(f"Running simulation of type: {params.simulation_type}")
 
         result = {"success": False, "result_path": None, "error_message": None}
 
         try:
-            # 根據模擬類型執行不同的模擬
-            if params.simulation_type == "cfr":
-                output_path = str(CFR_PLOT_IMAGE_PATH)
-                success = await self.generate_cfr_plot(session, output_path)
-                result["result_path"] = output_path
-                result["success"] = success
-
-            elif params.simulation_type == "sinr_map":
-                output_path = str(SINR_MAP_IMAGE_PATH)
-                success = await self.generate_sinr_map(
-                    session,
-                    output_path,
-                    params.sinr_vmin or -40.0,
-                    params.sinr_vmax or 0.0,
-                    params.cell_size or 1.0,
-                    params.samples_per_tx or 10**7,
-                )
-                result["result_path"] = output_path
-                result["success"] = success
-
-            elif params.simulation_type == "doppler":
-                output_path = str(DOPPLER_IMAGE_PATH)
-                success = await self.generate_doppler_plots(session, output_path)
-                result["result_path"] = output_path
-                result["success"] = success
-
-            elif params.simulation_type == "channel_response":
-                output_path = str(CHANNEL_RESPONSE_IMAGE_PATH)
-                success = await self.generate_channel_response_plots(
-                    session, output_path
-                )
-                result["result_path"] = output_path
-                result["success"] = success
+            with capture_spans() as spans:
+                # 根據模擬類型執行不同的模擬
+                if params.simulation_type == "cfr":
+                    output_path = output_path or str(CFR_PLOT_IMAGE_PATH)
+                    success = await self.generate_cfr_plot(
+                        session, output_path, time_s=params.time_s
+                    )
+                    result["result_path"] = output_path
+                    result["success"] = success
+
+                elif params.simulation_type == "sinr_map":
+                    output_path = output_path or str(SINR_MAP_IMAGE_PATH)
+                    success = await self.generate_sinr_map(
+                        session,
+                        output_path,
+                        sinr_vmin=params.sinr_vmin or -40.0,
+                        sinr_vmax=params.sinr_vmax or 0.0,
+                        cell_size=params.cell_size or 1.0,
+                        samples_per_tx=params.samples_per_tx or 10**7,
+                        time_s=params.time_s,
+                        map_center=params.map_center,
+                        map_size=params.map_size,
+                        tile_size=params.tile_size,
+                        adaptive_samples=params.adaptive_samples,
+                        target_rel_error=params.target_rel_error,
+                        time_budget_s=params.time_budget_s,
+                    )
+                    result["result_path"] = output_path
+                    result["success"] = success
 
-            else:
-                logger.error(f"不支援的模擬類型: {params.simulation_type}")
-                result["error_message"] = f"不支援的模擬類型: {params.simulation_type}"
+                elif params.simulation_type == "doppler":
+                    output_path = output_path or str(DOPPLER_IMAGE_PATH)
+                    success = await self.generate_doppler_plots(
+                        session, output_path, time_s=params.time_s
+                    )
+                    result["result_path"] = output_path
+                    result["success"] = success
+
+                elif params.simulation_type == "channel_response":
+                    output_path = output_path or str(CHANNEL_RESPONSE_IMAGE_PATH)
+                    success = await self.generate_channel_response_plots(
+                        session, output_path, time_s=params.time_s
+                    )
+                    result["result_path"] = output_path
+                    result["success"] = success
+
+                else:
+                    logger.error(f"不支援的模擬類型: {params.simulation_type}")
+                    result["error_message"] = f"不支援的模擬類型: {params.simulation_type}"
+
+            # 附上此次模擬的記憶體用量 (RSS 峰值增量、各階段配置) 與求解設定
+            if spans:
+                result["memory"] = spans[-1].memory_summary()
+                if "solver" in spans[-1].attributes:
+                    result["solver"] = spans[-1].attributes["solver"]
 
+        except SimulationCancelled:
+            raise
         except Exception as e:
             logger.error(f"執行模擬時發生錯誤: {str(e)}", exc_info=True)
             result["error_message"] = f"執行模擬時發生錯誤: {str(e)}"
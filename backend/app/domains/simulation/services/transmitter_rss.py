@@ -0,0 +1,163 @@
+"""
+各發射器 radio map (rss) 的快取
+
+RadioMapSolver 對每個發射器各自追蹤 samples_per_tx 條射線，rss[i] 只取決於場景、
+該發射器的位置/方向/功率、天線陣列、求解參數與網格。快取以此為鍵保存各發射器的
+rss，設備變更 (例如移動一個干擾器) 時只重新求解受影響的發射器，rss_des / rss_jam /
+SINR 再由快取的陣列重新加總。單次求解的整張網格使用 transmitter_cache，分塊求解的
+各分塊使用 radio_map_tiles.tile_cache，兩者的鍵都以 transmitter_keys 為基礎。
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import RADIO_MAP_RSS_CACHE_MB
+from app.core.metrics import annotate, metrics_registry, record_cache_lookup
+from app.domains.device.models.device_snapshot import DeviceColumns
+
+logger = logging.getLogger(__name__)
+
+RssKey = Tuple[str, Hashable]
+
+# 以需要求解的發射器列索引求解，回傳 (rss (len(rows), 列 y, 行 x), x 網格中心, y 網格中心)
+SubsetSolver = Callable[[np.ndarray], Awaitable[Tuple[np.ndarray, np.ndarray, np.ndarray]]]
+
+
+class RssCache:
+    """以容量 (bytes) 為上限的 rss LRU 快取；name 為快取命中率指標的標籤"""
+
+    def __init__(self, name: str, max_bytes: int):
+        self.name = name
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[RssKey, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: RssKey) -> Optional[np.ndarray]:
+        with self._lock:
+            rss = self._entries.get(key)
+            if rss is not None:
+                self._entries.move_to_end(key)
+        record_cache_lookup(self.name, rss is not None)
+        return rss
+
+    def put(self, key: RssKey, rss: np.ndarray) -> None:
+        if rss.nbytes > self.max_bytes:
+            return
+        rss.setflags(write=False)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            self._entries[key] = rss
+            self._bytes += rss.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+transmitter_cache = RssCache("radio_map_transmitters", int(RADIO_MAP_RSS_CACHE_MB * 2**20))
+
+metrics_registry.gauge(
+    "radio_map_transmitter_cache_bytes",
+    "Bytes of per-transmitter rss held by the full-grid radio map cache.",
+    lambda: {(): float(transmitter_cache.nbytes)},
+)
+
+
+def scene_key(scene_xml: str) -> str:
+    """場景檔路徑與修改時間"""
+    return f"{os.path.abspath(scene_xml)}@{os.path.getmtime(scene_xml)!r}"
+
+
+def transmitter_keys(
+    scene_xml: str,
+    transmitters: DeviceColumns,
+    *,
+    samples_per_tx: int,
+    max_depth: int,
+    array_config: Dict[str, Any],
+    seed: int = 42,
+) -> List[str]:
+    """各發射器 rss 的快取鍵 (不含網格)：場景、位置、方向、功率、天線陣列與求解參數
+
+    不含設備名稱，重新命名不會使快取失效。
+    """
+    common = hashlib.sha1(scene_key(scene_xml).encode())
+    common.update(repr((samples_per_tx, max_depth, sorted(array_config.items()), seed)).encode())
+    rows = np.column_stack(
+        [transmitters.positions, transmitters.orientations, transmitters.power_dbm]
+    ).astype(np.float64)
+    keys = []
+    for row in rows:
+        digest = common.copy()
+        digest.update(np.ascontiguousarray(row).tobytes())
+        keys.append(digest.hexdigest())
+    return keys
+
+
+async def solve_transmitter_rss(
+    scene_xml: str,
+    transmitters: DeviceColumns,
+    region: Hashable,
+    solve: SubsetSolver,
+    *,
+    samples_per_tx: int,
+    max_depth: int,
+    array_config: Dict[str, Any],
+    seed: int = 42,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """整張網格的各發射器 rss：取自快取，只求解未快取的發射器
+
+    region 描述網格 (cell_size 與範圍)；網格中心與各發射器 rss 分別快取，
+    網格中心已被移出快取時全部重新求解。回傳 (rss (num_tx, 列 y, 行 x), x, y)。
+    """
+    keys = transmitter_keys(
+        scene_xml,
+        transmitters,
+        samples_per_tx=samples_per_tx,
+        max_depth=max_depth,
+        array_config=array_config,
+        seed=seed,
+    )
+    grid_key = (scene_key(scene_xml), region)
+    centers = transmitter_cache.get(grid_key)
+    rows: List[Optional[np.ndarray]] = [transmitter_cache.get((key, region)) for key in keys]
+    if centers is None:
+        missing = list(range(len(keys)))
+    else:
+        missing = [i for i, rss in enumerate(rows) if rss is None]
+    cached = len(keys) - len(missing)
+    annotate(transmitters_cached=cached, transmitters_solved=len(missing))
+    if cached:
+        annotate(rss_reused=True)
+    logger.info(f"無線電地圖：{len(keys)} 個發射器，{cached} 個取自快取")
+
+    if missing:
+        rss, x, y = await solve(np.asarray(missing, dtype=np.intp))
+        centers = np.concatenate([np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)])
+        transmitter_cache.put(grid_key, centers)
+        for i, row in zip(missing, rss):
+            rows[i] = row
+            transmitter_cache.put((keys[i], region), row)
+
+    nx = rows[0].shape[1]
+    return np.stack(rows), centers[:nx], centers[nx:]
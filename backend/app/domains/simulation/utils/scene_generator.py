@@ -0,0 +1,313 @@
+"""
+程序化合成城市場景
+
+依建築數量、高度分布、街道寬度、地面大小與材質等參數產生街廓場景，
+輸出 Sionna RT 可直接 load_scene 的 Mitsuba XML 與二進位 PLY 網格，
+用於量測 PathSolver / RadioMapSolver 的耗時與記憶體如何隨幾何複雜度變化。
+"""
+
+import math
+from pathlib import Path
+from typing import Dict, List, Literal, Optional, Sequence, Tuple
+from xml.sax.saxutils import quoteattr
+
+import numpy as np
+from pydantic import BaseModel, Field, field_validator
+
+# Sionna RT 內建的 ITU 無線電材質
+ITU_MATERIALS = (
+    "vacuum",
+    "concrete",
+    "brick",
+    "plasterboard",
+    "wood",
+    "glass",
+    "ceiling_board",
+    "chipboard",
+    "plywood",
+    "marble",
+    "floorboard",
+    "metal",
+    "very_dry_ground",
+    "medium_dry_ground",
+    "wet_ground",
+)
+
+# 單位立方體外露的五個面 (四面牆與屋頂，不含底面)：(原點, u, v)，法向量 u×v 朝外
+_BOX_FACES = (
+    ((0, 0, 0), (1, 0, 0), (0, 0, 1)),
+    ((1, 0, 0), (0, 1, 0), (0, 0, 1)),
+    ((1, 1, 0), (-1, 0, 0), (0, 0, 1)),
+    ((0, 1, 0), (0, -1, 0), (0, 0, 1)),
+    ((0, 0, 1), (1, 0, 0), (0, 1, 0)),
+)
+
+
+class SyntheticSceneParameters(BaseModel):
+    """合成街廓場景參數"""
+
+    building_count: int = Field(100, ge=0, description="建築數量，依方格街廓排列")
+    lot_size: float = Field(30.0, gt=0, description="每棟建築所在地塊邊長 (m)")
+    street_width: float = Field(15.0, ge=0, description="地塊之間的街道寬度 (m)")
+    footprint_ratio: Tuple[float, float] = Field(
+        (0.6, 0.95), description="建築占地邊長相對於地塊邊長的範圍"
+    )
+    height_distribution: Literal["uniform", "normal", "lognormal"] = Field(
+        "lognormal", description="建築高度分布"
+    )
+    height_mean: float = Field(20.0, gt=0, description="高度平均 (lognormal 為中位數) (m)")
+    height_spread: float = Field(
+        0.5, ge=0, description="normal 為標準差 (m)，lognormal 為 sigma，uniform 為相對半寬"
+    )
+    min_height: float = Field(3.0, gt=0, description="最低建築高度 (m)")
+    max_height: float = Field(150.0, gt=0, description="最高建築高度 (m)")
+    facade_subdivisions: int = Field(
+        1, ge=1, description="每個牆面與屋頂切分為 n×n 個四邊形，用於增加三角形數量"
+    )
+    ground_size: Optional[float] = Field(
+        None, gt=0, description="地面邊長 (m)，未指定時為街廓範圍加上一條街寬"
+    )
+    ground_subdivisions: int = Field(1, ge=1, description="地面切分為 n×n 個四邊形")
+    building_materials: Dict[str, float] = Field(
+        default_factory=lambda: {"concrete": 0.6, "brick": 0.25, "glass": 0.15},
+        description="建築材質與權重",
+    )
+    ground_material: str = Field("medium_dry_ground", description="地面材質")
+    material_thickness: float = Field(0.2, gt=0, description="材質厚度 (m)")
+    seed: int = Field(0, description="隨機種子")
+
+    @field_validator("building_materials")
+    @classmethod
+    def _check_building_materials(cls, value: Dict[str, float]) -> Dict[str, float]:
+        if not value or any(weight < 0 for weight in value.values()) or sum(value.values()) <= 0:
+            raise ValueError("building_materials must have non-negative weights with a positive sum")
+        for material in value:
+            _check_material(material)
+        return value
+
+    @field_validator("ground_material")
+    @classmethod
+    def _check_ground_material(cls, value: str) -> str:
+        return _check_material(value)
+
+    @property
+    def triangle_count(self) -> int:
+        """產生場景的總三角形數"""
+        return (
+            self.building_count * 10 * self.facade_subdivisions**2
+            + 2 * self.ground_subdivisions**2
+        )
+
+
+class SyntheticSceneInfo(BaseModel):
+    """已寫出的合成場景摘要"""
+
+    name: str
+    xml_path: str
+    building_count: int
+    triangle_count: int
+    extent: float = Field(..., description="街廓範圍邊長 (m)")
+    ground_size: float
+    max_height: float
+    parameters: SyntheticSceneParameters
+
+
+def _check_material(material: str) -> str:
+    if material not in ITU_MATERIALS:
+        raise ValueError(f"Unknown ITU material '{material}', expected one of {ITU_MATERIALS}")
+    return material
+
+
+def _grid_face(origin, u, v, subdivisions: int) -> Tuple[np.ndarray, np.ndarray]:
+    """以 origin + a*u + b*v (a, b ∈ [0, 1]) 切分 n×n 的平面網格，三角形法向量為 u×v"""
+    steps = np.linspace(0.0, 1.0, subdivisions + 1)
+    a, b = np.meshgrid(steps, steps, indexing="ij")
+    vertices = (
+        np.asarray(origin, dtype=np.float64)
+        + a.reshape(-1, 1) * np.asarray(u, dtype=np.float64)
+        + b.reshape(-1, 1) * np.asarray(v, dtype=np.float64)
+    )
+    i, j = np.meshgrid(np.arange(subdivisions), np.arange(subdivisions), indexing="ij")
+    corner = (i * (subdivisions + 1) + j).ravel()
+    quad = np.stack(
+        [corner, corner + subdivisions + 1, corner + subdivisions + 2, corner + 1], axis=1
+    )
+    faces = np.concatenate([quad[:, [0, 1, 2]], quad[:, [0, 2, 3]]])
+    return vertices, faces
+
+
+def _box_template(subdivisions: int) -> Tuple[np.ndarray, np.ndarray]:
+    """單位立方體 (不含底面) 的頂點與三角形"""
+    vertices: List[np.ndarray] = []
+    faces: List[np.ndarray] = []
+    offset = 0
+    for origin, u, v in _BOX_FACES:
+        face_vertices, face_faces = _grid_face(origin, u, v, subdivisions)
+        vertices.append(face_vertices)
+        faces.append(face_faces + offset)
+        offset += len(face_vertices)
+    return np.concatenate(vertices), np.concatenate(faces)
+
+
+def _sample_heights(params: SyntheticSceneParameters, rng, count: int) -> np.ndarray:
+    if params.height_distribution == "uniform":
+        half = params.height_spread * params.height_mean
+        heights = rng.uniform(params.height_mean - half, params.height_mean + half, count)
+    elif params.height_distribution == "normal":
+        heights = rng.normal(params.height_mean, params.height_spread, count)
+    else:
+        heights = rng.lognormal(math.log(params.height_mean), params.height_spread, count)
+    return np.clip(heights, params.min_height, params.max_height)
+
+
+def building_layout(params: SyntheticSceneParameters) -> Tuple[np.ndarray, np.ndarray, float]:
+    """建築的最小角落座標與尺寸 (N, 3)，以及街廓範圍邊長；場景以原點為中心"""
+    rng = np.random.default_rng(params.seed)
+    count = params.building_count
+    columns = max(1, math.ceil(math.sqrt(count)))
+    rows = max(1, math.ceil(count / columns))
+    pitch = params.lot_size + params.street_width
+    extent = max(columns, rows) * pitch - params.street_width
+
+    index = np.arange(count)
+    lot_x = (index % columns) * pitch - (columns * pitch - params.street_width) / 2
+    lot_y = (index // columns) * pitch - (rows * pitch - params.street_width) / 2
+
+    low, high = params.footprint_ratio
+    width = rng.uniform(low, high, count) * params.lot_size
+    depth = rng.uniform(low, high, count) * params.lot_size
+    # 建築在地塊內隨機偏移，避免所有立面完全對齊
+    offset_x = rng.uniform(0.0, 1.0, count) * (params.lot_size - width)
+    offset_y = rng.uniform(0.0, 1.0, count) * (params.lot_size - depth)
+
+    corners = np.stack([lot_x + offset_x, lot_y + offset_y, np.zeros(count)], axis=1)
+    sizes = np.stack([width, depth, _sample_heights(params, rng, count)], axis=1)
+    return corners, sizes, extent
+
+
+def building_meshes(
+    corners: np.ndarray, sizes: np.ndarray, subdivisions: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """將所有建築一次展開為合併的頂點與三角形陣列"""
+    template_vertices, template_faces = _box_template(subdivisions)
+    vertices = corners[:, np.newaxis, :] + template_vertices[np.newaxis] * sizes[:, np.newaxis, :]
+    faces = (
+        template_faces[np.newaxis]
+        + (np.arange(len(corners)) * len(template_vertices))[:, np.newaxis, np.newaxis]
+    )
+    return vertices.reshape(-1, 3), faces.reshape(-1, 3)
+
+
+def write_ply(path: Path, vertices: np.ndarray, faces: np.ndarray) -> None:
+    """寫出 binary little-endian PLY (float32 頂點、int32 索引)"""
+    header = (
+        "ply\n"
+        "format binary_little_endian 1.0\n"
+        f"element vertex {len(vertices)}\n"
+        "property float x\n"
+        "property float y\n"
+        "property float z\n"
+        f"element face {len(faces)}\n"
+        "property list uchar int vertex_indices\n"
+        "end_header\n"
+    )
+    face_records = np.empty(len(faces), dtype=[("count", "u1"), ("indices", "<i4", (3,))])
+    face_records["count"] = 3
+    face_records["indices"] = faces
+    with open(path, "wb") as handle:
+        handle.write(header.encode("ascii"))
+        handle.write(np.ascontiguousarray(vertices, dtype="<f4").tobytes())
+        handle.write(face_records.tobytes())
+
+
+def _scene_xml(materials: Sequence[str], shapes: Sequence[Tuple[str, str, str]], thickness: float) -> str:
+    lines = ['<scene version="2.1.0">']
+    for material in materials:
+        material_id = quoteattr(f"mat-itu_{material}")
+        lines += [
+            f'    <bsdf type="itu-radio-material" id={material_id} name={material_id}>',
+            f'        <string name="type" value="{material}"/>',
+            f'        <float name="thickness" value="{thickness}"/>',
+            "    </bsdf>",
+        ]
+    for shape_id, filename, material in shapes:
+        shape_attr = quoteattr(shape_id)
+        lines += [
+            f'    <shape type="ply" id={shape_attr} name={shape_attr}>',
+            f'        <string name="filename" value="{filename}"/>',
+            '        <boolean name="face_normals" value="true"/>',
+            f'        <ref id="mat-itu_{material}" name="bsdf"/>',
+            "    </shape>",
+        ]
+    lines.append("</scene>")
+    return "\n".join(lines) + "\n"
+
+
+def write_scene(
+    params: SyntheticSceneParameters, output_dir, name: str = "synthetic"
+) -> SyntheticSceneInfo:
+    """寫出 <output_dir>/<name>/<name>.xml 與 meshes/*.ply，同材質的建築合併為一個網格"""
+    scene_dir = Path(output_dir) / name
+    meshes_dir = scene_dir / "meshes"
+    meshes_dir.mkdir(parents=True, exist_ok=True)
+
+    corners, sizes, extent = building_layout(params)
+    ground_size = params.ground_size or extent + 2 * params.street_width
+
+    shapes: List[Tuple[str, str, str]] = []
+    half = ground_size / 2
+    ground_vertices, ground_faces = _grid_face(
+        (-half, -half, 0.0), (ground_size, 0.0, 0.0), (0.0, ground_size, 0.0),
+        params.ground_subdivisions,
+    )
+    write_ply(meshes_dir / "ground.ply", ground_vertices, ground_faces)
+    shapes.append(("mesh-ground", "meshes/ground.ply", params.ground_material))
+
+    # 依權重為每棟建築抽取材質
+    rng = np.random.default_rng(params.seed + 1)
+    names = list(params.building_materials)
+    weights = np.asarray([params.building_materials[m] for m in names], dtype=np.float64)
+    assignment = rng.choice(len(names), size=len(corners), p=weights / weights.sum())
+    for index, material in enumerate(names):
+        selected = assignment == index
+        if not selected.any():
+            continue
+        vertices, faces = building_meshes(
+            corners[selected], sizes[selected], params.facade_subdivisions
+        )
+        filename = f"buildings_{material}.ply"
+        write_ply(meshes_dir / filename, vertices, faces)
+        shapes.append((f"mesh-buildings_{material}", f"meshes/{filename}", material))
+
+    materials = sorted({material for _, _, material in shapes})
+    xml_path = scene_dir / f"{name}.xml"
+    xml_path.write_text(_scene_xml(materials, shapes, params.material_thickness))
+
+    return SyntheticSceneInfo(
+        name=name,
+        xml_path=str(xml_path),
+        building_count=len(corners),
+        triangle_count=params.triangle_count,
+        extent=extent,
+        ground_size=ground_size,
+        max_height=float(sizes[:, 2].max()) if len(sizes) else 0.0,
+        parameters=params,
+    )
+
+
+def parameters_for_triangles(
+    target_triangles: int, max_buildings: int = 10_000, **overrides
+) -> SyntheticSceneParameters:
+    """選擇建築數量與立面切分，使三角形數接近 target_triangles
+
+    建築數量不超過 max_buildings，超過時改以立面切分增加三角形。
+    """
+    subdivisions = 1
+    while max_buildings * 10 * subdivisions**2 + 2 < target_triangles:
+        subdivisions += 1
+    buildings = max(1, round((target_triangles - 2) / (10 * subdivisions**2)))
+    return SyntheticSceneParameters(
+        building_count=min(buildings, max_buildings),
+        facade_subdivisions=subdivisions,
+        **overrides,
+    )
@@ -0,0 +1,136 @@
+"""
+場景幾何統計
+
+不載入 Sionna/Mitsuba，只讀取場景 XML 引用的 PLY 網格標頭與頂點，
+取得三角形數量與邊界框，供資源估算使用。結果依檔案修改時間快取。
+"""
+
+import logging
+import os
+import xml.etree.ElementTree as ET
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+_PLY_TYPES = {
+    "char": "i1", "int8": "i1", "uchar": "u1", "uint8": "u1",
+    "short": "i2", "int16": "i2", "ushort": "u2", "uint16": "u2",
+    "int": "i4", "int32": "i4", "uint": "u4", "uint32": "u4",
+    "float": "f4", "float32": "f4", "double": "f8", "float64": "f8",
+}
+
+
+class SceneStats(BaseModel):
+    """場景的網格數、三角形數與邊界框 (米)"""
+
+    meshes: int = 0
+    vertices: int = 0
+    triangles: int = 0
+    bounds_min: Optional[Tuple[float, float, float]] = None
+    bounds_max: Optional[Tuple[float, float, float]] = None
+
+    @property
+    def footprint(self) -> Tuple[float, float]:
+        """水平 (x, y) 範圍；未知時為 (0, 0)"""
+        if self.bounds_min is None or self.bounds_max is None:
+            return 0.0, 0.0
+        return (
+            self.bounds_max[0] - self.bounds_min[0],
+            self.bounds_max[1] - self.bounds_min[1],
+        )
+
+
+def _mesh_files(xml_path: Path) -> List[Path]:
+    """XML 中引用的 PLY 檔案；XML 無法解析時 (例如 Git LFS 指標檔) 改用 meshes/*.ply"""
+    try:
+        root = ET.parse(xml_path).getroot()
+        files = [
+            xml_path.parent / element.get("value")
+            for shape in root.iter("shape")
+            if shape.get("type") == "ply"
+            for element in shape.iter("string")
+            if element.get("name") == "filename" and element.get("value")
+        ]
+        if files:
+            return files
+    except (ET.ParseError, OSError):
+        pass
+    return sorted((xml_path.parent / "meshes").glob("*.ply"))
+
+
+def read_ply_stats(path: Path) -> Tuple[int, int, Optional[np.ndarray], Optional[np.ndarray]]:
+    """回傳 PLY 的 (頂點數, 三角形數, 最小角, 最大角)；只有 binary little-endian 會計算邊界框"""
+    with open(path, "rb") as handle:
+        if handle.readline().strip() != b"ply":
+            raise ValueError(f"{path} is not a PLY file")
+        fmt = None
+        elements: List[Tuple[str, int, List[Tuple[str, str]]]] = []
+        while True:
+            line = handle.readline()
+            if not line:
+                raise ValueError(f"{path} has no end_header")
+            words = line.decode("ascii", errors="replace").split()
+            if not words:
+                continue
+            if words[0] == "end_header":
+                break
+            if words[0] == "format":
+                fmt = words[1]
+            elif words[0] == "element":
+                elements.append((words[1], int(words[2]), []))
+            elif words[0] == "property" and elements:
+                elements[-1][2].append((words[-1], " ".join(words[1:-1])))
+
+        counts = {name: count for name, count, _ in elements}
+        vertex_count = counts.get("vertex", 0)
+        face_count = counts.get("face", 0)
+        if fmt != "binary_little_endian" or not elements or elements[0][0] != "vertex":
+            return vertex_count, face_count, None, None
+
+        properties = elements[0][2]
+        if any(kind.startswith("list") or kind not in _PLY_TYPES for _, kind in properties):
+            return vertex_count, face_count, None, None
+        dtype = np.dtype([(name, "<" + _PLY_TYPES[kind]) for name, kind in properties])
+        data = np.fromfile(handle, dtype=dtype, count=vertex_count)
+    if len(data) == 0 or not {"x", "y", "z"} <= set(dtype.names):
+        return vertex_count, face_count, None, None
+    xyz = np.stack([data["x"], data["y"], data["z"]], axis=1).astype(np.float64)
+    return vertex_count, face_count, xyz.min(axis=0), xyz.max(axis=0)
+
+
+@lru_cache(maxsize=64)
+def _cached_scene_stats(xml_path: str, mtime: float) -> SceneStats:
+    stats = SceneStats()
+    lower = np.full(3, np.inf)
+    upper = np.full(3, -np.inf)
+    for mesh in _mesh_files(Path(xml_path)):
+        try:
+            vertices, faces, mesh_min, mesh_max = read_ply_stats(mesh)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping mesh {mesh} while computing scene stats: {e}")
+            continue
+        stats.meshes += 1
+        stats.vertices += vertices
+        stats.triangles += faces
+        if mesh_min is not None:
+            lower = np.minimum(lower, mesh_min)
+            upper = np.maximum(upper, mesh_max)
+    if np.isfinite(lower).all():
+        stats.bounds_min = tuple(float(value) for value in lower)
+        stats.bounds_max = tuple(float(value) for value in upper)
+    return stats
+
+
+def scene_stats(xml_path) -> SceneStats:
+    """場景 XML 的幾何統計 (依 XML 修改時間快取)"""
+    path = str(xml_path)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        mtime = 0.0
+    return _cached_scene_stats(path, mtime)
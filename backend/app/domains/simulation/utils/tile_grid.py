@@ -0,0 +1,139 @@
+"""
+Radio map 分塊格點
+
+量測平面以 cell_size 對齊原點切成網格，分塊為 tile_cells × tile_cells 個網格的
+方形區塊，同樣對齊原點：分塊 (ix, iy) 涵蓋網格 [ix·n, (ix+1)·n) × [iy·n, (iy+1)·n)。
+任意請求範圍都由同一組全域分塊組成，範圍重疊的請求因此會用到相同的分塊。
+不依賴 Sionna，供資源估算與分塊求解共用。
+"""
+
+import math
+from typing import List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from app.domains.simulation.utils.scene_stats import SceneStats
+
+# 量測平面的高度 (米)，與 RadioMapSolver 預設一致
+RADIO_MAP_HEIGHT = 1.5
+# 場景範圍未知時的預設地圖邊長 (米)
+DEFAULT_MAP_EXTENT = 1000.0
+# 浮點誤差容許值，避免剛好落在網格邊界的範圍多算一格
+_EPS = 1e-9
+
+
+class RadioMapTile(BaseModel):
+    """全域格點上的一個分塊"""
+
+    ix: int
+    iy: int
+    tile_cells: int
+    cell_size: float
+    height: float = RADIO_MAP_HEIGHT
+
+    @property
+    def size(self) -> Tuple[float, float]:
+        edge = self.tile_cells * self.cell_size
+        return edge, edge
+
+    @property
+    def center(self) -> Tuple[float, float, float]:
+        edge = self.tile_cells * self.cell_size
+        return (self.ix + 0.5) * edge, (self.iy + 0.5) * edge, self.height
+
+    @property
+    def key(self) -> Tuple[int, int, int, float, float]:
+        return self.ix, self.iy, self.tile_cells, self.cell_size, self.height
+
+
+class TilePlan(BaseModel):
+    """請求範圍對應的分塊與裁切窗口 (以全域網格索引表示)"""
+
+    tiles: List[RadioMapTile]
+    cell_size: float
+    tile_cells: int
+    # 分塊拼接後涵蓋的網格範圍起點
+    tile_origin: Tuple[int, int]
+    tiles_shape: Tuple[int, int]  # (列數 y, 行數 x)
+    # 請求範圍的網格 [x0, x1) × [y0, y1)
+    window: Tuple[int, int, int, int]
+
+    @property
+    def grid_cells(self) -> int:
+        x0, x1, y0, y1 = self.window
+        return (x1 - x0) * (y1 - y0)
+
+    @property
+    def tile_grid_cells(self) -> int:
+        return self.tile_cells * self.tile_cells
+
+    def crop(self) -> Tuple[slice, slice]:
+        """拼接陣列 (..., y, x) 中請求範圍的切片"""
+        x0, x1, y0, y1 = self.window
+        ox, oy = self.tile_origin
+        return slice(y0 - oy, y1 - oy), slice(x0 - ox, x1 - ox)
+
+    def cell_centers(self) -> Tuple[Tuple[float, ...], Tuple[float, ...]]:
+        """請求範圍內各行的 x 與各列的 y 網格中心"""
+        x0, x1, y0, y1 = self.window
+        c = self.cell_size
+        return (
+            tuple((k + 0.5) * c for k in range(x0, x1)),
+            tuple((k + 0.5) * c for k in range(y0, y1)),
+        )
+
+
+def default_extent(stats: SceneStats) -> Tuple[Tuple[float, float], Tuple[float, float]]:
+    """場景水平範圍的中心與大小；未知時以原點為中心的 DEFAULT_MAP_EXTENT 方形"""
+    width, height = stats.footprint
+    if width <= 0 or height <= 0:
+        return (0.0, 0.0), (DEFAULT_MAP_EXTENT, DEFAULT_MAP_EXTENT)
+    return (
+        (
+            (stats.bounds_min[0] + stats.bounds_max[0]) / 2,
+            (stats.bounds_min[1] + stats.bounds_max[1]) / 2,
+        ),
+        (width, height),
+    )
+
+
+def plan_tiles(
+    center: Tuple[float, float],
+    size: Tuple[float, float],
+    cell_size: float,
+    tile_size: float,
+    height: Optional[float] = None,
+) -> TilePlan:
+    """列出涵蓋 center/size 範圍的分塊；tile_size 取最接近的 cell_size 整數倍"""
+    if cell_size <= 0 or tile_size <= 0:
+        raise ValueError("cell_size 與 tile_size 必須大於 0")
+    if size[0] <= 0 or size[1] <= 0:
+        raise ValueError("地圖範圍必須大於 0")
+    n = max(1, round(tile_size / cell_size))
+    cx, cy = center
+    w, h = size
+    x0 = math.floor((cx - w / 2) / cell_size + _EPS)
+    x1 = math.ceil((cx + w / 2) / cell_size - _EPS)
+    y0 = math.floor((cy - h / 2) / cell_size + _EPS)
+    y1 = math.ceil((cy + h / 2) / cell_size - _EPS)
+    ix0, ix1 = x0 // n, (x1 - 1) // n
+    iy0, iy1 = y0 // n, (y1 - 1) // n
+    tiles = [
+        RadioMapTile(
+            ix=ix,
+            iy=iy,
+            tile_cells=n,
+            cell_size=cell_size,
+            height=RADIO_MAP_HEIGHT if height is None else height,
+        )
+        for iy in range(iy0, iy1 + 1)
+        for ix in range(ix0, ix1 + 1)
+    ]
+    return TilePlan(
+        tiles=tiles,
+        cell_size=cell_size,
+        tile_cells=n,
+        tile_origin=(ix0 * n, iy0 * n),
+        tiles_shape=(iy1 - iy0 + 1, ix1 - ix0 + 1),
+        window=(x0, x1, y0, y1),
+    )
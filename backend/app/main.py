@@ -1,6 +1,7 @@
 import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 import os
 
@@ -8,6 +9,7 @@ import os
 from app.db.lifespan import lifespan
 from app.api.v1.router import api_router
 from app.core.config import OUTPUT_DIR  # 導入設定的圖片目錄路徑
+from app.core.metrics import PROMETHEUS_CONTENT_TYPE, metrics_registry
 
 logger = logging.getLogger(__name__)
 
@@ -51,6 +53,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # 允許所有方法
     allow_headers=["*"],  # 允許所有頭部
+    # 讓前端讀取模擬的估計執行時間、排隊時間與分析結果標頭
+    expose_headers=[
+        "X-Estimated-Runtime",
+        "X-Queue-Wait",
+        "X-Simulation-Downgraded",
+        "X-Simulation-Priority",
+        "X-Simulation-Job-Id",
+        "X-Simulation-Level",
+        "X-Simulation-Levels",
+        "X-Simulation-Final",
+        "X-Cell-Size",
+        "X-Samples-Per-Tx",
+        "X-Radio-Map-Solver",
+        "X-Profile-Id",
+        "Link",
+        "Retry-After",
+    ],
 )
 logger.info("CORS middleware added with specific origins.")
 
@@ -61,6 +80,15 @@ async def ping():
     return {"message": "pong"}
 
 
+# --- Metrics Endpoint ---
+@app.get("/metrics", tags=["Monitoring"], include_in_schema=False)
+async def metrics():
+    """以 Prometheus 文字格式輸出模擬延遲、佇列深度、快取命中率與記憶體用量"""
+    return PlainTextResponse(
+        metrics_registry.render(), media_type=PROMETHEUS_CONTENT_TYPE
+    )
+
+
 # --- Include API Routers ---
 # Include the router for API version 1
 app.include_router(api_router, prefix="/api/v1")  # Add a /api/v1 prefix
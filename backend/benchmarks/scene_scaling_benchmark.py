@@ -0,0 +1,201 @@
+"""
+幾何複雜度擴展性基準
+
+在 backend 目錄下執行：
+    python -m benchmarks.scene_scaling_benchmark --triangles 500 5000 50000 500000
+    python -m benchmarks.scene_scaling_benchmark --generate-only --output-dir /tmp/scenes
+
+以 app.domains.simulation.utils.scene_generator 產生由數百到數十萬個三角形的
+合成街廓場景，對每個場景量測 load_scene、PathSolver 與 RadioMapSolver 的耗時
+與常駐記憶體峰值增量 (僅使用 CPU)，結果輸出為 JSON。
+"""
+
+# 匯入時即設定僅使用 CPU (CUDA_VISIBLE_DEVICES、Mitsuba LLVM variant)
+from benchmarks.simulation_benchmark import git_commit, package_versions
+
+import argparse
+import json
+import os
+import platform
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Tuple
+
+from app.core.metrics import process_rss_bytes
+from app.domains.simulation.utils.scene_generator import (
+    SyntheticSceneInfo,
+    parameters_for_triangles,
+    write_scene,
+)
+
+ARRAY_CONFIG = {
+    "num_rows": 1,
+    "num_cols": 1,
+    "vertical_spacing": 0.5,
+    "horizontal_spacing": 0.5,
+    "pattern": "iso",
+    "polarization": "V",
+}
+
+
+def measure(func: Callable[[], Any], repeat: int = 1) -> Tuple[float, float, Any]:
+    """執行 repeat 次，回傳最佳耗時 (秒)、常駐記憶體峰值增量 (bytes) 與最後一次結果"""
+    best = float("inf")
+    peak = 0.0
+    result = None
+    for _ in range(repeat):
+        baseline = process_rss_bytes()
+        highest = [baseline]
+        done = threading.Event()
+
+        def sample() -> None:
+            while not done.wait(0.01):
+                highest[0] = max(highest[0], process_rss_bytes())
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            result = func()
+        finally:
+            elapsed = time.perf_counter() - start
+            done.set()
+            sampler.join()
+        best = min(best, elapsed)
+        peak = max(peak, max(highest[0], process_rss_bytes()) - baseline)
+    return best, peak, result
+
+
+def solve_scene(info: SyntheticSceneInfo, args) -> Dict[str, Any]:
+    """在合成場景上執行 PathSolver 與 RadioMapSolver"""
+    from sionna.rt import (
+        PathSolver,
+        PlanarArray,
+        RadioMapSolver,
+        Receiver,
+        Transmitter,
+        load_scene,
+    )
+
+    load_s, load_bytes, scene = measure(lambda: load_scene(info.xml_path))
+    scene.tx_array = PlanarArray(**ARRAY_CONFIG)
+    scene.rx_array = PlanarArray(**ARRAY_CONFIG)
+    # 發射器位於最高建築上方，接收器分布在街廓內的街道高度
+    scene.add(Transmitter(name="tx", position=[0.0, 0.0, info.max_height + 10.0], power_dbm=30))
+    quarter = info.extent / 4
+    for index, (x, y) in enumerate(
+        ((quarter, quarter), (-quarter, quarter), (-quarter, -quarter), (quarter, -quarter))
+    ):
+        scene.add(Receiver(name=f"rx{index}", position=[x, y, 1.5]))
+
+    path_solver = PathSolver()
+    path_s, path_bytes, _ = measure(
+        lambda: path_solver(
+            scene,
+            max_depth=args.max_depth,
+            los=True,
+            specular_reflection=True,
+            diffuse_reflection=False,
+            refraction=False,
+            synthetic_array=False,
+            seed=41,
+        ),
+        args.repeat,
+    )
+    rm_solver = RadioMapSolver()
+    radio_map_s, radio_map_bytes, _ = measure(
+        lambda: rm_solver(
+            scene,
+            max_depth=args.max_depth,
+            cell_size=(args.cell_size, args.cell_size),
+            samples_per_tx=args.samples_per_tx,
+        ),
+        args.repeat,
+    )
+    return {
+        "load_scene_s": load_s,
+        "load_scene_rss_delta_bytes": load_bytes,
+        "path_solver_s": path_s,
+        "path_solver_rss_delta_bytes": path_bytes,
+        "radio_map_solver_s": radio_map_s,
+        "radio_map_solver_rss_delta_bytes": radio_map_bytes,
+    }
+
+
+def run(args, output_dir: str) -> Dict[str, Any]:
+    results: List[Dict[str, Any]] = []
+    for target in args.triangles:
+        params = parameters_for_triangles(
+            target,
+            max_buildings=args.max_buildings,
+            street_width=args.street_width,
+            seed=args.seed,
+        )
+        generate_s, _, info = measure(lambda: write_scene(params, output_dir, f"synthetic_{target}"))
+        result = {
+            "target_triangles": target,
+            "triangles": info.triangle_count,
+            "buildings": info.building_count,
+            "facade_subdivisions": params.facade_subdivisions,
+            "extent_m": info.extent,
+            "xml_path": info.xml_path,
+            "generate_s": generate_s,
+        }
+        if not args.generate_only:
+            result.update(solve_scene(info, args))
+        results.append(result)
+        print(
+            f"{info.triangle_count:>9} triangles {info.building_count:>6} buildings  "
+            + "  ".join(
+                f"{key} {value:.3f}"
+                for key, value in result.items()
+                if key.endswith("_s")
+            )
+        )
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "packages": package_versions(),
+        "settings": {
+            "max_depth": args.max_depth,
+            "samples_per_tx": args.samples_per_tx,
+            "cell_size": args.cell_size,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Solver scaling benchmark on synthetic city scenes")
+    parser.add_argument("--triangles", type=int, nargs="+", default=[500, 5_000, 50_000, 500_000])
+    parser.add_argument("--max-buildings", type=int, default=10_000)
+    parser.add_argument("--street-width", type=float, default=15.0)
+    parser.add_argument("--max-depth", type=int, default=3)
+    parser.add_argument("--samples-per-tx", type=int, default=10**6)
+    parser.add_argument("--cell-size", type=float, default=4.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--generate-only", action="store_true", help="只產生場景，不執行求解器")
+    parser.add_argument("--output-dir", default=None, help="保留產生的場景；預設使用暫存目錄")
+    parser.add_argument("--output", default="bench_scene_scaling.json")
+    args = parser.parse_args()
+
+    if args.output_dir:
+        report = run(args, args.output_dir)
+    else:
+        with tempfile.TemporaryDirectory(prefix="synthetic_scenes_") as tmp:
+            report = run(args, tmp)
+    with open(args.output, "w") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"Wrote {len(report['results'])} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+模擬生成函數效能基準 (僅使用 CPU)
+
+在 backend 目錄下執行 (需安裝 aiosqlite)：
+    python -m benchmarks.simulation_benchmark --output bench_simulation.json
+    python -m benchmarks.simulation_benchmark --artifacts sinr_map --devices 4 16 \\
+        --samples-per-tx 100000 --cell-size 2 --compare bench_simulation.json
+
+設備資料寫入記憶體內 SQLite，不需要 PostgreSQL；對每個場景、設備數量、
+max_depth、samples_per_tx 與 cell_size 的組合執行生成函數，記錄總耗時與
+各階段 (load_scene、path_solver、cfr、plot…) 的耗時，結果輸出為 JSON，
+以 --compare 指定先前的結果檔即可比較不同 commit 間的差異。
+"""
+
+import os
+
+# 必須在匯入 TensorFlow / Mitsuba / pyrender 之前設定，確保只使用 CPU
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "-1")
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "3")
+os.environ.setdefault("PYOPENGL_PLATFORM", "osmesa")
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from itertools import product
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel
+
+try:
+    import mitsuba as mi
+
+    # Sionna RT 只在尚未選擇 variant 時才會優先使用 CUDA
+    mi.set_variant("llvm_ad_mono_polarized")
+except (ImportError, AttributeError, ValueError):
+    pass
+
+from app.core.config import SCENE_DIR
+from app.core.metrics import SimulationSpan, add_span_listener, remove_span_listener
+from app.domains.device.models.device_model import Device, DeviceRole
+from app.domains.simulation.services import sionna_service as sionna
+
+ARTIFACTS = ("cfr", "sinr_map", "doppler", "channel_response", "scene_image")
+
+# 各生成函數與其支援的掃描參數
+GENERATORS = {
+    "cfr": (sionna.generate_cfr_plot, ("max_depth",)),
+    "sinr_map": (sionna.generate_sinr_map, ("max_depth", "samples_per_tx", "cell_size")),
+    "doppler": (sionna.generate_doppler_plots, ("max_depth",)),
+    "channel_response": (sionna.generate_channel_response_plots, ("max_depth",)),
+}
+
+
+def bundled_scenes() -> List[str]:
+    """場景目錄下同時具有 XML 的場景名稱"""
+    return sorted(
+        path.name.lower()
+        for path in SCENE_DIR.iterdir()
+        if path.is_dir() and (path / f"{path.name}.xml").exists()
+    )
+
+
+def synthetic_devices(count: int, seed: int = 0) -> List[Device]:
+    """產生 count 個發射器 (約 1/4 為干擾器) 與一個接收器，位置以固定種子隨機分布"""
+    rng = np.random.default_rng(seed)
+    jammers = max(1, count // 4) if count > 1 else 0
+    angles = rng.uniform(0.0, 2 * np.pi, count)
+    radii = rng.uniform(10.0, 60.0, count)
+    heights = rng.uniform(15.0, 25.0, count)
+    devices = [
+        Device(
+            name=f"bench_tx_{index}",
+            position_x=int(radius * np.cos(angle)),
+            position_y=int(radius * np.sin(angle)),
+            position_z=int(height),
+            orientation_x=0.0,
+            orientation_y=0.0,
+            orientation_z=0.0,
+            role=DeviceRole.JAMMER if index < jammers else DeviceRole.DESIRED,
+            power_dbm=40 if index < jammers else 30,
+            active=True,
+        )
+        for index, (angle, radius, height) in enumerate(zip(angles, radii, heights))
+    ]
+    devices.append(
+        Device(
+            name="bench_rx",
+            position_x=5,
+            position_y=5,
+            position_z=2,
+            role=DeviceRole.RECEIVER,
+            power_dbm=0,
+            active=True,
+        )
+    )
+    return devices
+
+
+async def create_session_factory(device_count: int, seed: int):
+    """建立已寫入合成設備的記憶體內 SQLite，回傳 (engine, session 工廠)"""
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+    async with AsyncSession(engine) as session:
+        session.add_all(synthetic_devices(device_count, seed))
+        await session.commit()
+
+    def factory() -> AsyncSession:
+        return AsyncSession(engine, expire_on_commit=False)
+
+    return engine, factory
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def package_versions() -> Dict[str, Optional[str]]:
+    from importlib import metadata
+
+    versions = {}
+    for package in ("sionna", "sionna-rt", "tensorflow", "mitsuba", "pyrender", "numpy"):
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+
+def case_key(case: Dict[str, Any]) -> str:
+    """比較結果時用來對應同一組參數的鍵"""
+    return "/".join(
+        f"{name}={case.get(name)}"
+        for name in ("artifact", "scene", "devices", "max_depth", "samples_per_tx", "cell_size")
+    )
+
+
+async def run_case(
+    artifact: str,
+    session_factory,
+    output_dir: Path,
+    repeat: int,
+    warmup: int,
+    **params,
+) -> Dict[str, Any]:
+    """執行單一組參數 warmup + repeat 次，回傳耗時統計"""
+    spans: List[SimulationSpan] = []
+    output_path = str(output_dir / f"{artifact}.png")
+
+    async def invoke() -> bool:
+        if artifact == "scene_image":
+            return await sionna.sionna_service.generate_empty_scene_image(output_path)
+        generator, _ = GENERATORS[artifact]
+        async with session_factory() as session:
+            return await generator(session, output_path, **params)
+
+    for _ in range(warmup):
+        await invoke()
+
+    add_span_listener(spans.append)
+    wall: List[float] = []
+    outcomes: List[bool] = []
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            outcomes.append(bool(await invoke()))
+            wall.append(time.perf_counter() - start)
+    finally:
+        remove_span_listener(spans.append)
+
+    stage_names = sorted({name for span in spans for name in span.stages})
+    return {
+        "artifact": artifact,
+        **params,
+        "success": all(outcomes),
+        "wall_s": wall,
+        "best_s": min(wall),
+        "median_s": statistics.median(wall),
+        "stages_median_s": {
+            name: statistics.median(span.stages.get(name, 0.0) for span in spans)
+            for name in stage_names
+        },
+    }
+
+
+def sweep_cases(args) -> List[Dict[str, Any]]:
+    """展開各生成函數的參數組合"""
+    cases = []
+    for artifact in args.artifacts:
+        if artifact == "scene_image":
+            # 空場景渲染固定使用 NYCU 的 GLB，與設備及求解參數無關
+            cases.append({"artifact": artifact, "scene": "nycu", "devices": 0})
+            continue
+        swept = GENERATORS[artifact][1]
+        for scene, devices, max_depth, samples_per_tx, cell_size in product(
+            args.scenes,
+            args.devices,
+            args.max_depth,
+            args.samples_per_tx if "samples_per_tx" in swept else [None],
+            args.cell_size if "cell_size" in swept else [None],
+        ):
+            case = {"artifact": artifact, "scene": scene, "devices": devices, "max_depth": max_depth}
+            if samples_per_tx is not None:
+                case["samples_per_tx"] = samples_per_tx
+            if cell_size is not None:
+                case["cell_size"] = cell_size
+            cases.append(case)
+    return cases
+
+
+async def run(args) -> Dict[str, Any]:
+    results: List[Dict[str, Any]] = []
+    factories: Dict[int, Any] = {}
+    engines = []
+    with tempfile.TemporaryDirectory(prefix="sionna_bench_") as tmp:
+        output_dir = Path(tmp)
+        try:
+            for case in sweep_cases(args):
+                devices = case.pop("devices")
+                artifact = case.pop("artifact")
+                if devices not in factories:
+                    engine, factories[devices] = await create_session_factory(devices, args.seed)
+                    engines.append(engine)
+                params = dict(case)
+                if artifact == "scene_image":
+                    params = {}
+                else:
+                    params["scene_name"] = params.pop("scene")
+                result = await run_case(
+                    artifact, factories[devices], output_dir, args.repeat, args.warmup, **params
+                )
+                result.pop("scene_name", None)
+                result.update(scene=case["scene"], devices=devices)
+                if artifact != "scene_image":
+                    result["scene_xml"] = sionna.get_scene_xml_file_path(case["scene"])
+                results.append(result)
+                print(
+                    f"{case_key(result):<90} median {result['median_s']:8.3f}s"
+                    f"{'' if result['success'] else '  FAILED'}"
+                )
+        finally:
+            for engine in engines:
+                await engine.dispose()
+
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "packages": package_versions(),
+        "settings": {"repeat": args.repeat, "warmup": args.warmup, "seed": args.seed},
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline_path: str) -> None:
+    """與先前的結果檔比較中位數耗時"""
+    with open(baseline_path) as handle:
+        baseline = json.load(handle)
+    previous = {case_key(case): case for case in baseline.get("results", [])}
+    print(f"\nCompared with {baseline_path} ({baseline.get('git_commit')})")
+    for case in current["results"]:
+        old = previous.get(case_key(case))
+        if old is None:
+            continue
+        ratio = case["median_s"] / old["median_s"] if old["median_s"] else float("nan")
+        print(
+            f"{case_key(case):<90} {old['median_s']:8.3f}s -> {case['median_s']:8.3f}s ({ratio:5.2f}x)"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="CPU-only benchmark of the simulation generators")
+    parser.add_argument("--artifacts", nargs="+", choices=ARTIFACTS, default=list(ARTIFACTS))
+    parser.add_argument("--scenes", nargs="+", default=None, help="預設為所有內建場景")
+    parser.add_argument("--devices", type=int, nargs="+", default=[2, 8])
+    parser.add_argument("--max-depth", type=int, nargs="+", default=[1, 3])
+    parser.add_argument("--samples-per-tx", type=int, nargs="+", default=[10**5, 10**6])
+    parser.add_argument("--cell-size", type=float, nargs="+", default=[1.0, 4.0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_simulation.json")
+    parser.add_argument("--compare", default=None, help="先前輸出的 JSON 結果檔")
+    args = parser.parse_args()
+    if args.scenes is None:
+        args.scenes = bundled_scenes()
+
+    report = asyncio.run(run(args))
+    with open(args.output, "w") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"Wrote {len(report['results'])} results to {args.output}")
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
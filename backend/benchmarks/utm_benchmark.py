@@ -0,0 +1,87 @@
+"""
+UTM 投影效能基準
+
+在 backend 目錄下執行：
+    python -m benchmarks.utm_benchmark --points 1000000 5000000
+
+對每個點數量測正算與反算的吞吐量 (點/秒) 與往返誤差；
+若安裝了 pyproj，另外回報與 pyproj 的最大差異。
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.domains.coordinates.utils import utm
+
+
+def _timed(func, *args, repeat: int = 3, **kwargs):
+    """執行 repeat 次並回傳最佳耗時 (秒) 與最後一次結果"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _pyproj_difference(lat, lon, easting, northing, zone: int):
+    try:
+        from pyproj import Transformer
+    except ImportError:
+        return None
+    transformer = Transformer.from_crs("EPSG:4326", f"EPSG:{32600 + zone}", always_xy=True)
+    e_ref, n_ref = transformer.transform(lon, lat)
+    return float(max(np.abs(easting - e_ref).max(), np.abs(northing - n_ref).max()))
+
+
+def run(points: int, zone: int, repeat: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    # 區帶內 (中央子午線 ±3°) 的隨機點位
+    central = 6.0 * zone - 183.0
+    lat = rng.uniform(0.0, 80.0, points)
+    lon = rng.uniform(central - 3.0, central + 3.0, points)
+
+    forward_s, (easting, northing) = _timed(
+        utm.geo_to_utm, lat, lon, zone=zone, south=False, repeat=repeat
+    )
+    inverse_s, (lat_back, lon_back) = _timed(
+        utm.utm_to_geo, easting, northing, zone, south=False, repeat=repeat
+    )
+    # 以度換算約略的米數
+    roundtrip_m = float(
+        max(np.abs(lat_back - lat).max(), np.abs(lon_back - lon).max()) * 111_320.0
+    )
+    return {
+        "points": points,
+        "forward_points_per_s": points / forward_s,
+        "inverse_points_per_s": points / inverse_s,
+        "roundtrip_max_error_m": roundtrip_m,
+        "pyproj_max_difference_m": _pyproj_difference(lat, lon, easting, northing, zone),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Vectorized UTM projection benchmark")
+    parser.add_argument("--points", type=int, nargs="+", default=[100_000, 1_000_000, 5_000_000])
+    parser.add_argument("--zone", type=int, default=51)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'points':>10} {'forward pts/s':>15} {'inverse pts/s':>15} {'roundtrip m':>12} {'vs pyproj m':>12}")
+    for points in args.points:
+        result = run(points, args.zone, args.repeat)
+        pyproj = result["pyproj_max_difference_m"]
+        print(
+            f"{result['points']:>10} "
+            f"{result['forward_points_per_s']:>15.3e} "
+            f"{result['inverse_points_per_s']:>15.3e} "
+            f"{result['roundtrip_max_error_m']:>12.2e} "
+            f"{'n/a' if pyproj is None else f'{pyproj:.2e}':>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useCallback, useRef } from 'react'
 import { ViewerProps } from '../../types/viewer'
 import { ApiRoutes } from '../../config/apiRoutes'
+import { clientIdHeaders } from '../../utils/clientId'
 
 // SINR Map 顯示組件
 const SINRViewer: React.FC<ViewerProps> = ({
@@ -39,7 +40,7 @@ const SINRViewer: React.FC<ViewerProps> = ({
         // 添加timestamp參數防止緩存，並添加 scene 參數
         const apiUrl = `${API_PATH}?scene=${currentScene}&sinr_vmin=${sinrVmin}&sinr_vmax=${sinrVmax}&cell_size=${cellSize}&samples_per_tx=${samplesPerTx}&t=${new Date().getTime()}`
 
-        fetch(apiUrl)
+        fetch(apiUrl, { headers: clientIdHeaders })
             .then((response) => {
                 if (!response.ok) {
                     throw new Error(
@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useCallback, useRef } from 'react'
 import { ViewerProps } from '../../types/viewer'
 import { ApiRoutes } from '../../config/apiRoutes'
+import { clientIdHeaders } from '../../utils/clientId'
 
 // Time-Frequency 顯示組件
 const TimeFrequencyViewer: React.FC<ViewerProps> = ({
@@ -36,7 +37,7 @@ const TimeFrequencyViewer: React.FC<ViewerProps> = ({
         // 添加timestamp參數防止緩存，並添加 scene 參數
         const apiUrl = `${API_PATH}?scene=${currentScene}&t=${new Date().getTime()}`
 
-        fetch(apiUrl)
+        fetch(apiUrl, { headers: clientIdHeaders })
             .then((response) => {
                 if (!response.ok) {
                     if (response.status === 400) {
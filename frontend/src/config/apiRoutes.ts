@@ -16,6 +16,8 @@ export const ApiRoutes = {
     getById: (id: string) => `${API_BASE_URL}/devices/${id}`,
     update: (id: string) => `${API_BASE_URL}/devices/${id}`,
     delete: (id: string) => `${API_BASE_URL}/devices/${id}`,
+    bulk: `${API_BASE_URL}/devices/bulk`,
+    events: `${API_BASE_URL}/devices/events`,  // WebSocket 設備事件串流
   },
   
   // 座標領域API
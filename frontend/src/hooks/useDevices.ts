@@ -1,11 +1,11 @@
-import { useState, useEffect, useCallback } from 'react'
+import { useState, useEffect, useCallback, useRef } from 'react'
 import {
     getDevices as apiGetDevices,
-    createDevice as apiCreateDevice,
-    updateDevice as apiUpdateDevice,
     deleteDevice as apiDeleteDevice,
+    bulkApplyDevices as apiBulkApplyDevices,
+    subscribeDeviceEvents,
 } from '../services'
-import { Device, DeviceCreate, DeviceUpdate } from '../types/device'
+import { Device, DeviceCreate, DeviceEvent } from '../types/device'
 import { convertBackendToFrontend } from '../utils/deviceUtils'
 
 export const useDevices = () => {
@@ -17,6 +17,12 @@ export const useDevices = () => {
         'disconnected' | 'connected' | 'error'
     >('disconnected')
     const [hasTempDevices, setHasTempDevices] = useState<boolean>(false)
+    // 設備事件處理需讀取最新的原始設備列表
+    const originalDevicesRef = useRef<Device[]>([])
+
+    useEffect(() => {
+        originalDevicesRef.current = originalDevices
+    }, [originalDevices])
 
     const fetchDevices = useCallback(async () => {
         try {
@@ -70,6 +76,53 @@ export const useDevices = () => {
         fetchDevices()
     }, [fetchDevices])
 
+    // 訂閱後端設備事件，將其他客戶端（及自身）的變更直接套用到本地狀態
+    useEffect(() => {
+        const applyEvent = (event: DeviceEvent) => {
+            if (event.resync) {
+                fetchDevices()
+                return
+            }
+            const deleted = new Set(event.deleted ?? [])
+            const updates = new Map((event.updated ?? []).map((diff) => [diff.id, diff]))
+            const created = (event.created ?? []).map(convertBackendToFrontend)
+
+            const applyTo = (devices: Device[]): Device[] => {
+                const next = devices
+                    .filter((device) => !deleted.has(device.id))
+                    .map((device) => {
+                        const diff = updates.get(device.id)
+                        return diff ? { ...device, ...diff } : device
+                    })
+                const existingIds = new Set(next.map((device) => device.id))
+                return [...next, ...created.filter((device) => !existingIds.has(device.id))]
+            }
+
+            const prevOriginal = originalDevicesRef.current
+            const nextOriginal = applyTo(prevOriginal)
+            originalDevicesRef.current = nextOriginal
+            setOriginalDevices(nextOriginal)
+            setTempDevices((prevTemp) => {
+                // 保留使用者尚未保存的編輯：只替換與原始狀態一致的設備
+                const originalById = new Map(prevOriginal.map((device) => [device.id, device]))
+                const nextById = new Map(nextOriginal.map((device) => [device.id, device]))
+                const merged = prevTemp
+                    .filter((device) => !deleted.has(device.id))
+                    .map((device) => {
+                        const original = originalById.get(device.id)
+                        const untouched =
+                            original !== undefined &&
+                            JSON.stringify(original) === JSON.stringify(device)
+                        return untouched ? nextById.get(device.id) ?? device : device
+                    })
+                const mergedIds = new Set(merged.map((device) => device.id))
+                return [...merged, ...created.filter((device) => !mergedIds.has(device.id))]
+            })
+        }
+
+        return subscribeDeviceEvents(applyEvent)
+    }, [fetchDevices])
+
     const applyDeviceChanges = async () => {
         if (apiStatus !== 'connected') {
             setError('無法保存更改：API連接未建立')
@@ -99,40 +152,56 @@ export const useDevices = () => {
                 return true
             }
 
-            for (const device of newDevices) {
-                const payload: DeviceCreate = {
-                    name: device.name,
-                    position_x: Math.round(device.position_x),
-                    position_y: Math.round(device.position_y),
-                    position_z: Math.round(device.position_z),
-                    orientation_x: device.orientation_x,
-                    orientation_y: device.orientation_y,
-                    orientation_z: device.orientation_z,
-                    role: device.role,
-                    power_dbm: device.power_dbm,
-                    active: device.active,
-                }
-                await apiCreateDevice(payload)
-            }
+            const toPayload = (device: Device): DeviceCreate => ({
+                name: device.name,
+                position_x: Math.round(device.position_x),
+                position_y: Math.round(device.position_y),
+                position_z: Math.round(device.position_z),
+                orientation_x: device.orientation_x,
+                orientation_y: device.orientation_y,
+                orientation_z: device.orientation_z,
+                role: device.role,
+                power_dbm: device.power_dbm,
+                active: device.active,
+            })
 
-            for (const device of devicesToUpdate) {
-                const payload: DeviceUpdate = {
-                    name: device.name,
-                    position_x: Math.round(device.position_x),
-                    position_y: Math.round(device.position_y),
-                    position_z: Math.round(device.position_z),
-                    orientation_x: device.orientation_x,
-                    orientation_y: device.orientation_y,
-                    orientation_z: device.orientation_z,
-                    role: device.role,
-                    power_dbm: device.power_dbm,
-                    active: device.active,
-                }
-                await apiUpdateDevice(device.id, payload)
-            }
+            // 所有新增與更新以單一請求送出，後端在同一交易中驗證並寫入
+            const response = await apiBulkApplyDevices({
+                create: newDevices.map(toPayload),
+                update: devicesToUpdate.map((device) => ({
+                    id: device.id,
+                    ...toPayload(device),
+                })),
+            })
 
-            console.log('useDevices: 所有更新完成，正在重新獲取設備列表...')
-            await fetchDevices()
+            // 以回應內容合併到最新的本地狀態，保留請求期間由設備事件套用的變更
+            const created = response.created.map(convertBackendToFrontend)
+            const createdByName = new Map(created.map((device) => [device.name, device]))
+            const updatedById = new Map(
+                response.updated.map((d) => [d.id, convertBackendToFrontend(d)])
+            )
+            const mergeSaved = (devices: Device[]): Device[] => {
+                const merged = devices.map((device) =>
+                    device.id < 0
+                        ? createdByName.get(device.name) ?? device
+                        : updatedById.get(device.id) ?? device
+                )
+                // 設備事件可能已先加入新建的設備，依 id 去除重複
+                const seen = new Set<number>()
+                const unique = merged.filter((device) => {
+                    if (seen.has(device.id)) return false
+                    seen.add(device.id)
+                    return true
+                })
+                return [...unique, ...created.filter((device) => !seen.has(device.id))]
+            }
+            console.log('useDevices: 批次更新完成，已同步本地設備列表')
+            setTempDevices((prev) => mergeSaved(prev))
+            setOriginalDevices((prev) => {
+                const next = mergeSaved(prev.filter((device) => device.id >= 0))
+                originalDevicesRef.current = next
+                return next
+            })
             setHasTempDevices(false)
             return true
         } catch (err: any) {
@@ -163,7 +232,9 @@ export const useDevices = () => {
             console.log(`useDevices: 調用 API 刪除設備 ID: ${id}`)
             await apiDeleteDevice(id)
             console.log(`useDevices: 設備 ID: ${id} 刪除成功`)
-            await fetchDevices()
+            // 直接移除本地設備，其他客戶端經由設備事件串流同步
+            setTempDevices((prev) => prev.filter((device) => device.id !== id))
+            setOriginalDevices((prev) => prev.filter((device) => device.id !== id))
             return true
         } catch (err: any) {
             console.error(`useDevices: 刪除設備ID ${id} 失敗:`, err)
@@ -1,5 +1,6 @@
 // api.ts - 集中管理 API 請求
 import axios from 'axios';
+import { CLIENT_ID, CLIENT_ID_HEADER } from '../utils/clientId';
 
 // 創建一個 axios 實例，使用相對路徑
 const api = axios.create({
@@ -7,6 +8,7 @@ const api = axios.create({
   timeout: 30000, // 30 秒超時
   headers: {
     'Content-Type': 'application/json',
+    [CLIENT_ID_HEADER]: CLIENT_ID, // 模擬請求的排程與取代以分頁區分客戶端
   }
 });
 
@@ -1,5 +1,12 @@
 import api from './api';
-import { Device, DeviceCreate, DeviceUpdate } from '../types/device';
+import {
+  Device,
+  DeviceCreate,
+  DeviceUpdate,
+  DeviceBulkRequest,
+  DeviceBulkResponse,
+  DeviceEvent,
+} from '../types/device';
 import { ApiRoutes } from '../config/apiRoutes';
 
 // 設備角色枚舉（對應後端的 DeviceRole）
@@ -69,10 +76,70 @@ export const deleteDevice = async (deviceId: number): Promise<void> => {
   }
 };
 
+// 在單一請求/交易中批次建立、更新與刪除設備
+export const bulkApplyDevices = async (
+  payload: DeviceBulkRequest
+): Promise<DeviceBulkResponse> => {
+  try {
+    const response = await api.post<DeviceBulkResponse>(ApiRoutes.devices.bulk, payload);
+    return response.data;
+  } catch (error) {
+    console.error('批次更新設備失敗:', error);
+    throw error;
+  }
+};
+
+// 訂閱設備事件串流，斷線後自動重連；回傳取消訂閱的函數
+export const subscribeDeviceEvents = (
+  onEvent: (event: DeviceEvent) => void,
+  reconnectDelayMs: number = 3000
+): (() => void) => {
+  const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+  const url = `${protocol}//${window.location.host}${ApiRoutes.devices.events}`;
+  let socket: WebSocket | null = null;
+  let reconnectTimer: ReturnType<typeof setTimeout> | null = null;
+  let closed = false;
+  let hasConnected = false;
+
+  const connect = () => {
+    socket = new WebSocket(url);
+    socket.onopen = () => {
+      // 重連期間可能遺漏事件，要求重新同步
+      if (hasConnected) {
+        onEvent({ resync: true });
+      }
+      hasConnected = true;
+    };
+    socket.onmessage = (message) => {
+      try {
+        onEvent(JSON.parse(message.data) as DeviceEvent);
+      } catch (error) {
+        console.error('解析設備事件失敗:', error);
+      }
+    };
+    socket.onclose = () => {
+      if (!closed) {
+        reconnectTimer = setTimeout(connect, reconnectDelayMs);
+      }
+    };
+  };
+
+  connect();
+  return () => {
+    closed = true;
+    if (reconnectTimer) {
+      clearTimeout(reconnectTimer);
+    }
+    socket?.close();
+  };
+};
+
 export default {
   getDevices,
   getDeviceById,
   createDevice,
   updateDevice,
-  deleteDevice
+  deleteDevice,
+  bulkApplyDevices,
+  subscribeDeviceEvents
 }; 
\ No newline at end of file
@@ -41,4 +41,31 @@ export interface DeviceUpdate {
   role?: string;
   power_dbm?: number;
   active?: boolean;
-} 
\ No newline at end of file
+} 
+
+// 批次更新中的單筆設備更新
+export interface DeviceBulkUpdate extends DeviceUpdate {
+  id: number;
+}
+
+// 批次建立/更新/刪除設備的請求
+export interface DeviceBulkRequest {
+  create?: DeviceCreate[];
+  update?: DeviceBulkUpdate[];
+  delete?: number[];
+}
+
+// 批次操作結果
+export interface DeviceBulkResponse {
+  created: Device[];
+  updated: Device[];
+  deleted_ids: number[];
+}
+
+// 設備事件串流的單次提交差異 (updated 只包含 id 與變動欄位)
+export interface DeviceEvent {
+  created?: Device[];
+  updated?: (Partial<Device> & { id: number })[];
+  deleted?: number[];
+  resync?: boolean;
+}
@@ -0,0 +1,17 @@
+// 每個分頁各自的客戶端識別，模擬請求以 X-Client-Id 標頭送出：
+// 後端依此在客戶端之間公平排程，並讓同一分頁對同一圖表的新請求取代舊請求
+// (經 Vite 代理的請求來源位址都相同，無法用來區分使用者)
+export const CLIENT_ID_HEADER = 'X-Client-Id'
+
+function createClientId(): string {
+    // crypto.randomUUID 只在安全環境 (https) 可用，getRandomValues 則不受限制
+    const bytes = new Uint8Array(16)
+    crypto.getRandomValues(bytes)
+    return Array.from(bytes, (b) => b.toString(16).padStart(2, '0')).join('')
+}
+
+export const CLIENT_ID = createClientId()
+
+export const clientIdHeaders: Record<string, string> = {
+    [CLIENT_ID_HEADER]: CLIENT_ID,
+}
@@ -23,6 +23,7 @@ export default defineConfig({
                 target: 'http://sionna_backend:8000', // 使用正確的容器名稱
                 changeOrigin: true, // 修改請求頭中的 Host 字段為目標 URL
                 secure: false, // 關閉安全檢查，允許自簽證書
+                ws: true, // 代理 WebSocket (設備事件串流)
                 rewrite: (path: string) => path, // 保持路徑不變
                 configure: (proxy: any, options: any) => {
                     // 代理事件處理